@@ -53,6 +53,12 @@ class Settings(BaseSettings):
     model_confidence: float = Field(0.25, env="MODEL_CONFIDENCE")
     model_cache_dir: str = Field("./models", env="MODEL_CACHE_DIR")
     
+    # Tiled inference for high-resolution photos
+    tiled_inference: bool = Field(False, env="TILED_INFERENCE")
+    tile_size: int = Field(640, env="TILE_SIZE")
+    tile_overlap: float = Field(0.2, env="TILE_OVERLAP")
+    max_tiles: int = Field(16, env="MAX_TILES")
+    
     # Google Cloud / Vertex AI
     google_cloud_project: Optional[str] = Field(None, env="GOOGLE_CLOUD_PROJECT")
     vertex_ai_location: str = Field("us-central1", env="VERTEX_AI_LOCATION")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Export LPP Detector - Exporta el detector YOLOv5 a ONNX para nodos solo CPU
+Convierte los pesos configurados a ONNX (opcionalmente INT8 y TorchScript)
+y verifica la paridad con el modelo eager sobre un conjunto de imágenes.
+
+Uso:
+    python scripts/export_detector_onnx.py --weights models/vigia_lpp_yolo.pt --output models/onnx
+    python scripts/export_detector_onnx.py --int8 --parity-images tests/fixtures/wounds --threads 4
+"""
+
+import os
+import sys
+import argparse
+import json
+from pathlib import Path
+
+# Agregar path del proyecto
+sys.path.append(str(Path(__file__).parent.parent))
+
+from vigia_detect.cv_pipeline.onnx_backend import (
+    OnnxLPPDetector,
+    check_parity,
+    export_detector,
+    parse_core_list
+)
+from vigia_detect.cv_pipeline.real_lpp_detector import RealLPPDetector
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def find_fixture_images(directory: str) -> list:
+    """Imágenes de un directorio de fixtures, en orden estable."""
+    return sorted(
+        str(path) for path in Path(directory).iterdir()
+        if path.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Exportar detector LPP a ONNX Runtime")
+    parser.add_argument("--weights", default=os.getenv('YOLO_MODEL_PATH', './models/vigia_lpp_yolo.pt'),
+                        help="Pesos YOLOv5 entrenados (.pt)")
+    parser.add_argument("--output", default="./models/onnx",
+                        help="Directorio de salida")
+    parser.add_argument("--input-size", type=int, default=640,
+                        help="Lado de la entrada cuadrada del modelo")
+    parser.add_argument("--opset", type=int, default=12,
+                        help="Versión de opset ONNX")
+    parser.add_argument("--int8", action="store_true",
+                        help="Generar además un modelo INT8 cuantizado")
+    parser.add_argument("--torchscript", action="store_true",
+                        help="Generar además un modelo TorchScript")
+    parser.add_argument("--parity-images",
+                        help="Directorio de imágenes para verificar paridad con el modelo eager")
+    parser.add_argument("--threads", type=int,
+                        help="Hilos intra-op de ONNX Runtime (por defecto núcleos físicos)")
+    parser.add_argument("--cores",
+                        help="Núcleos a los que fijar los hilos (ej. 0-3)")
+    args = parser.parse_args()
+
+    if not Path(args.weights).exists():
+        print(f"❌ Pesos no encontrados: {args.weights}")
+        return 1
+
+    paths = export_detector(
+        args.weights,
+        args.output,
+        input_size=args.input_size,
+        opset=args.opset,
+        int8=args.int8,
+        torchscript=args.torchscript
+    )
+    for export_format, path in paths.items():
+        print(f"✅ {export_format}: {path}")
+
+    if not args.parity_images:
+        return 0
+
+    images = find_fixture_images(args.parity_images)
+    if not images:
+        print(f"❌ No hay imágenes en {args.parity_images}")
+        return 1
+
+    reference = RealLPPDetector(args.weights)
+    all_passed = True
+    for export_format in ('onnx', 'onnx_int8'):
+        if export_format not in paths:
+            continue
+        candidate = OnnxLPPDetector(
+            paths[export_format],
+            intra_op_threads=args.threads,
+            cores=parse_core_list(args.cores)
+        )
+        report = check_parity(reference, candidate, images)
+        all_passed = all_passed and report['passed']
+        print(f"\n{'✅' if report['passed'] else '❌'} Paridad {export_format}:")
+        print(json.dumps(report, indent=2))
+
+    return 0 if all_passed else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+CV Pipeline Benchmark - Latencia por etapa del pipeline de visión
+Mide decodificación, EXIF, rostros, CLAHE, redimensionado, normalización,
+inferencia y compresión de salidas crudas sobre imágenes sintéticas, y
+compara contra un baseline JSON para detectar regresiones.
+
+Uso:
+    python scripts/testing/benchmark_cv_pipeline.py --update-baseline
+    python scripts/testing/benchmark_cv_pipeline.py --threshold 0.2
+    python scripts/testing/benchmark_cv_pipeline.py --resolutions 640x480,4032x3024 --weights models/vigia_lpp_yolo.pt
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Agregar path del proyecto
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from vigia_detect.cv_pipeline.benchmark import (
+    DEFAULT_MIN_DELTA_MS,
+    DEFAULT_RESOLUTIONS,
+    DEFAULT_THRESHOLD,
+    compare_to_baseline,
+    load_baseline,
+    run_cv_benchmarks,
+    save_baseline
+)
+
+DEFAULT_BASELINE = Path(__file__).parent.parent.parent / "tests" / "performance" / "baselines" / "cv_pipeline.json"
+
+
+def parse_resolutions(value: str) -> list:
+    """'640x480,1280x960' -> [(640, 480), (1280, 960)]"""
+    resolutions = []
+    for part in value.split(','):
+        width, height = part.lower().strip().split('x')
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+
+def print_results(report: dict):
+    """Tabla de medianas y p95 por etapa"""
+    print(f"\n{'Etapa':<45} {'Mediana (ms)':>14} {'p95 (ms)':>12}")
+    print("-" * 73)
+    for stage, stats in sorted(report['results'].items()):
+        print(f"{stage:<45} {stats['median_ms']:>14.3f} {stats['p95_ms']:>12.3f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark por etapa del pipeline CV")
+    parser.add_argument("--resolutions", type=parse_resolutions,
+                        default=DEFAULT_RESOLUTIONS,
+                        help="Resoluciones sintéticas (ej. 640x480,1280x960)")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Ejecuciones medidas por etapa")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Ejecuciones de calentamiento por etapa")
+    parser.add_argument("--weights",
+                        help="Pesos YOLOv5 para medir RealLPPDetector")
+    parser.add_argument("--no-detectors", action="store_true",
+                        help="Omitir las etapas de inferencia")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE),
+                        help="Archivo JSON de baseline")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Guardar esta ejecución como nuevo baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Regresión relativa permitida (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="Regresión absoluta mínima a reportar")
+    parser.add_argument("--output",
+                        help="Guardar el reporte completo en este JSON")
+    args = parser.parse_args()
+
+    print("🔬 Ejecutando benchmarks del pipeline CV...")
+    report = run_cv_benchmarks(
+        resolutions=args.resolutions,
+        repeats=args.repeats,
+        warmup=args.warmup,
+        detectors=not args.no_detectors,
+        weights=args.weights
+    )
+    print_results(report)
+
+    if args.output:
+        save_baseline(report, args.output)
+        print(f"\n📄 Reporte guardado en {args.output}")
+
+    if args.update_baseline:
+        save_baseline(report, args.baseline)
+        print(f"\n✅ Baseline actualizado: {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\n⚠️  Sin baseline en {args.baseline} (use --update-baseline para crearlo)")
+        return 0
+
+    if baseline.get('environment', {}).get('platform') != report['environment']['platform']:
+        print("\n⚠️  El baseline proviene de otra plataforma; las comparaciones pueden no ser fiables")
+
+    regressions = compare_to_baseline(report, baseline, args.threshold, args.min_delta_ms)
+    if not regressions:
+        print(f"\n✅ Sin regresiones sobre {args.threshold:.0%} respecto al baseline")
+        return 0
+
+    print(f"\n❌ {len(regressions)} regresiones de latencia:")
+    print(json.dumps(regressions, indent=2))
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+CV Pipeline Benchmarks
+======================
+
+Stage-level latency benchmarks for the computer vision pipeline and the
+baseline regression check used to catch slowdowns before deployment.
+
+Create or refresh the baseline with:
+    python scripts/testing/benchmark_cv_pipeline.py --update-baseline
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from vigia_detect.cv_pipeline.benchmark import (
+    compare_to_baseline,
+    load_baseline,
+    measure,
+    run_cv_benchmarks,
+    save_baseline,
+    synthetic_wound_image,
+)
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "cv_pipeline.json"
+
+
+def _report(**medians):
+    return {"version": 1, "results": {stage: {"median_ms": ms} for stage, ms in medians.items()}}
+
+
+@pytest.mark.performance
+class TestBenchmarkHarness:
+    """Fixtures, timing and baseline comparison."""
+
+    def test_synthetic_wound_is_deterministic(self):
+        first = synthetic_wound_image(320, 240, stage=3, seed=7)
+        second = synthetic_wound_image(320, 240, stage=3, seed=7)
+
+        assert first.shape == (240, 320, 3) and first.dtype == np.uint8
+        np.testing.assert_array_equal(first, second)
+        # Lecho de la herida más rojo que la piel promedio
+        assert first[..., 2].std() > 10
+
+    def test_measure_times_only_the_call(self):
+        calls = []
+
+        stats = measure(lambda value: calls.append(value), setup=lambda: (len(calls),), repeats=3, warmup=2)
+
+        assert calls == [0, 1, 2, 3, 4]
+        assert stats["repeats"] == 3
+        assert stats["min_ms"] <= stats["median_ms"] <= stats["p95_ms"]
+
+    def test_regressions_respect_threshold_and_noise_floor(self):
+        baseline = _report(**{"preprocess.clahe@640x480": 10.0, "preprocess.resize@640x480": 0.2, "gone": 1.0})
+        current = _report(**{"preprocess.clahe@640x480": 13.0, "preprocess.resize@640x480": 0.6, "new": 5.0})
+
+        regressions = compare_to_baseline(current, baseline, threshold=0.25, min_delta_ms=0.5)
+
+        assert [r["stage"] for r in regressions] == ["preprocess.clahe@640x480"]
+        assert regressions[0]["ratio"] == 1.3
+        assert compare_to_baseline(current, baseline, threshold=0.5) == []
+
+    def test_baseline_round_trip(self, tmp_path):
+        path = tmp_path / "nested" / "baseline.json"
+
+        save_baseline(_report(stage=1.5), str(path))
+
+        assert load_baseline(str(path))["results"]["stage"]["median_ms"] == 1.5
+        assert load_baseline(str(tmp_path / "missing.json")) is None
+
+    def test_unknown_baseline_version_is_rejected(self, tmp_path):
+        path = tmp_path / "baseline.json"
+        save_baseline({"version": 99, "results": {}}, str(path))
+
+        with pytest.raises(ValueError):
+            load_baseline(str(path))
+
+
+@pytest.mark.performance
+class TestCVPipelineBenchmarks:
+    """Stage benchmarks on synthetic wound photos."""
+
+    def test_suite_covers_every_stage(self):
+        report = run_cv_benchmarks(resolutions=[(320, 240)], repeats=1, warmup=0, detectors=False)
+
+        stages = {key.split("@")[0] for key in report["results"]}
+        assert {
+            "preprocess.decode",
+            "preprocess.load_strip_exif",
+            "preprocess.face_blur",
+            "preprocess.clahe",
+            "preprocess.resize",
+            "preprocess.normalize",
+            "preprocess.total",
+            "raw_output.encode",
+            "raw_output.decode",
+        } <= stages
+        assert report["results"]["raw_output.encode"]["compression_ratio"] > 0
+        assert report["environment"]["cpu_count"]
+
+    @pytest.mark.slow
+    @pytest.mark.regression
+    def test_no_latency_regression_against_baseline(self):
+        baseline = load_baseline(str(BASELINE_PATH))
+        if baseline is None:
+            pytest.skip("No CV pipeline baseline recorded for this host")
+
+        threshold = float(os.getenv("VIGIA_BENCHMARK_THRESHOLD", "0.25"))
+        resolutions = sorted({
+            tuple(int(side) for side in key.split("@")[1].split("x"))
+            for key in baseline["results"] if "@" in key
+        })
+        report = run_cv_benchmarks(resolutions=resolutions, repeats=5)
+
+        regressions = compare_to_baseline(report, baseline, threshold=threshold)
+
+        assert not regressions, f"Latency regressions beyond {threshold:.0%}: {regressions}"
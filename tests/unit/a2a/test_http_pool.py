@@ -0,0 +1,142 @@
+"""
+Test A2A HTTP Connection Pool
+=============================
+
+Tests para el pool de conexiones HTTP compartido por los emisores A2A.
+"""
+
+import asyncio
+import threading
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from vigia_detect.a2a.http_pool import A2AConnectionPool, HTTPPoolConfig
+
+
+async def handle_message(request: web.Request) -> web.Response:
+    return web.json_response({"received": await request.json()})
+
+
+@pytest_asyncio.fixture
+async def agent_server():
+    app = web.Application()
+    app.router.add_post("/a2a/message", handle_message)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+class TestA2AConnectionPool:
+    """Tests del pool de conexiones"""
+
+    @pytest.mark.asyncio
+    async def test_sequential_requests_reuse_one_connection(self, agent_server):
+        pool = A2AConnectionPool()
+        url = str(agent_server.make_url("/a2a/message"))
+
+        for i in range(5):
+            session = await pool.get_session()
+            async with session.post(url, json={"id": i}) as response:
+                assert (await response.json())["received"] == {"id": i}
+
+        stats = pool.get_stats()
+        assert stats["requests"] == 5
+        assert stats["connections_created"] == 1
+        assert stats["connections_reused"] == 4
+        assert stats["connection_reuse_ratio"] == pytest.approx(0.8)
+        assert stats["in_flight"] == 0
+
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_session_reopened_after_close(self, agent_server):
+        pool = A2AConnectionPool(HTTPPoolConfig(limit=4))
+        first = await pool.get_session()
+        await pool.close()
+
+        second = await pool.get_session()
+
+        assert second is not first and not second.closed
+        assert pool.get_stats()["sessions_created"] == 2
+        await pool.close()
+        assert pool.get_stats()["session_open"] is False
+
+    def test_session_from_closed_loop_is_released(self):
+        pool = A2AConnectionPool()
+        first = asyncio.run(pool.get_session())
+        connector = first.connector
+
+        async def reopen():
+            session = await pool.get_session()
+            await pool.close()
+            return session
+
+        second = asyncio.run(reopen())
+
+        assert first.closed and second is not first
+        assert first.connector is None and connector.closed
+
+    def test_session_from_stopped_loop_is_closed_on_that_loop(self):
+        pool = A2AConnectionPool()
+        server_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=server_loop.run_forever, daemon=True)
+        thread.start()
+        old_loop = asyncio.new_event_loop()
+        try:
+            app = web.Application()
+            app.router.add_post("/a2a/message", handle_message)
+            server = TestServer(app, loop=server_loop)
+            asyncio.run_coroutine_threadsafe(server.start_server(), server_loop).result(5)
+            url = str(server.make_url("/a2a/message"))
+
+            async def send():
+                session = await pool.get_session()
+                async with session.post(url, json={"id": 1}) as response:
+                    await response.json()
+                return session
+
+            # Loop parado pero abierto, con una conexión keep-alive en el pool
+            first = old_loop.run_until_complete(send())
+            connector = first.connector
+
+            async def reopen():
+                session = await pool.get_session()
+                await pool.close()
+                return session
+
+            second = asyncio.run(reopen())
+
+            assert second is not first
+            assert first.closed and connector.closed
+            assert pool.get_stats()["sessions_created"] == 2
+        finally:
+            asyncio.run_coroutine_threadsafe(server.close(), server_loop).result(5)
+            server_loop.call_soon_threadsafe(server_loop.stop)
+            thread.join(5)
+            server_loop.close()
+            old_loop.close()
+
+    def test_session_from_running_loop_is_closed_on_that_loop(self):
+        pool = A2AConnectionPool()
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            first = asyncio.run_coroutine_threadsafe(pool.get_session(), other_loop).result(5)
+
+            async def reopen():
+                await pool.get_session()
+                await pool.close()
+
+            asyncio.run(reopen())
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result(5)
+
+            assert first.closed
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join(5)
+            other_loop.close()
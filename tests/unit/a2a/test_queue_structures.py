@@ -0,0 +1,61 @@
+"""
+Test A2A Queue Structures
+=========================
+
+Tests para el heap de prioridad y el timer wheel de las colas A2A.
+"""
+
+from vigia_detect.a2a.queue_structures import PriorityMessageHeap, TimerWheel
+
+
+class TestPriorityMessageHeap:
+    """Tests del heap de prioridad"""
+
+    def test_lower_rank_served_first(self):
+        heap = PriorityMessageHeap()
+        heap.push("low", 3, 1.0)
+        heap.push("critical", 0, 5.0)
+        heap.push("normal", 2, 0.5)
+
+        assert [heap.pop() for _ in range(3)] == ["critical", "normal", "low"]
+
+    def test_fifo_within_priority(self):
+        heap = PriorityMessageHeap()
+        for i in range(100):
+            heap.push(i, 1, 10.0)
+
+        assert [heap.pop() for _ in range(100)] == list(range(100))
+
+    def test_large_burst_keeps_order(self):
+        heap = PriorityMessageHeap()
+        for i in range(10000):
+            heap.push(i, i % 4, float(i // 7))
+
+        popped = [heap.pop() for _ in range(len(heap))]
+
+        assert popped == sorted(range(10000), key=lambda i: (i % 4, i // 7, i))
+        assert not heap and heap.peek() is None
+
+
+class TestTimerWheel:
+    """Tests del timer wheel"""
+
+    def test_pop_due_returns_only_due_items_in_order(self):
+        wheel = TimerWheel(resolution=0.1)
+        wheel.schedule("late", 12.0)
+        wheel.schedule("second", 10.35)
+        wheel.schedule("first", 10.05)
+
+        assert wheel.pop_due(9.0) == []
+        assert wheel.pop_due(10.4) == [(10.05, "first"), (10.35, "second")]
+        assert len(wheel) == 1
+        assert wheel.next_due() == 12.0
+
+    def test_partially_due_current_bucket(self):
+        wheel = TimerWheel(resolution=1.0)
+        wheel.schedule("a", 5.2)
+        wheel.schedule("b", 5.8)
+
+        assert wheel.pop_due(5.5) == [(5.2, "a")]
+        assert wheel.pop_due(5.9) == [(5.8, "b")]
+        assert not wheel
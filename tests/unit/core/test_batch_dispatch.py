@@ -0,0 +1,238 @@
+"""
+Test Batch Dispatch
+===================
+
+Tests para el reprocesamiento por lotes: triage en una pasada, creación de
+sesiones en pipeline y despacho por prioridad de ruta.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from vigia_detect.core.input_packager import StandardizedInput
+from vigia_detect.core.medical_dispatcher import MedicalDispatcher, ProcessingRoute
+from vigia_detect.core.phi_tokenization_client import TokenizedPatient
+from vigia_detect.core.session_manager import SessionManager, SessionType
+
+
+def make_session_manager():
+    session_manager = SessionManager()
+    session_manager.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return session_manager
+
+
+def make_input(session_id, text, has_media=False):
+    return StandardizedInput(
+        session_id=session_id,
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        input_type="image" if has_media else "text",
+        raw_content={"text": text},
+        metadata={"source": "whatsapp", "has_media": has_media, "has_text": bool(text)},
+        audit_trail={}
+    )
+
+
+class FakePHIClient:
+    def __init__(self):
+        self.calls = []
+
+    async def tokenize_patient(self, hospital_mrn, request_purpose, urgency_level):
+        self.calls.append(hospital_mrn)
+        return TokenizedPatient(
+            token_id=f"tok-{hospital_mrn}",
+            patient_alias="Batman",
+            age_range="70-80",
+            gender_category="male",
+            risk_factors={},
+            medical_conditions={},
+            expires_at=datetime.now(timezone.utc) + timedelta(hours=1)
+        )
+
+
+class RecordingProcessor:
+    def __init__(self, log):
+        self.log = log
+
+    async def process(self, standardized_input, triage_decision):
+        self.log.append(standardized_input.session_id)
+        return {"success": True, "summary": triage_decision.route.value}
+
+
+def make_dispatcher():
+    dispatcher = MedicalDispatcher(session_manager=make_session_manager(), phi_client=FakePHIClient())
+    dispatched = []
+    for route in ProcessingRoute:
+        dispatcher.register_route_processor(route, RecordingProcessor(dispatched))
+    return dispatcher, dispatched
+
+
+class TestCreateSessions:
+    """Tests de creación de sesiones en pipeline"""
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_written_in_one_pipeline(self, monkeypatch):
+        pytest.importorskip("lupa")
+        session_manager = make_session_manager()
+        await session_manager._load_scripts()
+        executed = []
+        original = session_manager.redis_client.pipeline
+
+        def spy(*args, **kwargs):
+            pipe = original(*args, **kwargs)
+            execute = pipe.execute
+
+            async def recording_execute(*a, **kw):
+                executed.append(len(pipe.command_stack))
+                return await execute(*a, **kw)
+
+            pipe.execute = recording_execute
+            return pipe
+
+        monkeypatch.setattr(session_manager.redis_client, "pipeline", spy)
+
+        results = await session_manager.create_sessions([
+            ({"source": "whatsapp", "input_type": "image"}, SessionType.CLINICAL_IMAGE, False),
+            ({"source": "whatsapp", "input_type": "text"}, SessionType.EMERGENCY, True),
+        ])
+
+        assert [r["success"] for r in results] == [True, True]
+        assert results[1]["timeout_minutes"] == 30
+        assert executed == [2]
+        assert await session_manager.list_active_sessions(SessionType.EMERGENCY) == [results[1]["session_id"]]
+        assert await session_manager.redis_client.ttl(f"session:{results[0]['session_id']}") > 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limits_are_allotted_in_batch_order(self):
+        session_manager = make_session_manager()
+        session_manager.max_concurrent_sessions[SessionType.EMERGENCY] = 1
+
+        results = await session_manager.create_sessions([
+            ({}, SessionType.EMERGENCY, True),
+            ({}, SessionType.EMERGENCY, True),
+        ])
+
+        assert results[0]["success"]
+        assert results[1]["error"] == "max_concurrent_sessions_reached"
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self):
+        assert await make_session_manager().create_sessions([]) == []
+
+
+class TestDispatchMany:
+    """Tests de despacho por lotes"""
+
+    @pytest.mark.asyncio
+    async def test_results_keep_input_order_and_emergencies_go_first(self):
+        dispatcher, dispatched = make_dispatcher()
+        inputs = [
+            make_input("Q1", "¿Cuál es el protocolo para LPP grado 2?"),
+            make_input("E1", "emergencia, está sangrando"),
+            make_input("I1", "foto del talón CD-2025-001", has_media=True),
+            make_input("H1", "", has_media=True),
+        ]
+
+        results = await dispatcher.dispatch_many(inputs, max_concurrency=2)
+
+        assert [r["session_id"] for r in results] == ["Q1", "E1", "I1", "H1"]
+        assert [r["route"] for r in results] == [
+            ProcessingRoute.MEDICAL_QUERY.value,
+            ProcessingRoute.EMERGENCY.value,
+            ProcessingRoute.CLINICAL_IMAGE.value,
+            ProcessingRoute.HUMAN_REVIEW.value,
+        ]
+        assert dispatched == ["E1", "I1", "H1", "Q1"]
+        assert (await dispatcher.get_routing_metrics())["total_dispatched"] == 4
+
+    @pytest.mark.asyncio
+    async def test_patient_codes_are_tokenized_once_per_batch(self):
+        dispatcher, _ = make_dispatcher()
+        inputs = [make_input(f"S{i}", "imagen de CD-2025-001", has_media=True) for i in range(3)]
+
+        results = await dispatcher.dispatch_many(inputs)
+
+        assert dispatcher.phi_client.calls == ["CD-2025-001"]
+        assert {r["route"] for r in results} == {ProcessingRoute.CLINICAL_IMAGE.value}
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_single_dispatch_routes(self):
+        texts = ["ayuda urgente", "dosis de medicamento para la úlcera", "hola"]
+        single, _ = make_dispatcher()
+        batch, _ = make_dispatcher()
+
+        expected = [(await single.dispatch(make_input(f"S{i}", t)))["route"] for i, t in enumerate(texts)]
+        results = await batch.dispatch_many([make_input(f"S{i}", t) for i, t in enumerate(texts)])
+
+        assert [r["route"] for r in results] == expected
+
+    @pytest.mark.asyncio
+    async def test_failed_session_creation_is_reported_per_input(self):
+        dispatcher, dispatched = make_dispatcher()
+        dispatcher.session_manager.max_concurrent_sessions[SessionType.EMERGENCY] = 1
+
+        results = await dispatcher.dispatch_many([
+            make_input("E1", "emergencia"),
+            make_input("E2", "emergencia"),
+        ])
+
+        assert results[0]["success"]
+        assert results[1]["error"] == "session_creation_failed"
+        assert dispatched == ["E1"]
+
+
+class TestTriageBatch:
+    """Tests de triage por lotes del motor de reglas"""
+
+    @pytest.mark.asyncio
+    async def test_batch_triage_matches_single_triage(self):
+        pytest.importorskip("google.generativeai")
+        from vigia_detect.core.triage_engine import MedicalTriageEngine
+
+        engine = MedicalTriageEngine()
+        inputs = [
+            make_input("S1", "Paciente con dolor severo"),
+            make_input("S2", "Foto de LPP grado 2 CD-2025-001", has_media=True),
+            make_input("S3", "Paciente con dolor severo"),
+            make_input("S4", ""),
+        ]
+
+        batch = await engine.perform_triage_batch(inputs)
+        single = [await engine.perform_triage(si) for si in inputs]
+
+        for batch_result, single_result in zip(batch, single):
+            assert batch_result.matched_rules == single_result.matched_rules
+            assert batch_result.urgency == single_result.urgency
+            assert batch_result.context == single_result.context
+            assert batch_result.confidence == single_result.confidence
+            assert batch_result.recommended_route == single_result.recommended_route
+        assert batch[0].clinical_flags is not batch[2].clinical_flags
+
+    @pytest.mark.asyncio
+    async def test_dispatcher_batch_triage_matches_single_triage(self):
+        dispatcher, _ = make_dispatcher()
+        inputs = [
+            make_input("S1", "ayuda urgente"),
+            make_input("S2", "Foto de LPP grado 2 CD-2025-001", has_media=True),
+            make_input("S3", "ayuda urgente"),
+            make_input("S4", "dosis de medicamento para la úlcera"),
+            make_input("S5", "Foto sin código", has_media=True),
+            make_input("S6", "Dolor y estrés del paciente CD-2025-001", has_media=True),
+            make_input("S7", ""),
+        ]
+
+        batch = await dispatcher._perform_medical_triage_batch(inputs)
+        assert dispatcher.phi_client.calls == ["CD-2025-001"]
+        single = [await dispatcher._perform_medical_triage(si) for si in inputs]
+
+        for batch_decision, single_decision in zip(batch, single):
+            assert batch_decision.route == single_decision.route
+            assert batch_decision.confidence == single_decision.confidence
+            assert batch_decision.reason == single_decision.reason
+            assert batch_decision.flags == single_decision.flags
+            assert getattr(batch_decision, "analysis_mode", None) == getattr(single_decision, "analysis_mode", None)
+            assert (batch_decision.tokenized_patient is None) == (single_decision.tokenized_patient is None)
+        assert batch[0].flags is not batch[2].flags
+        assert batch[1].tokenized_patient.token_id == "tok-CD-2025-001"
@@ -0,0 +1,148 @@
+"""
+Tests for the pipelined batch runner.
+"""
+import threading
+import time
+
+import pytest
+
+from vigia_detect.core.batch_pipeline import PipelinedBatchRunner
+
+
+def _failing_on(value):
+    def stage(item):
+        if item == value:
+            raise ValueError(f"bad item {item}")
+        return item
+    return stage
+
+
+class TestPipelinedBatchRunner:
+
+    def test_every_item_delivered_once(self):
+        runner = PipelinedBatchRunner(prepare_workers=3, finalize_workers=2, max_in_flight=4)
+
+        results = dict(runner.run(
+            list(range(20)),
+            prepare=lambda x: x + 1,
+            detect=lambda x: x * 10,
+            finalize=lambda x: f"r{x}",
+            on_error=lambda item, e: None
+        ))
+
+        assert results == {i: f"r{(i + 1) * 10}" for i in range(20)}
+
+    def test_results_stream_in_completion_order(self):
+        runner = PipelinedBatchRunner(prepare_workers=2)
+
+        def prepare(delay):
+            time.sleep(delay)
+            return delay
+
+        order = [index for index, _ in runner.run(
+            [0.2, 0.0],
+            prepare=prepare,
+            detect=lambda x: x,
+            finalize=lambda x: x,
+            on_error=lambda item, e: None
+        )]
+
+        assert order == [1, 0]
+
+    def test_stage_error_becomes_result(self):
+        runner = PipelinedBatchRunner()
+
+        results = dict(runner.run(
+            [1, 2, 3],
+            prepare=lambda x: x,
+            detect=_failing_on(2),
+            finalize=lambda x: x,
+            on_error=lambda item, e: {"item": item, "error": str(e)}
+        ))
+
+        assert results[0] == 1
+        assert results[1] == {"item": 2, "error": "bad item 2"}
+        assert results[2] == 3
+
+    def test_detect_runs_on_single_thread(self):
+        runner = PipelinedBatchRunner(prepare_workers=4, finalize_workers=4)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def detect(x):
+            with lock:
+                active.append(x)
+                peak.append(len(active))
+            time.sleep(0.005)
+            with lock:
+                active.remove(x)
+            return x
+
+        list(runner.run(
+            list(range(10)),
+            prepare=lambda x: x,
+            detect=detect,
+            finalize=lambda x: x,
+            on_error=lambda item, e: None
+        ))
+
+        assert max(peak) == 1
+
+    def test_in_flight_is_bounded(self):
+        runner = PipelinedBatchRunner(prepare_workers=4, finalize_workers=4, max_in_flight=2)
+        in_flight = []
+        peak = []
+        lock = threading.Lock()
+
+        def prepare(x):
+            with lock:
+                in_flight.append(x)
+                peak.append(len(in_flight))
+            return x
+
+        def finalize(x):
+            time.sleep(0.005)
+            with lock:
+                in_flight.remove(x)
+            return x
+
+        list(runner.run(
+            list(range(10)),
+            prepare=prepare,
+            detect=lambda x: x,
+            finalize=finalize,
+            on_error=lambda item, e: None
+        ))
+
+        assert max(peak) <= 2
+
+    def test_consumer_can_stop_early(self):
+        runner = PipelinedBatchRunner(max_in_flight=2)
+        stream = runner.run(
+            list(range(10)),
+            prepare=lambda x: x,
+            detect=lambda x: x,
+            finalize=lambda x: x,
+            on_error=lambda item, e: None
+        )
+
+        next(stream)
+        stream.close()
+
+    def test_stage_times_reported(self):
+        runner = PipelinedBatchRunner()
+
+        list(runner.run(
+            [1, 2],
+            prepare=lambda x: x,
+            detect=lambda x: x,
+            finalize=lambda x: x,
+            on_error=lambda item, e: None
+        ))
+
+        assert set(runner.get_stage_times()) == {"prepare", "detect", "finalize"}
+
+    def test_invalid_configuration(self):
+        with pytest.raises(ValueError):
+            PipelinedBatchRunner(max_in_flight=0)
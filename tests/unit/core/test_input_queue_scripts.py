@@ -0,0 +1,138 @@
+"""
+Test Input Queue State Scripts
+==============================
+
+Tests para las transiciones de estado atómicas (scripts Lua) de la Input Queue.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Scripting Lua en fakeredis
+
+from vigia_detect.core.input_packager import StandardizedInput
+from vigia_detect.core.input_queue import InputQueue, QueueStatus
+
+
+async def make_queue():
+    queue = InputQueue()
+    queue.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await queue._load_scripts()
+    return queue
+
+
+def make_input(session_id):
+    return StandardizedInput(
+        session_id=session_id,
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        input_type="text",
+        raw_content={"text": "control de rutina"},
+        metadata={"source": "api"},
+        audit_trail={}
+    )
+
+
+def record_commands(queue, monkeypatch):
+    commands = []
+    original = queue.redis_client.execute_command
+
+    async def spy(*args, **kwargs):
+        commands.append(args[0])
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(queue.redis_client, "execute_command", spy)
+    return commands
+
+
+async def hash_of(queue, session_id):
+    return await queue.redis_client.hgetall(f"input_queue:{session_id}")
+
+
+class TestAtomicTransitions:
+    """Tests de las transiciones en el servidor"""
+
+    @pytest.mark.asyncio
+    async def test_dequeue_is_one_round_trip(self, monkeypatch):
+        queue = await make_queue()
+        await queue.enqueue(make_input("S1"))
+        commands = record_commands(queue, monkeypatch)
+
+        standardized_input = await queue.dequeue("S1", "node-a")
+
+        assert standardized_input.session_id == "S1"
+        assert commands == ["EVALSHA"]
+        data = await hash_of(queue, "S1")
+        assert data["status"] == QueueStatus.PROCESSING.value
+        assert data["processing_node"] == "node-a"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_dequeue_has_single_winner(self):
+        queue = await make_queue()
+        await queue.enqueue(make_input("S1"))
+
+        results = await asyncio.gather(*[queue.dequeue("S1", f"node-{i}") for i in range(5)])
+
+        assert sum(result is not None for result in results) == 1
+
+    @pytest.mark.asyncio
+    async def test_dequeue_marks_expired_sessions(self):
+        queue = await make_queue()
+        await queue.enqueue(make_input("S1"))
+        past = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await queue.redis_client.hset("input_queue:S1", "expires_at_ts", past.timestamp())
+
+        assert await queue.dequeue("S1", "node-a") is None
+        assert (await hash_of(queue, "S1"))["status"] == QueueStatus.EXPIRED.value
+        assert await queue.list_pending_sessions() == []
+
+    @pytest.mark.asyncio
+    async def test_failure_with_retry_returns_to_pending(self):
+        queue = await make_queue()
+        queue.max_retry_count = 1
+        await queue.enqueue(make_input("S1"))
+        await queue.dequeue("S1", "node-a")
+
+        assert await queue.mark_failed("S1", "timeout")
+        data = await hash_of(queue, "S1")
+        assert data["status"] == QueueStatus.PENDING.value and data["retry_count"] == "1"
+
+        await queue.dequeue("S1", "node-a")
+        assert await queue.mark_failed("S1", "timeout")
+        data = await hash_of(queue, "S1")
+        assert data["status"] == QueueStatus.FAILED.value and "failed_at" in data
+        assert await queue.list_pending_sessions() == []
+
+    @pytest.mark.asyncio
+    async def test_completion_is_one_round_trip(self, monkeypatch):
+        queue = await make_queue()
+        await queue.enqueue(make_input("S1"))
+        lease = await queue.fetch_next("node-a", block_ms=None)
+        commands = record_commands(queue, monkeypatch)
+
+        assert await queue.complete(lease, {"success": True, "next_stage": "triage"})
+
+        assert commands == ["EVALSHA"]
+        assert await queue.redis_client.xlen(queue.stream_key) == 0
+        assert 0 < await queue.redis_client.ttl("input_queue:S1") <= 3600
+
+    @pytest.mark.asyncio
+    async def test_transitions_on_missing_sessions_do_not_create_hashes(self):
+        queue = await make_queue()
+
+        assert not await queue.mark_completed("ghost", {"success": True})
+        assert not await queue.mark_failed("ghost", "error")
+        await queue._mark_expired("ghost")
+
+        assert not await queue.redis_client.exists("input_queue:ghost")
+
+    @pytest.mark.asyncio
+    async def test_scripts_reload_after_flush(self):
+        queue = await make_queue()
+        await queue.enqueue(make_input("S1"))
+
+        await queue.redis_client.script_flush()
+
+        assert await queue.dequeue("S1", "node-a") is not None
@@ -0,0 +1,181 @@
+"""
+Test Input Queue Work Dispatch
+==============================
+
+Tests para la cola de trabajo con leases sobre Redis Streams.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Scripting Lua en fakeredis
+
+from vigia_detect.core.input_packager import StandardizedInput
+from vigia_detect.core.input_queue import InputQueue, InputQueueManager, QueueStatus
+
+
+def make_queue(**kwargs):
+    queue = InputQueue(**kwargs)
+    queue.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return queue
+
+
+def make_input(session_id):
+    return StandardizedInput(
+        session_id=session_id,
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        input_type="image",
+        raw_content={"media_url": f"https://media.example/{session_id}.jpg"},
+        metadata={"source": "whatsapp"},
+        audit_trail={"received_at": "2024-01-01T00:00:00+00:00"}
+    )
+
+
+async def status_of(queue, session_id):
+    return (await queue.get_queue_status(session_id))["status"]
+
+
+class TestWorkQueue:
+    """Tests de entrega, leases y reentrega"""
+
+    @pytest.mark.asyncio
+    async def test_fetch_next_leases_item(self):
+        queue = make_queue()
+        result = await queue.enqueue(make_input("S1"))
+
+        lease = await queue.fetch_next("node-a", block_ms=None)
+
+        assert result["success"]
+        assert lease.session_id == "S1"
+        assert lease.input.raw_content["media_url"].endswith("S1.jpg")
+        assert lease.deliveries == 1 and not lease.redelivered
+        assert await status_of(queue, "S1") == QueueStatus.PROCESSING.value
+        assert (await queue.get_queue_status("S1"))["processing_node"] == "node-a"
+
+    @pytest.mark.asyncio
+    async def test_batch_claim_is_fifo_and_exclusive(self):
+        queue = make_queue()
+        for session_id in ("S1", "S2", "S3"):
+            await queue.enqueue(make_input(session_id))
+
+        first = await queue.claim_batch("node-a", count=2, block_ms=None)
+        second = await queue.claim_batch("node-b", count=2, block_ms=None)
+
+        assert [lease.session_id for lease in first] == ["S1", "S2"]
+        assert [lease.session_id for lease in second] == ["S3"]
+        assert await queue.fetch_next("node-c", block_ms=None) is None
+
+    @pytest.mark.asyncio
+    async def test_completion_acknowledges_entry(self):
+        queue = make_queue()
+        await queue.enqueue(make_input("S1"))
+        lease = await queue.fetch_next("node-a", block_ms=None)
+
+        assert await queue.complete(lease, {"success": True})
+
+        stats = await queue.get_work_queue_stats()
+        assert stats["stream_length"] == 0 and stats["in_flight"] == 0
+        assert await status_of(queue, "S1") == QueueStatus.COMPLETED.value
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_redelivered(self):
+        queue = make_queue(visibility_timeout=timedelta(milliseconds=30))
+        await queue.enqueue(make_input("S1"))
+        stale = await queue.fetch_next("node-a", block_ms=None)
+
+        await asyncio.sleep(0.06)
+        lease = await queue.fetch_next("node-b", block_ms=None)
+
+        assert lease.session_id == "S1" and lease.redelivered
+        assert lease.deliveries == 2
+        assert lease.message_id == stale.message_id
+        assert not await queue.extend_lease(stale)
+        assert await queue.extend_lease(lease)
+
+    @pytest.mark.asyncio
+    async def test_extended_lease_is_not_redelivered(self):
+        queue = make_queue(visibility_timeout=timedelta(milliseconds=50))
+        await queue.enqueue(make_input("S1"))
+        lease = await queue.fetch_next("node-a", block_ms=None)
+
+        await asyncio.sleep(0.03)
+        assert await queue.extend_lease(lease)
+        await asyncio.sleep(0.03)
+
+        assert await queue.fetch_next("node-b", block_ms=None) is None
+
+    @pytest.mark.asyncio
+    async def test_failure_requeues_until_retries_exhausted(self):
+        queue = make_queue()
+        queue.max_retry_count = 1
+        await queue.enqueue(make_input("S1"))
+
+        lease = await queue.fetch_next("node-a", block_ms=None)
+        await queue.fail(lease, "timeout")
+        retry = await queue.fetch_next("node-b", block_ms=None)
+        await queue.fail(retry, "timeout")
+
+        assert retry.session_id == "S1"
+        assert await queue.fetch_next("node-c", block_ms=None) is None
+        assert await status_of(queue, "S1") == QueueStatus.FAILED.value
+        assert (await queue.get_work_queue_stats())["stream_length"] == 0
+
+    @pytest.mark.asyncio
+    async def test_poison_item_fails_after_max_deliveries(self):
+        queue = make_queue(visibility_timeout=timedelta(milliseconds=10))
+        queue.max_retry_count = 0
+        await queue.enqueue(make_input("S1"))
+
+        await queue.fetch_next("node-a", block_ms=None)
+        await asyncio.sleep(0.03)
+
+        assert await queue.fetch_next("node-b", block_ms=None) is None
+        assert await status_of(queue, "S1") == QueueStatus.FAILED.value
+
+    @pytest.mark.asyncio
+    async def test_sessions_taken_by_id_or_expired_are_skipped(self):
+        queue = make_queue()
+        await queue.enqueue(make_input("S1"))
+        await queue.enqueue(make_input("S2"))
+        await queue.dequeue("S1", "legacy-node")
+        past = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await queue.redis_client.hset("input_queue:S2", mapping={
+            "expires_at": past.isoformat(), "expires_at_ts": past.timestamp()
+        })
+
+        assert await queue.claim_batch("node-a", count=2, block_ms=None) == []
+        assert await status_of(queue, "S1") == QueueStatus.PROCESSING.value
+        assert await status_of(queue, "S2") == QueueStatus.EXPIRED.value
+
+    @pytest.mark.asyncio
+    async def test_blocks_only_without_redelivered_work(self, monkeypatch):
+        queue = make_queue(visibility_timeout=timedelta(milliseconds=10))
+        calls = []
+        original = queue.redis_client.xreadgroup
+
+        async def spy(*args, **kwargs):
+            calls.append(kwargs["block"])
+            return await original(*args, **kwargs)
+
+        monkeypatch.setattr(queue.redis_client, "xreadgroup", spy)
+        await queue.enqueue(make_input("S1"))
+
+        await queue.claim_batch("node-a", count=2, block_ms=250)
+        await asyncio.sleep(0.03)
+        await queue.claim_batch("node-b", count=2, block_ms=250)
+
+        assert calls == [250, None]
+
+    @pytest.mark.asyncio
+    async def test_manager_returns_next_input(self):
+        manager = InputQueueManager()
+        manager.queue = make_queue()
+        await manager.process_standardized_input(make_input("S1"))
+
+        standardized_input = await manager.get_next_for_processing("node-a", block_ms=None)
+
+        assert standardized_input.session_id == "S1"
+        assert await manager.get_next_for_processing("node-a", block_ms=None) is None
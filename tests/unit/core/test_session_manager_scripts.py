@@ -0,0 +1,245 @@
+"""
+Test Session Manager Scripts
+============================
+
+Tests para el ciclo de vida de sesiones con scripts Lua y pipelines, y el
+modo write-behind de transiciones no críticas.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Scripting Lua en fakeredis
+
+from vigia_detect.core.session_manager import SessionManager, SessionState, SessionType
+
+
+async def make_manager(**kwargs):
+    session_manager = SessionManager(**kwargs)
+    session_manager.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await session_manager._load_scripts()
+    return session_manager
+
+
+async def make_session(session_manager, session_type=SessionType.CLINICAL_IMAGE, emergency=False):
+    result = await session_manager.create_session(
+        {"source": "whatsapp", "input_type": "image"}, session_type, emergency
+    )
+    assert result["success"]
+    return result["session_id"]
+
+
+def record_commands(session_manager, monkeypatch):
+    commands = []
+    original = session_manager.redis_client.execute_command
+
+    async def spy(*args, **kwargs):
+        commands.append(args[0])
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(session_manager.redis_client, "execute_command", spy)
+    return commands
+
+
+def record_pipelines(session_manager, monkeypatch):
+    executed = []
+    original = session_manager.redis_client.pipeline
+
+    def spy(*args, **kwargs):
+        pipe = original(*args, **kwargs)
+        execute = pipe.execute
+
+        async def recording_execute(*a, **kw):
+            executed.append([command[0][0] for command in pipe.command_stack])
+            return await execute(*a, **kw)
+
+        pipe.execute = recording_execute
+        return pipe
+
+    monkeypatch.setattr(session_manager.redis_client, "pipeline", spy)
+    return executed
+
+
+async def hash_of(session_manager, session_id):
+    return await session_manager.redis_client.hgetall(f"session:{session_id}")
+
+
+class TestScriptedLifecycle:
+    """Tests de las operaciones atómicas en el servidor"""
+
+    @pytest.mark.asyncio
+    async def test_state_change_is_one_round_trip(self, monkeypatch):
+        session_manager = await make_manager()
+        session_id = await make_session(session_manager)
+        executed = record_pipelines(session_manager, monkeypatch)
+
+        assert await session_manager.update_session_state(session_id, SessionState.PROCESSING, "node-a")
+
+        assert executed == [["EVALSHA"]]
+        data = await hash_of(session_manager, session_id)
+        assert data["state"] == SessionState.PROCESSING.value
+        assert data["assigned_processor"] == "node-a"
+        assert "processing_started" in data
+
+    @pytest.mark.asyncio
+    async def test_create_is_one_round_trip_and_enforces_limit(self, monkeypatch):
+        session_manager = await make_manager()
+        session_manager.max_concurrent_sessions[SessionType.EMERGENCY] = 1
+        commands = record_commands(session_manager, monkeypatch)
+
+        first = await session_manager.create_session({}, SessionType.EMERGENCY, True)
+        second = await session_manager.create_session({}, SessionType.EMERGENCY, True)
+
+        assert commands == ["EVALSHA", "EVALSHA"]
+        assert first["success"] and first["timeout_minutes"] == 30
+        assert second["error"] == "max_concurrent_sessions_reached"
+        assert second["current_count"] == 1
+        assert await session_manager.redis_client.ttl(f"session:{first['session_id']}") > 0
+
+    @pytest.mark.asyncio
+    async def test_transitions_on_missing_sessions_do_not_create_hashes(self):
+        session_manager = await make_manager()
+
+        assert not await session_manager.update_session_state("ghost", SessionState.QUEUED)
+        assert not await session_manager.cleanup_session("ghost")
+        await session_manager._mark_session_expired("ghost")
+
+        assert not await session_manager.redis_client.exists("session:ghost")
+        assert not await session_manager.redis_client.exists("session:ghost:audit")
+
+    @pytest.mark.asyncio
+    async def test_update_marks_expired_sessions(self):
+        session_manager = await make_manager()
+        session_id = await make_session(session_manager)
+        past = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await session_manager.redis_client.hset(f"session:{session_id}", "expires_at_ts", past.timestamp())
+
+        assert not await session_manager.update_session_state(session_id, SessionState.PROCESSING)
+        assert (await hash_of(session_manager, session_id))["state"] == SessionState.EXPIRED.value
+        assert await session_manager.list_active_sessions() == []
+
+    @pytest.mark.asyncio
+    async def test_audit_trail_records_server_side_old_state(self):
+        session_manager = await make_manager()
+        session_id = await make_session(session_manager)
+
+        await session_manager.update_session_state(session_id, SessionState.QUEUED)
+        await session_manager.update_session_state(session_id, SessionState.COMPLETED)
+        await session_manager.cleanup_session(session_id, "done")
+
+        metadata = await session_manager._get_session_metadata(session_id)
+        events = [(event["event_type"], event["data"]) for event in metadata.audit_events]
+        assert metadata.state == SessionState.CLEANUP
+        assert [event_type for event_type, _ in events] == [
+            "session_created", "state_changed", "state_changed", "session_cleanup"
+        ]
+        assert events[1][1]["old_state"] == "created" and events[1][1]["new_state"] == "queued"
+        assert events[2][1]["old_state"] == "queued"
+        assert events[3][1]["final_state"] == "completed"
+        assert 0 < await session_manager.redis_client.ttl(f"session:{session_id}:audit") <= 86400
+
+    @pytest.mark.asyncio
+    async def test_list_active_sessions_is_a_single_union(self, monkeypatch):
+        session_manager = await make_manager()
+        image = await make_session(session_manager, SessionType.CLINICAL_IMAGE)
+        emergency = await make_session(session_manager, SessionType.EMERGENCY, True)
+        commands = record_commands(session_manager, monkeypatch)
+
+        assert sorted(await session_manager.list_active_sessions()) == sorted([image, emergency])
+        assert commands == ["SUNION"]
+
+    @pytest.mark.asyncio
+    async def test_sweep_expires_stale_sessions(self):
+        session_manager = await make_manager()
+        stale = await make_session(session_manager)
+        fresh = await make_session(session_manager)
+        past = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await session_manager.redis_client.hset(f"session:{stale}", "expires_at_ts", past.timestamp())
+
+        assert await session_manager._expire_stale_sessions() == 1
+        assert await session_manager.list_active_sessions() == [fresh]
+
+    @pytest.mark.asyncio
+    async def test_scripts_reload_after_flush(self):
+        session_manager = await make_manager()
+        session_id = await make_session(session_manager)
+
+        await session_manager.redis_client.script_flush()
+
+        assert await session_manager.update_session_state(session_id, SessionState.QUEUED)
+
+
+class TestWriteBehind:
+    """Tests del modo write-behind"""
+
+    @pytest.mark.asyncio
+    async def test_non_critical_transitions_are_flushed_in_one_pipeline(self, monkeypatch):
+        session_manager = await make_manager(write_behind=True)
+        session_id = await make_session(session_manager)
+        executed = record_pipelines(session_manager, monkeypatch)
+
+        assert await session_manager.update_session_state(session_id, SessionState.QUEUED)
+        assert await session_manager.update_session_state(session_id, SessionState.TRIAGING)
+
+        assert executed == []
+        assert (await hash_of(session_manager, session_id))["state"] == SessionState.CREATED.value
+
+        assert await session_manager.flush_pending_updates() == 2
+        assert executed == [["EVALSHA", "EVALSHA"]]
+        assert (await hash_of(session_manager, session_id))["state"] == SessionState.TRIAGING.value
+
+    @pytest.mark.asyncio
+    async def test_emergency_and_terminal_transitions_write_through(self):
+        session_manager = await make_manager(write_behind=True)
+        emergency = await make_session(session_manager, SessionType.EMERGENCY, True)
+        routine = await make_session(session_manager)
+
+        await session_manager.update_session_state(emergency, SessionState.PROCESSING)
+        await session_manager.update_session_state(routine, SessionState.QUEUED)
+        assert (await hash_of(session_manager, emergency))["state"] == SessionState.PROCESSING.value
+
+        # La escritura inmediata incluye lo pendiente, en orden
+        await session_manager.update_session_state(routine, SessionState.COMPLETED)
+        assert session_manager._pending_updates == []
+        metadata = await session_manager._get_session_metadata(routine)
+        assert [event["data"]["old_state"] for event in metadata.audit_events[1:]] == ["created", "queued"]
+
+    @pytest.mark.asyncio
+    async def test_reads_flush_pending_transitions(self):
+        session_manager = await make_manager(write_behind=True)
+        session_id = await make_session(session_manager)
+
+        await session_manager.update_session_state(session_id, SessionState.QUEUED)
+
+        assert (await session_manager.get_session_info(session_id))["state"] == SessionState.QUEUED.value
+
+    @pytest.mark.asyncio
+    async def test_pending_limit_forces_flush(self):
+        session_manager = await make_manager(write_behind=True, write_behind_max_pending=2)
+        session_id = await make_session(session_manager)
+
+        await session_manager.update_session_state(session_id, SessionState.QUEUED)
+        await session_manager.update_session_state(session_id, SessionState.TRIAGING)
+
+        assert session_manager._pending_updates == []
+        assert (await hash_of(session_manager, session_id))["state"] == SessionState.TRIAGING.value
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_and_stops_task(self):
+        session_manager = await make_manager(write_behind=True, write_behind_interval=timedelta(hours=1))
+        session_manager._write_behind_task = asyncio.create_task(session_manager._flush_write_behind())
+        task = session_manager._write_behind_task
+        session_id = await make_session(session_manager)
+
+        await session_manager.update_session_state(session_id, SessionState.QUEUED)
+        assert (await hash_of(session_manager, session_id))["state"] == SessionState.CREATED.value
+
+        await session_manager.close()
+
+        assert session_manager._pending_updates == []
+        assert (await hash_of(session_manager, session_id))["state"] == SessionState.QUEUED.value
+        assert task.cancelled()
+        assert session_manager._write_behind_task is None
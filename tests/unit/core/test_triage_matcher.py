@@ -0,0 +1,138 @@
+"""
+Test Triage Matcher
+===================
+
+Tests para el matcher multi-patrón de una sola pasada y su uso en el
+motor de triage.
+"""
+
+import re
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from vigia_detect.core.triage_matcher import NO_HITS, TriageMatcher, whole_words
+
+
+def make_matcher():
+    return TriageMatcher({
+        "emergency": whole_words("emergencia", r"dolor\s+(?:severo|intenso)", "help") + ["convuls"],
+        "pain": [r"dolor\s+(?:severo|intenso)", r"severe\s+pain"],
+        "code": [r"[a-z]{2}-\d{4}-\d{3}\b", r"paciente[\s:]+\w"],
+        "priority": ["dolor", "need"],
+    })
+
+
+class TestTriageMatcher:
+    """Tests del escaneo de una sola pasada"""
+
+    def test_reports_every_category_hit_by_overlapping_keywords(self):
+        hits = make_matcher().scan("Paciente con DOLOR   severo desde ayer")
+
+        assert hits == {"emergency", "pain", "code", "priority"}
+
+    def test_keywords_match_at_word_start_only(self):
+        matcher = make_matcher()
+
+        assert matcher.scan("help") == {"emergency"}
+        assert matcher.scan("helpful") == NO_HITS
+        assert matcher.scan("convulsiones") == {"emergency"}
+        assert matcher.scan("needed") == {"priority"}
+        assert matcher.scan("ya no lo need") == {"priority"}
+        assert matcher.scan("unneeded") == NO_HITS
+
+    def test_patient_codes_and_generic_fragments(self):
+        matcher = make_matcher()
+
+        assert matcher.scan("Imagen de CD-2025-001") == {"code"}
+        assert matcher.scan("imagen de cd-2025-0011") == NO_HITS
+
+    def test_empty_text_has_no_hits(self):
+        assert make_matcher().scan("") is NO_HITS
+
+    def test_invalid_categories_are_rejected(self):
+        with pytest.raises(ValueError):
+            TriageMatcher({})
+        with pytest.raises(ValueError):
+            TriageMatcher({"empty": []})
+
+    def test_matches_per_pattern_search(self):
+        categories = {
+            "a": whole_words("herida", r"lesión\s+por\s+presión"),
+            "b": whole_words("lesión", "care"),
+            "c": whole_words(r"grado\s+[1-4]"),
+        }
+        matcher = TriageMatcher(categories)
+        texts = ["Lesión por presión grado 2", "wound care", "grado 5 lesiones", "HERIDA, lesión"]
+
+        for text in texts:
+            expected = {
+                category for category, keywords in categories.items()
+                if any(re.search(r"\b" + keyword, text.lower()) for keyword in keywords)
+            }
+            assert matcher.scan(text) == expected, text
+
+
+class TestTriageEngineMatcher:
+    """Tests del motor de triage sobre el conjunto de categorías"""
+
+    @pytest.fixture
+    def engine(self):
+        pytest.importorskip("google.generativeai")
+        from vigia_detect.core.triage_engine import MedicalTriageEngine
+        return MedicalTriageEngine()
+
+    def make_input(self, text, has_media=False):
+        from vigia_detect.core.input_packager import StandardizedInput
+        return StandardizedInput(
+            session_id="S1",
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            input_type="image" if has_media else "text",
+            raw_content={"text": text},
+            metadata={"source": "whatsapp", "has_media": has_media},
+            audit_trail={}
+        )
+
+    @pytest.mark.asyncio
+    async def test_emergency_with_severe_pain(self, engine):
+        result = await engine.perform_triage(self.make_input("Paciente con dolor insoportable y sangrando"))
+
+        assert result.urgency.value == "emergency"
+        assert result.matched_rules[:2] == ["EMR001", "EMR002"]
+        assert result.recommended_route == "emergency_escalation"
+
+    @pytest.mark.asyncio
+    async def test_image_with_and_without_patient_code(self, engine):
+        with_code = await engine.perform_triage(self.make_input("Foto de LPP grado 2 de CD-2025-001", True))
+        without_code = await engine.perform_triage(self.make_input("Foto del talón", True))
+
+        assert with_code.context.value == "pressure_injury"
+        assert with_code.matched_rules[:2] == ["LPP001", "LPP002"]
+        assert without_code.context.value == "wound_assessment"
+        assert without_code.matched_rules == ["VAL001", "DEF001"]
+
+    def test_rules_are_sorted_once_and_follow_replacement(self, engine):
+        engine.rules = list(reversed(engine.rules))
+
+        priorities = [rule.priority for rule in engine._rules_by_priority]
+        assert priorities == sorted(priorities, reverse=True)
+        assert engine._default_rule.rule_id == "DEF001"
+
+    def test_general_medical_context_and_default_rule(self, engine):
+        hits = engine.matcher.scan("Consulta para la enfermera")
+
+        assert engine._detect_clinical_context("Consulta para la enfermera", False, hits).value == "general_medical"
+        rules, _ = engine._evaluate_rules("Consulta para la enfermera", False, None, None, hits)
+        assert [rule.rule_id for rule in rules] == ["DEF001"]
+
+    @pytest.mark.performance
+    def test_long_transcript_scan_is_sub_millisecond(self, engine):
+        transcript = "la familia comenta que duerme mucho y come poco durante el día " * 80
+
+        start = time.perf_counter()
+        for _ in range(20):
+            engine.matcher.scan(transcript)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / 20
+
+        assert elapsed_ms < 1.0
@@ -1,11 +1,13 @@
 """
 Tests for the unified image processor.
 """
+import numpy as np
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 
 from vigia_detect.core.unified_image_processor import UnifiedImageProcessor
+from vigia_detect.cv_pipeline.image_buffer import ImageBuffer
 from tests.shared_fixtures import (
     sample_image_path,
     sample_patient_code,
@@ -128,7 +130,42 @@ class TestUnifiedImageProcessor:
         assert result["successful_count"] == 2
         assert result["failed_count"] == 0
         assert len(result["results"]) == 2
-    
+
+    @patch('vigia_detect.core.unified_image_processor.is_valid_image')
+    @patch('vigia_detect.core.unified_image_processor.Detector')
+    @patch('vigia_detect.core.unified_image_processor.Preprocessor')
+    def test_process_multiple_images_streams_results(self, mock_preprocessor_class, mock_detector_class, mock_is_valid):
+        """Test batch results stream per image and keep input order"""
+        mock_is_valid.side_effect = lambda path: "invalid" not in path
+
+        mock_detector = Mock()
+        mock_detector.detect.return_value = {"detections": [], "confidence_scores": []}
+        mock_detector_class.return_value = mock_detector
+
+        mock_preprocessor = Mock()
+        mock_preprocessor.preprocess.return_value = "processed_image"
+        mock_preprocessor_class.return_value = mock_preprocessor
+
+        processor = UnifiedImageProcessor()
+        released = []
+        processor._preprocess_image = Mock(side_effect=lambda path: (
+            ImageBuffer(array=np.zeros((8, 8, 3), dtype=np.uint8), _release=released.append), {}
+        ))
+        image_paths = ["/test/image1.jpg", "/test/invalid.txt", "/test/image3.jpg"]
+        streamed = []
+
+        result = processor.process_multiple_images(
+            image_paths=image_paths,
+            on_result=lambda index, image_result: streamed.append(index)
+        )
+
+        assert sorted(streamed) == [0, 1, 2]
+        assert [r["image_path"] for r in result["results"]] == image_paths
+        assert result["successful_count"] == 2
+        assert result["failed_count"] == 1
+        assert set(result["stage_times_seconds"]) == {"prepare", "detect", "finalize"}
+        assert len(released) == 2  # Cada buffer preprocesado vuelve al pool
+
     @patch('vigia_detect.core.unified_image_processor.Detector')
     @patch('vigia_detect.core.unified_image_processor.Preprocessor')
     def test_medical_assessment_no_lesions(self, mock_preprocessor_class, mock_detector_class):
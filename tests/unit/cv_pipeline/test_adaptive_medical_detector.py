@@ -0,0 +1,88 @@
+"""
+Test Adaptive Medical Detector
+==============================
+
+Tests para la caché de detecciones del detector adaptativo: las inferencias
+fallidas no se guardan como imágenes sin lesiones.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("monai")  # El módulo anota tipos de MONAI
+
+from vigia_detect.cv_pipeline.adaptive_medical_detector import AdaptiveMedicalDetector, DetectionEngine
+from vigia_detect.cv_pipeline.image_buffer import ImageBuffer
+
+
+class StubYoloDetector:
+    """Detector YOLO de prueba que falla mientras failing sea True."""
+
+    def __init__(self):
+        self.failing = True
+        self.calls = 0
+
+    def detect_batch(self, images, raise_errors=False):
+        self.calls += 1
+        if self.failing:
+            if raise_errors:
+                raise RuntimeError("CUDA out of memory")
+            return [[] for _ in images]
+        return [[{"bbox": [1, 1, 8, 8], "confidence": 0.9, "class_id": 2, "lpp_stage": 2}] for _ in images]
+
+
+@pytest.fixture
+def detector():
+    with patch.object(AdaptiveMedicalDetector, "_initialize_engines"):
+        detector = AdaptiveMedicalDetector(max_batch_wait_ms=0)
+    detector.audit_service.log_event = AsyncMock()
+    detector.yolo_detector = StubYoloDetector()
+    detector.model_versions[DetectionEngine.YOLO_BACKUP] = "yolov5s:v1"
+    return detector
+
+
+def _image():
+    return ImageBuffer(array=np.full((32, 32, 3), 120, dtype=np.uint8), color_order="RGB")
+
+
+class TestDetectionCaching:
+    """Tests del cacheo de resultados por motor"""
+
+    @pytest.mark.asyncio
+    async def test_failed_inference_is_not_cached(self, detector):
+        failed = await detector.detect_medical_condition(
+            "wound.jpg", "token", force_engine=DetectionEngine.YOLO_BACKUP, image=_image()
+        )
+
+        assert not failed.cache_hit
+        assert detector.detection_cache.get_stats()["entries"] == 0
+
+        # El reenvío de la misma imagen vuelve a ejecutar la inferencia
+        detector.yolo_detector.failing = False
+        retried = await detector.detect_medical_condition(
+            "wound.jpg", "token", force_engine=DetectionEngine.YOLO_BACKUP, image=_image()
+        )
+
+        assert detector.yolo_detector.calls == 2
+        assert not retried.cache_hit
+        assert retried.lpp_grade == 2
+        assert detector.detection_cache.get_stats()["entries"] == 1
+        await detector.close()
+
+    @pytest.mark.asyncio
+    async def test_successful_inference_is_served_from_cache(self, detector):
+        detector.yolo_detector.failing = False
+
+        await detector.detect_medical_condition(
+            "wound.jpg", "token", force_engine=DetectionEngine.YOLO_BACKUP, image=_image()
+        )
+        cached = await detector.detect_medical_condition(
+            "wound.jpg", "token", force_engine=DetectionEngine.YOLO_BACKUP, image=_image()
+        )
+
+        assert cached.cache_hit
+        assert detector.yolo_detector.calls == 1
+        await detector.close()
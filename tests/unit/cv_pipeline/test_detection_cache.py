@@ -0,0 +1,127 @@
+"""
+Test Detection Result Cache
+===========================
+
+Tests para la caché de resultados de detección por hash de imagen.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from vigia_detect.cv_pipeline.detection_cache import DetectionCache, compute_dhash
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _wound_image(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    image = cv2.resize(rng.integers(0, 255, (8, 8, 3), dtype=np.uint8), (256, 256))
+    cv2.circle(image, (128, 128), 40, (180, 40, 40), -1)
+    return image
+
+
+def _encode(image: np.ndarray, quality: int = 95) -> bytes:
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+RESULT = {"detections": [{"lpp_stage": 2, "confidence": 0.8}], "processing_engine": "yolo"}
+
+
+class TestDetectionCache:
+    """Tests de la caché de detecciones"""
+
+    @pytest.mark.asyncio
+    async def test_exact_content_hit(self):
+        cache = DetectionCache()
+        key = cache.make_key(_encode(_wound_image()))
+
+        assert await cache.get("yolo_backup", "v1", key) is None
+        await cache.put("yolo_backup", "v1", key, RESULT)
+
+        assert await cache.get("yolo_backup", "v1", key) == RESULT
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_scoped_by_engine_and_model_version(self):
+        cache = DetectionCache()
+        key = cache.make_key(_encode(_wound_image()))
+        await cache.put("yolo_backup", "v1", key, RESULT)
+
+        assert await cache.get("yolo_backup", "v2", key) is None
+        assert await cache.get("monai_primary", "v1", key) is None
+
+    @pytest.mark.asyncio
+    async def test_near_duplicate_hit_in_perceptual_mode(self):
+        cache = DetectionCache(perceptual=True)
+        image = _wound_image()
+        await cache.put("yolo_backup", "v1", cache.make_key(_encode(image), image), RESULT)
+
+        recompressed = cv2.imdecode(np.frombuffer(_encode(image, quality=60), np.uint8), cv2.IMREAD_COLOR)
+        key = cache.make_key(_encode(image, quality=60), recompressed)
+
+        assert await cache.get("yolo_backup", "v1", key) == RESULT
+        assert cache.get_stats()["near_duplicate_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_different_image_misses_in_perceptual_mode(self):
+        cache = DetectionCache(perceptual=True)
+        image, other = _wound_image(0), _wound_image(1)
+        await cache.put("yolo_backup", "v1", cache.make_key(_encode(image), image), RESULT)
+
+        assert await cache.get("yolo_backup", "v1", cache.make_key(_encode(other), other)) is None
+
+    @pytest.mark.asyncio
+    async def test_file_and_pixel_keys_do_not_collide(self):
+        cache = DetectionCache()
+        image = _wound_image()
+        pixel_key = cache.make_pixel_key(image)
+        await cache.put("yolo_backup", "v1", pixel_key, RESULT)
+
+        # Mismos bytes interpretados como contenido de archivo
+        assert await cache.get("yolo_backup", "v1", cache.make_key(image.tobytes())) is None
+        assert await cache.get("yolo_backup", "v1", cache.make_pixel_key(image.copy())) == RESULT
+        assert cache.make_pixel_key(image.reshape(128, 512, 3)) != pixel_key
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        cache = DetectionCache(max_entries=2)
+        keys = [cache.make_key(bytes([i])) for i in range(3)]
+        for key in keys:
+            await cache.put("yolo_backup", "v1", key, RESULT)
+
+        assert await cache.get("yolo_backup", "v1", keys[0]) is None
+        assert await cache.get("yolo_backup", "v1", keys[2]) == RESULT
+        assert cache.get_stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_engine(self):
+        cache = DetectionCache()
+        key = cache.make_key(b"image")
+        await cache.put("yolo_backup", "v1", key, RESULT)
+        await cache.put("monai_primary", "v1", key, RESULT)
+
+        assert cache.invalidate("yolo_backup") == 1
+        assert await cache.get("yolo_backup", "v1", key) is None
+        assert await cache.get("monai_primary", "v1", key) == RESULT
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_shared_between_workers(self):
+        server = fakeredis.FakeServer()
+        worker_a = DetectionCache(redis_url="redis://fake")
+        worker_b = DetectionCache(redis_url="redis://fake")
+        worker_a.redis_client = fakeredis.FakeAsyncRedis(server=server)
+        worker_b.redis_client = fakeredis.FakeAsyncRedis(server=server)
+        key = worker_a.make_key(b"image")
+
+        await worker_a.put("yolo_backup", "v1", key, {"detections": [{"confidence": np.float32(0.5)}]})
+
+        assert await worker_b.get("yolo_backup", "v1", key) == {"detections": [{"confidence": 0.5}]}
+        assert worker_b.get_stats()["redis_hits"] == 1
+
+    def test_dhash_stable_under_resize(self):
+        image = _wound_image()
+        resized = cv2.resize(image, (512, 512))
+
+        assert bin(compute_dhash(image) ^ compute_dhash(resized)).count("1") <= 4
@@ -0,0 +1,214 @@
+"""
+Test Face Anonymization
+=======================
+
+Tests para la anonimización facial con detección reducida y cascadas compartidas.
+"""
+
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from vigia_detect.cv_pipeline import face_anonymizer
+from vigia_detect.cv_pipeline.face_anonymizer import (
+    EXIF_IFD,
+    EXIF_SUBJECT_DISTANCE_RANGE,
+    CascadePool,
+    FaceAnonymizer,
+    close_up_reason,
+    get_cascade_pool,
+    read_capture_metadata,
+)
+from vigia_detect.cv_pipeline.image_buffer import ImageBuffer
+from vigia_detect.cv_pipeline.preprocessor import ImagePreprocessor
+
+
+class FakeCascade:
+    """Cascada de prueba: un rostro fijo en coordenadas de la imagen reducida."""
+
+    def __init__(self, face=(10, 20, 40, 40)):
+        self.face = face
+        self.calls = []
+
+    def detectMultiScale(self, gray, **kwargs):
+        self.calls.append((gray.shape, kwargs))
+        return np.array([self.face])
+
+
+class FakeCascadePool:
+    """Pool de prueba que siempre presta la misma cascada."""
+
+    def __init__(self, cascade):
+        self.cascade = cascade
+
+    @contextmanager
+    def checkout(self):
+        yield self.cascade
+
+
+@pytest.fixture
+def fake_cascade(monkeypatch):
+    cascade = FakeCascade()
+    monkeypatch.setattr(face_anonymizer, "get_cascade_pool", lambda path=None: FakeCascadePool(cascade))
+    return cascade
+
+
+def _textured(height, width):
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+class TestCascadePool:
+    """Tests del pool de cascadas por proceso"""
+
+    def test_pool_shared_within_process(self):
+        assert get_cascade_pool() is get_cascade_pool()
+
+    def test_new_threads_reuse_returned_cascades(self):
+        pool = CascadePool(get_cascade_pool().cascade_path, max_size=2)
+        with pool.checkout() as main:
+            pass
+
+        # Hilos nuevos (p. ej. el pool de workers de otra ejecución) no recargan el XML
+        other = []
+
+        def borrow():
+            with pool.checkout() as cascade:
+                other.append(cascade)
+
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        thread.join()
+
+        assert other[0] is main
+        assert pool.get_stats()["loaded"] == 1
+
+    def test_concurrent_checkouts_get_distinct_cascades(self):
+        pool = CascadePool(get_cascade_pool().cascade_path, max_size=2)
+        with pool.checkout() as first, pool.checkout() as second:
+            assert first is not second
+        assert pool.get_stats() == {"loaded": 2, "idle": 2, "max_size": 2}
+
+    def test_checkout_waits_when_pool_is_exhausted(self):
+        pool = CascadePool(get_cascade_pool().cascade_path, max_size=1)
+        borrowed = []
+        with pool.checkout() as main:
+            thread = threading.Thread(target=lambda: borrowed.append(pool._acquire()))
+            thread.start()
+            thread.join(timeout=0.2)
+            assert thread.is_alive()
+        thread.join(timeout=5)
+
+        assert borrowed == [main]
+        assert pool.get_stats()["loaded"] == 1
+
+    def test_missing_cascade_raises(self, tmp_path):
+        pool = CascadePool(str(tmp_path / "missing.xml"), max_size=1)
+        with pytest.raises(ValueError):
+            with pool.checkout():
+                pass
+        assert pool.get_stats()["loaded"] == 0
+
+
+class TestFaceAnonymizer:
+    """Tests de la detección reducida y el difuminado"""
+
+    def test_boxes_map_back_to_full_resolution(self, fake_cascade):
+        anonymizer = FaceAnonymizer(detection_max_side=500)
+        image = _textured(1000, 2000)
+        original = image.copy()
+
+        image, report = anonymizer.anonymize(image)
+
+        gray_shape, kwargs = fake_cascade.calls[0]
+        assert gray_shape == (250, 500)
+        assert kwargs["minSize"] == (8, 8)
+        assert report["faces"] == 1 and not report["skipped"]
+        # Rostro (10, 20, 40, 40) en la copia reducida -> (40, 80, 160, 160) en la original
+        assert not np.array_equal(image[80:240, 40:200], original[80:240, 40:200])
+        np.testing.assert_array_equal(image[300:, 300:], original[300:, 300:])
+
+    def test_small_images_are_not_resized(self, fake_cascade):
+        FaceAnonymizer(detection_max_side=640).anonymize(_textured(300, 400))
+
+        assert fake_cascade.calls[0][0] == (300, 400)
+
+    def test_close_up_is_skipped(self, fake_cascade):
+        anonymizer = FaceAnonymizer()
+        image = _textured(100, 100)
+        original = image.copy()
+
+        image, report = anonymizer.anonymize(image, {"subject_distance_range": 1})
+
+        assert report == {"faces": 0, "skipped": True, "reason": "exif_distance_range", "time_ms": report["time_ms"]}
+        assert not fake_cascade.calls
+        np.testing.assert_array_equal(image, original)
+        assert anonymizer.get_stats()["skipped"] == 1
+
+    def test_stats_report_time(self, fake_cascade):
+        anonymizer = FaceAnonymizer()
+        for _ in range(3):
+            anonymizer.anonymize(_textured(64, 64))
+
+        stats = anonymizer.get_stats()
+
+        assert stats["images"] == 3 and stats["faces"] == 3
+        assert stats["total_ms"] >= 0 and stats["avg_ms"] == pytest.approx(stats["total_ms"] / 3, abs=1e-3)
+
+
+class TestCloseUpMetadata:
+    """Tests de los metadatos que omiten la detección"""
+
+    def test_reasons(self):
+        assert close_up_reason({}) is None
+        assert close_up_reason({"close_up": True}) == "close_up"
+        assert close_up_reason({"crop": [0, 0, 10, 10], "body_region": "sacrum"}) == "body_region_crop"
+        assert close_up_reason({"subject_distance": 0.3}) == "exif_subject_distance"
+        assert close_up_reason({"subject_distance": 2.0}) is None
+        assert close_up_reason({"subject_distance_range": 3}) is None
+
+    def test_facial_regions_are_never_skipped(self):
+        assert close_up_reason({"close_up": True, "body_region": "occiput"}) is None
+
+    def test_exif_subject_distance_range_is_read(self, tmp_path):
+        path = tmp_path / "macro.jpg"
+        exif = Image.Exif()
+        exif[EXIF_IFD] = {EXIF_SUBJECT_DISTANCE_RANGE: 1}
+        Image.fromarray(_textured(32, 32)).save(path, exif=exif)
+
+        with Image.open(path) as pil_image:
+            assert read_capture_metadata(pil_image) == {"subject_distance_range": 1}
+        assert read_capture_metadata(Image.new("RGB", (4, 4))) == {}
+
+
+class TestPreprocessorAnonymization:
+    """Tests de la integración con ImagePreprocessor"""
+
+    def test_buffer_reports_anonymization(self, fake_cascade):
+        preprocessor = ImagePreprocessor(target_size=(64, 64), enhance_contrast=False, face_detection_max_side=100)
+
+        buffer = preprocessor.preprocess_buffer(_textured(400, 200))
+
+        assert buffer.metadata["anonymization"]["faces"] == 1
+        assert fake_cascade.calls[0][0] == (100, 50)
+        assert preprocessor.get_preprocessor_info()["anonymization"]["images"] == 1
+
+    def test_crop_metadata_skips_detection(self, fake_cascade):
+        preprocessor = ImagePreprocessor(target_size=(64, 64), enhance_contrast=False)
+        crop = ImageBuffer(array=_textured(128, 128), metadata={"crop": [0, 0, 128, 128], "body_region": "heel"})
+
+        buffer = preprocessor.preprocess_buffer(crop)
+
+        assert buffer.metadata["anonymization"]["reason"] == "body_region_crop"
+        assert not fake_cascade.calls
+
+    def test_skip_can_be_disabled(self, fake_cascade):
+        preprocessor = ImagePreprocessor(target_size=(64, 64), enhance_contrast=False, skip_close_up_faces=False)
+        crop = ImageBuffer(array=_textured(128, 128), metadata={"close_up": True})
+
+        preprocessor.preprocess_buffer(crop)
+
+        assert len(fake_cascade.calls) == 1
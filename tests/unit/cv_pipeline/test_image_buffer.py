@@ -0,0 +1,90 @@
+"""
+Test Shared Image Buffers
+=========================
+
+Tests para ImageBuffer y el pool de arrays preasignados.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from vigia_detect.cv_pipeline.image_buffer import BufferPool, ImageBuffer, unwrap_image
+
+
+class TestBufferPool:
+    """Tests del pool de buffers"""
+
+    def test_released_array_is_reused(self):
+        pool = BufferPool()
+
+        first = pool.acquire((64, 64, 3), np.float32)
+        pool.release(first)
+        second = pool.acquire((64, 64, 3), np.float32)
+
+        assert second is first
+        assert pool.get_stats()["allocations"] == 1
+        assert pool.get_stats()["reuses"] == 1
+
+    def test_shapes_and_dtypes_are_separate(self):
+        pool = BufferPool()
+        pool.release(pool.acquire((64, 64, 3), np.float32))
+
+        other = pool.acquire((64, 64, 3), np.uint8)
+
+        assert other.dtype == np.uint8
+        assert pool.get_stats()["allocations"] == 2
+
+    def test_idle_buffers_are_bounded(self):
+        pool = BufferPool(max_per_shape=1)
+        arrays = [pool.acquire((8, 8, 3)) for _ in range(3)]
+        for array in arrays:
+            pool.release(array)
+
+        stats = pool.get_stats()
+        assert stats["idle_buffers"] == 1
+        assert stats["discards"] == 2
+
+
+class TestImageBuffer:
+    """Tests del buffer de imagen compartido"""
+
+    def test_release_returns_array_once(self):
+        pool = BufferPool()
+        array = pool.acquire((8, 8, 3), np.uint8)
+        with ImageBuffer(array=array, _release=pool.release) as buffer:
+            pass
+        buffer.release()
+
+        assert pool.get_stats()["releases"] == 1
+
+    def test_from_file_decodes_rgb(self, tmp_path):
+        image = np.zeros((20, 30, 3), dtype=np.uint8)
+        image[:, :] = (255, 0, 0)  # Azul en BGR
+        path = tmp_path / "wound.png"
+        cv2.imwrite(str(path), image)
+
+        buffer = ImageBuffer.from_file(str(path))
+
+        assert buffer.color_order == "RGB"
+        assert buffer.original_size == (30, 20)
+        assert tuple(buffer.array[0, 0]) == (0, 0, 255)
+        assert buffer.as_rgb() is buffer.array
+        assert tuple(buffer.as_bgr()[0, 0]) == (255, 0, 0)
+
+    def test_as_tensor_shares_memory(self):
+        torch = pytest.importorskip("torch")
+        buffer = ImageBuffer(array=np.zeros((4, 6, 3), dtype=np.float32))
+
+        tensor = buffer.as_tensor(batch_dim=True)
+        buffer.array[1, 2, 0] = 7.0
+
+        assert tensor.shape == (1, 3, 4, 6)
+        assert tensor[0, 0, 1, 2].item() == 7.0
+        assert isinstance(tensor, torch.Tensor)
+
+    def test_unwrap_image(self):
+        array = np.zeros((2, 2, 3), dtype=np.uint8)
+
+        assert unwrap_image(ImageBuffer(array=array)) is array
+        assert unwrap_image(array) is array
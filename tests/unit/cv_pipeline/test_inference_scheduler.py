@@ -0,0 +1,89 @@
+"""
+Test Dynamic Batching Inference Scheduler
+=========================================
+
+Tests para el scheduler de inferencia con batching dinámico por motor.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from vigia_detect.cv_pipeline.inference_scheduler import DynamicBatchScheduler
+
+
+class RecordingModel:
+    """Modelo de prueba: registra tamaños de lote y duplica cada entrada."""
+
+    def __init__(self, delay: float = 0.0, gate: threading.Event = None):
+        self.batches = []
+        self.delay = delay
+        self.gate = gate
+
+    def __call__(self, items):
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        time.sleep(self.delay)
+        self.batches.append(len(items))
+        return [item * 2 for item in items]
+
+
+class TestDynamicBatchScheduler:
+    """Tests del scheduler de batching dinámico"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self):
+        model = RecordingModel()
+        scheduler = DynamicBatchScheduler("test", model, max_batch_size=8, max_wait_ms=20)
+
+        results = await asyncio.gather(*(scheduler.submit(i) for i in range(5)))
+
+        assert results == [0, 2, 4, 6, 8]
+        assert model.batches == [5]
+        await scheduler.close()
+
+    @pytest.mark.asyncio
+    async def test_requests_queue_while_engine_busy(self):
+        gate = threading.Event()
+        model = RecordingModel(gate=gate)
+        scheduler = DynamicBatchScheduler("test", model, max_batch_size=3, max_wait_ms=1)
+
+        first = asyncio.ensure_future(scheduler.submit(0))
+        await asyncio.sleep(0.02)  # Primer lote en curso (bloqueado)
+        rest = [asyncio.ensure_future(scheduler.submit(i)) for i in range(1, 6)]
+        await asyncio.sleep(0.02)
+        gate.set()
+
+        assert await first == 0
+        assert [await task for task in rest] == [2, 4, 6, 8, 10]
+        assert model.batches == [1, 3, 2]
+        await scheduler.close()
+
+    @pytest.mark.asyncio
+    async def test_timed_out_caller_does_not_affect_batch(self):
+        model = RecordingModel(delay=0.1)
+        scheduler = DynamicBatchScheduler("test", model, max_batch_size=4, max_wait_ms=1)
+
+        slow = asyncio.wait_for(scheduler.submit(1), timeout=0.02)
+        other = scheduler.submit(2)
+        results = await asyncio.gather(slow, other, return_exceptions=True)
+
+        assert isinstance(results[0], asyncio.TimeoutError)
+        assert results[1] == 4
+        await scheduler.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_error_reaches_every_caller(self):
+        def failing_model(items):
+            raise RuntimeError("model failure")
+
+        scheduler = DynamicBatchScheduler("test", failing_model, max_batch_size=4, max_wait_ms=1)
+
+        results = await asyncio.gather(scheduler.submit(1), scheduler.submit(2), return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert scheduler.get_stats()["errors"] == 1
+        await scheduler.close()
+
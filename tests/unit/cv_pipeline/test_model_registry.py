@@ -0,0 +1,155 @@
+"""
+Test Process-wide Model Registry
+================================
+
+Tests para el registro de modelos compartidos entre detectores.
+"""
+
+import threading
+import time
+
+import pytest
+
+from vigia_detect.cv_pipeline.model_registry import ModelRegistry, get_model_registry
+
+
+class CountingLoader:
+    """Loader de prueba: cuenta cargas y devuelve un objeto nuevo por carga."""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return object()
+
+
+class TestModelRegistry:
+    """Tests del registro de modelos"""
+
+    def test_loads_each_key_once(self):
+        registry = ModelRegistry()
+        loader = CountingLoader()
+
+        first = registry.get_or_load("yolo", "/models/lpp.pt", "cpu", loader)
+        second = registry.get_or_load("yolo", "/models/lpp.pt", "cpu", loader)
+
+        assert first is second
+        assert loader.calls == 1
+        assert registry.get_stats()["models"][0]["hits"] == 1
+
+    def test_device_and_weights_are_part_of_the_key(self):
+        registry = ModelRegistry()
+        loader = CountingLoader()
+
+        registry.get_or_load("yolo", "/models/lpp.pt", "cpu", loader)
+        registry.get_or_load("yolo", "/models/lpp.pt", "cuda", loader)
+        registry.get_or_load("yolo", "/models/other.pt", "cpu", loader)
+        registry.get_or_load("monai", "/models/lpp.pt", "cpu", loader)
+
+        assert loader.calls == 4
+
+    def test_concurrent_requests_share_one_load(self):
+        registry = ModelRegistry()
+        loader = CountingLoader(delay=0.05)
+        models = []
+
+        threads = [
+            threading.Thread(target=lambda: models.append(registry.get_or_load("monai", None, "cpu", loader)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert loader.calls == 1
+        assert len({id(model) for model in models}) == 1
+
+    def test_failed_load_is_retried(self):
+        registry = ModelRegistry()
+
+        def failing():
+            raise RuntimeError("weights corrupted")
+
+        with pytest.raises(RuntimeError):
+            registry.get_or_load("yolo", "/models/lpp.pt", "cpu", failing)
+
+        loader = CountingLoader()
+        registry.get_or_load("yolo", "/models/lpp.pt", "cpu", loader)
+        assert loader.calls == 1
+
+    def test_background_warm_up(self):
+        registry = ModelRegistry()
+        loader = CountingLoader()
+
+        thread = registry.warm_up([
+            lambda: registry.get_or_load("yolo", "/models/lpp.pt", "cpu", loader),
+            lambda: (_ for _ in ()).throw(RuntimeError("missing weights"))
+        ])
+        thread.join(timeout=5)
+
+        assert registry.is_loaded("yolo", "/models/lpp.pt", "cpu")
+        registry.get_or_load("yolo", "/models/lpp.pt", "cpu", loader)
+        assert loader.calls == 1
+
+    def test_evict_forces_reload(self):
+        registry = ModelRegistry()
+        loader = CountingLoader()
+        registry.get_or_load("yolo", "/models/lpp.pt", "cpu", loader)
+        registry.get_or_load("monai", None, "cpu", loader)
+
+        assert registry.evict("yolo") == 1
+        registry.get_or_load("yolo", "/models/lpp.pt", "cpu", loader)
+
+        assert loader.calls == 3
+
+    def test_stats_report_load_time_and_footprint(self):
+        torch = pytest.importorskip("torch")
+        registry = ModelRegistry()
+
+        registry.get_or_load("monai", None, "cpu", lambda: torch.nn.Linear(10, 5))
+        stats = registry.get_stats()
+
+        assert stats["loaded_models"] == 1
+        assert stats["models"][0]["parameter_bytes"] == (10 * 5 + 5) * 4
+        assert stats["models"][0]["load_time_seconds"] >= 0
+
+    def test_global_registry_is_shared(self):
+        assert get_model_registry() is get_model_registry()
+
+
+class TestSharedYoloLoader:
+    """Tests del cargador único de YOLOv5"""
+
+    def test_detectors_share_one_yolo_load(self, monkeypatch, tmp_path):
+        torch = pytest.importorskip("torch")
+        from vigia_detect.cv_pipeline import yolo_loader
+        from vigia_detect.cv_pipeline.real_lpp_detector import load_yolo_weights
+
+        registry = ModelRegistry()
+        loads = []
+
+        class FakeModel:
+            def to(self, device):
+                self.device = str(device)
+                return self
+
+        def fake_load(model_type, model_path):
+            loads.append(model_path)
+            return FakeModel()
+
+        monkeypatch.setattr(yolo_loader, "get_model_registry", lambda: registry)
+        monkeypatch.setattr(yolo_loader, "_load_yolo_isolated", fake_load)
+        weights = tmp_path / "lpp.pt"
+        weights.write_bytes(b"weights")
+
+        # LPPDetector y RealLPPDetector llegan a la misma entrada del registro
+        lpp_model = yolo_loader.load_yolo_model_isolated("yolov5s", str(weights), "cpu")
+        real_model = load_yolo_weights(str(weights), torch.device("cpu"))
+
+        assert lpp_model is real_model
+        assert loads == [str(weights)]
+        assert real_model.device == "cpu"
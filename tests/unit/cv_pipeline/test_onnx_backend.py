@@ -0,0 +1,162 @@
+"""
+Test ONNX Runtime Backend
+=========================
+
+Tests para el backend ONNX Runtime del detector LPP y la verificación de paridad.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from vigia_detect.cv_pipeline.model_registry import get_model_registry
+from vigia_detect.cv_pipeline.onnx_backend import (
+    OnnxLPPDetector,
+    check_parity,
+    letterbox,
+    parse_core_list,
+    postprocess_predictions,
+)
+
+
+def _prediction(cx, cy, w, h, objectness, class_scores):
+    return [cx, cy, w, h, objectness, *class_scores]
+
+
+class FixedDetector:
+    """Detector de prueba con detecciones fijas."""
+
+    def __init__(self, detections):
+        self.detections = detections
+
+    def detect(self, image):
+        return [dict(d) for d in self.detections]
+
+
+DETECTION = {"bbox": [10, 10, 50, 50], "confidence": 0.8, "class_id": 1}
+
+
+class TestPrePostProcessing:
+    """Tests de letterbox y decodificación de predicciones"""
+
+    def test_letterbox_keeps_aspect_ratio(self):
+        image = np.zeros((100, 200, 3), dtype=np.uint8)
+
+        padded, ratio, pad = letterbox(image, 64)
+
+        assert padded.shape == (64, 64, 3)
+        assert ratio == pytest.approx(0.32)
+        assert pad == (0, 16)
+        assert padded[0, 0, 0] == 114
+
+    def test_postprocess_decodes_and_suppresses_per_class(self):
+        predictions = np.array([
+            _prediction(32, 32, 20, 20, 0.9, [0.0, 1.0, 0.0]),
+            _prediction(33, 33, 20, 20, 0.8, [0.0, 1.0, 0.0]),  # Duplicado de la misma clase
+            _prediction(33, 33, 20, 20, 0.7, [0.0, 0.0, 1.0]),  # Otra clase
+            _prediction(10, 10, 4, 4, 0.1, [1.0, 0.0, 0.0]),  # Bajo el umbral
+        ], dtype=np.float32)
+
+        rows = postprocess_predictions(predictions, conf_threshold=0.25, iou_threshold=0.45)
+
+        assert rows.shape == (2, 6)
+        np.testing.assert_allclose(rows[0, :4], [22, 22, 42, 42])
+        assert rows[0, 5] == 1 and rows[1, 5] == 2
+
+    def test_parse_core_list(self):
+        assert parse_core_list("0-3") == [0, 1, 2, 3]
+        assert parse_core_list("1, 4,6-7") == [1, 4, 6, 7]
+        assert parse_core_list("") is None
+
+
+class TestParity:
+    """Tests de la verificación de paridad"""
+
+    def test_identical_backends_pass(self):
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+
+        report = check_parity(FixedDetector([DETECTION]), FixedDetector([DETECTION]), [image, image])
+
+        assert report["passed"]
+        assert report["matched_detections"] == 2
+        assert report["recall"] == 1.0
+
+    def test_missing_or_shifted_detections_fail(self):
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+        shifted = {**DETECTION, "bbox": [40, 40, 80, 80]}
+
+        report = check_parity(FixedDetector([DETECTION]), FixedDetector([shifted]), [image])
+
+        assert not report["passed"]
+        assert report["recall"] == 0.0
+
+    def test_confidence_drift_fails(self):
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+        drifted = {**DETECTION, "confidence": 0.5}
+
+        report = check_parity(FixedDetector([DETECTION]), FixedDetector([drifted]), [image])
+
+        assert report["recall"] == 1.0
+        assert report["max_confidence_delta"] == pytest.approx(0.3)
+        assert not report["passed"]
+
+
+class TestOnnxLPPDetector:
+    """Tests del detector sobre ONNX Runtime"""
+
+    @pytest.fixture
+    def onnx_model(self, tmp_path):
+        """Modelo ONNX mínimo con salida YOLOv5 constante (una caja de clase 1)."""
+        pytest.importorskip("onnxruntime")
+        onnx = pytest.importorskip("onnx")
+        from onnx import TensorProto, helper, numpy_helper
+
+        predictions = np.array([[_prediction(32, 32, 16, 16, 0.9, [0.0, 0.9, 0.0, 0.0, 0.0])]], dtype=np.float32)
+        zero = numpy_helper.from_array(np.zeros((1, 1, 10), dtype=np.float32), "zero")
+        constant = numpy_helper.from_array(predictions, "predictions")
+        graph = helper.make_graph(
+            [
+                helper.make_node("ReduceMean", ["images"], ["mean"], keepdims=0),
+                helper.make_node("Mul", ["mean", "zero"], ["scaled"]),
+                helper.make_node("Add", ["predictions", "scaled"], ["output"]),
+            ],
+            "yolo_stub",
+            [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, 64, 64])],
+            [helper.make_tensor_value_info("output", TensorProto.FLOAT, [1, 1, 10])],
+            initializer=[zero, constant],
+        )
+        model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+        model.ir_version = 8
+        path = tmp_path / "lpp.onnx"
+        onnx.save(model, str(path))
+        path.with_suffix(".json").write_text(json.dumps({"input_size": 64, "quantized": False}))
+
+        yield str(path)
+        get_model_registry().evict("yolo_onnx")
+
+    def test_detections_in_original_coordinates(self, onnx_model):
+        detector = OnnxLPPDetector(onnx_model, intra_op_threads=1)
+        image = np.zeros((128, 128, 3), dtype=np.uint8)
+
+        detections = detector.detect(image)
+
+        assert len(detections) == 1
+        assert detections[0]["bbox"] == [48, 48, 80, 80]
+        assert detections[0]["lpp_stage"] == 2
+        assert detector.get_model_info()["dynamic_batch"] is False
+
+    def test_batch_and_session_sharing(self, onnx_model):
+        first = OnnxLPPDetector(onnx_model, intra_op_threads=1)
+        second = OnnxLPPDetector(onnx_model, intra_op_threads=1)
+
+        results = first.detect_batch([np.zeros((64, 64, 3), np.uint8), np.zeros((64, 64, 3), np.float32)])
+
+        assert first.session is second.session
+        assert [len(r) for r in results] == [1, 1]
+
+    def test_missing_model_raises(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            OnnxLPPDetector(str(tmp_path / "missing.onnx"))
@@ -0,0 +1,164 @@
+"""
+Test Tiled Inference
+====================
+
+Tests para la inferencia por teselas en imágenes de alta resolución.
+"""
+
+import numpy as np
+import pytest
+
+from vigia_detect.cv_pipeline.image_buffer import BufferPool
+from vigia_detect.cv_pipeline.preprocessor import ImagePreprocessor
+from vigia_detect.cv_pipeline.tiled_inference import (
+    Tile,
+    TileConfig,
+    TiledDetector,
+    merge_tile_detections,
+    non_max_suppression,
+    plan_tiles,
+)
+
+
+class BlobDetector:
+    """Detector de prueba: caja alrededor de los píxeles brillantes de cada tesela."""
+
+    def __init__(self):
+        self.batches = []
+
+    def detect(self, image):
+        image = getattr(image, "array", image)
+        ys, xs = np.nonzero(image[..., 2] > 0.5 * image.max()) if image.max() > 0 else ([], [])
+        if len(xs) == 0:
+            return []
+        return [{
+            "bbox": [int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1],
+            "confidence": 0.9,
+            "class_id": 1
+        }]
+
+    def detect_batch(self, images):
+        self.batches.append(len(images))
+        return [self.detect(image) for image in images]
+
+
+class DictDetector(BlobDetector):
+    """Detector con la interfaz de LPPDetector (dict con 'detections')."""
+
+    detect_batch = None
+
+    def detect(self, image):
+        return {"detections": super().detect(image), "processing_time_ms": 1.0}
+
+
+def _coverage(tiles, width, height):
+    covered = np.zeros((height, width), dtype=bool)
+    for tile in tiles:
+        covered[tile.y:tile.y + tile.height, tile.x:tile.x + tile.width] = True
+    return covered.all()
+
+
+class TestPlanTiles:
+    """Tests de la planificación de teselas"""
+
+    def test_small_image_is_not_tiled(self):
+        assert plan_tiles(800, 600, TileConfig()) == [Tile(0, 0, 800, 600)]
+
+    def test_grid_covers_image_with_overlap(self):
+        config = TileConfig(tile_size=640, overlap=0.25, max_tiles=64, include_full_image=False)
+
+        tiles = plan_tiles(2000, 1500, config)
+
+        assert all(tile.width == 640 and tile.height == 640 for tile in tiles)
+        assert _coverage(tiles, 2000, 1500)
+        xs = sorted({tile.x for tile in tiles})
+        assert xs[1] - xs[0] == 480
+
+    def test_budget_grows_tile_region(self):
+        config = TileConfig(tile_size=640, max_tiles=5)
+
+        tiles = plan_tiles(4000, 3000, config)
+
+        assert len(tiles) <= 5
+        assert tiles[-1] == Tile(0, 0, 4000, 3000)
+        assert tiles[0].width > 640
+        assert _coverage(tiles[:-1], 4000, 3000)
+
+    def test_invalid_config(self):
+        with pytest.raises(ValueError):
+            TileConfig(overlap=1.0)
+        with pytest.raises(ValueError):
+            TileConfig(max_tiles=0)
+
+
+class TestMerge:
+    """Tests de la fusión de detecciones"""
+
+    def test_nms_is_class_aware(self):
+        detections = [
+            {"bbox": [0, 0, 10, 10], "confidence": 0.9, "class_id": 1},
+            {"bbox": [1, 1, 10, 10], "confidence": 0.8, "class_id": 1},
+            {"bbox": [1, 1, 10, 10], "confidence": 0.7, "class_id": 2},
+        ]
+
+        kept = non_max_suppression(detections, iou_threshold=0.5)
+
+        assert [d["confidence"] for d in kept] == [0.9, 0.7]
+
+    def test_boxes_map_to_original_coordinates(self):
+        config = TileConfig(tile_size=100)
+        tiles = [Tile(1000, 500, 100, 100), Tile(0, 0, 400, 200)]
+        detections = [
+            [{"bbox": [10, 20, 30, 40], "confidence": 0.9, "class_id": 0}],
+            [{"bbox": [10.0, 10.0, 50.0, 50.0], "confidence": 0.8, "class_id": 0}],
+        ]
+
+        merged = merge_tile_detections(detections, tiles, (2000, 1000), config)
+
+        assert merged[0]["bbox"] == [1010, 520, 1030, 540]
+        assert merged[1]["bbox"] == [40.0, 20.0, 200.0, 100.0]
+
+
+class TestTiledDetector:
+    """Tests del detector por teselas"""
+
+    def _image(self):
+        image = np.zeros((1500, 2000, 3), dtype=np.uint8)
+        image[700:720, 1200:1230, 2] = 255  # Lesión pequeña (rojo en BGR)
+        return image
+
+    def test_small_lesion_found_in_original_coordinates(self):
+        detector = BlobDetector()
+        config = TileConfig(tile_size=640, overlap=0.25, max_tiles=16, include_full_image=False, batch_size=4)
+
+        detections = TiledDetector(detector, config).detect(self._image())
+
+        assert len(detections) == 1
+        x1, y1, x2, y2 = detections[0]["bbox"]
+        assert abs(x1 - 1200) <= 1 and abs(y1 - 700) <= 1
+        assert abs(x2 - 1230) <= 1 and abs(y2 - 720) <= 1
+        assert max(detector.batches) <= 4
+
+    def test_dict_detectors_keep_their_format(self):
+        tiled = TiledDetector(DictDetector(), TileConfig(max_tiles=16))
+
+        result = tiled.detect(self._image())
+
+        assert len(result["detections"]) == 1
+        assert result["tiles"] <= 16
+        assert tiled.get_stats()["images"] == 1
+
+    def test_preprocess_tiles_uses_pool(self):
+        preprocessor = ImagePreprocessor(face_detection=False, enhance_contrast=False)
+        pool = BufferPool()
+        config = TileConfig(max_tiles=9)
+
+        tiled = preprocessor.preprocess_tiles(self._image(), config, pool=pool)
+        result = TiledDetector(BlobDetector(), config).detect(tiled)
+        tiled.release()
+
+        assert tiled.original_size == (2000, 1500)
+        assert all(buffer.shape == (640, 640, 3) for buffer in tiled.buffers)
+        assert all(buffer.array.dtype == np.float32 for buffer in tiled.buffers)
+        assert len(result) == 1
+        assert pool.get_stats()["releases"] == len(tiled.tiles)
@@ -0,0 +1,101 @@
+"""
+Test Raw Output Array Codec
+===========================
+
+Tests para la serialización de salidas crudas de IA con cabecera de dtype/forma.
+"""
+
+import gzip
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from vigia_detect.db.raw_output_codec import (
+    RawOutputCodec,
+    available_codecs,
+    blob_compression_method,
+    decode_raw_array,
+    is_encoded,
+)
+from vigia_detect.db.raw_outputs_client import RawOutputsClient
+
+
+def _confidence_maps() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.random((1, 5, 64, 64), dtype=np.float32)
+
+
+class TestRawOutputCodec:
+    """Tests del codec de arrays"""
+
+    @pytest.mark.parametrize("codec", [name for name, ok in available_codecs().items() if ok])
+    def test_round_trip_keeps_dtype_and_shape(self, codec):
+        array = _confidence_maps()
+
+        decoded = RawOutputCodec(codec=codec).decode(RawOutputCodec(codec=codec).encode(array))
+
+        assert decoded.dtype == np.float32
+        assert decoded.shape == (1, 5, 64, 64)
+        np.testing.assert_array_equal(decoded, array)
+
+    def test_integer_and_scalar_arrays(self):
+        codec = RawOutputCodec()
+
+        for array in (np.arange(12, dtype=np.int64).reshape(3, 4), np.array(3.5), np.zeros((0, 6))):
+            decoded = codec.decode(codec.encode(array))
+            assert decoded.dtype == array.dtype
+            assert decoded.shape == array.shape
+            np.testing.assert_array_equal(decoded, array)
+
+    def test_shuffle_improves_float_compression(self):
+        array = np.linspace(0, 1, 64 * 64, dtype=np.float32).reshape(64, 64)
+
+        shuffled = RawOutputCodec(codec="zlib", shuffle=True).encode(array)
+        plain = RawOutputCodec(codec="zlib", shuffle=False).encode(array)
+
+        assert len(shuffled) < len(plain)
+
+    def test_float16_quantization(self):
+        array = _confidence_maps()
+        codec = RawOutputCodec(quantize_float16=True)
+
+        blob = codec.encode(array)
+        decoded = codec.decode(blob)
+
+        assert decoded.dtype == np.float32
+        np.testing.assert_allclose(decoded, array, atol=1e-3)
+        assert blob_compression_method(blob).endswith("+float16")
+
+    def test_unknown_codec_is_rejected(self):
+        with pytest.raises(ValueError):
+            RawOutputCodec(codec="brotli")
+
+    def test_legacy_gzip_blobs_still_decode(self):
+        array = _confidence_maps()
+        legacy = gzip.compress(array.tobytes())
+
+        assert not is_encoded(legacy)
+        assert blob_compression_method(legacy) == "gzip"
+        decoded = decode_raw_array(legacy, dtype="float32", shape=(1, 5, 64, 64))
+        np.testing.assert_array_equal(decoded, array)
+
+
+class TestRawOutputsClientEncoding:
+    """Tests de la escritura directa de arrays en RawOutputsClient"""
+
+    def test_arrays_are_encoded_and_blobs_kept(self):
+        client = RawOutputsClient(codec=RawOutputCodec(codec="zlib"))
+        existing = RawOutputCodec(codec="zlib").encode(np.ones(4, dtype=np.float32))
+        capture = SimpleNamespace(
+            confidence_maps=_confidence_maps(),
+            detection_arrays=existing,
+            expression_vectors=None
+        )
+
+        blobs = client.encode_binary_fields(capture)
+
+        np.testing.assert_array_equal(decode_raw_array(blobs["confidence_maps"]), capture.confidence_maps)
+        assert blobs["detection_arrays"] is existing
+        assert blobs["expression_vectors"] is None
+        assert client._compression_method(blobs) == "zlib+shuffle"
@@ -0,0 +1,103 @@
+"""
+Test BM25 Protocol Search
+=========================
+
+Tests para el índice invertido BM25 del indexador de protocolos.
+"""
+
+import pytest
+
+from vigia_detect.redis_layer.bm25_index import BM25Index, tokenize_with_offsets
+from vigia_detect.redis_layer.protocol_indexer_enhanced import (
+    EnhancedProtocolIndexer,
+    ProtocolIndexConfig,
+    ProtocolType
+)
+
+
+class TestBM25Index:
+    """Tests del índice BM25"""
+
+    def test_tokenizer_filters_stop_words_and_keeps_offsets(self):
+        tokens = tokenize_with_offsets("Protocolo para LPP con desbridamiento")
+
+        assert tokens == [("protocolo", 0), ("lpp", 15), ("desbridamiento", 23)]
+
+    def test_rare_term_outranks_common_term(self):
+        index = BM25Index()
+        index.add_document("a", "", "presion presion presion apósito", [])
+        index.add_document("b", "", "presion desbridamiento", [])
+        index.add_document("c", "", "presion cuidado", [])
+
+        ranked = index.search({"presion", "desbridamiento"}, top_k=3)
+
+        assert ranked[0][0] == "b"
+        assert len(ranked) == 3
+
+    def test_allowed_set_restricts_candidates(self):
+        index = BM25Index()
+        for doc_id in ("a", "b", "c"):
+            index.add_document(doc_id, "", "tratamiento herida", [])
+
+        ranked = index.search({"tratamiento"}, top_k=5, allowed={"b"})
+
+        assert [doc_id for doc_id, _ in ranked] == ["b"]
+
+    def test_remove_document_updates_postings_and_lengths(self):
+        index = BM25Index()
+        index.add_document("a", "Título", "tratamiento herida", [])
+        index.add_document("b", "", "tratamiento", [])
+        index.remove_document("a")
+
+        assert "herida" not in index.postings
+        assert "titulo" not in index.postings and "título" not in index.postings
+        assert index.total_length == index.doc_lengths["b"]
+
+    def test_matching_chunks_ranked_by_distinct_terms(self):
+        index = BM25Index()
+        chunks = ["solo herida", "herida con infeccion", "nada relevante"]
+        index.add_document("a", "", " ".join(chunks), chunks)
+
+        assert index.matching_chunks("a", {"herida", "infeccion"}, limit=3) == [1, 0]
+
+
+class TestProtocolIndexerSearch:
+    """Tests de búsqueda del indexador enhanced"""
+
+    @pytest.fixture
+    def indexer(self):
+        config = ProtocolIndexConfig(min_chunk_size=10, chunk_size=100, overlap_size=10)
+        return EnhancedProtocolIndexer(config)
+
+    @pytest.mark.asyncio
+    async def test_search_filters_by_type_and_language(self, indexer):
+        await indexer.index_document_content(
+            "Prevención de lesiones por presión con cambios posturales cada dos horas",
+            "Prevención LPP", ProtocolType.PREVENTION
+        )
+        await indexer.index_document_content(
+            "Tratamiento de lesiones por presión grado tres con desbridamiento",
+            "Tratamiento LPP", ProtocolType.TREATMENT
+        )
+        await indexer.index_document_content(
+            "Pressure injury treatment with debridement",
+            "Pressure injury treatment", ProtocolType.TREATMENT, language="en"
+        )
+
+        results = await indexer.search_protocols("lesiones desbridamiento", protocol_type="treatment")
+        assert [r["title"] for r in results] == ["Tratamiento LPP"]
+        assert 0 < results[0]["confidence"] <= 1
+
+        english = await indexer.search_protocols("treatment", language="en")
+        assert [r["title"] for r in english] == ["Pressure injury treatment"]
+
+    @pytest.mark.asyncio
+    async def test_snippet_centered_on_stored_offset(self, indexer):
+        content = ("introducción general " * 40) + "aplicar alginato según exudado " + ("cierre " * 40)
+        await indexer.index_document_content(content, "Apósitos", ProtocolType.TREATMENT)
+
+        results = await indexer.search_protocols("alginato")
+
+        assert "alginato" in results[0]["content"]
+        assert results[0]["matched_chunks"]
+        assert all("alginato" in chunk for chunk in results[0]["matched_chunks"])
@@ -0,0 +1,90 @@
+"""
+Test Embedding Micro-Batcher
+============================
+
+Tests para el agrupamiento de embeddings concurrentes en llamadas batch.
+"""
+
+import pytest
+import asyncio
+import numpy as np
+
+from vigia_detect.redis_layer.embedding_batcher import MicroBatchEmbedder
+
+
+class FakeEncoder:
+    """Encoder determinista que registra los lotes recibidos"""
+
+    def __init__(self, dim: int = 4):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t)] * self.dim for t in texts], dtype=np.float32)
+
+
+class TestMicroBatchEmbedder:
+    """Tests del micro-batcher de embeddings"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_encode_call(self):
+        encoder = FakeEncoder()
+        batcher = MicroBatchEmbedder(encoder, max_batch_size=16, max_wait_ms=20)
+
+        texts = ["a", "bb", "ccc", "dddd"]
+        vectors = await asyncio.gather(*(batcher.embed(t) for t in texts))
+
+        assert len(encoder.calls) == 1
+        assert encoder.calls[0] == texts
+        for text, vector in zip(texts, vectors):
+            assert vector.dtype == np.float32
+            assert vector.shape == (4,)
+            assert vector[0] == len(text)
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limit_splits_batches(self):
+        encoder = FakeEncoder()
+        batcher = MicroBatchEmbedder(encoder, max_batch_size=2, max_wait_ms=50)
+
+        await asyncio.gather(*(batcher.embed(f"text-{i}") for i in range(5)))
+
+        assert [len(call) for call in encoder.calls] == [2, 2, 1]
+        stats = batcher.get_stats()
+        assert stats["batches"] == 3
+        assert stats["batch_size_histogram"]["count"] == 3
+        assert stats["queue_wait_ms_histogram"]["count"] == 5
+
+    @pytest.mark.asyncio
+    async def test_identical_inflight_texts_are_deduplicated(self):
+        encoder = FakeEncoder()
+        batcher = MicroBatchEmbedder(encoder, max_batch_size=16, max_wait_ms=10)
+
+        first, second = await asyncio.gather(batcher.embed("lpp"), batcher.embed("lpp"))
+
+        assert encoder.calls == [["lpp"]]
+        assert batcher.get_stats()["deduplicated"] == 1
+        assert np.array_equal(first, second)
+        assert first is not second
+
+    @pytest.mark.asyncio
+    async def test_encode_failure_propagates_to_every_caller(self):
+        def failing_encoder(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = MicroBatchEmbedder(failing_encoder, max_batch_size=8, max_wait_ms=5)
+
+        results = await asyncio.gather(
+            batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert batcher.get_stats()["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_close_rejects_new_requests(self):
+        batcher = MicroBatchEmbedder(FakeEncoder(), max_wait_ms=1)
+        await batcher.close()
+
+        with pytest.raises(RuntimeError):
+            await batcher.embed("late")
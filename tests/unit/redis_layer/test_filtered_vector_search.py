@@ -0,0 +1,147 @@
+"""
+Test Filtered Vector Search
+===========================
+
+Tests para búsqueda vectorial con filtros aplicados dentro del índice.
+"""
+
+import pytest
+import numpy as np
+
+from vigia_detect.redis_layer.vector_service_enhanced import (
+    EnhancedVectorService,
+    VectorSearchConfig,
+    VectorDocument
+)
+
+
+DIMENSION = 16
+
+
+def make_service(index_type: str = "HNSW", snapshot_dir=None, **overrides) -> EnhancedVectorService:
+    config = VectorSearchConfig(
+        dimension=DIMENSION,
+        index_type=index_type,
+        similarity_threshold=0.0,
+        snapshot_dir=str(snapshot_dir) if snapshot_dir else None,
+        **overrides
+    )
+    service = EnhancedVectorService(config)
+    service.vector_index = service._create_index()
+    return service
+
+
+def make_corpus(n: int = 3000, rare_every: int = 100):
+    """Corpus con un tipo de documento raro (1 de cada rare_every)"""
+    rng = np.random.default_rng(7)
+    docs = []
+    for i in range(n):
+        rare = i % rare_every == 0
+        docs.append(VectorDocument(
+            doc_id=f"doc-{i}",
+            content=f"Documento {i}",
+            metadata={},
+            vector=rng.random(DIMENSION, dtype=np.float32),
+            document_type="clinical_guideline" if rare else "medical_protocol",
+            language="en" if i % 2 else "es"
+        ))
+    return docs
+
+
+def brute_force_top_k(docs, query, k, document_type=None, language=None):
+    matching = [
+        d for d in docs
+        if (document_type is None or d.document_type == document_type)
+        and (language is None or d.language == language)
+    ]
+    matching.sort(key=lambda d: float(((d.vector - query) ** 2).sum()))
+    return [d.doc_id for d in matching[:k]]
+
+
+class TestFilteredVectorSearch:
+    """Tests de búsqueda filtrada sin sobre-recuperación"""
+
+    @pytest.mark.asyncio
+    async def test_selective_filter_returns_full_exact_top_k(self):
+        docs = make_corpus()
+        service = make_service()
+        service._add_many_to_index(docs)
+        query = np.random.default_rng(1).random(DIMENSION, dtype=np.float32)
+
+        results = await service._vector_search(query, k=5, filter_type="clinical_guideline")
+
+        assert [r.doc_id for r in results] == brute_force_top_k(
+            docs, query, 5, document_type="clinical_guideline"
+        )
+        assert service.search_stats["exact_scans"] == 1
+
+    @pytest.mark.asyncio
+    async def test_broad_filter_uses_index_selector(self):
+        docs = make_corpus()
+        service = make_service(filtered_exact_scan_max=10)
+        service._add_many_to_index(docs)
+        query = np.random.default_rng(2).random(DIMENSION, dtype=np.float32)
+
+        results = await service._vector_search(query, k=10, filter_language="en")
+
+        assert len(results) == 10
+        assert all(r.language == "en" for r in results)
+        assert service.search_stats["exact_scans"] == 0
+
+    @pytest.mark.asyncio
+    async def test_combined_filters_on_flat_index(self):
+        docs = make_corpus(rare_every=10)
+        service = make_service(index_type="FLAT", filtered_exact_scan_max=0)
+        service._add_many_to_index(docs)
+        query = np.random.default_rng(3).random(DIMENSION, dtype=np.float32)
+
+        results = await service._vector_search(
+            query, k=5, filter_type="clinical_guideline", filter_language="es"
+        )
+
+        assert [r.doc_id for r in results] == brute_force_top_k(
+            docs, query, 5, document_type="clinical_guideline", language="es"
+        )
+
+    @pytest.mark.asyncio
+    async def test_unknown_filter_value_returns_nothing(self):
+        service = make_service()
+        service._add_many_to_index(make_corpus(n=50))
+
+        results = await service._vector_search(
+            np.zeros(DIMENSION, dtype=np.float32), k=5, filter_type="unknown"
+        )
+
+        assert results == []
+
+    @pytest.mark.asyncio
+    async def test_reindexed_document_is_returned_once(self):
+        docs = make_corpus(n=20)
+        service = make_service()
+        service._add_many_to_index(docs)
+
+        updated = VectorDocument(
+            doc_id="doc-3", content="Actualizado", metadata={},
+            vector=docs[3].vector, document_type="clinical_guideline"
+        )
+        service._add_to_index(updated)
+
+        results = await service._vector_search(docs[3].vector, k=5)
+        assert [r.doc_id for r in results].count("doc-3") == 1
+
+        guideline = await service._vector_search(docs[3].vector, k=1, filter_type="clinical_guideline")
+        assert guideline[0].content == "Actualizado"
+
+    @pytest.mark.asyncio
+    async def test_filters_apply_to_snapshot_base_index(self, tmp_path):
+        docs = make_corpus(n=500, rare_every=50)
+        service = make_service(snapshot_dir=tmp_path)
+        service._add_many_to_index(docs)
+        await service.save_snapshot()
+        query = np.random.default_rng(4).random(DIMENSION, dtype=np.float32)
+
+        results = await service._vector_search(query, k=5, filter_type="clinical_guideline")
+
+        assert [r.doc_id for r in results] == brute_force_top_k(
+            docs, query, 5, document_type="clinical_guideline"
+        )
@@ -0,0 +1,103 @@
+"""
+Test Hybrid Retriever
+=====================
+
+Tests para la recuperación híbrida con reciprocal-rank fusion.
+"""
+
+import pytest
+import asyncio
+
+from vigia_detect.redis_layer.hybrid_retriever import (
+    HybridRetriever,
+    HybridRetrievalConfig
+)
+
+
+class FakeVectorService:
+    redis_client = None
+
+    def __init__(self, results, delay: float = 0.0):
+        self.results = results
+        self.delay = delay
+        self.calls = 0
+
+    async def search_similar(self, query, k=5, filter_by_type=None, filter_by_language=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.results[:k]
+
+
+class FakeProtocolIndexer:
+    def __init__(self, results, delay: float = 0.0):
+        self.results = results
+        self.delay = delay
+        self.calls = 0
+
+    async def search_protocols(self, query, protocol_type=None, query_type=None, max_results=10, language=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.results[:max_results]
+
+
+def result(doc_id, confidence=0.5, source="vector_search"):
+    return {"doc_id": doc_id, "content": doc_id, "confidence": confidence, "sources": [source]}
+
+
+class TestHybridRetriever:
+    """Tests del recuperador híbrido"""
+
+    @pytest.mark.asyncio
+    async def test_rrf_promotes_documents_found_by_both_sources(self):
+        vector = FakeVectorService([result("a"), result("shared"), result("b")])
+        protocols = FakeProtocolIndexer([
+            result("shared", 0.9, "protocol_indexer"), result("c", 0.4, "protocol_indexer")
+        ])
+        retriever = HybridRetriever(vector, protocols)
+
+        fused = await retriever.search("lpp grado 3", k=3)
+
+        assert fused[0]["doc_id"] == "shared"
+        assert fused[0]["retrieval_ranks"] == {"vector_search": 2, "protocol_indexer": 1}
+        assert fused[0]["sources"] == ["vector_search", "protocol_indexer"]
+        assert fused[0]["confidence"] == 0.9
+        assert len(fused) == 3
+
+    @pytest.mark.asyncio
+    async def test_sources_run_concurrently(self):
+        vector = FakeVectorService([result("a")], delay=0.1)
+        protocols = FakeProtocolIndexer([result("b", source="protocol_indexer")], delay=0.1)
+        retriever = HybridRetriever(vector, protocols)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await retriever.search("query")
+
+        assert loop.time() - started < 0.18
+
+    @pytest.mark.asyncio
+    async def test_fused_result_is_cached_under_one_key(self):
+        vector = FakeVectorService([result("a")])
+        protocols = FakeProtocolIndexer([result("b", source="protocol_indexer")])
+        retriever = HybridRetriever(vector, protocols)
+
+        first = await retriever.search("query")
+        second = await retriever.search("query")
+
+        assert first == second
+        assert vector.calls == 1 and protocols.calls == 1
+        assert retriever.get_stats()["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_source_is_dropped_and_result_not_cached(self):
+        vector = FakeVectorService([result("a")])
+        protocols = FakeProtocolIndexer([result("b", source="protocol_indexer")], delay=1.0)
+        retriever = HybridRetriever(vector, protocols, HybridRetrievalConfig(latency_budget_ms=50))
+
+        fused = await retriever.search("query")
+
+        assert [r["doc_id"] for r in fused] == ["a"]
+        stats = retriever.get_stats()
+        assert stats["source_timeouts"]["protocol_indexer"] == 1
+        assert stats["partial_results"] == 1
+        assert stats["local_cache_size"] == 0
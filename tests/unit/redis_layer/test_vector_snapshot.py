@@ -0,0 +1,175 @@
+"""
+Test Vector Snapshots
+=====================
+
+Tests para snapshots del índice FAISS en disco y reproducción del WAL.
+"""
+
+import pytest
+import numpy as np
+
+from vigia_detect.redis_layer.vector_service_enhanced import (
+    EnhancedVectorService,
+    VectorSearchConfig,
+    VectorDocument
+)
+
+
+DIMENSION = 8
+
+
+def make_service(snapshot_dir) -> EnhancedVectorService:
+    """Servicio con índice plano y snapshots, sin Redis ni modelo"""
+    config = VectorSearchConfig(
+        dimension=DIMENSION,
+        index_type="FLAT",
+        similarity_threshold=0.0,
+        snapshot_dir=str(snapshot_dir)
+    )
+    service = EnhancedVectorService(config)
+    service.vector_index = service._create_index()
+    return service
+
+
+def make_doc(doc_id: str, seed: int, document_type: str = "medical_protocol") -> VectorDocument:
+    vector = np.random.default_rng(seed).random(DIMENSION, dtype=np.float32)
+    return VectorDocument(
+        doc_id=doc_id,
+        content=f"Protocolo {doc_id}",
+        metadata={"title": doc_id},
+        vector=vector,
+        document_type=document_type
+    )
+
+
+class TestVectorSnapshots:
+    """Tests de snapshot + WAL del servicio vectorial"""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_round_trip(self, tmp_path):
+        service = make_service(tmp_path)
+        docs = [make_doc(f"doc-{i}", i) for i in range(10)]
+        service._add_many_to_index(docs)
+
+        manifest = await service.save_snapshot()
+        assert manifest["count"] == 10
+
+        restored = make_service(tmp_path)
+        assert restored._load_snapshot()
+        assert restored.base_index.ntotal == 10
+        assert len(restored.document_store) == 0
+
+        results = await restored._vector_search(docs[3].vector, k=1)
+        assert results[0].doc_id == "doc-3"
+        assert results[0].content == "Protocolo doc-3"
+        assert results[0].metadata == {"title": "doc-3"}
+
+    @pytest.mark.asyncio
+    async def test_wal_replayed_after_snapshot(self, tmp_path):
+        service = make_service(tmp_path)
+        service._add_many_to_index([make_doc("base", 1)])
+        await service.save_snapshot()
+
+        late_doc = make_doc("late", 2, document_type="clinical_guideline")
+        service._add_to_index(late_doc)
+        service._append_to_wal(late_doc)
+        service.snapshot_store.close()
+
+        restored = make_service(tmp_path)
+        assert restored._load_snapshot()
+        stats = await restored.get_stats()
+        assert stats["indexed_documents"] == 2
+        assert stats["snapshot"]["delta_documents"] == 1
+
+        results = await restored._vector_search(late_doc.vector, k=2)
+        assert results[0].doc_id == "late"
+        assert results[0].document_type == "clinical_guideline"
+
+    @pytest.mark.asyncio
+    async def test_reindexed_document_shadows_snapshot_copy(self, tmp_path):
+        service = make_service(tmp_path)
+        service._add_many_to_index([make_doc("doc", 1)])
+        await service.save_snapshot()
+
+        updated = make_doc("doc", 1)
+        updated.content = "Protocolo actualizado"
+        service._add_to_index(updated)
+
+        results = await service._vector_search(updated.vector, k=5)
+        assert [r.doc_id for r in results] == ["doc"]
+        assert results[0].content == "Protocolo actualizado"
+
+        manifest = await service.save_snapshot()
+        assert manifest["count"] == 1
+
+    def test_snapshot_ignored_when_dimension_differs(self, tmp_path):
+        service = make_service(tmp_path)
+        service._add_many_to_index([make_doc("doc", 1)])
+        service._write_snapshot()
+
+        assert service.snapshot_store.load(DIMENSION * 2) is None
+
+
+class TestSnapshotGenerations:
+    """Tests de publicación de generaciones entre varios workers"""
+
+    @pytest.mark.asyncio
+    async def test_previous_generation_kept_during_grace_period(self, tmp_path):
+        service = make_service(tmp_path)
+        service._add_many_to_index([make_doc("doc", 1)])
+        await service.save_snapshot()
+        await service.save_snapshot()
+
+        store = service.snapshot_store
+        assert store._path("index", 1).exists()
+        assert store.read_manifest()["retired"][-1]["generation"] == 1
+
+        store.retired_grace_seconds = 0
+        await service.save_snapshot()
+        assert not store._path("index", 1).exists()
+        assert not store._path("index", 2).exists()
+        assert store._path("index", 3).exists()
+
+    @pytest.mark.asyncio
+    async def test_stale_worker_appends_follow_published_generation(self, tmp_path):
+        writer = make_service(tmp_path)
+        writer._add_many_to_index([make_doc("base", 1)])
+        await writer.save_snapshot()
+
+        stale = make_service(tmp_path)
+        assert stale._load_snapshot()
+        before = make_doc("before", 2)
+        stale._add_to_index(before)
+        stale._append_to_wal(before)
+
+        await writer.save_snapshot()
+
+        after = make_doc("after", 3)
+        stale._add_to_index(after)
+        stale._append_to_wal(after)
+        assert stale.snapshot_store.generation == 2
+        stale.snapshot_store.close()
+
+        restored = make_service(tmp_path)
+        assert restored._load_snapshot()
+        stats = await restored.get_stats()
+        assert stats["indexed_documents"] == 3
+        assert stats["snapshot"]["delta_documents"] == 2
+
+    @pytest.mark.asyncio
+    async def test_first_boot_writers_get_distinct_generations(self, tmp_path):
+        first = make_service(tmp_path)
+        second = make_service(tmp_path)
+        first._add_many_to_index([make_doc("a", 1)])
+        second._add_many_to_index([make_doc("b", 2)])
+
+        early = make_doc("early", 3)
+        second._add_to_index(early)
+        second._append_to_wal(early)
+
+        manifests = [first._write_snapshot(), second._write_snapshot()]
+
+        assert [m["generation"] for m in manifests] == [1, 2]
+        restored = make_service(tmp_path)
+        assert restored._load_snapshot()
+        assert restored.base_index.ntotal == 2
@@ -0,0 +1,109 @@
+"""
+Test Audit Event Search
+=======================
+
+Tests para el planificador de búsqueda de eventos de auditoría
+(índices por igualdad + línea de tiempo por día, sin KEYS).
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import datetime, timezone, timedelta
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from vigia_detect.utils.audit_service import (
+    AuditService,
+    AuditEventType,
+    ComplianceStandard
+)
+
+
+@pytest_asyncio.fixture
+async def audit_service():
+    service = AuditService()
+    service.redis_client = fakeredis.FakeAsyncRedis()
+    yield service
+    await service.close()
+
+
+async def log(service, event_type, component="cv_pipeline", session_id=None):
+    return await service.log_event(
+        event_type=event_type,
+        component=component,
+        action="test_action",
+        session_id=session_id
+    )
+
+
+class TestAuditEventSearch:
+    """Tests de búsqueda indexada de eventos"""
+
+    @pytest.mark.asyncio
+    async def test_search_never_uses_keys(self, audit_service):
+        for _ in range(3):
+            await log(audit_service, AuditEventType.IMAGE_PROCESSED)
+
+        async def forbidden_keys(*args, **kwargs):
+            raise AssertionError("KEYS must not be used")
+        audit_service.redis_client.keys = forbidden_keys
+
+        events = await audit_service.search_events({}, limit=10)
+
+        assert len(events) == 3
+
+    @pytest.mark.asyncio
+    async def test_search_intersects_indices_newest_first(self, audit_service):
+        await log(audit_service, AuditEventType.IMAGE_PROCESSED, component="cv_pipeline")
+        await log(audit_service, AuditEventType.DATA_ACCESS, component="cv_pipeline")
+        second = await log(audit_service, AuditEventType.IMAGE_PROCESSED, component="cv_pipeline")
+        await log(audit_service, AuditEventType.IMAGE_PROCESSED, component="triage")
+
+        events = await audit_service.search_events({
+            "event_type": AuditEventType.IMAGE_PROCESSED.value,
+            "component": "cv_pipeline"
+        })
+
+        assert len(events) == 2
+        assert events[0].event_id == second
+        assert all(e.component == "cv_pipeline" for e in events)
+
+    @pytest.mark.asyncio
+    async def test_search_stops_at_limit_and_respects_time_range(self, audit_service):
+        for _ in range(5):
+            await log(audit_service, AuditEventType.DATA_ACCESS, session_id="S1")
+
+        now = datetime.now(timezone.utc)
+        limited = await audit_service.search_events({"session_id": "S1"}, limit=2)
+        empty = await audit_service.search_events({
+            "start_time": now - timedelta(days=3),
+            "end_time": now - timedelta(days=1)
+        })
+
+        assert len(limited) == 2
+        assert limited[0].timestamp >= limited[1].timestamp
+        assert empty == []
+
+    @pytest.mark.asyncio
+    async def test_legacy_day_without_timeline_uses_date_index(self, audit_service):
+        await log(audit_service, AuditEventType.DATA_ACCESS)
+        date_key = datetime.now(timezone.utc).strftime("%Y%m%d")
+        await audit_service.redis_client.delete(f"audit_timeline:{date_key}")
+
+        events = await audit_service.search_events({
+            "start_time": datetime.now(timezone.utc) - timedelta(hours=1),
+            "compliance_standard": ComplianceStandard.GDPR
+        })
+
+        assert [e.event_type for e in events] == [AuditEventType.DATA_ACCESS]
+
+    @pytest.mark.asyncio
+    async def test_legacy_day_found_without_start_time(self, audit_service):
+        await log(audit_service, AuditEventType.DATA_ACCESS)
+        date_key = datetime.now(timezone.utc).strftime("%Y%m%d")
+        await audit_service.redis_client.delete(f"audit_timeline:{date_key}", "audit_index:days")
+
+        events = await audit_service.search_events({"event_type": AuditEventType.DATA_ACCESS.value})
+
+        assert [e.event_type for e in events] == [AuditEventType.DATA_ACCESS]
+        assert await audit_service.redis_client.zscore("audit_index:days", date_key) == int(date_key)
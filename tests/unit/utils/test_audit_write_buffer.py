@@ -0,0 +1,116 @@
+"""
+Test Audit Write Buffer
+=======================
+
+Tests para las escrituras de auditoría agrupadas en pipelines.
+"""
+
+import asyncio
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from vigia_detect.utils.audit_service import (
+    AuditService,
+    AuditEventType,
+    close_audit_services,
+    flush_audit_services_sync
+)
+
+
+def make_service(**kwargs):
+    service = AuditService(**kwargs)
+    service.redis_client = fakeredis.FakeAsyncRedis()
+    return service
+
+
+async def log(service, event_type, session_id="S1"):
+    return await service.log_event(
+        event_type=event_type,
+        component="cv_pipeline",
+        action="test_action",
+        session_id=session_id
+    )
+
+
+class TestAuditWriteBuffer:
+    """Tests del buffer de escritura"""
+
+    @pytest.mark.asyncio
+    async def test_events_coalesced_into_one_timed_flush(self):
+        service = make_service(write_flush_interval=0.02)
+
+        event_ids = [await log(service, AuditEventType.IMAGE_PROCESSED) for _ in range(5)]
+        assert not await service.redis_client.exists(f"audit_event:{event_ids[0]}")
+
+        await asyncio.sleep(0.1)
+
+        assert all([await service.redis_client.exists(f"audit_event:{i}") for i in event_ids])
+        assert service.write_stats["flushes"] == 1
+        assert service.write_stats["events_flushed"] == 5
+        await service.close()
+
+    @pytest.mark.asyncio
+    async def test_critical_event_durable_before_return_and_ordered(self):
+        service = make_service(write_flush_interval=60)
+
+        first = await log(service, AuditEventType.DATA_ACCESS)
+        critical = await log(service, AuditEventType.SECURITY_BREACH)
+
+        trail = await service.redis_client.lrange("audit_trail:S1", 0, -1)
+        assert [i.decode() for i in trail] == [critical, first]
+        assert await service.redis_client.exists(f"audit_alert:ALERT_{critical}")
+        assert service.write_stats["durable_flushes"] == 1
+        await service.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_size_triggers_flush(self):
+        service = make_service(write_batch_size=3, write_flush_interval=60)
+
+        for _ in range(3):
+            await log(service, AuditEventType.IMAGE_PROCESSED)
+        await asyncio.sleep(0.01)
+
+        assert service.write_stats["events_flushed"] == 3
+        await service.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_counts_events_and_search_flushes_first(self):
+        service = make_service(write_flush_interval=60)
+        await log(service, AuditEventType.IMAGE_PROCESSED)
+
+        events = await service.search_events({})
+        assert len(events) == 1
+
+        service.redis_client = None
+        assert await log(service, AuditEventType.SECURITY_BREACH) == "fallback_event"
+        assert service.write_stats["failed_events"] == 1
+        await service.close()
+
+
+class TestAuditShutdown:
+    """Tests del flush de eventos pendientes al apagar"""
+
+    @pytest.mark.asyncio
+    async def test_close_audit_services_flushes_every_instance(self):
+        services = [make_service(write_flush_interval=60) for _ in range(2)]
+        event_ids = [await log(service, AuditEventType.IMAGE_PROCESSED) for service in services]
+
+        await close_audit_services()
+
+        for service, event_id in zip(services, event_ids):
+            assert await service.redis_client.exists(f"audit_event:{event_id}")
+            assert service._flusher_task is None
+
+    def test_sync_flush_writes_events_left_on_a_stopped_loop(self):
+        service = make_service(write_flush_interval=60)
+        loop = asyncio.new_event_loop()
+        try:
+            event_id = loop.run_until_complete(log(service, AuditEventType.IMAGE_PROCESSED))
+
+            flush_audit_services_sync()
+
+            assert service._write_buffer == []
+            assert loop.run_until_complete(service.redis_client.exists(f"audit_event:{event_id}"))
+        finally:
+            loop.close()
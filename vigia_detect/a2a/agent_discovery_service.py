@@ -679,6 +679,9 @@ class AgentDiscoveryService:
         if self.zk_client:
             self.zk_client.stop()
         
+        # Persist buffered audit events
+        await self.audit_service.close()
+        
         logger.info("Agent Discovery Service shutdown complete")
 
 
@@ -762,6 +762,9 @@ class FaultToleranceManager:
         for task in self.background_tasks:
             task.cancel()
         
+        # Persist buffered audit events
+        await self.audit_service.close()
+        
         logger.info("Fault Tolerance Manager shutdown complete")
 
 
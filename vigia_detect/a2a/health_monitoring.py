@@ -722,6 +722,9 @@ class AgentHealthMonitor:
         for task in self.background_tasks:
             task.cancel()
         
+        # Persist buffered audit events
+        await self.audit_service.close()
+        
         logger.info("Agent Health Monitor shutdown complete")
 
 
@@ -0,0 +1,237 @@
+"""
+A2A HTTP Connection Pool - Shared aiohttp Sessions
+==================================================
+
+Pool de conexiones HTTP por proceso para todos los emisores A2A
+(protocol layer, load balancer), en lugar de crear una
+`aiohttp.ClientSession` (y una conexión TCP/TLS nueva) por mensaje.
+
+Features:
+- Keep-alive connection reuse
+- Per-host and global connection limits
+- DNS cache
+- Configurable timeouts
+- Pool saturation and connection reuse metrics
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from ..utils.metrics import Histogram
+from ..utils.secure_logger import SecureLogger
+
+logger = SecureLogger("a2a_http_pool")
+
+
+@dataclass
+class HTTPPoolConfig:
+    """Configuration for the shared A2A connection pool"""
+    limit: int = 100  # Total simultaneous connections
+    limit_per_host: int = 20  # Simultaneous connections per agent endpoint
+    keepalive_timeout: float = 30.0  # Idle keep-alive lifetime (seconds)
+    dns_cache_ttl: int = 300  # DNS cache lifetime (seconds)
+    total_timeout: float = 30.0
+    connect_timeout: float = 5.0
+    sock_read_timeout: float = 25.0
+
+
+class A2AConnectionPool:
+    """
+    Shared aiohttp session with a pooled TCP connector.
+
+    The session is created lazily on first use and re-created if it was
+    closed or belongs to a different event loop, so closing the pool on
+    one component's shutdown never breaks other senders in the process.
+    A session replaced because the loop changed is closed on its own loop
+    if that loop is still open; if the loop was already closed, the
+    session's connector is detached and closed.
+    """
+
+    def __init__(self, config: Optional[HTTPPoolConfig] = None):
+        self.config = config or HTTPPoolConfig()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics (updated from aiohttp trace hooks)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.stats = {
+            "requests": 0,
+            "request_errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "queued_for_connection": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+            "sessions_created": 0
+        }
+        self.connection_wait_ms = Histogram(
+            "a2a_connection_wait_ms", buckets=(0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared session, creating it on the running loop if needed"""
+        loop = asyncio.get_running_loop()
+
+        session = self._session
+        if session is None or session.closed or self._session_loop is not loop:
+            stale, stale_loop = session, self._session_loop
+            session = self._session = self._create_session()
+            self._session_loop = loop
+            self.stats["sessions_created"] += 1
+            await self._discard_session(stale, stale_loop)
+
+        return session
+
+    async def _discard_session(self, session: Optional[aiohttp.ClientSession],
+                               loop: Optional[asyncio.AbstractEventLoop]):
+        """Release a session that belongs to another event loop"""
+        if session is None or session.closed:
+            return
+
+        if loop is not None and loop.is_running():
+            # Loop still serving another thread: close the session there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+
+        if loop is not None and not loop.is_closed():
+            # Stopped loop: run the close on it from a worker thread
+            await asyncio.to_thread(loop.run_until_complete, session.close())
+        else:
+            # Closed loop: its transports went with it, so closing the detached
+            # connector has nothing to wait for and only marks it closed
+            connector = session.connector
+            session.detach()
+            if connector is not None:
+                await connector.close()
+        logger.info("A2A HTTP session from a previous event loop discarded")
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Create session with pooled connector and metric hooks"""
+        connector = aiohttp.TCPConnector(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            keepalive_timeout=self.config.keepalive_timeout,
+            ttl_dns_cache=self.config.dns_cache_ttl,
+            use_dns_cache=True
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.config.total_timeout,
+            connect=self.config.connect_timeout,
+            sock_read=self.config.sock_read_timeout
+        )
+
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[self._create_trace_config()]
+        )
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        """Trace hooks that feed the pool metrics"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.stats["requests"] += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        async def on_request_end(session, context, params):
+            self.in_flight -= 1
+
+        async def on_request_exception(session, context, params):
+            self.in_flight -= 1
+            self.stats["request_errors"] += 1
+
+        async def on_connection_queued_start(session, context, params):
+            self.stats["queued_for_connection"] += 1
+            context.queued_at = time.perf_counter()
+
+        async def on_connection_queued_end(session, context, params):
+            queued_at = getattr(context, "queued_at", None)
+            if queued_at is not None:
+                self.connection_wait_ms.observe((time.perf_counter() - queued_at) * 1000)
+
+        async def on_connection_create_end(session, context, params):
+            self.stats["connections_created"] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats["connections_reused"] += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.stats["dns_cache_hits"] += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.stats["dns_cache_misses"] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+
+        return trace_config
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics including saturation and connection reuse ratio"""
+        connections = self.stats["connections_created"] + self.stats["connections_reused"]
+
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "limit": self.config.limit,
+            "limit_per_host": self.config.limit_per_host,
+            "saturation": self.in_flight / self.config.limit if self.config.limit else 0.0,
+            "peak_saturation": self.peak_in_flight / self.config.limit if self.config.limit else 0.0,
+            "connection_reuse_ratio": self.stats["connections_reused"] / connections if connections else 0.0,
+            "connection_wait_ms": self.connection_wait_ms.snapshot(),
+            "session_open": self._session is not None and not self._session.closed
+        }
+
+    async def close(self):
+        """Close the shared session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("A2A HTTP connection pool closed")
+        self._session = None
+        self._session_loop = None
+
+
+# Per-process pool
+_connection_pool: Optional[A2AConnectionPool] = None
+
+
+def get_connection_pool(config: Optional[HTTPPoolConfig] = None) -> A2AConnectionPool:
+    """
+    Get the process-wide A2A connection pool.
+
+    Args:
+        config: Pool configuration, only applied when the pool is first created
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = A2AConnectionPool(config)
+    return _connection_pool
+
+
+async def close_connection_pool():
+    """Close the process-wide pool's connections (re-opened lazily on next use)"""
+    if _connection_pool is not None:
+        await _connection_pool.close()
+
+
+__all__ = [
+    'A2AConnectionPool',
+    'HTTPPoolConfig',
+    'get_connection_pool',
+    'close_connection_pool'
+]
@@ -29,6 +29,7 @@ import aiohttp
 from aiohttp import web
 
 from .protocol_layer import A2AMessage, MessagePriority, AuthLevel
+from .http_pool import get_connection_pool, close_connection_pool
 from .agent_discovery_service import (
     AgentDiscoveryService, AgentRegistration, ServiceQuery, AgentType, AgentStatus
 )
@@ -467,13 +468,13 @@ class MedicalLoadBalancer:
         timeout = aiohttp.ClientTimeout(total=context.timeout)
         
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(url, json=message.to_dict()) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result
-                    else:
-                        raise Exception(f"Agent responded with status {response.status}")
+            session = await get_connection_pool().get_session()
+            async with session.post(url, json=message.to_dict(), timeout=timeout) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result
+                else:
+                    raise Exception(f"Agent responded with status {response.status}")
         
         except asyncio.TimeoutError:
             raise Exception(f"Request to agent {agent.agent_id} timed out")
@@ -631,7 +632,8 @@ class MedicalLoadBalancer:
             "queue_sizes": {
                 priority.value: queue.qsize()
                 for priority, queue in self.request_queues.items()
-            }
+            },
+            "connection_pool": get_connection_pool().get_stats()
         }
     
     async def health_check(self) -> Dict[str, Any]:
@@ -664,6 +666,12 @@ class MedicalLoadBalancer:
         for task in self.background_tasks:
             task.cancel()
         
+        # Close pooled agent connections
+        await close_connection_pool()
+        
+        # Persist buffered audit events
+        await self.audit_service.close()
+        
         logger.info("Medical Load Balancer shutdown complete")
 
 
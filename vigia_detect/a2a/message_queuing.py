@@ -30,12 +30,21 @@ import pickle
 import gzip
 
 from .protocol_layer import A2AMessage, MessagePriority, AuthLevel
+from .queue_structures import PriorityMessageHeap, TimerWheel
 from .agent_discovery_service import AgentDiscoveryService, AgentType
 from ..utils.secure_logger import SecureLogger
 from ..utils.audit_service import AuditService, AuditEventType
 
 logger = SecureLogger("a2a_message_queuing")
 
+# Priority rank used by PRIORITY queues (lower is served first)
+PRIORITY_RANKS = {
+    MessagePriority.CRITICAL: 0,
+    MessagePriority.HIGH: 1,
+    MessagePriority.NORMAL: 2,
+    MessagePriority.LOW: 3
+}
+
 
 class QueueType(Enum):
     """Types of message queues"""
@@ -141,8 +150,10 @@ class MessageQueue:
         self.max_size = max_size
         self.enable_persistence = enable_persistence
         
-        # Queue storage
-        self.messages: deque = deque()
+        # Queue storage: ready messages in a heap keyed on
+        # (priority, scheduled_at, sequence), future ones in a timer wheel
+        self.ready_messages: PriorityMessageHeap[QueuedMessage] = PriorityMessageHeap()
+        self.delayed_messages: TimerWheel[QueuedMessage] = TimerWheel(resolution=0.1)
         self.processing_messages: Dict[str, QueuedMessage] = {}
         self.message_index: Dict[str, QueuedMessage] = {}
         
@@ -158,7 +169,7 @@ class MessageQueue:
     
     async def enqueue(self, queued_message: QueuedMessage) -> bool:
         """Add message to queue"""
-        if len(self.messages) >= self.max_size:
+        if self.get_pending_count() >= self.max_size:
             logger.warning(f"Queue {self.queue_name} is full, rejecting message")
             return False
         
@@ -170,10 +181,7 @@ class MessageQueue:
             queued_message.acknowledgment_required = False  # Batch doesn't need acks
         
         # Add to queue
-        if self.queue_type == QueueType.PRIORITY:
-            self._enqueue_by_priority(queued_message)
-        else:
-            self.messages.append(queued_message)
+        self._push(queued_message)
         
         # Index the message
         self.message_index[queued_message.message_id] = queued_message
@@ -191,58 +199,47 @@ class MessageQueue:
         logger.debug(f"Message {queued_message.message_id} enqueued to {self.queue_name}")
         return True
     
-    def _enqueue_by_priority(self, queued_message: QueuedMessage):
-        """Enqueue message by priority (higher priority first)"""
-        priority_order = {
-            MessagePriority.CRITICAL: 0,
-            MessagePriority.HIGH: 1,
-            MessagePriority.NORMAL: 2,
-            MessagePriority.LOW: 3
-        }
-        
-        message_priority = priority_order.get(queued_message.message.priority, 2)
-        
-        # Find insertion point
-        insertion_index = 0
-        for i, existing_msg in enumerate(self.messages):
-            existing_priority = priority_order.get(existing_msg.message.priority, 2)
-            if message_priority < existing_priority:
-                insertion_index = i
-                break
-            insertion_index = i + 1
+    def _priority_rank(self, queued_message: QueuedMessage) -> int:
+        """Heap rank for a message (only PRIORITY queues order by message priority)"""
+        if self.queue_type != QueueType.PRIORITY:
+            return 0
+        return PRIORITY_RANKS.get(queued_message.message.priority, PRIORITY_RANKS[MessagePriority.NORMAL])
+    
+    def _push(self, queued_message: QueuedMessage):
+        """Place message in the ready heap, or the timer wheel if scheduled for later"""
+        scheduled_ts = queued_message.scheduled_at.timestamp()
         
-        # Insert at calculated position
-        if insertion_index >= len(self.messages):
-            self.messages.append(queued_message)
+        if scheduled_ts > time.time():
+            self.delayed_messages.schedule(queued_message, scheduled_ts)
         else:
-            self.messages.insert(insertion_index, queued_message)
+            self.ready_messages.push(queued_message, self._priority_rank(queued_message), scheduled_ts)
+    
+    def _promote_due_messages(self):
+        """Move messages whose scheduled time has arrived into the ready heap"""
+        for scheduled_ts, queued_message in self.delayed_messages.pop_due(time.time()):
+            self.ready_messages.push(queued_message, self._priority_rank(queued_message), scheduled_ts)
     
     async def dequeue(self, count: int = 1) -> List[QueuedMessage]:
         """Remove and return messages from queue"""
         messages = []
         
-        for _ in range(min(count, len(self.messages))):
-            if self.messages:
-                message = self.messages.popleft()
-                
-                # Check if message is scheduled for future processing
-                if message.scheduled_at > datetime.now(timezone.utc):
-                    # Put back in queue for later
-                    self.messages.appendleft(message)
-                    break
-                
-                # Mark as processing
-                message.status = MessageStatus.PROCESSING
-                message.processing_started_at = datetime.now(timezone.utc)
-                
-                # Move to processing
-                self.processing_messages[message.message_id] = message
-                
-                # Update statistics
-                self.stats.pending_messages -= 1
-                self.stats.processing_messages += 1
-                
-                messages.append(message)
+        self._promote_due_messages()
+        
+        while self.ready_messages and len(messages) < count:
+            message = self.ready_messages.pop()
+            
+            # Mark as processing
+            message.status = MessageStatus.PROCESSING
+            message.processing_started_at = datetime.now(timezone.utc)
+            
+            # Move to processing
+            self.processing_messages[message.message_id] = message
+            
+            # Update statistics
+            self.stats.pending_messages -= 1
+            self.stats.processing_messages += 1
+            
+            messages.append(message)
         
         return messages
     
@@ -296,8 +293,8 @@ class MessageQueue:
                 seconds=message.retry_delay * (2 ** message.retry_count)  # Exponential backoff
             )
             
-            # Put back in queue
-            self.messages.append(message)
+            # Put back in queue (timer wheel until the backoff expires)
+            self._push(message)
             self.stats.processing_messages -= 1
             self.stats.pending_messages += 1
             
@@ -315,7 +312,7 @@ class MessageQueue:
     def get_stats(self) -> QueueStatistics:
         """Get current queue statistics"""
         # Update real-time stats
-        self.stats.pending_messages = len(self.messages)
+        self.stats.pending_messages = self.get_pending_count()
         self.stats.processing_messages = len(self.processing_messages)
         
         # Calculate throughput
@@ -330,7 +327,7 @@ class MessageQueue:
     
     def get_pending_count(self) -> int:
         """Get number of pending messages"""
-        return len(self.messages)
+        return len(self.ready_messages) + len(self.delayed_messages)
     
     def get_processing_count(self) -> int:
         """Get number of processing messages"""
@@ -718,6 +715,9 @@ class A2AMessageQueueManager:
         if self.redis_client:
             await self.redis_client.close()
         
+        # Persist buffered audit events
+        await self.audit_service.close()
+        
         logger.info("A2A Message Queue Manager shutdown complete")
 
 
@@ -34,6 +34,7 @@ from cryptography.fernet import Fernet
 
 from ..utils.secure_logger import SecureLogger
 from ..utils.audit_service import AuditService, AuditEventType
+from .http_pool import get_connection_pool, close_connection_pool
 
 logger = SecureLogger("a2a_protocol_layer")
 
@@ -379,14 +380,14 @@ class A2AProtocolLayer:
         """Send message via HTTP"""
         url = f"http://{target_agent}/a2a/message"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url,
-                json=message.to_dict(),
-                headers={"Authorization": f"Bearer {self.auth_key}"}
-            ) as response:
-                if response.status != 200:
-                    raise Exception(f"HTTP error: {response.status}")
+        session = await get_connection_pool().get_session()
+        async with session.post(
+            url,
+            json=message.to_dict(),
+            headers={"Authorization": f"Bearer {self.auth_key}"}
+        ) as response:
+            if response.status != 200:
+                raise Exception(f"HTTP error: {response.status}")
     
     async def handle_http_message(self, request: web.Request) -> web.Response:
         """Handle incoming HTTP message"""
@@ -503,7 +504,10 @@ class A2AProtocolLayer:
     
     async def handle_stats(self, request: web.Request) -> web.Response:
         """Statistics endpoint"""
-        return web.json_response(self.stats)
+        return web.json_response({
+            **self.stats,
+            "connection_pool": get_connection_pool().get_stats()
+        })
     
     async def handle_batch_messages(self, request: web.Request) -> web.Response:
         """Handle batch message processing"""
@@ -538,6 +542,8 @@ class A2AProtocolLayer:
     async def stop_server(self, runner):
         """Stop A2A protocol server"""
         await runner.cleanup()
+        await close_connection_pool()
+        await self.audit_service.close()
         logger.info("A2A Protocol server stopped")
 
 
@@ -0,0 +1,121 @@
+"""
+A2A Queue Structures - Heap and Timer Wheel for Message Queues
+=============================================================
+
+Estructuras de datos para las colas de mensajes A2A:
+
+- PriorityMessageHeap: heap keyed on (priority, scheduled_at, sequence),
+  O(log n) push/pop with FIFO order within a priority level
+- TimerWheel: bucketed timer for delayed/retry messages, so messages that
+  are not yet due never sit in (or block) the ready heap
+"""
+
+import heapq
+import itertools
+import math
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class PriorityMessageHeap(Generic[T]):
+    """
+    Min-heap of items ordered by (priority rank, scheduled timestamp, sequence).
+
+    Lower rank is served first; the monotonically increasing sequence keeps
+    FIFO order between items with equal rank and timestamp.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, float, int, T]] = []
+        self._sequence = itertools.count()
+
+    def push(self, item: T, rank: int, scheduled_ts: float):
+        """Add item with its priority rank and scheduled timestamp"""
+        heapq.heappush(self._heap, (rank, scheduled_ts, next(self._sequence), item))
+
+    def pop(self) -> T:
+        """Remove and return the highest-priority item"""
+        return heapq.heappop(self._heap)[3]
+
+    def peek(self) -> Optional[T]:
+        """Return the highest-priority item without removing it"""
+        return self._heap[0][3] if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+
+class TimerWheel(Generic[T]):
+    """
+    Bucketed timer for scheduled items.
+
+    Items are hashed into buckets of `resolution` seconds; a heap of bucket
+    ticks keeps bucket order, so scheduling is O(1) for an existing bucket
+    and collecting due items only touches buckets whose tick has started.
+    """
+
+    def __init__(self, resolution: float = 0.1):
+        """
+        Args:
+            resolution: Bucket width in seconds
+        """
+        self.resolution = resolution
+        self._buckets: Dict[int, List[Tuple[float, T]]] = {}
+        self._ticks: List[int] = []
+        self._size = 0
+
+    def schedule(self, item: T, due_ts: float):
+        """Schedule item to become due at `due_ts` (epoch seconds)"""
+        tick = math.floor(due_ts / self.resolution)
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            bucket = self._buckets[tick] = []
+            heapq.heappush(self._ticks, tick)
+        bucket.append((due_ts, item))
+        self._size += 1
+
+    def pop_due(self, now_ts: float) -> List[Tuple[float, T]]:
+        """Remove and return (due_ts, item) pairs that are due at `now_ts`, in due order"""
+        due: List[Tuple[float, T]] = []
+        current_tick = math.floor(now_ts / self.resolution)
+
+        while self._ticks and self._ticks[0] <= current_tick:
+            tick = self._ticks[0]
+            bucket = self._buckets[tick]
+
+            if tick < current_tick:
+                heapq.heappop(self._ticks)
+                del self._buckets[tick]
+                due.extend(bucket)
+            else:
+                # Current bucket: only part of it may be due yet
+                ready = [entry for entry in bucket if entry[0] <= now_ts]
+                if ready:
+                    remaining = [entry for entry in bucket if entry[0] > now_ts]
+                    due.extend(ready)
+                    if remaining:
+                        self._buckets[tick] = remaining
+                    else:
+                        heapq.heappop(self._ticks)
+                        del self._buckets[tick]
+                break
+
+        self._size -= len(due)
+        due.sort(key=lambda entry: entry[0])
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """Earliest due timestamp, if any item is scheduled"""
+        if not self._ticks:
+            return None
+        return min(due_ts for due_ts, _ in self._buckets[self._ticks[0]])
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
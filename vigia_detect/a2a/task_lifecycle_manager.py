@@ -709,6 +709,9 @@ class MedicalTaskLifecycleManager:
         for task_id in list(self.task_events.keys()):
             await self._archive_task_lifecycle(task_id)
         
+        # Persist buffered audit events
+        await self.audit_service.close()
+        
         logger.info("MedicalTaskLifecycleManager shutdown complete")
 
 
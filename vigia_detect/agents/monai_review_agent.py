@@ -21,7 +21,6 @@ Usage:
 import asyncio
 import logging
 import json
-import gzip
 import base64
 import numpy as np
 from datetime import datetime
@@ -31,6 +30,7 @@ from enum import Enum
 
 from vigia_detect.agents.base_agent import BaseAgent, AgentMessage, AgentResponse
 from vigia_detect.db.raw_outputs_client import RawOutputsClient
+from vigia_detect.db.raw_output_codec import decode_raw_array
 from vigia_detect.db.supabase_client import SupabaseClient
 from vigia_detect.utils.audit_service import AuditService
 from vigia_detect.systems.medical_knowledge import MedicalKnowledgeSystem
@@ -405,27 +405,20 @@ class MonaiReviewAgent(BaseAgent):
                 "detection_arrays": None
             }
             
-            # Decompress confidence maps if available
+            # Decompress confidence maps if available (self-describing or legacy gzip blobs)
             if raw_output_data.get("confidence_maps"):
-                confidence_maps_b64 = raw_output_data["confidence_maps"]
-                confidence_maps_compressed = base64.b64decode(confidence_maps_b64)
-                confidence_maps_bytes = gzip.decompress(confidence_maps_compressed)
+                confidence_maps_compressed = base64.b64decode(raw_output_data["confidence_maps"])
                 
-                # Reconstruct numpy array from metadata
+                # Legacy blobs need shape and dtype from metadata
                 shape = parsed_data["processing_metadata"].get("prediction_shape", (1, 5, 512, 512))
                 dtype = parsed_data["processing_metadata"].get("prediction_dtype", "float32")
                 
-                confidence_maps = np.frombuffer(confidence_maps_bytes, dtype=dtype)
-                parsed_data["confidence_maps"] = confidence_maps.reshape(shape)
+                parsed_data["confidence_maps"] = decode_raw_array(confidence_maps_compressed, dtype=dtype, shape=shape)
             
             # Decompress detection arrays if available  
             if raw_output_data.get("detection_arrays"):
-                detection_arrays_b64 = raw_output_data["detection_arrays"]
-                detection_arrays_compressed = base64.b64decode(detection_arrays_b64)
-                detection_arrays_bytes = gzip.decompress(detection_arrays_compressed)
-                
-                detection_arrays = np.frombuffer(detection_arrays_bytes, dtype="float32")
-                parsed_data["detection_arrays"] = detection_arrays
+                detection_arrays_compressed = base64.b64decode(raw_output_data["detection_arrays"])
+                parsed_data["detection_arrays"] = decode_raw_array(detection_arrays_compressed, dtype="float32")
             
             return parsed_data
             
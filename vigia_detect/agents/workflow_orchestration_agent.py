@@ -988,6 +988,10 @@ class WorkflowOrchestrationAgent(BaseAgent):
             # Limpiar workflows activos
             self.active_workflows.clear()
             
+            # Persistir transiciones de sesión pendientes (write-behind)
+            await self.medical_dispatcher.close()
+            await self.session_manager.close()
+            
             self.is_initialized = False
             
         except Exception as e:
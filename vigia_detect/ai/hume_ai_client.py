@@ -20,7 +20,6 @@ import asyncio
 import json
 import logging
 import os
-import gzip
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
@@ -36,6 +35,7 @@ from pydantic import BaseModel, Field
 from vigia_detect.utils.audit_service import AuditService
 from vigia_detect.db.supabase_client import SupabaseClient
 from vigia_detect.db.raw_outputs_client import RawOutputsClient
+from vigia_detect.db.raw_output_codec import get_raw_output_codec
 
 # Batman tokenization for HIPAA compliance (import will be done dynamically if needed)
 
@@ -566,7 +566,7 @@ class HumeAIClient:
                 ])
                 
                 if prosody_array.size > 0:
-                    raw_vectors = gzip.compress(prosody_array.tobytes())
+                    raw_vectors = get_raw_output_codec().encode(prosody_array)
         except Exception as e:
             logger.warning(f"Failed to extract raw emotion vectors: {e}")
         
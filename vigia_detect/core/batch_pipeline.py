@@ -0,0 +1,137 @@
+"""
+Pipelined batch runner for image processing.
+Overlaps I/O-bound decode/preprocessing and visualization with compute-bound
+detection using three bounded stages, streaming each result as it finishes.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+STAGES = ("prepare", "detect", "finalize")
+
+
+class PipelinedBatchRunner:
+    """
+    Three-stage pipeline: prepare (thread pool) -> detect (single thread) ->
+    finalize (thread pool).
+
+    Detection runs on one dedicated thread, so detector models never see
+    concurrent calls. At most `max_in_flight` items are between stages at
+    any time, which bounds the memory held by preprocessed images.
+    """
+
+    def __init__(self,
+                 prepare_workers: int = 4,
+                 finalize_workers: int = 2,
+                 max_in_flight: int = 8):
+        """
+        Args:
+            prepare_workers: Threads for validation, decode and preprocessing
+            finalize_workers: Threads for enrichment and visualization
+            max_in_flight: Maximum items inside the pipeline at once
+        """
+        if min(prepare_workers, finalize_workers, max_in_flight) < 1:
+            raise ValueError("Pipeline workers and max_in_flight must be >= 1")
+
+        self.prepare_workers = prepare_workers
+        self.finalize_workers = finalize_workers
+        self.max_in_flight = max_in_flight
+
+        self._stats_lock = threading.Lock()
+        self.stage_seconds: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+
+    def run(self,
+            items: List[Any],
+            prepare: Callable[[Any], Any],
+            detect: Callable[[Any], Any],
+            finalize: Callable[[Any], Any],
+            on_error: Callable[[Any, Exception], Any]) -> Iterator[Tuple[int, Any]]:
+        """
+        Run every item through the three stages.
+
+        Args:
+            items: Inputs (e.g. image paths)
+            prepare: item -> state
+            detect: state -> state
+            finalize: state -> result
+            on_error: (item, exception) -> result, used when any stage raises
+
+        Yields:
+            (input index, result) in completion order
+        """
+        items = list(items)
+        if not items:
+            return
+
+        self.stage_seconds = {stage: 0.0 for stage in STAGES}
+        results: "queue.Queue[Tuple[int, Any]]" = queue.Queue()
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        stop = threading.Event()
+
+        prepare_pool = ThreadPoolExecutor(self.prepare_workers, thread_name_prefix="batch-prepare")
+        detect_pool = ThreadPoolExecutor(1, thread_name_prefix="batch-detect")
+        finalize_pool = ThreadPoolExecutor(self.finalize_workers, thread_name_prefix="batch-finalize")
+
+        stage_chain = [
+            ("prepare", prepare, detect_pool),
+            ("detect", detect, finalize_pool),
+            ("finalize", finalize, None)
+        ]
+
+        def finish(index: int, result: Any):
+            results.put((index, result))
+            slots.release()
+
+        def run_stage(index: int, position: int, value: Any):
+            stage, fn, next_pool = stage_chain[position]
+            started = time.perf_counter()
+            try:
+                output = fn(value)
+            except Exception as e:
+                try:
+                    result = on_error(items[index], e)
+                except Exception as handler_error:
+                    # Never lose the slot, or the feeder would block forever
+                    result = handler_error
+                finish(index, result)
+                return
+            finally:
+                with self._stats_lock:
+                    self.stage_seconds[stage] += time.perf_counter() - started
+
+            if next_pool is None:
+                finish(index, output)
+            else:
+                next_pool.submit(run_stage, index, position + 1, output)
+
+        def feed():
+            for index, item in enumerate(items):
+                slots.acquire()
+                if stop.is_set():
+                    slots.release()
+                    return
+                prepare_pool.submit(run_stage, index, 0, item)
+
+        feeder = threading.Thread(target=feed, name="batch-feeder", daemon=True)
+        feeder.start()
+
+        delivered = 0
+        try:
+            while delivered < len(items):
+                yield results.get()
+                delivered += 1
+        finally:
+            # Consumer may stop early: let in-flight items drain, then stop
+            # the pools in stage order so chained submissions still succeed
+            stop.set()
+            feeder.join()
+            prepare_pool.shutdown(wait=True)
+            detect_pool.shutdown(wait=True)
+            finalize_pool.shutdown(wait=True)
+
+    def get_stage_times(self) -> Dict[str, float]:
+        """Busy seconds per stage for the last run"""
+        with self._stats_lock:
+            return {stage: round(seconds, 4) for stage, seconds in self.stage_seconds.items()}
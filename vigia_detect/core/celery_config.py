@@ -11,6 +11,7 @@ from typing import Dict, Any
 
 # Configuration constants
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
+WARM_UP_MODELS = os.getenv('VIGIA_WARM_UP_MODELS', 'true').lower() == 'true'
 
 # Medical task configuration
 MEDICAL_TASK_CONFIG = {
@@ -70,6 +71,7 @@ def configure_task_defaults(task_name: str) -> Dict[str, Any]:
 # Try to import real Celery, fallback to mock
 try:
     from celery import Celery
+    from celery.signals import worker_process_init, worker_process_shutdown
     from kombu import Queue
     
     # Real Celery configuration
@@ -125,6 +127,26 @@ try:
         ),
     )
     
+    @worker_process_init.connect
+    def warm_up_worker_models(**kwargs):
+        """Load detection models once per worker process, in the background"""
+        if not WARM_UP_MODELS:
+            return
+        try:
+            from vigia_detect.cv_pipeline.medical_detector_factory import warm_up_detector_models
+            warm_up_detector_models(background=True)
+        except Exception as e:
+            print(f"⚠️  Model warm-up skipped: {e}")
+    
+    @worker_process_shutdown.connect
+    def flush_worker_audit_events(**kwargs):
+        """Persist audit events still buffered when the worker process exits"""
+        try:
+            from vigia_detect.utils.audit_service import flush_audit_services_sync
+            flush_audit_services_sync()
+        except Exception as e:
+            print(f"⚠️  Audit flush on shutdown failed: {e}")
+    
     print("✅ CELERY INSTALLED: Using production configuration")
     CELERY_AVAILABLE = True
     
@@ -3,17 +3,20 @@ Procesador centralizado de imágenes para el sistema Vigía
 """
 import os
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, Callable, Iterator
 from pathlib import Path
 
 from ..cv_pipeline.detector import LPPDetector
 from ..cv_pipeline.preprocessor import ImagePreprocessor
+from ..cv_pipeline.image_buffer import get_buffer_pool
+from ..cv_pipeline.tiled_inference import TileConfig, TiledDetector, TiledImage
 from ..utils.image_utils import (
     is_valid_image, 
     save_detection_visualization, 
     anonymize_image
 )
 from .constants import LPP_GRADE_DESCRIPTIONS, LPP_GRADE_RECOMMENDATIONS
+from .batch_pipeline import PipelinedBatchRunner
 
 
 class ImageProcessor:
@@ -25,7 +28,8 @@ class ImageProcessor:
     def __init__(self, 
                  model_type: str = 'yolov5s',
                  confidence_threshold: float = 0.25,
-                 anonymize: bool = True):
+                 anonymize: bool = True,
+                 tile_config: Optional[TileConfig] = None):
         """
         Inicializa el procesador de imágenes.
         
@@ -33,6 +37,8 @@ class ImageProcessor:
             model_type: Tipo de modelo YOLO a usar
             confidence_threshold: Umbral de confianza para detecciones
             anonymize: Si se debe anonimizar rostros en las imágenes
+            tile_config: Activa la inferencia por teselas en resolución completa
+                para imágenes grandes (None = redimensionar a 640x640)
         """
         self.logger = logging.getLogger('vigia.image_processor')
         self.anonymize = anonymize
@@ -44,6 +50,10 @@ class ImageProcessor:
         )
         self.preprocessor = ImagePreprocessor()
         
+        # Inferencia por teselas (opcional)
+        self.tile_config = tile_config
+        self.tiled_detector = TiledDetector(self.detector, tile_config) if tile_config else None
+        
         self.logger.info(f"ImageProcessor initialized with model {model_type}")
     
     def process_image(self, 
@@ -64,42 +74,9 @@ class ImageProcessor:
             Dict con resultados del procesamiento
         """
         try:
-            # Validar imagen
-            if not is_valid_image(image_path):
-                return {
-                    "success": False,
-                    "error": "Invalid image file",
-                    "image_path": image_path
-                }
-            
-            # Preprocesar
-            processed_img, metadata = self._preprocess_image(image_path)
-            
-            # Detectar
-            detection_results = self.detector.detect(processed_img)
-            
-            # Enriquecer resultados
-            enriched_results = self._enrich_results(
-                detection_results, 
-                metadata,
-                patient_code
-            )
-            
-            # Guardar visualización si se requiere
-            if save_visualization and output_dir:
-                viz_path = self._save_visualization(
-                    image_path,
-                    enriched_results,
-                    output_dir
-                )
-                enriched_results["visualization_path"] = viz_path
-            
-            return {
-                "success": True,
-                "results": enriched_results,
-                "image_path": image_path,
-                "patient_code": patient_code
-            }
+            state = self._prepare_stage(image_path)
+            state = self._detect_stage(state)
+            return self._finalize_stage(state, patient_code, save_visualization, output_dir)
             
         except Exception as e:
             self.logger.error(f"Error processing image {image_path}: {str(e)}")
@@ -113,31 +90,37 @@ class ImageProcessor:
                      image_paths: list,
                      patient_code: Optional[str] = None,
                      save_visualizations: bool = False,
-                     output_dir: Optional[str] = None) -> list:
+                     output_dir: Optional[str] = None,
+                     on_result: Optional[Callable[[int, Dict], None]] = None) -> list:
         """
         Procesa un lote de imágenes.
         
+        Las imágenes pasan por un pipeline acotado: la lectura y la
+        visualización de unas se solapan con la detección de otras.
+        
         Args:
             image_paths: Lista de rutas a imágenes
             patient_code: Código del paciente
             save_visualizations: Si guardar visualizaciones
             output_dir: Directorio de salida
+            on_result: Callback (índice, resultado) al terminar cada imagen
             
         Returns:
-            Lista de resultados de procesamiento
+            Lista de resultados de procesamiento, en el orden de entrada
         """
-        results = []
+        results = [None] * len(image_paths)
         
-        for idx, image_path in enumerate(image_paths):
-            self.logger.info(f"Processing image {idx + 1}/{len(image_paths)}: {image_path}")
+        for idx, result in self.stream_batch(
+            image_paths,
+            patient_code,
+            save_visualizations,
+            output_dir
+        ):
+            self.logger.info(f"Processed image {idx + 1}/{len(image_paths)}: {image_paths[idx]}")
+            results[idx] = result
             
-            result = self.process_image(
-                image_path,
-                patient_code,
-                save_visualizations,
-                output_dir
-            )
-            results.append(result)
+            if on_result:
+                on_result(idx, result)
         
         # Resumen
         successful = sum(1 for r in results if r.get("success", False))
@@ -145,10 +128,115 @@ class ImageProcessor:
         
         return results
     
+    def stream_batch(self,
+                     image_paths: list,
+                     patient_code: Optional[str] = None,
+                     save_visualizations: bool = False,
+                     output_dir: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        Procesa un lote en pipeline y entrega cada resultado al terminar.
+        
+        La detección corre en un único hilo; validación, preprocesamiento,
+        enriquecimiento y visualización corren en pools de hilos.
+        
+        Yields:
+            (índice en image_paths, resultado) en orden de finalización
+        """
+        def on_error(image_path: str, error: Exception) -> Dict:
+            self.logger.error(f"Error processing image {image_path}: {str(error)}")
+            return {
+                "success": False,
+                "error": str(error),
+                "image_path": image_path
+            }
+        
+        yield from PipelinedBatchRunner().run(
+            image_paths,
+            prepare=self._prepare_stage,
+            detect=self._detect_stage,
+            finalize=lambda state: self._finalize_stage(
+                state,
+                patient_code,
+                save_visualizations,
+                output_dir
+            ),
+            on_error=on_error
+        )
+    
+    def _prepare_stage(self, image_path: str) -> Dict:
+        """Valida y preprocesa la imagen (etapa de E/S)"""
+        state = {"image_path": image_path}
+        
+        # Validar imagen
+        if not is_valid_image(image_path):
+            state["error"] = "Invalid image file"
+            return state
+        
+        # Preprocesar
+        state["processed_img"], state["metadata"] = self._preprocess_image(image_path)
+        return state
+    
+    def _detect_stage(self, state: Dict) -> Dict:
+        """Detecta lesiones (etapa de cómputo)"""
+        if "error" not in state:
+            buffer = state.pop("processed_img")
+            try:
+                if isinstance(buffer, TiledImage):
+                    state["detection_results"] = self.tiled_detector.detect(buffer)
+                else:
+                    state["detection_results"] = self.detector.detect(buffer)
+            finally:
+                # Devolver el array preprocesado al pool para la siguiente imagen
+                buffer.release()
+        return state
+    
+    def _finalize_stage(self,
+                        state: Dict,
+                        patient_code: Optional[str],
+                        save_visualization: bool,
+                        output_dir: Optional[str]) -> Dict:
+        """Enriquece resultados y guarda la visualización (etapa de E/S)"""
+        image_path = state["image_path"]
+        
+        if "error" in state:
+            return {
+                "success": False,
+                "error": state["error"],
+                "image_path": image_path
+            }
+        
+        # Enriquecer resultados
+        enriched_results = self._enrich_results(
+            state["detection_results"], 
+            state["metadata"],
+            patient_code
+        )
+        
+        # Guardar visualización si se requiere
+        if save_visualization and output_dir:
+            viz_path = self._save_visualization(
+                image_path,
+                enriched_results,
+                output_dir
+            )
+            enriched_results["visualization_path"] = viz_path
+        
+        return {
+            "success": True,
+            "results": enriched_results,
+            "image_path": image_path,
+            "patient_code": patient_code
+        }
+    
     def _preprocess_image(self, image_path: str) -> Tuple[Any, Dict]:
         """Preprocesa la imagen y extrae metadata"""
-        # Preprocesar
-        processed_img = self.preprocessor.preprocess(image_path)
+        # Preprocesar hacia buffers del pool que el detector lee directamente
+        if self.tile_config:
+            processed_img = self.preprocessor.preprocess_tiles(image_path, self.tile_config, pool=get_buffer_pool())
+            buffers = processed_img.buffers
+        else:
+            processed_img = self.preprocessor.preprocess_buffer(image_path, pool=get_buffer_pool())
+            buffers = [processed_img]
         
         # Extraer metadata
         metadata = {
@@ -156,10 +244,15 @@ class ImageProcessor:
             "file_size": os.path.getsize(image_path),
             "file_name": os.path.basename(image_path)
         }
+        if self.tile_config:
+            metadata["tiles"] = len(processed_img.tiles)
+        if processed_img.metadata.get("anonymization"):
+            metadata["anonymization"] = processed_img.metadata["anonymization"]
         
         # Anonimizar si es necesario
         if self.anonymize:
-            processed_img = anonymize_image(processed_img)
+            for buffer in buffers:
+                buffer.array = anonymize_image(buffer.array)
         
         return processed_img, metadata
     
@@ -8,6 +8,11 @@ Características:
 - Timeout automático (15 minutos)
 - Encryption at rest
 - No logging de contenido PII
+- Cola de trabajo con Redis Streams: los procesadores reciben items con
+  lectura bloqueante (sin polling), bajo leases con timeout de visibilidad
+  que se reentregan automáticamente si el procesador cae
+- Transiciones de estado atómicas: scripts Lua precargados verifican y
+  actualizan el hash de la sesión en un único round trip
 """
 
 import asyncio
@@ -21,6 +26,7 @@ import hashlib
 import os
 from cryptography.fernet import Fernet
 import redis.asyncio as redis
+from redis.exceptions import ResponseError
 
 from .input_packager import StandardizedInput
 from ..utils.secure_logger import SecureLogger
@@ -50,19 +56,152 @@ class QueueItem:
     processing_node: Optional[str] = None
 
 
+@dataclass
+class WorkLease:
+    """Item entregado a un procesador por la cola de trabajo."""
+    session_id: str
+    message_id: str
+    processor_id: str
+    input: StandardizedInput
+    leased_at: datetime
+    lease_expires_at: datetime
+    deliveries: int = 1
+    redelivered: bool = False
+
+
+# Scripts Lua de transición de estado. Cada uno verifica y actualiza el hash
+# de la sesión de forma atómica en el servidor (un round trip, sin carreras
+# entre procesadores). Las fechas se comparan con expires_at_ts (epoch); los
+# items sin ese campo dependen del TTL del hash para expirar.
+
+# KEYS: hash, sesiones | ARGV: session_id, ahora_ts, ahora_iso, processor_id
+DEQUEUE_SCRIPT = """
+local data = redis.call('HMGET', KEYS[1], 'status', 'expires_at_ts', 'encrypted_payload')
+if not data[1] then
+    return {'missing'}
+end
+if data[2] and tonumber(data[2]) < tonumber(ARGV[2]) then
+    redis.call('HSET', KEYS[1], 'status', 'expired', 'expired_at', ARGV[3])
+    redis.call('SREM', KEYS[2], ARGV[1])
+    return {'expired'}
+end
+if data[1] ~= 'pending' then
+    return {'invalid_status', data[1]}
+end
+redis.call('HSET', KEYS[1], 'status', 'processing', 'last_accessed', ARGV[3], 'processing_node', ARGV[4])
+return {'ok', data[3]}
+"""
+
+# KEYS: hash, sesiones, stream | ARGV: session_id, message_id, processor_id,
+# ahora_ts, ahora_iso, lease_expira_iso, reentregado (0/1), max_entregas, grupo
+LEASE_SCRIPT = """
+local function ack()
+    redis.call('XACK', KEYS[3], ARGV[9], ARGV[2])
+    redis.call('XDEL', KEYS[3], ARGV[2])
+end
+local data = redis.call('HMGET', KEYS[1], 'status', 'expires_at_ts', 'encrypted_payload', 'deliveries')
+local status = data[1]
+if (status ~= 'pending' and status ~= 'processing') or (status == 'processing' and ARGV[7] == '0') then
+    ack()
+    return {'skipped'}
+end
+if data[2] and tonumber(data[2]) < tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[1], 'status', 'expired', 'expired_at', ARGV[5])
+    redis.call('SREM', KEYS[2], ARGV[1])
+    ack()
+    return {'expired'}
+end
+local deliveries = tonumber(data[4] or '0') + 1
+if deliveries > tonumber(ARGV[8]) then
+    redis.call('HSET', KEYS[1], 'status', 'failed', 'failed_at', ARGV[5],
+               'last_error', 'lease_expired_max_deliveries', 'last_failed_at', ARGV[5])
+    redis.call('HDEL', KEYS[1], 'stream_id')
+    redis.call('SREM', KEYS[2], ARGV[1])
+    ack()
+    return {'failed', tostring(deliveries)}
+end
+redis.call('HSET', KEYS[1], 'status', 'processing', 'last_accessed', ARGV[5], 'processing_node', ARGV[3],
+           'stream_id', ARGV[2], 'deliveries', deliveries, 'lease_expires_at', ARGV[6])
+return {'ok', data[3], tostring(deliveries)}
+"""
+
+# KEYS: hash, sesiones, stream | ARGV: session_id, ahora_iso, resumen, ttl, grupo
+COMPLETE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {'missing'}
+end
+redis.call('HSET', KEYS[1], 'status', 'completed', 'completed_at', ARGV[2], 'result_summary', ARGV[3])
+redis.call('SREM', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+local stream_id = redis.call('HGET', KEYS[1], 'stream_id')
+if stream_id then
+    redis.call('XACK', KEYS[3], ARGV[5], stream_id)
+    redis.call('XDEL', KEYS[3], stream_id)
+end
+return {'ok'}
+"""
+
+# KEYS: hash, sesiones, stream | ARGV: session_id, ahora_iso, error,
+# reintentar (0/1), max_reintentos, grupo
+FAIL_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {'missing'}
+end
+local retry_count = tonumber(redis.call('HGET', KEYS[1], 'retry_count') or '0')
+local should_retry = ARGV[4] == '1' and retry_count < tonumber(ARGV[5])
+local status = 'failed'
+if should_retry then
+    status = 'pending'
+    retry_count = retry_count + 1
+else
+    redis.call('HSET', KEYS[1], 'failed_at', ARGV[2])
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+redis.call('HSET', KEYS[1], 'status', status, 'retry_count', retry_count,
+           'last_error', ARGV[3], 'last_failed_at', ARGV[2])
+local stream_id = redis.call('HGET', KEYS[1], 'stream_id')
+if stream_id then
+    redis.call('XACK', KEYS[3], ARGV[6], stream_id)
+    redis.call('XDEL', KEYS[3], stream_id)
+    redis.call('HDEL', KEYS[1], 'stream_id')
+end
+if should_retry then
+    redis.call('XADD', KEYS[3], '*', 'session_id', ARGV[1])
+end
+return {status, tostring(retry_count)}
+"""
+
+# KEYS: hash, sesiones | ARGV: session_id, ahora_iso
+EXPIRE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'expired', 'expired_at', ARGV[2])
+redis.call('SREM', KEYS[2], ARGV[1])
+return 1
+"""
+
+
 class InputQueue:
     """
     Input Queue con encryption y session management.
     Proporciona buffer temporal seguro entre entrada y procesamiento.
     """
     
-    def __init__(self, redis_url: Optional[str] = None, encryption_key: Optional[str] = None):
+    def __init__(self, redis_url: Optional[str] = None, encryption_key: Optional[str] = None,
+                 visibility_timeout: Optional[timedelta] = None,
+                 stream_key: str = "input_queue:stream",
+                 consumer_group: str = "input_queue:workers"):
         """
         Inicializar Input Queue.
         
         Args:
             redis_url: URL de Redis para persistencia
             encryption_key: Clave de encriptación (se genera si no se proporciona)
+            visibility_timeout: Duración del lease de un procesador antes de
+                reentregar el item a otro (env INPUT_QUEUE_VISIBILITY_TIMEOUT, segundos)
+            stream_key: Stream de Redis con las referencias de trabajo
+            consumer_group: Grupo de consumidores de los procesadores
         """
         self.redis_url = redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
         
@@ -82,22 +221,37 @@ class InputQueue:
         self.default_timeout = timedelta(minutes=15)
         self.max_retry_count = 3
         self.cleanup_interval = timedelta(minutes=5)
+        self.visibility_timeout = visibility_timeout or timedelta(
+            seconds=float(os.getenv('INPUT_QUEUE_VISIBILITY_TIMEOUT', '60'))
+        )
+        
+        # Cola de trabajo (Redis Streams): cada entrada referencia el hash
+        # encriptado de la sesión; el payload nunca se duplica en el stream
+        self.stream_key = stream_key
+        self.consumer_group = consumer_group
+        self._group_ready = False
         
         # Redis client será inicializado asincrónicamente
         self.redis_client = None
+        self._scripts = None
+        self._scripts_client = None
         
         logger.audit("input_queue_initialized", {
             "component": "layer1_input_queue",
             "timeout_minutes": 15,
             "max_retries": self.max_retry_count,
+            "visibility_timeout_seconds": self.visibility_timeout.total_seconds(),
             "encryption_enabled": True
         })
     
     async def initialize(self):
         """Inicializar conexión Redis."""
         try:
-            self.redis_client = redis.from_url(self.redis_url)
+            self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
             await self.redis_client.ping()
+            await self._ensure_consumer_group()
+            
+            await self._load_scripts()
             
             logger.audit("input_queue_redis_connected", {
                 "redis_url": self.redis_url.split('@')[-1]  # Log sin credenciales
@@ -152,23 +306,27 @@ class InputQueue:
                 "encrypted_payload": encrypted_payload,
                 "created_at": now.isoformat(),
                 "expires_at": expires_at.isoformat(),
+                "expires_at_ts": expires_at.timestamp(),
                 "status": QueueStatus.PENDING.value,
                 "retry_count": 0
             }
             
-            # Usar pipeline para operaciones atómicas
+            # Usar pipeline para operaciones atómicas; XADD despierta a los
+            # procesadores bloqueados en claim_batch
             pipe = self.redis_client.pipeline()
             await pipe.hset(queue_key, mapping=queue_data)
             await pipe.expire(queue_key, int(self.default_timeout.total_seconds()))
             await pipe.sadd("input_queue:sessions", session_id)
-            await pipe.execute()
+            await pipe.xadd(self.stream_key, {"session_id": session_id})
+            await pipe.xlen(self.stream_key)
+            results = await pipe.execute()
             
             # Log de enqueue exitoso (sin datos PII)
             logger.audit("input_enqueued", {
                 "session_id": session_id,
                 "input_type": standardized_input.input_type,
                 "expires_at": expires_at.isoformat(),
-                "queue_position": await self._get_queue_position(session_id)
+                "queue_position": results[-1]
             })
             
             return {
@@ -194,6 +352,9 @@ class InputQueue:
         """
         Obtener y marcar como procesando un input de la queue.
         
+        La verificación de expiración/estado y el cambio a PROCESSING son
+        atómicos: si dos procesadores piden la misma sesión solo uno la obtiene.
+        
         Args:
             session_id: ID de sesión a procesar
             processor_id: ID del procesador que toma el item
@@ -205,40 +366,32 @@ class InputQueue:
             if not self.redis_client:
                 await self.initialize()
             
-            queue_key = f"input_queue:{session_id}"
-            
-            # Obtener item de Redis
-            queue_data = await self.redis_client.hgetall(queue_key)
-            if not queue_data:
-                return None
+            now = datetime.now(timezone.utc)
+            outcome = await self._get_scripts()["dequeue"](
+                keys=[f"input_queue:{session_id}", "input_queue:sessions"],
+                args=[session_id, now.timestamp(), now.isoformat(), processor_id]
+            )
             
-            # Verificar si no ha expirado
-            expires_at = datetime.fromisoformat(queue_data["expires_at"])
-            if datetime.now(timezone.utc) > expires_at:
-                await self._mark_expired(session_id)
+            if outcome[0] == "expired":
+                logger.audit("input_expired", {
+                    "session_id": session_id,
+                    "expired_at": now.isoformat()
+                })
                 return None
             
-            # Verificar estado
-            current_status = QueueStatus(queue_data["status"])
-            if current_status != QueueStatus.PENDING:
+            if outcome[0] == "invalid_status":
                 logger.warning("dequeue_invalid_status", {
                     "session_id": session_id,
-                    "current_status": current_status.value,
+                    "current_status": outcome[1],
                     "processor_id": processor_id
                 })
                 return None
             
-            # Marcar como procesando
-            now = datetime.now(timezone.utc)
-            await self.redis_client.hset(queue_key, mapping={
-                "status": QueueStatus.PROCESSING.value,
-                "last_accessed": now.isoformat(),
-                "processing_node": processor_id
-            })
+            if outcome[0] != "ok":
+                return None
             
             # Decriptar payload
-            encrypted_payload = queue_data["encrypted_payload"]
-            decrypted_json = self._decrypt_payload(encrypted_payload)
+            decrypted_json = self._decrypt_payload(outcome[1])
             
             # Reconstruir StandardizedInput
             payload_dict = json.loads(decrypted_json)
@@ -273,25 +426,27 @@ class InputQueue:
             True si marcado exitosamente
         """
         try:
-            queue_key = f"input_queue:{session_id}"
             now = datetime.now(timezone.utc)
             
-            # Actualizar estado
-            await self.redis_client.hset(queue_key, mapping={
-                "status": QueueStatus.COMPLETED.value,
-                "completed_at": now.isoformat(),
-                "result_summary": json.dumps({
-                    "success": result.get("success", False),
-                    "processing_time": result.get("processing_time", 0),
-                    "next_stage": result.get("next_stage", "unknown")
-                })
-            })
-            
-            # Remover de sessions activas
-            await self.redis_client.srem("input_queue:sessions", session_id)
-            
-            # Programar cleanup en 1 hora
-            await self.redis_client.expire(queue_key, 3600)
+            # Actualizar estado, remover de sessions activas, programar cleanup
+            # en 1 hora y confirmar la entrada del stream en un solo script
+            outcome = await self._get_scripts()["complete"](
+                keys=[f"input_queue:{session_id}", "input_queue:sessions", self.stream_key],
+                args=[
+                    session_id,
+                    now.isoformat(),
+                    json.dumps({
+                        "success": result.get("success", False),
+                        "processing_time": result.get("processing_time", 0),
+                        "next_stage": result.get("next_stage", "unknown")
+                    }),
+                    3600,
+                    self.consumer_group
+                ]
+            )
+            if outcome[0] != "ok":
+                logger.warning("mark_completed_missing_session", {"session_id": session_id})
+                return False
             
             logger.audit("input_completed", {
                 "session_id": session_id,
@@ -312,6 +467,9 @@ class InputQueue:
         """
         Marcar procesamiento como fallido.
         
+        Con retry (y reintentos disponibles) el item vuelve a PENDING y se
+        reencola en el stream dentro del mismo script.
+        
         Args:
             session_id: ID de sesión fallida
             error: Descripción del error
@@ -321,39 +479,23 @@ class InputQueue:
             True si marcado exitosamente
         """
         try:
-            queue_key = f"input_queue:{session_id}"
             now = datetime.now(timezone.utc)
             
-            # Obtener estado actual
-            queue_data = await self.redis_client.hgetall(queue_key)
-            retry_count = int(queue_data.get("retry_count", 0))
-            
-            # Decidir si hacer retry
-            should_retry = retry and retry_count < self.max_retry_count
-            new_status = QueueStatus.PENDING if should_retry else QueueStatus.FAILED
-            new_retry_count = retry_count + 1 if should_retry else retry_count
-            
-            # Actualizar estado
-            update_data = {
-                "status": new_status.value,
-                "retry_count": new_retry_count,
-                "last_error": error,
-                "last_failed_at": now.isoformat()
-            }
-            
-            if not should_retry:
-                update_data["failed_at"] = now.isoformat()
-                # Remover de sessions activas
-                await self.redis_client.srem("input_queue:sessions", session_id)
-            
-            await self.redis_client.hset(queue_key, mapping=update_data)
+            outcome = await self._get_scripts()["fail"](
+                keys=[f"input_queue:{session_id}", "input_queue:sessions", self.stream_key],
+                args=[session_id, now.isoformat(), error, int(retry), self.max_retry_count, self.consumer_group]
+            )
+            if outcome[0] == "missing":
+                logger.warning("mark_failed_missing_session", {"session_id": session_id})
+                return False
             
+            new_status, new_retry_count = outcome[0], int(outcome[1])
             logger.audit("input_failed", {
                 "session_id": session_id,
                 "error": error,
                 "retry_count": new_retry_count,
-                "will_retry": should_retry,
-                "final_status": new_status.value
+                "will_retry": new_status == QueueStatus.PENDING.value,
+                "final_status": new_status
             })
             
             return True
@@ -408,6 +550,232 @@ class InputQueue:
             logger.error("list_pending_sessions_failed", {"error": str(e)})
             return []
     
+    async def claim_batch(self, processor_id: str, count: int = 1,
+                          block_ms: Optional[int] = 5000) -> List[WorkLease]:
+        """
+        Tomar hasta count items de la cola de trabajo bajo lease.
+        
+        Primero se reasignan los items cuyo lease expiró (procesador caído);
+        luego se leen items nuevos, bloqueando hasta block_ms si no hay
+        ninguno. Cada item debe cerrarse con mark_completed/mark_failed (o
+        complete/fail) antes de que expire el lease, o extend_lease.
+        
+        Args:
+            processor_id: ID del procesador (consumidor del grupo)
+            count: Máximo de items a tomar
+            block_ms: Espera máxima por items nuevos (None = no bloquear)
+            
+        Returns:
+            Lista de WorkLease (vacía si no hubo trabajo)
+        """
+        try:
+            if not self.redis_client:
+                await self.initialize()
+            await self._ensure_consumer_group()
+            
+            entries = [(message_id, fields, True)
+                       for message_id, fields in await self._reclaim_expired(processor_id, count)]
+            
+            if len(entries) < count:
+                response = await self.redis_client.xreadgroup(
+                    self.consumer_group, processor_id, {self.stream_key: ">"},
+                    count=count - len(entries),
+                    block=None if entries else block_ms
+                )
+                for _, stream_entries in response or []:
+                    entries.extend((message_id, fields, False) for message_id, fields in stream_entries)
+            
+            leases = []
+            for message_id, fields, redelivered in entries:
+                lease = await self._lease_entry(message_id, fields, processor_id, redelivered)
+                if lease:
+                    leases.append(lease)
+            return leases
+            
+        except ResponseError as e:
+            if "NOGROUP" in str(e):
+                # El stream fue eliminado: recrear grupo en la próxima llamada
+                self._group_ready = False
+            logger.error("claim_batch_failed", {"processor_id": processor_id, "error": str(e)})
+            return []
+        except Exception as e:
+            logger.error("claim_batch_failed", {"processor_id": processor_id, "error": str(e)})
+            return []
+    
+    async def fetch_next(self, processor_id: str, block_ms: Optional[int] = 5000) -> Optional[WorkLease]:
+        """
+        Tomar el próximo item de la cola de trabajo, bloqueando hasta block_ms.
+        
+        Args:
+            processor_id: ID del procesador
+            block_ms: Espera máxima (None = no bloquear)
+            
+        Returns:
+            WorkLease o None si no llegó trabajo
+        """
+        leases = await self.claim_batch(processor_id, count=1, block_ms=block_ms)
+        return leases[0] if leases else None
+    
+    async def extend_lease(self, lease: WorkLease) -> bool:
+        """
+        Renovar el lease de un item en proceso (heartbeat).
+        
+        Returns:
+            False si el lease ya se perdió (item reasignado o cerrado)
+        """
+        try:
+            # Verificar propiedad antes de XCLAIM, que transfiere la entrada
+            owner = await self.redis_client.hmget(
+                f"input_queue:{lease.session_id}", "stream_id", "processing_node"
+            )
+            if owner != [lease.message_id, lease.processor_id]:
+                return False
+            
+            claimed = await self.redis_client.xclaim(
+                self.stream_key, self.consumer_group, lease.processor_id,
+                min_idle_time=0, message_ids=[lease.message_id], justid=True
+            )
+            if not claimed:
+                return False
+            
+            lease.lease_expires_at = datetime.now(timezone.utc) + self.visibility_timeout
+            await self.redis_client.hset(f"input_queue:{lease.session_id}",
+                                         "lease_expires_at", lease.lease_expires_at.isoformat())
+            return True
+            
+        except Exception as e:
+            logger.error("extend_lease_failed", {"session_id": lease.session_id, "error": str(e)})
+            return False
+    
+    async def complete(self, lease: WorkLease, result: Dict[str, Any]) -> bool:
+        """Cerrar un lease como completado."""
+        return await self.mark_completed(lease.session_id, result)
+    
+    async def fail(self, lease: WorkLease, error: str, retry: bool = True) -> bool:
+        """Cerrar un lease como fallido (reencolando si quedan reintentos)."""
+        return await self.mark_failed(lease.session_id, error, retry)
+    
+    async def get_work_queue_stats(self) -> Dict[str, Any]:
+        """Longitud del stream, items sin entregar y leases en curso."""
+        try:
+            await self._ensure_consumer_group()
+            pending = await self.redis_client.xpending(self.stream_key, self.consumer_group)
+            in_flight = pending["pending"] if isinstance(pending, dict) else pending[0]
+            length = await self.redis_client.xlen(self.stream_key)
+            return {
+                "stream_length": length,
+                "in_flight": in_flight,
+                "waiting": max(0, length - in_flight),
+                "visibility_timeout_seconds": self.visibility_timeout.total_seconds()
+            }
+        except Exception as e:
+            logger.error("get_work_queue_stats_failed", {"error": str(e)})
+            return {}
+    
+    async def _ensure_consumer_group(self):
+        """Crear el stream y el grupo de procesadores si no existen."""
+        if self._group_ready:
+            return
+        try:
+            await self.redis_client.xgroup_create(self.stream_key, self.consumer_group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+    
+    async def _reclaim_expired(self, processor_id: str, count: int) -> List:
+        """Reasignar a processor_id entradas cuyo lease expiró."""
+        response = await self.redis_client.xautoclaim(
+            self.stream_key, self.consumer_group, processor_id,
+            min_idle_time=int(self.visibility_timeout.total_seconds() * 1000),
+            start_id="0-0", count=count
+        )
+        # [next_id, entries] (Redis 6.2) o [next_id, entries, deleted_ids] (Redis 7)
+        return [(message_id, fields) for message_id, fields in response[1] if fields]
+    
+    async def _lease_entry(self, message_id: str, fields: Dict[str, Any],
+                           processor_id: str, redelivered: bool) -> Optional[WorkLease]:
+        """Validar una entrada del stream y marcar su sesión como procesando (atómico)."""
+        session_id = fields.get("session_id")
+        if not session_id:
+            await self._ack_entry(message_id)
+            return None
+        
+        now = datetime.now(timezone.utc)
+        lease_expires_at = now + self.visibility_timeout
+        outcome = await self._get_scripts()["lease"](
+            keys=[f"input_queue:{session_id}", "input_queue:sessions", self.stream_key],
+            args=[
+                session_id, message_id, processor_id,
+                now.timestamp(), now.isoformat(), lease_expires_at.isoformat(),
+                int(redelivered), self.max_retry_count + 1, self.consumer_group
+            ]
+        )
+        
+        # Sesión cerrada, expirada o tomada con dequeue(session_id): entrada descartada
+        if outcome[0] == "expired":
+            logger.audit("input_expired", {"session_id": session_id, "expired_at": now.isoformat()})
+        elif outcome[0] == "failed":
+            # Lease expirado demasiadas veces: el item hace caer a los procesadores
+            logger.audit("input_failed", {
+                "session_id": session_id,
+                "error": "lease_expired_max_deliveries",
+                "deliveries": int(outcome[1]),
+                "will_retry": False,
+                "final_status": QueueStatus.FAILED.value
+            })
+        if outcome[0] != "ok":
+            return None
+        
+        deliveries = int(outcome[2])
+        payload_dict = json.loads(self._decrypt_payload(outcome[1]))
+        standardized_input = StandardizedInput(**payload_dict)
+        
+        logger.audit("input_leased", {
+            "session_id": session_id,
+            "processor_id": processor_id,
+            "input_type": standardized_input.input_type,
+            "deliveries": deliveries,
+            "redelivered": redelivered,
+            "lease_expires_at": lease_expires_at.isoformat()
+        })
+        
+        return WorkLease(
+            session_id=session_id,
+            message_id=message_id,
+            processor_id=processor_id,
+            input=standardized_input,
+            leased_at=now,
+            lease_expires_at=lease_expires_at,
+            deliveries=deliveries,
+            redelivered=redelivered
+        )
+    
+    async def _ack_entry(self, message_id: str):
+        """Confirmar y eliminar una entrada del stream."""
+        pipe = self.redis_client.pipeline()
+        await pipe.xack(self.stream_key, self.consumer_group, message_id)
+        await pipe.xdel(self.stream_key, message_id)
+        await pipe.execute()
+    
+    def _get_scripts(self) -> Dict[str, Any]:
+        """Scripts de transición registrados en el cliente Redis actual."""
+        if self._scripts is None or self._scripts_client is not self.redis_client:
+            self._scripts = {
+                "dequeue": self.redis_client.register_script(DEQUEUE_SCRIPT),
+                "lease": self.redis_client.register_script(LEASE_SCRIPT),
+                "complete": self.redis_client.register_script(COMPLETE_SCRIPT),
+                "fail": self.redis_client.register_script(FAIL_SCRIPT),
+                "expire": self.redis_client.register_script(EXPIRE_SCRIPT)
+            }
+            self._scripts_client = self.redis_client
+        return self._scripts
+    
+    async def _load_scripts(self):
+        """Precargar scripts de transición (EVALSHA desde la primera llamada)."""
+        for script in self._get_scripts().values():
+            await self.redis_client.script_load(script.script)
+    
     def _encrypt_payload(self, payload_json: str) -> str:
         """Encriptar payload JSON."""
         return self.fernet.encrypt(payload_json.encode()).decode()
@@ -416,33 +784,21 @@ class InputQueue:
         """Decriptar payload."""
         return self.fernet.decrypt(encrypted_payload.encode()).decode()
     
-    async def _get_queue_position(self, session_id: str) -> int:
-        """Obtener posición aproximada en la queue."""
-        try:
-            sessions = await self.list_pending_sessions()
-            if session_id in sessions:
-                return sessions.index(session_id) + 1
-            return 0
-        except:
-            return 0
-    
     async def _mark_expired(self, session_id: str):
         """Marcar item como expirado."""
         try:
-            queue_key = f"input_queue:{session_id}"
             now = datetime.now(timezone.utc)
             
-            await self.redis_client.hset(queue_key, mapping={
-                "status": QueueStatus.EXPIRED.value,
-                "expired_at": now.isoformat()
-            })
-            
-            await self.redis_client.srem("input_queue:sessions", session_id)
+            marked = await self._get_scripts()["expire"](
+                keys=[f"input_queue:{session_id}", "input_queue:sessions"],
+                args=[session_id, now.isoformat()]
+            )
             
-            logger.audit("input_expired", {
-                "session_id": session_id,
-                "expired_at": now.isoformat()
-            })
+            if marked:
+                logger.audit("input_expired", {
+                    "session_id": session_id,
+                    "expired_at": now.isoformat()
+                })
             
         except Exception as e:
             logger.error("mark_expired_failed", {
@@ -502,23 +858,35 @@ class InputQueueManager:
         """
         return await self.queue.enqueue(standardized_input)
     
-    async def get_next_for_processing(self, processor_id: str) -> Optional[StandardizedInput]:
+    async def get_next_for_processing(self, processor_id: str,
+                                      block_ms: Optional[int] = 5000) -> Optional[StandardizedInput]:
         """
         Obtener próximo input para procesamiento.
         
+        Bloquea hasta block_ms esperando trabajo; el item queda bajo lease
+        hasta mark_completed/mark_failed de su sesión.
+        
         Args:
             processor_id: ID del procesador
+            block_ms: Espera máxima (None = no bloquear)
             
         Returns:
             StandardizedInput o None si no hay items pendientes
         """
-        sessions = await self.queue.list_pending_sessions()
-        
-        for session_id in sessions:
-            status = await self.queue.get_queue_status(session_id)
-            if status and status["status"] == QueueStatus.PENDING.value:
-                input_item = await self.queue.dequeue(session_id, processor_id)
-                if input_item:
-                    return input_item
+        lease = await self.queue.fetch_next(processor_id, block_ms=block_ms)
+        return lease.input if lease else None
+    
+    async def claim_work(self, processor_id: str, count: int = 1,
+                         block_ms: Optional[int] = 5000) -> List[WorkLease]:
+        """
+        Tomar un lote de items para un procesador.
         
-        return None
\ No newline at end of file
+        Args:
+            processor_id: ID del procesador
+            count: Máximo de items
+            block_ms: Espera máxima (None = no bloquear)
+            
+        Returns:
+            Lista de WorkLease
+        """
+        return await self.queue.claim_batch(processor_id, count=count, block_ms=block_ms)
\ No newline at end of file
@@ -11,6 +11,8 @@ Responsabilidades:
 """
 
 import asyncio
+import copy
+from collections import Counter
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List, Tuple
 from enum import Enum
@@ -39,6 +41,19 @@ class ProcessingRoute(Enum):
     FASE2_COMPLETE = "fase2_complete"
 
 
+# Orden de despacho por lotes (menor = primero)
+ROUTE_DISPATCH_PRIORITY = {
+    ProcessingRoute.EMERGENCY: 0,
+    ProcessingRoute.MULTIMODAL_ANALYSIS: 1,
+    ProcessingRoute.VOICE_ANALYSIS_REQUIRED: 1,
+    ProcessingRoute.CLINICAL_IMAGE: 1,
+    ProcessingRoute.FASE2_COMPLETE: 1,
+    ProcessingRoute.HUMAN_REVIEW: 2,
+    ProcessingRoute.MEDICAL_QUERY: 3,
+    ProcessingRoute.INVALID: 4
+}
+
+
 class TriageDecision:
     """Decisión de triage con justificación."""
     def __init__(self, route: ProcessingRoute, confidence: float, reason: str, 
@@ -50,6 +65,13 @@ class TriageDecision:
         self.timestamp = datetime.now(timezone.utc)
         self.tokenized_patient: Optional[TokenizedPatient] = None  # NO PHI data
     
+    def copy(self) -> "TriageDecision":
+        """Copia independiente (flags propios) de una decisión compartida por un lote."""
+        decision = copy.copy(self)
+        decision.flags = list(self.flags)
+        decision.timestamp = datetime.now(timezone.utc)
+        return decision
+    
     def to_dict(self) -> Dict[str, Any]:
         result = {
             "route": self.route.value,
@@ -124,6 +146,10 @@ class MedicalDispatcher:
             "phi_tokenization": "ready"
         })
     
+    async def close(self):
+        """Cerrar el gestor de sesiones (escribe las transiciones pendientes)."""
+        await self.session_manager.close()
+    
     async def dispatch(self, standardized_input: StandardizedInput) -> Dict[str, Any]:
         """
         Despachar input estandarizado a la ruta apropiada.
@@ -139,240 +165,412 @@ class MedicalDispatcher:
         try:
             # Realizar triage médico
             triage_decision = await self._perform_medical_triage(standardized_input)
+            self._log_triage_decision(session_id, triage_decision)
             
-            # Log de decisión de triage (sin PII)
-            logger.audit("medical_triage_decision", {
-                "session_id": session_id,
-                "route": triage_decision.route.value,
-                "confidence": triage_decision.confidence,
-                "reason": triage_decision.reason,
-                "flags": triage_decision.flags
-            })
-            
-            # Determinar tipo de sesión basado en ruta
-            session_type = self._route_to_session_type(triage_decision.route)
-            is_emergency = "emergency" in triage_decision.flags
-            
-            # Crear sesión médica
+            # Crear sesión médica según la ruta
             session_result = await self.session_manager.create_session(
-                input_data={
-                    "source": standardized_input.metadata.get("source"),
-                    "input_type": standardized_input.input_type
-                },
-                session_type=session_type,
-                emergency=is_emergency
-            )
-            
-            if not session_result["success"]:
-                return {
-                    "success": False,
-                    "error": "session_creation_failed",
-                    "details": session_result.get("error"),
-                    "session_id": session_id
-                }
-            
-            # Actualizar estado a triaging
-            await self.session_manager.update_session_state(
-                session_id, 
-                SessionState.TRIAGING,
-                additional_data=triage_decision.to_dict()
-            )
-            
-            # Despachar a ruta específica
-            dispatch_result = await self._dispatch_to_route(
-                standardized_input,
-                triage_decision,
-                session_result["timeout_minutes"]
+                *self._session_request(standardized_input, triage_decision)
             )
             
-            # Actualizar métricas
-            self.routing_metrics["total_dispatched"] += 1
-            self.routing_metrics["routes"][triage_decision.route.value] += 1
-            
-            return {
-                "success": True,
-                "session_id": session_id,
-                "route": triage_decision.route.value,
-                "processing_result": dispatch_result,
-                "triage_confidence": triage_decision.confidence,
-                "session_expires": session_result["expires_at"]
-            }
+            return await self._complete_dispatch(standardized_input, triage_decision, session_result)
             
         except Exception as e:
-            logger.error("medical_dispatch_failed", {
-                "session_id": session_id,
-                "error": str(e),
-                "input_type": standardized_input.input_type
-            })
-            
-            # Marcar sesión como fallida
-            await self.session_manager.update_session_state(
-                session_id,
-                SessionState.FAILED,
-                additional_data={"error": str(e)}
-            )
+            return await self._dispatch_failed(standardized_input, e)
+    
+    async def dispatch_many(self, standardized_inputs: List[StandardizedInput],
+                            max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """
+        Despachar un lote de inputs (p. ej. backlog tras una caída de Redis o del webhook).
+        
+        El triage del lote se hace en una pasada con las mismas reglas que
+        dispatch(): cada texto se escanea y cada código de paciente se tokeniza
+        una sola vez, y las reglas se evalúan una vez por combinación distinta
+        de indicadores. Las sesiones se crean con escrituras Redis en pipeline,
+        emergencias primero para que obtengan cupo, y el despacho avanza por
+        grupos de ruta en orden de prioridad, con hasta `max_concurrency`
+        inputs en paralelo dentro de cada grupo.
+        
+        Args:
+            standardized_inputs: Inputs del Input Queue
+            max_concurrency: Máximo de despachos simultáneos
             
+        Returns:
+            Lista de resultados con el formato de dispatch(), en el orden de los inputs
+        """
+        if not standardized_inputs:
+            return []
+        
+        # Triage de todo el lote
+        decisions = await self._perform_medical_triage_batch(standardized_inputs)
+        
+        # Orden de despacho estable por prioridad de ruta
+        order = sorted(
+            range(len(standardized_inputs)),
+            key=lambda i: ROUTE_DISPATCH_PRIORITY.get(decisions[i].route, len(ROUTE_DISPATCH_PRIORITY))
+        )
+        
+        for i in order:
+            self._log_triage_decision(standardized_inputs[i].session_id, decisions[i])
+        
+        # Crear sesiones en pipeline
+        session_results = await self.session_manager.create_sessions([
+            self._session_request(standardized_inputs[i], decisions[i])
+            for i in order
+        ])
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def dispatch_one(i: int, session_result: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self._complete_dispatch(
+                        standardized_inputs[i], decisions[i], session_result
+                    )
+                except Exception as e:
+                    return await self._dispatch_failed(standardized_inputs[i], e)
+        
+        # Despachar por grupos de prioridad
+        results: List[Optional[Dict[str, Any]]] = [None] * len(standardized_inputs)
+        groups: Dict[int, List[Tuple[int, Dict[str, Any]]]] = {}
+        for i, session_result in zip(order, session_results):
+            priority = ROUTE_DISPATCH_PRIORITY.get(decisions[i].route, len(ROUTE_DISPATCH_PRIORITY))
+            groups.setdefault(priority, []).append((i, session_result))
+        
+        for priority in sorted(groups):
+            group = groups[priority]
+            outcomes = await asyncio.gather(*(dispatch_one(i, result) for i, result in group))
+            for (i, _), outcome in zip(group, outcomes):
+                results[i] = outcome
+        
+        logger.audit("medical_dispatch_batch_completed", {
+            "batch_size": len(standardized_inputs),
+            "succeeded": sum(1 for r in results if r["success"]),
+            "by_route": dict(Counter(d.route.value for d in decisions))
+        })
+        
+        return results
+    
+    def _log_triage_decision(self, session_id: str, triage_decision: TriageDecision):
+        """Log de decisión de triage (sin PII)."""
+        logger.audit("medical_triage_decision", {
+            "session_id": session_id,
+            "route": triage_decision.route.value,
+            "confidence": triage_decision.confidence,
+            "reason": triage_decision.reason,
+            "flags": triage_decision.flags
+        })
+    
+    def _session_request(self, standardized_input: StandardizedInput,
+                         triage_decision: TriageDecision) -> Tuple[Dict[str, Any], SessionType, bool]:
+        """Argumentos (input_data, session_type, emergency) de la sesión según la ruta de triage."""
+        input_data = {
+            "source": standardized_input.metadata.get("source"),
+            "input_type": standardized_input.input_type
+        }
+        session_type = self._route_to_session_type(triage_decision.route)
+        is_emergency = "emergency" in triage_decision.flags
+        return input_data, session_type, is_emergency
+    
+    async def _complete_dispatch(self, standardized_input: StandardizedInput,
+                                 triage_decision: TriageDecision,
+                                 session_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Despachar un input ya triado con su sesión creada."""
+        session_id = standardized_input.session_id
+        
+        if not session_result["success"]:
             return {
                 "success": False,
-                "error": "dispatch_failed",
-                "details": str(e),
+                "error": "session_creation_failed",
+                "details": session_result.get("error"),
                 "session_id": session_id
             }
+        
+        # Actualizar estado a triaging
+        await self.session_manager.update_session_state(
+            session_id, 
+            SessionState.TRIAGING,
+            additional_data=triage_decision.to_dict()
+        )
+        
+        # Despachar a ruta específica
+        dispatch_result = await self._dispatch_to_route(
+            standardized_input,
+            triage_decision,
+            session_result["timeout_minutes"]
+        )
+        
+        # Actualizar métricas
+        self.routing_metrics["total_dispatched"] += 1
+        self.routing_metrics["routes"][triage_decision.route.value] += 1
+        
+        return {
+            "success": True,
+            "session_id": session_id,
+            "route": triage_decision.route.value,
+            "processing_result": dispatch_result,
+            "triage_confidence": triage_decision.confidence,
+            "session_expires": session_result["expires_at"]
+        }
+    
+    async def _dispatch_failed(self, standardized_input: StandardizedInput,
+                               error: Exception) -> Dict[str, Any]:
+        """Registrar y marcar como fallido un despacho."""
+        session_id = standardized_input.session_id
+        
+        logger.error("medical_dispatch_failed", {
+            "session_id": session_id,
+            "error": str(error),
+            "input_type": standardized_input.input_type
+        })
+        
+        # Marcar sesión como fallida
+        await self.session_manager.update_session_state(
+            session_id,
+            SessionState.FAILED,
+            additional_data={"error": str(error)}
+        )
+        
+        return {
+            "success": False,
+            "error": "dispatch_failed",
+            "details": str(error),
+            "session_id": session_id
+        }
+    
+    async def _perform_medical_triage_batch(self, 
+                                          standardized_inputs: List[StandardizedInput]) -> List[TriageDecision]:
+        """
+        Triage de un lote en una pasada.
+        
+        Cada texto distinto se escanea una vez, cada código de paciente distinto
+        se tokeniza una sola vez (en paralelo) y las reglas de ruta se evalúan
+        una vez por combinación distinta de indicadores; los inputs que la
+        comparten reciben una copia de la decisión con su propio paciente
+        tokenizado. El resultado es el mismo que el de _perform_medical_triage
+        input a input.
+        """
+        decisions: List[Optional[TriageDecision]] = [None] * len(standardized_inputs)
+        signals: List[Optional[Tuple]] = [None] * len(standardized_inputs)
+        scans: Dict[str, Tuple] = {}
+        
+        for i, standardized_input in enumerate(standardized_inputs):
+            try:
+                media = self._media_signals(standardized_input.metadata)
+                text_content = standardized_input.raw_content.get("text", "").strip()
+                scan = scans.get(text_content)
+                if scan is None:
+                    scan = scans[text_content] = self._scan_triage_text(text_content)
+                signals[i] = (media, scan)
+            except Exception as e:
+                decisions[i] = self._triage_error_decision(standardized_input, e)
+        
+        patient_codes = list(dict.fromkeys(
+            patient_code for patient_code, _ in scans.values() if patient_code
+        ))
+        tokenized = await asyncio.gather(*(
+            self._resolve_tokenized_patient(code) for code in patient_codes
+        ))
+        tokenized_patients = dict(zip(patient_codes, tokenized))
+        
+        rule_decisions: Dict[Tuple, TriageDecision] = {}
+        for i, standardized_input in enumerate(standardized_inputs):
+            if signals[i] is None:
+                continue
+            try:
+                media, (patient_code, text_flags) = signals[i]
+                tokenized_patient = tokenized_patients.get(patient_code)
+                key = (media, text_flags, tokenized_patient is not None)
+                decision = rule_decisions.get(key)
+                if decision is None:
+                    decision = rule_decisions[key] = self._decide_route(*key)
+                decisions[i] = self._bind_patient(decision.copy(), tokenized_patient)
+            except Exception as e:
+                decisions[i] = self._triage_error_decision(standardized_input, e)
+        
+        logger.audit("medical_triage_batch_completed", {
+            "batch_size": len(standardized_inputs),
+            "distinct_texts": len(scans),
+            "distinct_patients": len(patient_codes),
+            "distinct_decisions": len(rule_decisions)
+        })
+        
+        return decisions
     
     async def _perform_medical_triage(self, standardized_input: StandardizedInput) -> TriageDecision:
         """
         Realizar triage médico del input.
         
         CRITICAL: Este es el punto de decisión médica principal
+        
+        Args:
+            standardized_input: Input estandarizado
         """
         try:
-            raw_content = standardized_input.raw_content
-            metadata = standardized_input.metadata
-            
             # Extraer indicadores clave
-            has_image = metadata.get("has_media", False)
-            has_text = metadata.get("has_text", False)
-            has_voice = metadata.get("has_voice", False) or metadata.get("has_audio", False)
-            text_content = raw_content.get("text", "").strip()
-            
-            # Detectar si es una consulta multimodal (FASE 2)
-            is_multimodal_context = self._is_multimodal_medical_context(text_content)
-            
-            # Buscar indicadores de emergencia
-            emergency_keywords = [
-                "urgente", "emergencia", "dolor severo", "sangrado",
-                "urgent", "emergency", "severe pain", "bleeding",
-                "crítico", "critical", "ayuda", "help"
-            ]
-            
-            is_emergency = any(
-                keyword in text_content.lower() 
-                for keyword in emergency_keywords
-            )
+            media = self._media_signals(standardized_input.metadata)
+            text_content = standardized_input.raw_content.get("text", "").strip()
+            patient_code, text_flags = self._scan_triage_text(text_content)
             
-            # Detectar y tokenizar código de paciente (Bruce Wayne → Batman)
-            patient_code = self._extract_patient_code(text_content)
+            # Tokenizar código de paciente (Bruce Wayne → Batman)
             tokenized_patient = None
-            
             if patient_code:
-                try:
-                    # Convertir MRN a tokenized patient (PHI → NO PHI)
-                    tokenized_patient = await self._tokenize_patient_data(patient_code)
-                    logger.audit("patient_tokenization_success", {
-                        "original_code": patient_code[:8] + "...",  # Partial for audit
-                        "patient_alias": tokenized_patient.patient_alias,
-                        "token_id": tokenized_patient.token_id
-                    })
-                except Exception as e:
-                    logger.error("patient_tokenization_failed", {
-                        "error": str(e),
-                        "patient_code": patient_code[:8] + "..."
-                    })
-                    tokenized_patient = None
-            
-            has_valid_patient_code = tokenized_patient is not None
+                tokenized_patient = await self._resolve_tokenized_patient(patient_code)
             
-            # Lógica de triage basada en el documento de arquitectura
+            decision = self._decide_route(media, text_flags, tokenized_patient is not None)
+            return self._bind_patient(decision, tokenized_patient)
             
-            # Ruta 1: Análisis multimodal (FASE 2) - Imagen + Voz
-            if has_image and has_voice and has_valid_patient_code and is_multimodal_context:
-                decision = TriageDecision(
-                    route=ProcessingRoute.MULTIMODAL_ANALYSIS,
-                    confidence=0.98,
-                    reason="Multimodal analysis required: Image + Voice data with valid tokenized patient",
-                    flags=["has_tokenized_patient", "multimodal_context", "phi_protected", "fase2_trigger"]
-                )
-                decision.tokenized_patient = tokenized_patient
-                decision.analysis_mode = "multimodal"
-                return decision
-            
-            # Ruta 1B: Imagen con posible voz requerida (FASE 2 parcial)
-            if has_image and has_valid_patient_code and is_multimodal_context and not has_voice:
-                decision = TriageDecision(
-                    route=ProcessingRoute.VOICE_ANALYSIS_REQUIRED,
-                    confidence=0.90,
-                    reason="Image analysis complete, voice analysis required for FASE 2",
-                    flags=["has_tokenized_patient", "voice_required", "phi_protected", "fase2_pending"]
-                )
-                decision.tokenized_patient = tokenized_patient
-                decision.analysis_mode = "voice_pending"
-                return decision
-            
-            # Ruta 1C: Imagen clínica estándar (FASE 1)
-            if has_image and has_valid_patient_code:
-                decision = TriageDecision(
-                    route=ProcessingRoute.CLINICAL_IMAGE,
-                    confidence=0.95,
-                    reason="Clinical image with valid tokenized patient",
-                    flags=["has_tokenized_patient", "clinical_context", "phi_protected"]
-                )
-                # Adjuntar datos tokenizados (NO PHI)
-                decision.tokenized_patient = tokenized_patient
-                decision.analysis_mode = "image_only"
-                return decision
-            
-            # Ruta 2: Consulta médica estructurada
-            if has_text and not has_image:
-                # Detectar consulta médica vs texto aleatorio
-                medical_indicators = [
-                    "protocolo", "protocol", "tratamiento", "treatment",
-                    "diagnóstico", "diagnosis", "síntomas", "symptoms",
-                    "medicamento", "medication", "dosis", "dose",
-                    "lesión", "injury", "lpp", "úlcera", "ulcer"
-                ]
-                
-                is_medical_query = any(
-                    indicator in text_content.lower()
-                    for indicator in medical_indicators
-                )
-                
-                if is_medical_query:
-                    return TriageDecision(
-                        route=ProcessingRoute.MEDICAL_QUERY,
-                        confidence=0.85,
-                        reason="Medical knowledge query detected",
-                        flags=["medical_query", "text_only"]
-                    )
-            
-            # Ruta 3: Escalamiento de emergencia
-            if is_emergency:
-                return TriageDecision(
-                    route=ProcessingRoute.EMERGENCY,
-                    confidence=0.90,
-                    reason="Emergency keywords detected",
-                    flags=["emergency", "requires_human_review"]
-                )
-            
-            # Ruta 4: Casos ambiguos - revisión humana
-            if has_image and not has_valid_patient_code:
-                return TriageDecision(
-                    route=ProcessingRoute.HUMAN_REVIEW,
-                    confidence=0.70,
-                    reason="Image without patient code - requires human validation",
-                    flags=["missing_patient_code", "ambiguous_context"]
-                )
-            
-            # Ruta 5: Input inválido
-            return TriageDecision(
-                route=ProcessingRoute.INVALID,
+        except Exception as e:
+            return self._triage_error_decision(standardized_input, e)
+    
+    def _media_signals(self, metadata: Dict[str, Any]) -> Tuple[bool, bool, bool]:
+        """Indicadores de medios del input: (imagen, texto, voz)."""
+        has_image = bool(metadata.get("has_media", False))
+        has_text = bool(metadata.get("has_text", False))
+        has_voice = bool(metadata.get("has_voice", False) or metadata.get("has_audio", False))
+        return has_image, has_text, has_voice
+    
+    def _scan_triage_text(self, text_content: str) -> Tuple[Optional[str], Tuple[bool, bool, bool]]:
+        """
+        Escanear el texto una vez para el triage.
+        
+        Returns:
+            (código de paciente, (contexto multimodal, emergencia, consulta médica))
+        """
+        text_lower = text_content.lower()
+        
+        # Detectar si es una consulta multimodal (FASE 2)
+        is_multimodal_context = self._is_multimodal_medical_context(text_content)
+        
+        # Buscar indicadores de emergencia
+        emergency_keywords = [
+            "urgente", "emergencia", "dolor severo", "sangrado",
+            "urgent", "emergency", "severe pain", "bleeding",
+            "crítico", "critical", "ayuda", "help"
+        ]
+        
+        is_emergency = any(
+            keyword in text_lower 
+            for keyword in emergency_keywords
+        )
+        
+        # Detectar consulta médica vs texto aleatorio
+        medical_indicators = [
+            "protocolo", "protocol", "tratamiento", "treatment",
+            "diagnóstico", "diagnosis", "síntomas", "symptoms",
+            "medicamento", "medication", "dosis", "dose",
+            "lesión", "injury", "lpp", "úlcera", "ulcer"
+        ]
+        
+        is_medical_query = any(
+            indicator in text_lower
+            for indicator in medical_indicators
+        )
+        
+        patient_code = self._extract_patient_code(text_content)
+        return patient_code, (is_multimodal_context, is_emergency, is_medical_query)
+    
+    def _decide_route(self, media: Tuple[bool, bool, bool], text_flags: Tuple[bool, bool, bool],
+                      has_valid_patient_code: bool) -> TriageDecision:
+        """
+        Aplicar las reglas de ruta a los indicadores del input.
+        
+        Solo depende de sus argumentos, por lo que el triage por lotes evalúa
+        las reglas una vez por combinación distinta de indicadores.
+        """
+        has_image, has_text, has_voice = media
+        is_multimodal_context, is_emergency, is_medical_query = text_flags
+        
+        # Lógica de triage basada en el documento de arquitectura
+        
+        # Ruta 1: Análisis multimodal (FASE 2) - Imagen + Voz
+        if has_image and has_voice and has_valid_patient_code and is_multimodal_context:
+            decision = TriageDecision(
+                route=ProcessingRoute.MULTIMODAL_ANALYSIS,
+                confidence=0.98,
+                reason="Multimodal analysis required: Image + Voice data with valid tokenized patient",
+                flags=["has_tokenized_patient", "multimodal_context", "phi_protected", "fase2_trigger"]
+            )
+            decision.analysis_mode = "multimodal"
+            return decision
+        
+        # Ruta 1B: Imagen con posible voz requerida (FASE 2 parcial)
+        if has_image and has_valid_patient_code and is_multimodal_context and not has_voice:
+            decision = TriageDecision(
+                route=ProcessingRoute.VOICE_ANALYSIS_REQUIRED,
+                confidence=0.90,
+                reason="Image analysis complete, voice analysis required for FASE 2",
+                flags=["has_tokenized_patient", "voice_required", "phi_protected", "fase2_pending"]
+            )
+            decision.analysis_mode = "voice_pending"
+            return decision
+        
+        # Ruta 1C: Imagen clínica estándar (FASE 1)
+        if has_image and has_valid_patient_code:
+            decision = TriageDecision(
+                route=ProcessingRoute.CLINICAL_IMAGE,
                 confidence=0.95,
-                reason="No valid medical context detected",
-                flags=["invalid_input", "no_medical_content"]
+                reason="Clinical image with valid tokenized patient",
+                flags=["has_tokenized_patient", "clinical_context", "phi_protected"]
             )
-            
-        except Exception as e:
-            logger.error("medical_triage_failed", {
-                "error": str(e),
-                "session_id": standardized_input.session_id
-            })
-            
-            # En caso de error, enviar a revisión humana
+            decision.analysis_mode = "image_only"
+            return decision
+        
+        # Ruta 2: Consulta médica estructurada
+        if has_text and not has_image and is_medical_query:
+            return TriageDecision(
+                route=ProcessingRoute.MEDICAL_QUERY,
+                confidence=0.85,
+                reason="Medical knowledge query detected",
+                flags=["medical_query", "text_only"]
+            )
+        
+        # Ruta 3: Escalamiento de emergencia
+        if is_emergency:
+            return TriageDecision(
+                route=ProcessingRoute.EMERGENCY,
+                confidence=0.90,
+                reason="Emergency keywords detected",
+                flags=["emergency", "requires_human_review"]
+            )
+        
+        # Ruta 4: Casos ambiguos - revisión humana
+        if has_image and not has_valid_patient_code:
             return TriageDecision(
                 route=ProcessingRoute.HUMAN_REVIEW,
-                confidence=0.50,
-                reason=f"Triage error: {str(e)}",
-                flags=["triage_error", "requires_human_review"]
+                confidence=0.70,
+                reason="Image without patient code - requires human validation",
+                flags=["missing_patient_code", "ambiguous_context"]
             )
+        
+        # Ruta 5: Input inválido
+        return TriageDecision(
+            route=ProcessingRoute.INVALID,
+            confidence=0.95,
+            reason="No valid medical context detected",
+            flags=["invalid_input", "no_medical_content"]
+        )
+    
+    def _bind_patient(self, decision: TriageDecision,
+                      tokenized_patient: Optional[TokenizedPatient]) -> TriageDecision:
+        """Adjuntar datos tokenizados (NO PHI) en las rutas con paciente."""
+        if "has_tokenized_patient" in decision.flags:
+            decision.tokenized_patient = tokenized_patient
+        return decision
+    
+    def _triage_error_decision(self, standardized_input: StandardizedInput,
+                               error: Exception) -> TriageDecision:
+        """Decisión ante un fallo de triage: enviar a revisión humana."""
+        logger.error("medical_triage_failed", {
+            "error": str(error),
+            "session_id": standardized_input.session_id
+        })
+        
+        return TriageDecision(
+            route=ProcessingRoute.HUMAN_REVIEW,
+            confidence=0.50,
+            reason=f"Triage error: {str(error)}",
+            flags=["triage_error", "requires_human_review"]
+        )
     
     async def _dispatch_to_route(self, 
                                 standardized_input: StandardizedInput,
@@ -538,6 +736,24 @@ class MedicalDispatcher:
         
         return None
     
+    async def _resolve_tokenized_patient(self, patient_code: str) -> Optional[TokenizedPatient]:
+        """Tokenizar código de paciente; None si la tokenización falla."""
+        try:
+            # Convertir MRN a tokenized patient (PHI → NO PHI)
+            tokenized_patient = await self._tokenize_patient_data(patient_code)
+            logger.audit("patient_tokenization_success", {
+                "original_code": patient_code[:8] + "...",  # Partial for audit
+                "patient_alias": tokenized_patient.patient_alias,
+                "token_id": tokenized_patient.token_id
+            })
+            return tokenized_patient
+        except Exception as e:
+            logger.error("patient_tokenization_failed", {
+                "error": str(e),
+                "patient_code": patient_code[:8] + "..."
+            })
+            return None
+    
     async def _tokenize_patient_data(self, hospital_mrn: str) -> TokenizedPatient:
         """
         Tokenizar datos de paciente usando el PHI Tokenization Service.
@@ -285,7 +285,11 @@ class ServiceConfigManager:
                     'confidence_threshold': float(os.getenv('MODEL_CONFIDENCE_THRESHOLD', 0.25)),
                     'medical_grade': False,
                     'precision_target': '85-90%',
-                    'backup_role': True
+                    'backup_role': True,
+                    # Exported ONNX model for CPU inference (scripts/export_detector_onnx.py)
+                    'onnx_model_path': os.getenv('YOLO_ONNX_MODEL_PATH'),
+                    'onnx_threads': int(os.getenv('ONNX_INTRA_OP_THREADS', 0)) or None,
+                    'onnx_cores': os.getenv('ONNX_CPU_CORES')
                 },
                 'medgemma': {
                     'use_local': use_local_ai,
@@ -8,17 +8,21 @@ Características:
 - Cleanup automático de datos temporales
 - Session tokens únicos
 - Audit trail completo
+- Transiciones de estado atómicas en el servidor (un round trip)
+- Write-behind opcional para transiciones no críticas
 """
 
 import asyncio
 import hashlib
+import os
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, Optional, List, Set
+from typing import Dict, Any, Optional, List, Set, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import json
 import redis.asyncio as redis
+from redis.exceptions import NoScriptError
 
 from ..utils.secure_logger import SecureLogger
 
@@ -61,33 +65,144 @@ class SessionMetadata:
     assigned_processor: Optional[str] = None
     escalation_reason: Optional[str] = None
     audit_events: List[Dict[str, Any]] = None
-    
+
     def __post_init__(self):
         if self.audit_events is None:
             self.audit_events = []
 
 
+# Estados que siempre se escriben de inmediato (nunca write-behind)
+TERMINAL_STATES = {SessionState.COMPLETED, SessionState.FAILED, SessionState.EXPIRED, SessionState.CLEANUP}
+
+# Campos de audit que completa el servidor y se mueven a "data" al leer
+SERVER_AUDIT_FIELDS = ("old_state", "final_state")
+
+
+# Scripts Lua del ciclo de vida. Cada operación verifica y actualiza la
+# sesión de forma atómica en el servidor (un round trip). Layout de KEYS:
+# hash de la sesión, lista de audit, y los sets active_sessions:* de todos
+# los tipos. La expiración se compara con expires_at_ts (epoch); las
+# sesiones sin ese campo dependen del TTL del hash. Los eventos de audit se
+# construyen en Python; el script inserta el estado leído en el servidor
+# como primer campo del JSON.
+_PUSH_AUDIT = """
+local function push_audit(event, field, value)
+    redis.call('RPUSH', KEYS[2], '{"' .. field .. '":' .. cjson.encode(value) .. ',' .. string.sub(event, 2))
+    local ttl = redis.call('PTTL', KEYS[1])
+    if ttl > 0 then
+        redis.call('PEXPIRE', KEYS[2], ttl)
+    end
+end
+"""
+
+# KEYS: hash, audit, set del tipo | ARGV: session_id, max_concurrentes, ttl, campo1, valor1, ...
+CREATE_SCRIPT = """
+local count = redis.call('SCARD', KEYS[3])
+if count >= tonumber(ARGV[2]) then
+    return {'limit', count}
+end
+local unpack = unpack or table.unpack
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('SADD', KEYS[3], ARGV[1])
+return {'ok', count + 1}
+"""
+
+# ARGV: session_id, ahora_ts, ahora_iso, nuevo_estado, processor_id,
+# campo_timestamp, evento
+UPDATE_SCRIPT = _PUSH_AUDIT + """
+local data = redis.call('HMGET', KEYS[1], 'state', 'expires_at_ts')
+if not data[1] then
+    return {'missing'}
+end
+if data[2] and tonumber(data[2]) < tonumber(ARGV[2]) then
+    redis.call('HSET', KEYS[1], 'state', 'expired', 'expired_at', ARGV[3])
+    for i = 3, #KEYS do
+        redis.call('SREM', KEYS[i], ARGV[1])
+    end
+    return {'expired'}
+end
+redis.call('HSET', KEYS[1], 'state', ARGV[4], 'last_updated', ARGV[3])
+if ARGV[5] ~= '' then
+    redis.call('HSET', KEYS[1], 'assigned_processor', ARGV[5])
+end
+if ARGV[6] ~= '' then
+    redis.call('HSET', KEYS[1], ARGV[6], ARGV[3])
+end
+push_audit(ARGV[7], 'old_state', data[1])
+return {'ok', data[1]}
+"""
+
+# ARGV: session_id, ahora_iso, razón, retención, evento
+CLEANUP_SCRIPT = _PUSH_AUDIT + """
+local state = redis.call('HGET', KEYS[1], 'state')
+if not state then
+    return {'missing'}
+end
+for i = 3, #KEYS do
+    redis.call('SREM', KEYS[i], ARGV[1])
+end
+redis.call('HSET', KEYS[1], 'state', 'cleanup', 'cleanup_at', ARGV[2], 'cleanup_reason', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+push_audit(ARGV[5], 'final_state', state)
+return {'ok', state}
+"""
+
+# ARGV: session_id, ahora_iso
+EXPIRE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'state', 'expired', 'expired_at', ARGV[2])
+for i = 3, #KEYS do
+    redis.call('SREM', KEYS[i], ARGV[1])
+end
+return 1
+"""
+
+
 class SessionManager:
     """
     Gestor de sesiones con aislamiento temporal.
     Controla el ciclo de vida completo de procesamiento médico.
     """
-    
-    def __init__(self, redis_url: Optional[str] = None):
+
+    def __init__(self, redis_url: Optional[str] = None, write_behind: Optional[bool] = None,
+                 write_behind_interval: Optional[timedelta] = None,
+                 write_behind_max_pending: int = 100):
         """
         Inicializar Session Manager.
-        
+
         Args:
             redis_url: URL de Redis para persistencia de sesiones
+            write_behind: Acumular transiciones de estado no críticas y
+                escribirlas en lote (env SESSION_WRITE_BEHIND). Las sesiones de
+                emergencia y los estados terminales siempre se escriben de inmediato.
+            write_behind_interval: Intervalo máximo entre escrituras en lote
+            write_behind_max_pending: Transiciones acumuladas que fuerzan la escritura
         """
         self.redis_url = redis_url or "redis://localhost:6379/1"  # DB separada para sesiones
         self.redis_client = None
-        
+        self._scripts = None
+        self._scripts_client = None
+
         # Configuración de timeouts
         self.default_session_timeout = timedelta(minutes=15)
         self.emergency_session_timeout = timedelta(minutes=30)
         self.cleanup_interval = timedelta(minutes=2)
-        
+        self.cleanup_retention = timedelta(hours=24)
+
+        # Write-behind de transiciones no críticas
+        if write_behind is None:
+            write_behind = os.getenv("SESSION_WRITE_BEHIND", "false").lower() == "true"
+        self.write_behind = write_behind
+        self.write_behind_interval = write_behind_interval or timedelta(milliseconds=250)
+        self.write_behind_max_pending = write_behind_max_pending
+        self._pending_updates: List[Tuple[str, List[str], List[Any]]] = []
+        self._flush_lock = asyncio.Lock()
+        self._write_behind_task: Optional[asyncio.Task] = None
+        self._maintenance_tasks: List[asyncio.Task] = []
+
         # Límites de sesiones concurrentes por tipo
         self.max_concurrent_sessions = {
             SessionType.CLINICAL_IMAGE: 50,
@@ -95,124 +210,101 @@ class SessionManager:
             SessionType.HUMAN_ESCALATION: 20,
             SessionType.EMERGENCY: 10
         }
-        
+
         logger.audit("session_manager_initialized", {
             "component": "session_manager",
             "default_timeout_minutes": 15,
             "emergency_timeout_minutes": 30,
-            "max_concurrent_clinical": 50
+            "max_concurrent_clinical": 50,
+            "write_behind": self.write_behind
         })
-    
+
     async def initialize(self):
         """Inicializar conexión Redis y tareas de mantenimiento."""
         try:
-            self.redis_client = redis.from_url(self.redis_url)
+            self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
             await self.redis_client.ping()
-            
+
+            await self._load_scripts()
+
             logger.audit("session_manager_redis_connected", {
                 "redis_url": self.redis_url.split('@')[-1]
             })
-            
+
             # Iniciar tareas de mantenimiento
-            asyncio.create_task(self._cleanup_expired_sessions())
-            asyncio.create_task(self._monitor_session_health())
-            
+            self._maintenance_tasks = [
+                asyncio.create_task(self._cleanup_expired_sessions()),
+                asyncio.create_task(self._monitor_session_health())
+            ]
+            if self.write_behind:
+                self._write_behind_task = asyncio.create_task(self._flush_write_behind())
+
         except Exception as e:
             logger.error("session_manager_redis_failed", {
                 "error": str(e),
                 "redis_url": self.redis_url.split('@')[-1]
             })
             raise
-    
-    async def create_session(self, 
-                           input_data: Dict[str, Any], 
+
+    async def close(self):
+        """
+        Escribir las transiciones pendientes y detener las tareas de fondo.
+
+        Debe llamarse al apagar el proceso: con write-behind, las
+        transiciones acumuladas solo viven en memoria.
+        """
+        await self.flush_pending_updates()
+
+        task, self._write_behind_task = self._write_behind_task, None
+        if task is not None:
+            # Con el lock tomado la tarea no está a mitad de una escritura
+            async with self._flush_lock:
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        tasks, self._maintenance_tasks = self._maintenance_tasks, []
+        for maintenance_task in tasks:
+            maintenance_task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Transiciones encoladas mientras se detenía la tarea
+        await self.flush_pending_updates()
+
+        logger.audit("session_manager_closed", {
+            "pending_write_behind": len(self._pending_updates)
+        })
+
+    async def create_session(self,
+                           input_data: Dict[str, Any],
                            session_type: SessionType,
                            emergency: bool = False) -> Dict[str, Any]:
         """
         Crear nueva sesión de procesamiento.
-        
+
+        La verificación del límite de concurrencia y el alta de la sesión son
+        atómicas (un round trip).
+
         Args:
             input_data: Datos de entrada (ya anonimizados)
             session_type: Tipo de sesión
             emergency: Si es emergencia médica
-            
+
         Returns:
             Dict con información de sesión creada
         """
         try:
             if not self.redis_client:
                 await self.initialize()
-            
-            # Verificar límites de concurrencia
-            current_count = await self._get_active_session_count(session_type)
-            max_allowed = self.max_concurrent_sessions[session_type]
-            
-            if current_count >= max_allowed:
-                return {
-                    "success": False,
-                    "error": "max_concurrent_sessions_reached",
-                    "current_count": current_count,
-                    "max_allowed": max_allowed
-                }
-            
-            # Generar session ID
-            session_id = self._generate_session_id(session_type, emergency)
-            
-            # Configurar timeout
-            timeout = self.emergency_session_timeout if emergency else self.default_session_timeout
-            
-            # Crear metadata
-            now = datetime.now(timezone.utc)
-            metadata = SessionMetadata(
-                session_id=session_id,
-                session_type=session_type,
-                state=SessionState.CREATED,
-                created_at=now,
-                expires_at=now + timeout,
-                source=input_data.get('source', 'unknown'),
-                input_type=input_data.get('input_type', 'unknown')
+
+            metadata, session_data, timeout = await self._prepare_session(
+                input_data, session_type, emergency
             )
-            
-            # Registrar evento inicial
-            await self._add_audit_event(metadata, "session_created", {
-                "session_type": session_type.value,
-                "emergency": emergency,
-                "expires_at": metadata.expires_at.isoformat()
-            })
-            
-            # Guardar en Redis
-            session_key = f"session:{session_id}"
-            await self.redis_client.hset(session_key, mapping={
-                "metadata": json.dumps(asdict(metadata), default=str),
-                "created_at": now.isoformat(),
-                "expires_at": metadata.expires_at.isoformat(),
-                "state": SessionState.CREATED.value,
-                "type": session_type.value,
-                "emergency": str(emergency)
-            })
-            
-            # Set expiration
-            await self.redis_client.expire(session_key, int(timeout.total_seconds()))
-            
-            # Añadir a set de sesiones activas
-            await self.redis_client.sadd(f"active_sessions:{session_type.value}", session_id)
-            
-            logger.audit("session_created", {
-                "session_id": session_id,
-                "session_type": session_type.value,
-                "emergency": emergency,
-                "expires_at": metadata.expires_at.isoformat(),
-                "active_count": current_count + 1
-            })
-            
-            return {
-                "success": True,
-                "session_id": session_id,
-                "expires_at": metadata.expires_at.isoformat(),
-                "timeout_minutes": int(timeout.total_seconds() / 60),
-                "session_type": session_type.value
-            }
-            
+
+            keys, args = self._create_call(metadata, session_data, timeout)
+            outcome = await self._get_scripts()["create"](keys=keys, args=args)
+
+            return self._create_result(metadata, timeout, emergency, outcome)
+
         except Exception as e:
             logger.error("session_creation_failed", {
                 "session_type": session_type.value,
@@ -222,82 +314,118 @@ class SessionManager:
                 "success": False,
                 "error": str(e)
             }
-    
-    async def update_session_state(self, 
-                                 session_id: str, 
+
+    async def create_sessions(self,
+                            session_requests: List[Tuple[Dict[str, Any], SessionType, bool]]) -> List[Dict[str, Any]]:
+        """
+        Crear varias sesiones en un solo round trip.
+
+        Cada alta verifica su límite de concurrencia en el servidor, en el
+        orden del lote, por lo que el llamador debe ordenar primero las
+        solicitudes más prioritarias.
+
+        Args:
+            session_requests: Tuplas (input_data, session_type, emergency)
+
+        Returns:
+            Lista de resultados con el mismo formato que create_session,
+            en el orden de las solicitudes
+        """
+        if not session_requests:
+            return []
+
+        try:
+            if not self.redis_client:
+                await self.initialize()
+
+            prepared = []
+            calls = []
+            for input_data, session_type, emergency in session_requests:
+                metadata, session_data, timeout = await self._prepare_session(
+                    input_data, session_type, emergency
+                )
+                prepared.append((metadata, timeout, emergency))
+                calls.append(("create", *self._create_call(metadata, session_data, timeout)))
+
+            outcomes = await self._execute_scripts(calls)
+            results = [
+                self._create_result(metadata, timeout, emergency, outcome)
+                for (metadata, timeout, emergency), outcome in zip(prepared, outcomes)
+            ]
+
+            logger.audit("sessions_created_batch", {
+                "requested": len(session_requests),
+                "created": sum(1 for r in results if r["success"]),
+                "emergency": sum(1 for _, _, emergency in session_requests if emergency)
+            })
+
+            return results
+
+        except Exception as e:
+            logger.error("session_batch_creation_failed", {
+                "requested": len(session_requests),
+                "error": str(e)
+            })
+            return [{"success": False, "error": str(e)} for _ in session_requests]
+
+    async def update_session_state(self,
+                                 session_id: str,
                                  new_state: SessionState,
                                  processor_id: Optional[str] = None,
                                  additional_data: Optional[Dict[str, Any]] = None) -> bool:
         """
         Actualizar estado de sesión.
-        
+
+        La verificación de existencia/expiración, el cambio de estado y el
+        evento de audit se aplican en un solo script (un round trip). Con
+        write-behind, las transiciones no terminales de sesiones que no son de
+        emergencia se acumulan y se escriben en lote; en ese caso el retorno
+        indica que la transición fue aceptada.
+
         Args:
             session_id: ID de sesión
             new_state: Nuevo estado
             processor_id: ID del procesador (opcional)
             additional_data: Datos adicionales (opcional)
-            
+
         Returns:
             True si actualización exitosa
         """
         try:
-            session_key = f"session:{session_id}"
-            
-            # Verificar que la sesión existe
-            session_data = await self.redis_client.hgetall(session_key)
-            if not session_data:
-                logger.warning("session_not_found", {"session_id": session_id})
-                return False
-            
-            # Verificar que no ha expirado
-            expires_at = datetime.fromisoformat(session_data["expires_at"])
-            if datetime.now(timezone.utc) > expires_at:
-                await self._mark_session_expired(session_id)
-                return False
-            
-            # Actualizar estado
             now = datetime.now(timezone.utc)
-            update_data = {
-                "state": new_state.value,
-                "last_updated": now.isoformat()
-            }
-            
-            if processor_id:
-                update_data["assigned_processor"] = processor_id
-            
+
+            timestamp_field = ""
             if new_state == SessionState.PROCESSING:
-                update_data["processing_started"] = now.isoformat()
+                timestamp_field = "processing_started"
             elif new_state in [SessionState.COMPLETED, SessionState.FAILED]:
-                update_data["finished_at"] = now.isoformat()
-            
-            await self.redis_client.hset(session_key, mapping=update_data)
-            
-            # Actualizar metadata con audit event
-            metadata = await self._get_session_metadata(session_id)
-            if metadata:
-                await self._add_audit_event(metadata, "state_changed", {
-                    "old_state": metadata.state.value,
-                    "new_state": new_state.value,
-                    "processor_id": processor_id,
-                    "additional_data": additional_data
-                })
-                
-                metadata.state = new_state
-                if processor_id:
-                    metadata.assigned_processor = processor_id
-                
-                await self.redis_client.hset(session_key, "metadata", 
-                                           json.dumps(asdict(metadata), default=str))
-            
-            logger.audit("session_state_updated", {
-                "session_id": session_id,
+                timestamp_field = "finished_at"
+
+            event = self._audit_event(session_id, "state_changed", {
                 "new_state": new_state.value,
                 "processor_id": processor_id,
-                "updated_at": now.isoformat()
-            })
-            
-            return True
-            
+                "additional_data": additional_data
+            }, now)
+
+            call = ("update", self._session_keys(session_id), [
+                session_id, now.timestamp(), now.isoformat(), new_state.value,
+                processor_id or "", timestamp_field, json.dumps(event, default=str)
+            ])
+
+            if self._defer_update(session_id, new_state):
+                self._pending_updates.append(call)
+                if len(self._pending_updates) >= self.write_behind_max_pending:
+                    await self.flush_pending_updates()
+                return True
+
+            # Escribir de inmediato (junto con lo pendiente, en orden)
+            async with self._flush_lock:
+                calls = self._pending_updates + [call]
+                self._pending_updates = []
+                outcomes = await self._execute_scripts(calls)
+
+            self._log_update_outcomes(calls[:-1], outcomes[:-1])
+            return self._log_update_outcome(call, outcomes[-1])
+
         except Exception as e:
             logger.error("session_state_update_failed", {
                 "session_id": session_id,
@@ -305,28 +433,60 @@ class SessionManager:
                 "error": str(e)
             })
             return False
-    
+
+    async def flush_pending_updates(self) -> int:
+        """
+        Escribir las transiciones acumuladas por write-behind (un round trip).
+
+        Returns:
+            Número de transiciones escritas
+        """
+        if not self._pending_updates:
+            return 0
+
+        async with self._flush_lock:
+            calls = self._pending_updates
+            self._pending_updates = []
+            if not calls:
+                return 0
+
+            try:
+                outcomes = await self._execute_scripts(calls)
+            except Exception as e:
+                # Reencolar delante de lo acumulado mientras tanto
+                self._pending_updates = calls + self._pending_updates
+                logger.error("session_write_behind_flush_failed", {
+                    "pending": len(self._pending_updates),
+                    "error": str(e)
+                })
+                return 0
+
+        self._log_update_outcomes(calls, outcomes)
+        return len(calls)
+
     async def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtener información completa de sesión.
-        
+
         Args:
             session_id: ID de sesión
-            
+
         Returns:
             Dict con información de sesión o None si no existe
         """
         try:
+            await self.flush_pending_updates()
+
             session_key = f"session:{session_id}"
             session_data = await self.redis_client.hgetall(session_key)
-            
+
             if not session_data:
                 return None
-            
+
             # Verificar expiración
             expires_at = datetime.fromisoformat(session_data["expires_at"])
             is_expired = datetime.now(timezone.utc) > expires_at
-            
+
             return {
                 "session_id": session_id,
                 "state": session_data.get("state"),
@@ -341,280 +501,505 @@ class SessionManager:
                 "is_expired": is_expired,
                 "time_remaining": max(0, (expires_at - datetime.now(timezone.utc)).total_seconds()) if not is_expired else 0
             }
-            
+
         except Exception as e:
             logger.error("get_session_info_failed", {
                 "session_id": session_id,
                 "error": str(e)
             })
             return None
-    
+
     async def extend_session(self, session_id: str, additional_minutes: int = 5) -> bool:
         """
         Extender tiempo de vida de sesión.
-        
+
         Args:
             session_id: ID de sesión
             additional_minutes: Minutos adicionales
-            
+
         Returns:
             True si extensión exitosa
         """
         try:
+            await self.flush_pending_updates()
+
             session_key = f"session:{session_id}"
-            session_data = await self.redis_client.hgetall(session_key)
-            
-            if not session_data:
+            current_expires_iso = await self.redis_client.hget(session_key, "expires_at")
+
+            if not current_expires_iso:
                 return False
-            
+
             # Calcular nueva expiración
-            current_expires = datetime.fromisoformat(session_data["expires_at"])
+            current_expires = datetime.fromisoformat(current_expires_iso)
             new_expires = current_expires + timedelta(minutes=additional_minutes)
-            
-            # Actualizar
-            await self.redis_client.hset(session_key, mapping={
+            remaining_seconds = int((new_expires - datetime.now(timezone.utc)).total_seconds())
+
+            # Actualizar campos y TTL (un round trip)
+            pipe = self.redis_client.pipeline()
+            await pipe.hset(session_key, mapping={
                 "expires_at": new_expires.isoformat(),
+                "expires_at_ts": new_expires.timestamp(),
                 "extended_at": datetime.now(timezone.utc).isoformat()
             })
-            
-            # Actualizar TTL en Redis
-            remaining_seconds = (new_expires - datetime.now(timezone.utc)).total_seconds()
-            await self.redis_client.expire(session_key, int(remaining_seconds))
-            
+            await pipe.expire(session_key, remaining_seconds)
+            await pipe.expire(f"{session_key}:audit", remaining_seconds)
+            await pipe.execute()
+
             logger.audit("session_extended", {
                 "session_id": session_id,
                 "additional_minutes": additional_minutes,
                 "new_expires": new_expires.isoformat()
             })
-            
+
             return True
-            
+
         except Exception as e:
             logger.error("session_extension_failed", {
                 "session_id": session_id,
                 "error": str(e)
             })
             return False
-    
+
     async def cleanup_session(self, session_id: str, reason: str = "normal_completion") -> bool:
         """
         Limpiar sesión y datos temporales.
-        
+
         Args:
             session_id: ID de sesión
             reason: Razón de cleanup
-            
+
         Returns:
             True si cleanup exitoso
         """
         try:
-            session_key = f"session:{session_id}"
-            
-            # Obtener metadata antes de limpiar
-            metadata = await self._get_session_metadata(session_id)
-            if metadata:
-                await self._add_audit_event(metadata, "session_cleanup", {
-                    "reason": reason,
-                    "final_state": metadata.state.value
-                })
-            
-            # Remover de sets activos
-            for session_type in SessionType:
-                await self.redis_client.srem(f"active_sessions:{session_type.value}", session_id)
-            
-            # Marcar como cleanup pero mantener por audit
-            await self.redis_client.hset(session_key, mapping={
-                "state": SessionState.CLEANUP.value,
-                "cleanup_at": datetime.now(timezone.utc).isoformat(),
-                "cleanup_reason": reason
-            })
-            
-            # Programar eliminación final en 24 horas
-            await self.redis_client.expire(session_key, 86400)
-            
+            await self.flush_pending_updates()
+
+            now = datetime.now(timezone.utc)
+            event = self._audit_event(session_id, "session_cleanup", {"reason": reason}, now)
+
+            # Marcar como cleanup pero mantener por audit; eliminación final
+            # tras el período de retención
+            outcome = await self._get_scripts()["cleanup"](
+                keys=self._session_keys(session_id),
+                args=[session_id, now.isoformat(), reason,
+                      int(self.cleanup_retention.total_seconds()),
+                      json.dumps(event, default=str)]
+            )
+
+            if outcome[0] != "ok":
+                logger.warning("session_not_found", {"session_id": session_id})
+                return False
+
             logger.audit("session_cleaned_up", {
                 "session_id": session_id,
-                "reason": reason
+                "reason": reason,
+                "final_state": outcome[1]
             })
-            
+
             return True
-            
+
         except Exception as e:
             logger.error("session_cleanup_failed", {
                 "session_id": session_id,
                 "error": str(e)
             })
             return False
-    
+
     async def list_active_sessions(self, session_type: Optional[SessionType] = None) -> List[str]:
         """
         Listar sesiones activas.
-        
+
         Args:
             session_type: Filtrar por tipo (opcional)
-            
+
         Returns:
             Lista de session IDs activos
         """
         try:
             if session_type:
                 sessions = await self.redis_client.smembers(f"active_sessions:{session_type.value}")
-                return [s.decode() if isinstance(s, bytes) else s for s in sessions]
             else:
-                all_sessions = []
-                for stype in SessionType:
-                    sessions = await self.redis_client.smembers(f"active_sessions:{stype.value}")
-                    all_sessions.extend([s.decode() if isinstance(s, bytes) else s for s in sessions])
-                return all_sessions
-                
+                sessions = await self.redis_client.sunion(self._active_set_keys())
+            return [s.decode() if isinstance(s, bytes) else s for s in sessions]
+
         except Exception as e:
             logger.error("list_active_sessions_failed", {"error": str(e)})
             return []
-    
+
     def _generate_session_id(self, session_type: SessionType, emergency: bool = False) -> str:
         """Generar session ID único."""
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
         unique_id = str(uuid.uuid4())[:8]
         prefix = "EMR" if emergency else "SES"
         type_code = session_type.value[:3].upper()
-        
+
         return f"VIGIA_{prefix}_{type_code}_{timestamp}_{unique_id}"
-    
+
+    def _is_emergency_session(self, session_id: str) -> bool:
+        """Sesión de emergencia según el prefijo de su ID."""
+        return session_id.startswith("VIGIA_EMR_")
+
+    def _defer_update(self, session_id: str, new_state: SessionState) -> bool:
+        """Si la transición puede escribirse en diferido (write-behind)."""
+        return (
+            self.write_behind
+            and new_state not in TERMINAL_STATES
+            and not self._is_emergency_session(session_id)
+        )
+
+    async def _prepare_session(self,
+                             input_data: Dict[str, Any],
+                             session_type: SessionType,
+                             emergency: bool) -> Tuple[SessionMetadata, Dict[str, str], timedelta]:
+        """Generar ID, metadata y campos Redis de una sesión nueva."""
+        # Generar session ID
+        session_id = self._generate_session_id(session_type, emergency)
+
+        # Configurar timeout
+        timeout = self.emergency_session_timeout if emergency else self.default_session_timeout
+
+        # Crear metadata
+        now = datetime.now(timezone.utc)
+        metadata = SessionMetadata(
+            session_id=session_id,
+            session_type=session_type,
+            state=SessionState.CREATED,
+            created_at=now,
+            expires_at=now + timeout,
+            source=input_data.get('source', 'unknown'),
+            input_type=input_data.get('input_type', 'unknown')
+        )
+
+        # Registrar evento inicial
+        await self._add_audit_event(metadata, "session_created", {
+            "session_type": session_type.value,
+            "emergency": emergency,
+            "expires_at": metadata.expires_at.isoformat()
+        })
+
+        session_data = {
+            "metadata": json.dumps(asdict(metadata), default=str),
+            "created_at": now.isoformat(),
+            "expires_at": metadata.expires_at.isoformat(),
+            "expires_at_ts": str(metadata.expires_at.timestamp()),
+            "state": SessionState.CREATED.value,
+            "type": session_type.value,
+            "emergency": str(emergency)
+        }
+
+        return metadata, session_data, timeout
+
+    def _create_call(self, metadata: SessionMetadata, session_data: Dict[str, str],
+                     timeout: timedelta) -> Tuple[List[str], List[Any]]:
+        """KEYS y ARGV del script de creación."""
+        session_id = metadata.session_id
+        session_type = metadata.session_type
+        keys = [
+            f"session:{session_id}",
+            f"session:{session_id}:audit",
+            f"active_sessions:{session_type.value}"
+        ]
+        args = [session_id, self.max_concurrent_sessions[session_type], int(timeout.total_seconds())]
+        for field, value in session_data.items():
+            args.extend((field, value))
+        return keys, args
+
+    def _create_result(self, metadata: SessionMetadata, timeout: timedelta,
+                       emergency: bool, outcome: List[Any]) -> Dict[str, Any]:
+        """Resultado de creación de sesión a partir de la respuesta del script."""
+        session_type = metadata.session_type
+
+        if outcome[0] == "limit":
+            return {
+                "success": False,
+                "error": "max_concurrent_sessions_reached",
+                "current_count": int(outcome[1]),
+                "max_allowed": self.max_concurrent_sessions[session_type]
+            }
+
+        logger.audit("session_created", {
+            "session_id": metadata.session_id,
+            "session_type": session_type.value,
+            "emergency": emergency,
+            "expires_at": metadata.expires_at.isoformat(),
+            "active_count": int(outcome[1])
+        })
+
+        return {
+            "success": True,
+            "session_id": metadata.session_id,
+            "expires_at": metadata.expires_at.isoformat(),
+            "timeout_minutes": int(timeout.total_seconds() / 60),
+            "session_type": session_type.value
+        }
+
+    def _log_update_outcome(self, call: Tuple[str, List[str], List[Any]], outcome: List[Any]) -> bool:
+        """Registrar el resultado de una transición de estado."""
+        _, _, args = call
+        session_id, new_state, processor_id = args[0], args[3], args[4] or None
+
+        if outcome[0] == "missing":
+            logger.warning("session_not_found", {"session_id": session_id})
+            return False
+
+        if outcome[0] == "expired":
+            logger.audit("session_expired", {
+                "session_id": session_id,
+                "expired_at": args[2]
+            })
+            return False
+
+        logger.audit("session_state_updated", {
+            "session_id": session_id,
+            "old_state": outcome[1],
+            "new_state": new_state,
+            "processor_id": processor_id,
+            "updated_at": args[2]
+        })
+        return True
+
+    def _log_update_outcomes(self, calls: List[Tuple[str, List[str], List[Any]]], outcomes: List[Any]):
+        """Registrar los resultados de transiciones escritas en lote."""
+        for call, outcome in zip(calls, outcomes):
+            self._log_update_outcome(call, outcome)
+
+    def _active_set_keys(self) -> List[str]:
+        """Sets de sesiones activas de todos los tipos."""
+        return [f"active_sessions:{session_type.value}" for session_type in SessionType]
+
+    def _session_keys(self, session_id: str) -> List[str]:
+        """KEYS de los scripts: hash, lista de audit y sets activos."""
+        return [f"session:{session_id}", f"session:{session_id}:audit"] + self._active_set_keys()
+
+    def _get_scripts(self) -> Dict[str, Any]:
+        """Scripts de ciclo de vida registrados en el cliente Redis actual."""
+        if self._scripts is None or self._scripts_client is not self.redis_client:
+            self._scripts = {
+                "create": self.redis_client.register_script(CREATE_SCRIPT),
+                "update": self.redis_client.register_script(UPDATE_SCRIPT),
+                "cleanup": self.redis_client.register_script(CLEANUP_SCRIPT),
+                "expire": self.redis_client.register_script(EXPIRE_SCRIPT)
+            }
+            self._scripts_client = self.redis_client
+        return self._scripts
+
+    async def _load_scripts(self):
+        """Precargar scripts de ciclo de vida (EVALSHA desde la primera llamada)."""
+        for script in self._get_scripts().values():
+            await self.redis_client.script_load(script.script)
+
+    async def _execute_scripts(self, calls: List[Tuple[str, List[str], List[Any]]]) -> List[Any]:
+        """
+        Ejecutar varias llamadas a scripts en un pipeline (un round trip).
+
+        Si el servidor perdió los scripts (SCRIPT FLUSH, reinicio) ninguna
+        llamada se ejecutó: se recargan y se reintenta una vez.
+        """
+        scripts = self._get_scripts()
+
+        for attempt in range(2):
+            pipe = self.redis_client.pipeline(transaction=False)
+            for name, keys, args in calls:
+                await pipe.evalsha(scripts[name].sha, len(keys), *keys, *args)
+            try:
+                return await pipe.execute()
+            except NoScriptError:
+                if attempt:
+                    raise
+                await self._load_scripts()
+
     async def _get_active_session_count(self, session_type: SessionType) -> int:
         """Obtener número de sesiones activas del tipo."""
         try:
             return await self.redis_client.scard(f"active_sessions:{session_type.value}")
         except:
             return 0
-    
+
     async def _get_session_metadata(self, session_id: str) -> Optional[SessionMetadata]:
-        """Obtener metadata de sesión."""
+        """Obtener metadata de sesión con su estado y audit trail actuales."""
         try:
             session_key = f"session:{session_id}"
-            metadata_json = await self.redis_client.hget(session_key, "metadata")
-            
+
+            pipe = self.redis_client.pipeline()
+            await pipe.hmget(session_key, ["metadata", "state", "type", "assigned_processor"])
+            await pipe.lrange(f"{session_key}:audit", 0, -1)
+            (metadata_json, state, session_type, assigned_processor), audit_entries = await pipe.execute()
+
             if metadata_json:
                 data = json.loads(metadata_json)
                 # Reconstruir datetime objects
                 data['created_at'] = datetime.fromisoformat(data['created_at'])
                 data['expires_at'] = datetime.fromisoformat(data['expires_at'])
-                data['state'] = SessionState(data['state'])
-                data['session_type'] = SessionType(data['session_type'])
-                
+                # El snapshot JSON serializa los enums con str(); los campos
+                # del hash tienen el valor actual
+                data['state'] = SessionState(state)
+                data['session_type'] = SessionType(session_type)
+                if assigned_processor:
+                    data['assigned_processor'] = assigned_processor
+
+                # Eventos posteriores a la creación (lista de audit)
+                for entry in audit_entries:
+                    event = json.loads(entry)
+                    for field in SERVER_AUDIT_FIELDS:
+                        if field in event:
+                            event["data"][field] = event.pop(field)
+                    data['audit_events'].append(event)
+
                 return SessionMetadata(**data)
             return None
-            
+
         except Exception as e:
             logger.error("get_session_metadata_failed", {
                 "session_id": session_id,
                 "error": str(e)
             })
             return None
-    
+
+    def _audit_event(self, session_id: str, event_type: str, event_data: Dict[str, Any],
+                     timestamp: Optional[datetime] = None) -> Dict[str, Any]:
+        """Construir evento de audit."""
+        return {
+            "timestamp": (timestamp or datetime.now(timezone.utc)).isoformat(),
+            "event_type": event_type,
+            "session_id": session_id,
+            "data": event_data
+        }
+
     async def _add_audit_event(self, metadata: SessionMetadata, event_type: str, event_data: Dict[str, Any]):
         """Añadir evento de audit a sesión."""
         try:
-            audit_event = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "event_type": event_type,
-                "session_id": metadata.session_id,
-                "data": event_data
-            }
-            
+            audit_event = self._audit_event(metadata.session_id, event_type, event_data)
+
             metadata.audit_events.append(audit_event)
-            
+
             # Log del evento
             logger.audit(f"session_{event_type}", {
                 "session_id": metadata.session_id,
                 **event_data
             })
-            
+
         except Exception as e:
             logger.error("add_audit_event_failed", {
                 "session_id": metadata.session_id,
                 "event_type": event_type,
                 "error": str(e)
             })
-    
+
     async def _mark_session_expired(self, session_id: str):
         """Marcar sesión como expirada."""
         try:
-            session_key = f"session:{session_id}"
             now = datetime.now(timezone.utc)
-            
-            await self.redis_client.hset(session_key, mapping={
-                "state": SessionState.EXPIRED.value,
-                "expired_at": now.isoformat()
-            })
-            
-            # Remover de sesiones activas
-            for session_type in SessionType:
-                await self.redis_client.srem(f"active_sessions:{session_type.value}", session_id)
-            
-            logger.audit("session_expired", {
-                "session_id": session_id,
-                "expired_at": now.isoformat()
-            })
-            
+
+            marked = await self._get_scripts()["expire"](
+                keys=self._session_keys(session_id),
+                args=[session_id, now.isoformat()]
+            )
+
+            if marked:
+                logger.audit("session_expired", {
+                    "session_id": session_id,
+                    "expired_at": now.isoformat()
+                })
+
         except Exception as e:
             logger.error("mark_session_expired_failed", {
                 "session_id": session_id,
                 "error": str(e)
             })
-    
+
+    async def _expire_stale_sessions(self) -> int:
+        """
+        Marcar como expiradas las sesiones activas vencidas.
+
+        Lee todas las expiraciones en un pipeline y marca las vencidas en otro.
+        """
+        sessions = await self.list_active_sessions()
+        if not sessions:
+            return 0
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for session_id in sessions:
+            await pipe.hmget(f"session:{session_id}", ["expires_at_ts", "expires_at"])
+        expirations = await pipe.execute()
+
+        now = datetime.now(timezone.utc)
+        expired = []
+        for session_id, (expires_at_ts, expires_at) in zip(sessions, expirations):
+            if expires_at_ts:
+                is_expired = float(expires_at_ts) < now.timestamp()
+            elif expires_at:
+                is_expired = datetime.fromisoformat(expires_at) < now
+            else:
+                # Hash eliminado por TTL: solo queda en el set activo
+                is_expired = True
+            if is_expired:
+                expired.append(session_id)
+
+        if expired:
+            await self._execute_scripts([
+                ("expire", self._session_keys(session_id), [session_id, now.isoformat()])
+                for session_id in expired
+            ])
+
+        return len(expired)
+
     async def _cleanup_expired_sessions(self):
         """Tarea de limpieza de sesiones expiradas."""
         while True:
             try:
                 await asyncio.sleep(self.cleanup_interval.total_seconds())
-                
-                expired_count = 0
+
                 now = datetime.now(timezone.utc)
-                
-                # Revisar todas las sesiones activas
-                for session_type in SessionType:
-                    sessions = await self.list_active_sessions(session_type)
-                    
-                    for session_id in sessions:
-                        info = await self.get_session_info(session_id)
-                        if info and info["is_expired"]:
-                            await self._mark_session_expired(session_id)
-                            expired_count += 1
-                
+                expired_count = await self._expire_stale_sessions()
+
                 if expired_count > 0:
                     logger.audit("cleanup_expired_sessions", {
                         "expired_count": expired_count,
                         "cleanup_time": now.isoformat()
                     })
-                    
+
             except Exception as e:
                 logger.error("cleanup_task_failed", {"error": str(e)})
                 await asyncio.sleep(60)
-    
+
+    async def _flush_write_behind(self):
+        """Tarea de escritura periódica de transiciones write-behind."""
+        while True:
+            try:
+                await asyncio.sleep(self.write_behind_interval.total_seconds())
+                await self.flush_pending_updates()
+            except Exception as e:
+                logger.error("write_behind_task_failed", {"error": str(e)})
+
     async def _monitor_session_health(self):
         """Monitorear salud del sistema de sesiones."""
         while True:
             try:
                 await asyncio.sleep(300)  # Cada 5 minutos
-                
+
+                session_types = list(SessionType)
+                pipe = self.redis_client.pipeline(transaction=False)
+                for session_type in session_types:
+                    await pipe.scard(f"active_sessions:{session_type.value}")
+                counts = await pipe.execute()
+
                 health_data = {}
                 total_active = 0
-                
-                for session_type in SessionType:
-                    count = await self._get_active_session_count(session_type)
+
+                for session_type, count in zip(session_types, counts):
                     health_data[session_type.value] = {
                         "active_count": count,
                         "max_allowed": self.max_concurrent_sessions[session_type],
                         "utilization": count / self.max_concurrent_sessions[session_type]
                     }
                     total_active += count
-                
+
                 logger.audit("session_health_check", {
                     "total_active_sessions": total_active,
                     "session_types": health_data,
+                    "pending_write_behind": len(self._pending_updates),
                     "timestamp": datetime.now(timezone.utc).isoformat()
                 })
-                
+
             except Exception as e:
                 logger.error("health_monitor_failed", {"error": str(e)})
-                await asyncio.sleep(60)
\ No newline at end of file
@@ -12,16 +12,16 @@ Responsabilidades:
 Versión mejorada con integración MedGemma para análisis médico inteligente.
 """
 
-import re
 import asyncio
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
 from .input_packager import StandardizedInput
 from ..utils.secure_logger import SecureLogger
 from ..ai.medgemma_client import MedGemmaClient, MedicalContext, MedicalAnalysisType
+from .triage_matcher import TriageMatcher, whole_words
 
 logger = SecureLogger("triage_engine")
 
@@ -95,11 +95,19 @@ class MedicalTriageEngine:
     Motor de triage médico con reglas clínicas.
     """
     
+    # Categorías del matcher que determinan el contexto, en orden de precedencia
+    CONTEXT_BY_CATEGORY = (
+        ("pressure_injury", ClinicalContext.PRESSURE_INJURY),
+        ("medication", ClinicalContext.MEDICATION_QUERY),
+        ("protocol", ClinicalContext.PROTOCOL_REQUEST),
+        ("wound", ClinicalContext.WOUND_ASSESSMENT)
+    )
+    
     def __init__(self, use_medgemma: bool = False):
         """Inicializar motor de triage."""
         self.rules = self._initialize_medical_rules()
-        self.emergency_patterns = self._compile_emergency_patterns()
-        self.clinical_patterns = self._compile_clinical_patterns()
+        self.triage_keywords = self._compile_triage_keywords()
+        self.matcher = TriageMatcher(self.triage_keywords)
         
         # Inicializar MedGemma client si está habilitado
         self.use_medgemma = use_medgemma
@@ -115,11 +123,23 @@ class MedicalTriageEngine:
         logger.audit("triage_engine_initialized", {
             "component": "layer2_triage_engine",
             "total_rules": len(self.rules),
-            "emergency_patterns": len(self.emergency_patterns),
+            "emergency_patterns": len(self.triage_keywords["emergency"]),
             "clinical_compliance": True,
             "medgemma_enabled": self.use_medgemma
         })
     
+    @property
+    def rules(self) -> List[TriageRule]:
+        """Reglas de triage activas."""
+        return self._rules
+    
+    @rules.setter
+    def rules(self, rules: List[TriageRule]):
+        # Orden por prioridad calculado una vez (sorted es estable)
+        self._rules = list(rules)
+        self._rules_by_priority = sorted(self._rules, key=lambda r: r.priority, reverse=True)
+        self._default_rule = next((r for r in self._rules if r.rule_id == "DEF001"), None)
+    
     def _initialize_medical_rules(self) -> List[TriageRule]:
         """Inicializar reglas médicas validadas."""
         return [
@@ -226,68 +246,77 @@ class MedicalTriageEngine:
             )
         ]
     
-    def _compile_emergency_patterns(self) -> List[re.Pattern]:
-        """Compilar patrones de emergencia."""
-        emergency_terms = [
-            # Español
-            r'\b(emergencia|urgente|crítico|grave|severo|ayuda)\b',
-            r'\b(dolor\s+(severo|intenso|insoportable))\b',
-            r'\b(sangr(ando|ado|e)|hemorragia)\b',
-            r'\b(no\s+puedo\s+respirar|ahog(ando|o))\b',
-            r'\b(paro|infarto|convuls)',
-            
-            # English
-            r'\b(emergency|urgent|critical|severe|help)\b',
-            r'\b(severe\s+pain|intense\s+pain|unbearable)\b',
-            r'\b(bleed(ing)?|hemorrhag(e|ing))\b',
-            r'\b(can\'?t\s+breathe|chok(ing|e))\b',
-            r'\b(cardiac|heart\s+attack|seizure)\b'
-        ]
+    def _compile_triage_keywords(self) -> Dict[str, List[str]]:
+        """
+        Palabras clave por categoría para el TriageMatcher.
         
-        return [re.compile(pattern, re.IGNORECASE) for pattern in emergency_terms]
-    
-    def _compile_clinical_patterns(self) -> Dict[str, List[re.Pattern]]:
-        """Compilar patrones clínicos por categoría."""
-        patterns = {
-            "pressure_injury": [
-                re.compile(r'\b(lpp|lesión\s+por\s+presión|úlcera\s+por\s+presión)\b', re.IGNORECASE),
-                re.compile(r'\b(pressure\s+(injury|ulcer|sore)|bedsore)\b', re.IGNORECASE),
-                re.compile(r'\b(escara|decúbito)\b', re.IGNORECASE),
-                re.compile(r'\bgrado\s+[1-4]\b', re.IGNORECASE),
-                re.compile(r'\bstage\s+[1-4]\b', re.IGNORECASE)
+        Fragmentos regex en minúsculas que coinciden al inicio de una palabra
+        del mensaje normalizado.
+        """
+        return {
+            "emergency": [
+                # Español
+                *whole_words("emergencia", "urgente", "crítico", "grave", "severo", "ayuda"),
+                *whole_words(r"dolor\s+(?:severo|intenso|insoportable)"),
+                *whole_words(r"sangr(?:ando|ado|e)", "hemorragia"),
+                *whole_words(r"no\s+puedo\s+respirar", r"ahog(?:ando|o)"),
+                "paro", "infarto", "convuls",
+                
+                # English
+                *whole_words("emergency", "urgent", "critical", "severe", "help"),
+                *whole_words(r"severe\s+pain", r"intense\s+pain", "unbearable"),
+                *whole_words(r"bleed(?:ing)?", r"hemorrhag(?:e|ing)"),
+                *whole_words(r"can'?t\s+breathe", r"chok(?:ing|e)"),
+                *whole_words("cardiac", r"heart\s+attack", "seizure")
             ],
             
-            "medication": [
-                re.compile(r'\b(medicamento|medicina|fármaco|dosis)\b', re.IGNORECASE),
-                re.compile(r'\b(medication|medicine|drug|dose|dosage)\b', re.IGNORECASE),
-                re.compile(r'\b(antibiótico|analgésico|antiinflamatorio)\b', re.IGNORECASE),
-                re.compile(r'\b(antibiotic|analgesic|anti-inflammatory)\b', re.IGNORECASE)
-            ],
+            "pressure_injury": whole_words(
+                "lpp", r"lesión\s+por\s+presión", r"úlcera\s+por\s+presión",
+                r"pressure\s+(?:injury|ulcer|sore)", "bedsore",
+                "escara", "decúbito",
+                r"grado\s+[1-4]", r"stage\s+[1-4]"
+            ),
             
-            "protocol": [
-                re.compile(r'\b(protocolo|procedimiento|guía\s+clínica)\b', re.IGNORECASE),
-                re.compile(r'\b(protocol|procedure|clinical\s+guide(line)?)\b', re.IGNORECASE),
-                re.compile(r'\b(tratamiento|manejo|cuidado)\b', re.IGNORECASE),
-                re.compile(r'\b(treatment|management|care)\b', re.IGNORECASE)
+            "medication": whole_words(
+                "medicamento", "medicina", "fármaco", "dosis",
+                "medication", "medicine", "drug", "dose", "dosage",
+                "antibiótico", "analgésico", "antiinflamatorio",
+                "antibiotic", "analgesic", "anti-inflammatory"
+            ),
+            
+            "protocol": whole_words(
+                "protocolo", "procedimiento", r"guía\s+clínica",
+                "protocol", "procedure", r"clinical\s+guide(?:line)?",
+                "tratamiento", "manejo", "cuidado",
+                "treatment", "management", "care"
+            ),
+            
+            "wound": whole_words(
+                "herida", "lesión", "úlcera", "llaga",
+                "wound", "injury", "ulcer", "sore",
+                "tejido", "necrosis", "infección",
+                "tissue", "infection"
+            ),
+            
+            "patient_code": [
+                r"[a-z]{2}-\d{4}-\d{3}\b",  # CD-2025-001
+                r"paciente[\s:]+\w",
+                r"patient[\s:]+\w",
+                r"código[\s:]+\w",
+                r"code[\s:]+\w"
             ],
             
-            "wound": [
-                re.compile(r'\b(herida|lesión|úlcera|llaga)\b', re.IGNORECASE),
-                re.compile(r'\b(wound|injury|ulcer|sore)\b', re.IGNORECASE),
-                re.compile(r'\b(tejido|necrosis|infección)\b', re.IGNORECASE),
-                re.compile(r'\b(tissue|necrosis|infection)\b', re.IGNORECASE)
+            "severe_pain": [
+                r"dolor\s+(?:severo|intenso|insoportable)",
+                r"severe\s+pain",
+                r"intense\s+pain"
             ],
             
-            "patient_code": [
-                re.compile(r'\b[A-Z]{2}-\d{4}-\d{3}\b'),  # CD-2025-001
-                re.compile(r'\bpaciente[\s:]+(\w+)', re.IGNORECASE),
-                re.compile(r'\bpatient[\s:]+(\w+)', re.IGNORECASE),
-                re.compile(r'\bcódigo[\s:]+(\w+)', re.IGNORECASE),
-                re.compile(r'\bcode[\s:]+(\w+)', re.IGNORECASE)
-            ]
+            # Indicadores de urgencia, prioridad y contenido médico general
+            "urgent_terms": ["urgente", "urgent", "pronto", "soon", "rápido", "quick", "ahora", "now"],
+            "priority_terms": ["importante", "important", "necesito", "need", "dolor", "pain"],
+            "medical_terms": ["médico", "doctor", "enfermera", "salud", "medical", "health", "nurse"]
         }
-        
-        return patterns
     
     async def perform_triage(self, standardized_input: StandardizedInput) -> TriageResult:
         """
@@ -303,81 +332,149 @@ class MedicalTriageEngine:
             # Extraer información relevante
             text_content = standardized_input.raw_content.get("text", "")
             has_image = standardized_input.metadata.get("has_media", False)
-            input_type = standardized_input.input_type
             
-            # Detectar contexto clínico
-            clinical_context = self._detect_clinical_context(text_content, has_image)
+            # Escanear el mensaje una sola vez
+            hits = self.matcher.scan(text_content)
             
-            # Detectar urgencia
-            urgency = self._assess_urgency(text_content)
-            
-            # Evaluar reglas
-            matched_rules, clinical_flags = self._evaluate_rules(
-                text_content, has_image, clinical_context, urgency
-            )
-            
-            # Determinar ruta recomendada
-            recommended_route = self._determine_route(
-                matched_rules, clinical_context, urgency, has_image
-            )
-            
-            # Calcular confianza
-            confidence = self._calculate_confidence(
-                matched_rules, clinical_context, text_content
-            )
-            
-            # Determinar si requiere revisión humana
-            requires_human = self._requires_human_review(
-                confidence, urgency, clinical_flags
-            )
-            
-            # Generar explicación
-            explanation = self._generate_explanation(
-                clinical_context, urgency, matched_rules, clinical_flags
-            )
-            
-            result = TriageResult(
-                urgency=urgency,
-                context=clinical_context,
-                confidence=confidence,
-                matched_rules=[r.rule_id for r in matched_rules],
-                recommended_route=recommended_route,
-                clinical_flags=clinical_flags,
-                explanation=explanation,
-                requires_human_review=requires_human,
-                timestamp=datetime.now(timezone.utc)
-            )
-            
-            # Log de triage (sin PII)
-            logger.audit("medical_triage_completed", {
-                "session_id": standardized_input.session_id,
-                "urgency": urgency.value,
-                "context": clinical_context.value,
-                "confidence": confidence,
-                "matched_rules": result.matched_rules,
-                "requires_human": requires_human
-            })
-            
-            return result
+            decision = self._decide(text_content, has_image, hits)
+            return self._build_triage_result(standardized_input, text_content, decision)
             
         except Exception as e:
-            logger.error("triage_engine_error", {
-                "session_id": standardized_input.session_id,
-                "error": str(e)
-            })
+            return self._triage_error_result(standardized_input, e)
+    
+    async def perform_triage_batch(self, standardized_inputs: List[StandardizedInput]) -> List[TriageResult]:
+        """
+        Realizar triage de un lote de inputs en una sola pasada.
+        
+        Cada texto distinto se escanea una vez y las reglas se evalúan una vez
+        por combinación distinta de categorías encontradas e imagen; los inputs
+        que comparten combinación reutilizan la decisión. Pensado para reprocesar
+        backlogs tras una caída de Redis o del webhook.
+        
+        Args:
+            standardized_inputs: Inputs estandarizados
             
-            # Resultado por defecto en caso de error
-            return TriageResult(
-                urgency=ClinicalUrgency.PRIORITY,
-                context=ClinicalContext.UNKNOWN,
-                confidence=0.0,
-                matched_rules=["ERROR"],
-                recommended_route="human_review",
-                clinical_flags=["triage_error", "requires_validation"],
-                explanation=f"Triage error: {str(e)}",
-                requires_human_review=True,
-                timestamp=datetime.now(timezone.utc)
-            )
+        Returns:
+            Lista de TriageResult en el mismo orden que los inputs
+        """
+        scans: Dict[str, FrozenSet[str]] = {}
+        decisions: Dict[Tuple[FrozenSet[str], bool, bool], Tuple] = {}
+        results = []
+        
+        for standardized_input in standardized_inputs:
+            try:
+                text_content = standardized_input.raw_content.get("text", "")
+                has_image = bool(standardized_input.metadata.get("has_media", False))
+                
+                hits = scans.get(text_content)
+                if hits is None:
+                    hits = scans[text_content] = self.matcher.scan(text_content)
+                
+                key = (hits, has_image, bool(text_content))
+                decision = decisions.get(key)
+                if decision is None:
+                    decision = decisions[key] = self._decide(text_content, has_image, hits)
+                
+                results.append(self._build_triage_result(standardized_input, text_content, decision))
+                
+            except Exception as e:
+                results.append(self._triage_error_result(standardized_input, e))
+        
+        logger.audit("medical_triage_batch_completed", {
+            "batch_size": len(standardized_inputs),
+            "distinct_texts": len(scans),
+            "distinct_decisions": len(decisions)
+        })
+        
+        return results
+    
+    def _decide(self, text: str, has_image: bool, hits: FrozenSet[str]) -> Tuple:
+        """
+        Decisión de triage a partir de las categorías encontradas.
+        
+        Solo depende de (hits, has_image, bool(text)), por lo que puede
+        reutilizarse entre inputs con la misma combinación.
+        """
+        # Detectar contexto clínico
+        clinical_context = self._detect_clinical_context(text, has_image, hits)
+        
+        # Detectar urgencia
+        urgency = self._assess_urgency(text, hits)
+        
+        # Evaluar reglas
+        matched_rules, clinical_flags = self._evaluate_rules(
+            text, has_image, clinical_context, urgency, hits
+        )
+        
+        # Determinar ruta recomendada
+        recommended_route = self._determine_route(
+            matched_rules, clinical_context, urgency, has_image
+        )
+        
+        # Generar explicación
+        explanation = self._generate_explanation(
+            clinical_context, urgency, matched_rules, clinical_flags
+        )
+        
+        return clinical_context, urgency, matched_rules, clinical_flags, recommended_route, explanation
+    
+    def _build_triage_result(self, standardized_input: StandardizedInput,
+                             text: str, decision: Tuple) -> TriageResult:
+        """Construir TriageResult y registrar audit (sin PII)."""
+        clinical_context, urgency, matched_rules, clinical_flags, recommended_route, explanation = decision
+        
+        # Calcular confianza
+        confidence = self._calculate_confidence(
+            matched_rules, clinical_context, text
+        )
+        
+        # Determinar si requiere revisión humana
+        requires_human = self._requires_human_review(
+            confidence, urgency, clinical_flags
+        )
+        
+        result = TriageResult(
+            urgency=urgency,
+            context=clinical_context,
+            confidence=confidence,
+            matched_rules=[r.rule_id for r in matched_rules],
+            recommended_route=recommended_route,
+            clinical_flags=list(clinical_flags),
+            explanation=explanation,
+            requires_human_review=requires_human,
+            timestamp=datetime.now(timezone.utc)
+        )
+        
+        # Log de triage (sin PII)
+        logger.audit("medical_triage_completed", {
+            "session_id": standardized_input.session_id,
+            "urgency": urgency.value,
+            "context": clinical_context.value,
+            "confidence": confidence,
+            "matched_rules": result.matched_rules,
+            "requires_human": requires_human
+        })
+        
+        return result
+    
+    def _triage_error_result(self, standardized_input: StandardizedInput, error: Exception) -> TriageResult:
+        """Resultado por defecto en caso de error."""
+        logger.error("triage_engine_error", {
+            "session_id": standardized_input.session_id,
+            "error": str(error)
+        })
+        
+        return TriageResult(
+            urgency=ClinicalUrgency.PRIORITY,
+            context=ClinicalContext.UNKNOWN,
+            confidence=0.0,
+            matched_rules=["ERROR"],
+            recommended_route="human_review",
+            clinical_flags=["triage_error", "requires_validation"],
+            explanation=f"Triage error: {str(error)}",
+            requires_human_review=True,
+            timestamp=datetime.now(timezone.utc)
+        )
     
     async def perform_enhanced_triage(self, standardized_input: StandardizedInput) -> TriageResult:
         """
@@ -593,129 +690,98 @@ class MedicalTriageEngine:
         else:
             return basic_route
     
-    def _detect_clinical_context(self, text: str, has_image: bool) -> ClinicalContext:
+    def _detect_clinical_context(self, text: str, has_image: bool,
+                                 hits: Optional[FrozenSet[str]] = None) -> ClinicalContext:
         """Detectar contexto clínico del input."""
         if not text and not has_image:
             return ClinicalContext.NON_MEDICAL
         
-        text_lower = text.lower()
-        
-        # Verificar cada categoría de patrones
-        for category, patterns in self.clinical_patterns.items():
-            for pattern in patterns:
-                if pattern.search(text):
-                    if category == "pressure_injury":
-                        return ClinicalContext.PRESSURE_INJURY
-                    elif category == "medication":
-                        return ClinicalContext.MEDICATION_QUERY
-                    elif category == "protocol":
-                        return ClinicalContext.PROTOCOL_REQUEST
-                    elif category == "wound":
-                        return ClinicalContext.WOUND_ASSESSMENT
+        if hits is None:
+            hits = self.matcher.scan(text)
+        
+        # Verificar cada categoría en orden de precedencia
+        for category, context in self.CONTEXT_BY_CATEGORY:
+            if category in hits:
+                return context
         
         # Si hay imagen, asumir contexto de wound assessment
         if has_image:
             return ClinicalContext.WOUND_ASSESSMENT
         
         # Si hay algún contenido médico general
-        medical_terms = ["médico", "doctor", "enfermera", "salud", "medical", "health", "nurse"]
-        if any(term in text_lower for term in medical_terms):
+        if "medical_terms" in hits:
             return ClinicalContext.GENERAL_MEDICAL
         
         return ClinicalContext.UNKNOWN
     
-    def _assess_urgency(self, text: str) -> ClinicalUrgency:
+    def _assess_urgency(self, text: str, hits: Optional[FrozenSet[str]] = None) -> ClinicalUrgency:
         """Evaluar urgencia clínica."""
+        if hits is None:
+            hits = self.matcher.scan(text)
+        
         # Verificar patrones de emergencia
-        for pattern in self.emergency_patterns:
-            if pattern.search(text):
-                return ClinicalUrgency.EMERGENCY
+        if "emergency" in hits:
+            return ClinicalUrgency.EMERGENCY
         
         # Verificar indicadores de urgencia
-        urgent_terms = ["urgente", "urgent", "pronto", "soon", "rápido", "quick", "ahora", "now"]
-        if any(term in text.lower() for term in urgent_terms):
+        if "urgent_terms" in hits:
             return ClinicalUrgency.URGENT
         
         # Verificar indicadores de prioridad
-        priority_terms = ["importante", "important", "necesito", "need", "dolor", "pain"]
-        if any(term in text.lower() for term in priority_terms):
+        if "priority_terms" in hits:
             return ClinicalUrgency.PRIORITY
         
         return ClinicalUrgency.ROUTINE
     
     def _evaluate_rules(self, text: str, has_image: bool, 
-                       context: ClinicalContext, urgency: ClinicalUrgency) -> Tuple[List[TriageRule], List[str]]:
+                       context: ClinicalContext, urgency: ClinicalUrgency,
+                       hits: Optional[FrozenSet[str]] = None) -> Tuple[List[TriageRule], List[str]]:
         """Evaluar reglas de triage."""
+        if hits is None:
+            hits = self.matcher.scan(text)
+        
         matched_rules = []
         clinical_flags = []
         
-        # Evaluar cada regla
-        for rule in sorted(self.rules, key=lambda r: r.priority, reverse=True):
-            if self._evaluate_rule_condition(rule, text, has_image, context, urgency):
+        # Evaluar cada regla (ya ordenadas por prioridad)
+        for rule in self._rules_by_priority:
+            if self._evaluate_rule_condition(rule, hits, has_image, context, urgency):
                 matched_rules.append(rule)
                 clinical_flags.extend(rule.flags)
         
         # Si no hay reglas específicas, usar default
-        if not matched_rules:
-            default_rule = next((r for r in self.rules if r.rule_id == "DEF001"), None)
-            if default_rule:
-                matched_rules.append(default_rule)
-                clinical_flags.extend(default_rule.flags)
+        if not matched_rules and self._default_rule:
+            matched_rules.append(self._default_rule)
+            clinical_flags.extend(self._default_rule.flags)
         
         return matched_rules, list(set(clinical_flags))
     
-    def _evaluate_rule_condition(self, rule: TriageRule, text: str, 
+    def _evaluate_rule_condition(self, rule: TriageRule, hits: FrozenSet[str], 
                                 has_image: bool, context: ClinicalContext, 
                                 urgency: ClinicalUrgency) -> bool:
-        """Evaluar condición de una regla específica."""
+        """Evaluar condición de una regla sobre las categorías encontradas."""
         condition = rule.condition
         
         if condition == "emergency_keywords":
             return urgency == ClinicalUrgency.EMERGENCY
         
         elif condition == "severe_pain":
-            pain_patterns = [
-                r'dolor\s+(severo|intenso|insoportable)',
-                r'severe\s+pain',
-                r'intense\s+pain'
-            ]
-            return any(re.search(p, text, re.IGNORECASE) for p in pain_patterns)
+            return "severe_pain" in hits
         
         elif condition == "has_image_and_patient_code":
-            if not has_image:
-                return False
-            patient_code_found = any(
-                pattern.search(text) 
-                for pattern in self.clinical_patterns["patient_code"]
-            )
-            return patient_code_found
+            return has_image and "patient_code" in hits
         
         elif condition == "pressure_injury_keywords":
-            return any(
-                pattern.search(text)
-                for pattern in self.clinical_patterns["pressure_injury"]
-            )
+            return "pressure_injury" in hits
         
         elif condition == "protocol_request":
-            return any(
-                pattern.search(text)
-                for pattern in self.clinical_patterns["protocol"]
-            )
+            return "protocol" in hits
         
         elif condition == "medication_query":
-            return any(
-                pattern.search(text)
-                for pattern in self.clinical_patterns["medication"]
-            )
+            return "medication" in hits
         
         elif condition == "image_without_patient_code":
-            if not has_image:
-                return False
-            patient_code_found = any(
-                pattern.search(text)
-                for pattern in self.clinical_patterns["patient_code"]
-            )
-            return not patient_code_found
+            return has_image and "patient_code" not in hits
         
         elif condition == "default":
             return True
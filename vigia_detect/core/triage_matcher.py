@@ -0,0 +1,109 @@
+"""
+Triage Matcher - Búsqueda multi-patrón de una sola pasada
+Compila una vez las palabras clave de todas las categorías del triage
+(emergencia, LPP, protocolo, medicación, código de paciente, dolor...) en un
+único escáner y recorre el mensaje normalizado una sola vez, devolviendo el
+conjunto de categorías encontradas. Las reglas se evalúan sobre ese conjunto
+sin volver a escanear el texto.
+"""
+
+import re
+from typing import Dict, FrozenSet, List, Mapping, Sequence, Tuple
+
+NO_HITS: FrozenSet[str] = frozenset()
+
+_REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+_QUANTIFIERS = set("?*+{")
+
+
+def normalize_message(text: str) -> str:
+    """Normalización aplicada antes de escanear (minúsculas)."""
+    return text.lower()
+
+
+def whole_words(*words: str) -> List[str]:
+    """Fragmentos que además deben terminar en límite de palabra."""
+    return [rf"{word}\b" for word in words]
+
+
+def _alternation(fragments: Sequence[str]) -> str:
+    """
+    Alternancia de fragmentos agrupados por su primer carácter literal.
+
+    El motor `re` prueba cada alternativa en cada posición; agrupar por el
+    primer carácter reduce las alternativas probadas por palabra a una sola
+    rama, que es lo que mantiene el escaneo bajo el milisegundo.
+    """
+    groups: Dict[str, List[str]] = {}
+    generic = []
+    for fragment in dict.fromkeys(fragments):
+        head = fragment[:1]
+        if not head:
+            raise ValueError("Empty triage keyword")
+        if head in _REGEX_SPECIAL or fragment[1:2] in _QUANTIFIERS:
+            generic.append(f"(?:{fragment})")
+        else:
+            groups.setdefault(head, []).append(fragment[1:])
+
+    branches = [
+        f"{re.escape(head)}(?:{'|'.join(tails)})"
+        for head, tails in groups.items()
+    ]
+    return r"\b(?:" + "|".join(branches + generic) + ")"
+
+
+class TriageMatcher:
+    """
+    Matcher multi-categoría compilado una sola vez.
+
+    Cada categoría es una lista de fragmentos regex en minúsculas que deben
+    coincidir al inicio de una palabra. `scan` salta entre inicios de palabra
+    con el escáner combinado y, en cada coincidencia, comprueba qué categorías
+    pendientes coinciden en esa posición; termina en cuanto todas las
+    categorías fueron vistas.
+    """
+
+    def __init__(self, categories: Mapping[str, Sequence[str]]):
+        if not categories:
+            raise ValueError("TriageMatcher requires at least one category")
+
+        matchers = []
+        fragments = []
+        for category, keywords in categories.items():
+            if not keywords:
+                raise ValueError(f"Empty triage category: {category}")
+            matchers.append((category, re.compile(_alternation(keywords))))
+            fragments.extend(keywords)
+
+        self.categories: Tuple[str, ...] = tuple(categories)
+        self._matchers: Tuple[Tuple[str, "re.Pattern"], ...] = tuple(matchers)
+        self._scanner = re.compile(_alternation(fragments))
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """Categorías con al menos una coincidencia en el mensaje."""
+        if not text:
+            return NO_HITS
+
+        normalized = normalize_message(text)
+        search = self._scanner.search
+        pending = self._matchers
+        hits = []
+        position = 0
+
+        while pending:
+            found = search(normalized, position)
+            if found is None:
+                break
+
+            start = found.start()
+            remaining = []
+            for entry in pending:
+                if entry[1].match(normalized, start):
+                    hits.append(entry[0])
+                else:
+                    remaining.append(entry)
+
+            pending = remaining
+            position = start + 1
+
+        return frozenset(hits) if hits else NO_HITS
@@ -4,14 +4,17 @@ Eliminates code duplication between CLI, WhatsApp, and other interfaces.
 """
 import os
 import logging
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Callable, Iterator
 from pathlib import Path
 from datetime import datetime
 import uuid
 
 from config.settings import settings
 from .base_client_v2 import BaseClientV2
+from .batch_pipeline import PipelinedBatchRunner
 from ..cv_pipeline import Detector, Preprocessor
+from ..cv_pipeline.image_buffer import get_buffer_pool
+from ..cv_pipeline.tiled_inference import TileConfig, TiledDetector, TiledImage
 from ..utils.image_utils import (
     is_valid_image, 
     save_detection_visualization, 
@@ -50,6 +53,17 @@ class UnifiedImageProcessor(BaseClientV2):
             # Initialize preprocessor
             self.preprocessor = Preprocessor()
             
+            # Tiled inference keeps full-resolution detail on large photos
+            self.tile_config = None
+            self.tiled_detector = None
+            if getattr(self.settings, 'tiled_inference', False):
+                self.tile_config = TileConfig(
+                    tile_size=self.settings.tile_size,
+                    overlap=self.settings.tile_overlap,
+                    max_tiles=self.settings.max_tiles
+                )
+                self.tiled_detector = TiledDetector(self.detector, self.tile_config)
+            
             self.logger.info(f"Unified image processor initialized")
             
         except Exception as e:
@@ -86,57 +100,18 @@ class UnifiedImageProcessor(BaseClientV2):
             Dict with processing results
         """
         processing_id = str(uuid.uuid4())
-        start_time = datetime.now()
         
         try:
-            self.logger.info(f"Processing image: {image_path} (ID: {processing_id})")
-            
-            # Validate image
-            if not is_valid_image(image_path):
-                return self._create_error_result(
-                    "Invalid image file",
-                    image_path,
-                    processing_id
-                )
-            
-            # Preprocess image
-            processed_img, preprocessing_metadata = self._preprocess_image(image_path)
-            
-            # Detect lesions
-            detection_results = self.detector.detect(processed_img)
-            
-            # Enrich results with medical context
-            enriched_results = self._enrich_detection_results(
-                detection_results, 
-                preprocessing_metadata,
-                patient_code,
-                metadata
+            state = self._prepare_stage(image_path, processing_id)
+            state = self._detect_stage(state)
+            return self._finalize_stage(
+                state,
+                patient_code=patient_code,
+                save_visualization=save_visualization,
+                output_dir=output_dir,
+                metadata=metadata
             )
             
-            # Save visualization if requested
-            if save_visualization and output_dir:
-                viz_path = self._save_visualization(
-                    image_path,
-                    enriched_results,
-                    output_dir,
-                    processing_id
-                )
-                enriched_results["visualization_path"] = viz_path
-            
-            # Calculate processing time
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            return {
-                "success": True,
-                "processing_id": processing_id,
-                "processing_time_seconds": processing_time,
-                "image_path": image_path,
-                "patient_code": patient_code,
-                "results": enriched_results,
-                "timestamp": datetime.now().isoformat(),
-                "processor_version": "unified_v1.0"
-            }
-            
         except Exception as e:
             self.logger.error(f"Error processing image {image_path}: {str(e)}")
             return self._create_error_result(
@@ -145,6 +120,88 @@ class UnifiedImageProcessor(BaseClientV2):
                 processing_id
             )
     
+    def _prepare_stage(self, image_path: str, processing_id: str) -> Dict[str, Any]:
+        """Validate and preprocess an image (I/O-bound stage)"""
+        state = {
+            "image_path": image_path,
+            "processing_id": processing_id,
+            "start_time": datetime.now()
+        }
+        
+        self.logger.info(f"Processing image: {image_path} (ID: {processing_id})")
+        
+        # Validate image
+        if not is_valid_image(image_path):
+            state["error"] = "Invalid image file"
+            return state
+        
+        # Preprocess image
+        state["processed_img"], state["preprocessing_metadata"] = self._preprocess_image(image_path)
+        return state
+    
+    def _detect_stage(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run lesion detection (compute-bound stage)"""
+        if "error" not in state:
+            buffer = state.pop("processed_img")
+            try:
+                if isinstance(buffer, TiledImage):
+                    state["detection_results"] = self.tiled_detector.detect(buffer)
+                else:
+                    state["detection_results"] = self.detector.detect(buffer)
+            finally:
+                # Return the preprocessed array to the pool for the next image
+                buffer.release()
+        return state
+    
+    def _finalize_stage(self,
+                        state: Dict[str, Any],
+                        patient_code: Optional[str] = None,
+                        save_visualization: bool = False,
+                        output_dir: Optional[str] = None,
+                        metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Enrich results and save visualization (I/O-bound stage)"""
+        image_path = state["image_path"]
+        processing_id = state["processing_id"]
+        
+        if "error" in state:
+            return self._create_error_result(
+                state["error"],
+                image_path,
+                processing_id
+            )
+        
+        # Enrich results with medical context
+        enriched_results = self._enrich_detection_results(
+            state["detection_results"],
+            state["preprocessing_metadata"],
+            patient_code,
+            metadata
+        )
+        
+        # Save visualization if requested
+        if save_visualization and output_dir:
+            viz_path = self._save_visualization(
+                image_path,
+                enriched_results,
+                output_dir,
+                processing_id
+            )
+            enriched_results["visualization_path"] = viz_path
+        
+        # Calculate processing time
+        processing_time = (datetime.now() - state["start_time"]).total_seconds()
+        
+        return {
+            "success": True,
+            "processing_id": processing_id,
+            "processing_time_seconds": processing_time,
+            "image_path": image_path,
+            "patient_code": patient_code,
+            "results": enriched_results,
+            "timestamp": datetime.now().isoformat(),
+            "processor_version": "unified_v1.0"
+        }
+    
     async def process_image_async(self, image_path: str, token_id: str = None, patient_context: dict = None):
         """Simple async wrapper for dashboard compatibility"""
         import asyncio
@@ -194,16 +251,22 @@ class UnifiedImageProcessor(BaseClientV2):
                               patient_code: Optional[str] = None,
                               save_visualizations: bool = False,
                               output_dir: Optional[str] = None,
-                              batch_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                              batch_metadata: Optional[Dict[str, Any]] = None,
+                              on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Process multiple images in batch.
         
+        Images flow through a bounded pipeline (see stream_multiple_images),
+        so decode and visualization of some images overlap with detection of
+        others. Results are returned in input order.
+        
         Args:
             image_paths: List of image file paths
             patient_code: Patient identifier (optional)
             save_visualizations: Whether to save detection visualizations
             output_dir: Directory to save results
             batch_metadata: Additional metadata for the batch
+            on_result: Called with (index, result) as each image finishes
             
         Returns:
             Dict with batch processing results
@@ -213,27 +276,28 @@ class UnifiedImageProcessor(BaseClientV2):
         
         self.logger.info(f"Processing batch of {len(image_paths)} images (Batch ID: {batch_id})")
         
-        results = []
+        runner = PipelinedBatchRunner()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(image_paths)
         successful_count = 0
         failed_count = 0
         
-        for i, image_path in enumerate(image_paths):
-            self.logger.info(f"Processing image {i+1}/{len(image_paths)}: {image_path}")
-            
-            result = self.process_single_image(
-                image_path=image_path,
-                patient_code=patient_code,
-                save_visualization=save_visualizations,
-                output_dir=output_dir,
-                metadata=batch_metadata
-            )
-            
-            results.append(result)
+        for index, result in self.stream_multiple_images(
+            image_paths,
+            patient_code=patient_code,
+            save_visualizations=save_visualizations,
+            output_dir=output_dir,
+            batch_metadata=batch_metadata,
+            runner=runner
+        ):
+            results[index] = result
             
             if result["success"]:
                 successful_count += 1
             else:
                 failed_count += 1
+            
+            if on_result:
+                on_result(index, result)
         
         processing_time = (datetime.now() - start_time).total_seconds()
         
@@ -243,28 +307,80 @@ class UnifiedImageProcessor(BaseClientV2):
             "successful_count": successful_count,
             "failed_count": failed_count,
             "processing_time_seconds": processing_time,
+            "stage_times_seconds": runner.get_stage_times(),
             "patient_code": patient_code,
             "results": results,
             "timestamp": datetime.now().isoformat(),
             "processor_version": "unified_v1.0"
         }
     
+    def stream_multiple_images(self,
+                               image_paths: List[str],
+                               patient_code: Optional[str] = None,
+                               save_visualizations: bool = False,
+                               output_dir: Optional[str] = None,
+                               batch_metadata: Optional[Dict[str, Any]] = None,
+                               runner: Optional[PipelinedBatchRunner] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Process images through a pipelined batch and yield results as they finish.
+        
+        Validation/preprocessing and enrichment/visualization run on thread
+        pools while detection runs on a single thread, so the detector is
+        never called concurrently.
+        
+        Args:
+            image_paths: List of image file paths
+            patient_code: Patient identifier (optional)
+            save_visualizations: Whether to save detection visualizations
+            output_dir: Directory to save results
+            batch_metadata: Additional metadata for the batch
+            runner: Pipeline runner to use (default: a new PipelinedBatchRunner)
+            
+        Yields:
+            (index into image_paths, result) in completion order
+        """
+        runner = runner or PipelinedBatchRunner()
+        items = [(image_path, str(uuid.uuid4())) for image_path in image_paths]
+        
+        def on_error(item: Tuple[str, str], error: Exception) -> Dict[str, Any]:
+            image_path, processing_id = item
+            self.logger.error(f"Error processing image {image_path}: {str(error)}")
+            return self._create_error_result(str(error), image_path, processing_id)
+        
+        yield from runner.run(
+            items,
+            prepare=lambda item: self._prepare_stage(*item),
+            detect=self._detect_stage,
+            finalize=lambda state: self._finalize_stage(
+                state,
+                patient_code=patient_code,
+                save_visualization=save_visualizations,
+                output_dir=output_dir,
+                metadata=batch_metadata
+            ),
+            on_error=on_error
+        )
+    
     def _preprocess_image(self, image_path: str) -> Tuple[Any, Dict[str, Any]]:
         """Preprocess image and return processed image with metadata"""
         try:
-            # Get original image size before preprocessing
-            from PIL import Image
-            with Image.open(image_path) as img:
-                original_size = img.size
-            
-            processed_img = self.preprocessor.preprocess(image_path)
+            # Decoded once into pooled buffers that the detector reads directly
+            if self.tile_config:
+                processed_img = self.preprocessor.preprocess_tiles(image_path, self.tile_config, pool=get_buffer_pool())
+                processed_size = (self.tile_config.tile_size, self.tile_config.tile_size, 3)
+            else:
+                processed_img = self.preprocessor.preprocess_buffer(image_path, pool=get_buffer_pool())
+                processed_size = processed_img.shape
             
             metadata = {
-                "original_size": original_size,
-                "processed_size": processed_img.shape if hasattr(processed_img, 'shape') else None,
+                "original_size": processed_img.original_size,
+                "processed_size": processed_size,
                 "preprocessing_info": self.preprocessor.get_preprocessor_info(),
-                "anonymized": True  # Always anonymize for privacy
+                "anonymized": True,  # Always anonymize for privacy
+                "anonymization": processed_img.metadata.get("anonymization")
             }
+            if self.tile_config:
+                metadata["tiles"] = len(processed_img.tiles)
             
             return processed_img, metadata
             
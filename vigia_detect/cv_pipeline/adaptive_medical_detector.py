@@ -9,6 +9,7 @@ Features:
 - MONAI medical-grade preprocessing and detection (90-95% precision)
 - YOLOv5 intelligent backup with emergency mode (85-90% precision)
 - Timeout-aware adaptive routing (8s timeout for MONAI)
+- Dynamic batching of concurrent requests per engine
 - Enhanced confidence scoring and medical validation
 - Complete audit trail with engine selection reasoning
 - HIPAA-compliant Batman tokenization support
@@ -24,14 +25,13 @@ import torch
 import cv2
 import numpy as np
 import logging
-import gzip
-import base64
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple, Union
 from enum import Enum
 from dataclasses import dataclass, asdict
 from datetime import datetime
 import json
+import uuid
 
 # MONAI imports (medical-grade AI)
 try:
@@ -48,16 +48,60 @@ except ImportError:
 
 # Vigia components
 from .real_lpp_detector import PressureUlcerDetector
+from .onnx_backend import OnnxLPPDetector, ONNXRUNTIME_AVAILABLE
+from .inference_scheduler import DynamicBatchScheduler
+from .detection_cache import DetectionCache
+from .model_registry import get_model_registry
+from .image_buffer import ImageBuffer
 from ..utils.audit_service import AuditService
 from ..db.raw_outputs_client import RawOutputsClient
+from ..db.raw_output_codec import get_raw_output_codec
 
 logger = logging.getLogger(__name__)
 
 
+def load_monai_model(model_path: Optional[str], device: torch.device) -> torch.nn.Module:
+    """
+    Load the MONAI medical model once per process and device.
+    
+    Args:
+        model_path: Path to trained weights (random initialization if missing)
+        device: Device to place the model on
+        
+    Returns:
+        Shared MONAI model in eval mode
+    """
+    if not MONAI_AVAILABLE:
+        raise ImportError("MONAI not available")
+    
+    def load():
+        # For demonstration - in production, load actual trained MONAI model
+        # This would be a DenseNet121 or similar medical model trained on pressure ulcer data
+        model = DenseNet121(
+            spatial_dims=2,
+            in_channels=3,
+            out_channels=5,  # 5 LPP stages (0-4)
+            pretrained=False
+        ).to(device)
+        
+        # Load trained weights if available
+        if model_path and Path(model_path).exists():
+            checkpoint = torch.load(model_path, map_location=device)
+            model.load_state_dict(checkpoint['model_state_dict'])
+            logger.info(f"Loaded MONAI model weights: {model_path}")
+        else:
+            logger.warning("MONAI model weights not found - using random initialization")
+        
+        return model.eval()
+    
+    return get_model_registry().get_or_load("monai", model_path, device, load)
+
+
 class DetectionEngine(Enum):
     """Available detection engines"""
     MONAI_PRIMARY = "monai_primary"
     YOLO_BACKUP = "yolo_backup"
+    YOLO_ONNX = "yolo_onnx"  # Exported YOLOv5 on ONNX Runtime (CPU)
     MOCK = "mock"
 
 
@@ -109,6 +153,7 @@ class MedicalAssessment:
     detection_metrics: DetectionMetrics
     token_id: str  # Batman token for HIPAA compliance
     raw_outputs: Optional[RawOutputCapture] = None  # Raw AI outputs for research
+    cache_hit: bool = False  # Result served from the detection cache
 
 
 class AdaptiveMedicalDetector:
@@ -127,7 +172,14 @@ class AdaptiveMedicalDetector:
                  yolo_model_path: Optional[str] = None,
                  monai_timeout: float = 8.0,
                  confidence_threshold_monai: float = 0.7,
-                 confidence_threshold_yolo: float = 0.6):
+                 confidence_threshold_yolo: float = 0.6,
+                 max_batch_size: int = 8,
+                 max_batch_wait_ms: float = 10.0,
+                 detection_cache: Optional[DetectionCache] = None,
+                 enable_detection_cache: bool = True,
+                 yolo_onnx_path: Optional[str] = None,
+                 onnx_threads: Optional[int] = None,
+                 onnx_cores: Optional[List[int]] = None):
         """
         Initialize adaptive medical detector.
         
@@ -137,12 +189,24 @@ class AdaptiveMedicalDetector:
             monai_timeout: Timeout for MONAI processing (seconds)
             confidence_threshold_monai: Confidence threshold for MONAI
             confidence_threshold_yolo: Confidence threshold for YOLOv5
+            max_batch_size: Maximum images per forward pass for each engine
+            max_batch_wait_ms: Maximum wait for a batch to fill on an idle engine
+            detection_cache: Cache of detection results by image hash
+                (default: in-memory DetectionCache)
+            enable_detection_cache: Use a detection cache at all
+            yolo_onnx_path: Exported YOLOv5 ONNX model; when set, the YOLO
+                backup runs on ONNX Runtime (eager YOLOv5 stays as emergency backup)
+            onnx_threads: ONNX Runtime intra-op threads (physical cores if None)
+            onnx_cores: CPU cores to pin ONNX Runtime threads to
         """
         self.monai_model_path = monai_model_path
         self.yolo_model_path = yolo_model_path
         self.monai_timeout = monai_timeout
         self.confidence_threshold_monai = confidence_threshold_monai
         self.confidence_threshold_yolo = confidence_threshold_yolo
+        self.yolo_onnx_path = yolo_onnx_path
+        self.onnx_threads = onnx_threads
+        self.onnx_cores = onnx_cores
         
         # Initialize audit service
         self.audit_service = AuditService()
@@ -153,6 +217,7 @@ class AdaptiveMedicalDetector:
         # Initialize models
         self.monai_model = None
         self.yolo_detector = None
+        self.yolo_onnx_detector = None
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         
         # Medical preprocessing pipeline
@@ -161,9 +226,27 @@ class AdaptiveMedicalDetector:
         # Performance metrics
         self.engine_stats = {
             DetectionEngine.MONAI_PRIMARY: {'attempts': 0, 'successes': 0, 'avg_time': 0.0},
-            DetectionEngine.YOLO_BACKUP: {'attempts': 0, 'successes': 0, 'avg_time': 0.0}
+            DetectionEngine.YOLO_BACKUP: {'attempts': 0, 'successes': 0, 'avg_time': 0.0},
+            DetectionEngine.YOLO_ONNX: {'attempts': 0, 'successes': 0, 'avg_time': 0.0}
         }
         
+        # Dynamic batching: concurrent requests share forward passes per engine
+        self.inference_schedulers = {
+            DetectionEngine.MONAI_PRIMARY: DynamicBatchScheduler(
+                "monai", self._monai_batch_inference, max_batch_size, max_batch_wait_ms
+            ),
+            DetectionEngine.YOLO_BACKUP: DynamicBatchScheduler(
+                "yolo", self._yolo_batch_inference, max_batch_size, max_batch_wait_ms
+            ),
+            DetectionEngine.YOLO_ONNX: DynamicBatchScheduler(
+                "yolo_onnx", self._yolo_onnx_batch_inference, max_batch_size, max_batch_wait_ms
+            )
+        }
+        
+        # Detection results by image hash, scoped by engine and model version
+        self.detection_cache = (detection_cache or DetectionCache()) if enable_detection_cache else None
+        self.model_versions: Dict[DetectionEngine, str] = {}
+        
         self._initialize_engines()
     
     def _setup_monai_transforms(self) -> Optional[Compose]:
@@ -172,7 +255,7 @@ class AdaptiveMedicalDetector:
             return None
             
         return Compose([
-            EnsureChannelFirst(),
+            EnsureChannelFirst(channel_dim=-1),  # Images are loaded as HWC
             ScaleIntensity(minv=0.0, maxv=1.0),
             NormalizeIntensity(subtrahend=0.5, divisor=0.5),  # Medical normalization
             Resize((512, 512)),  # Medical standard resolution
@@ -198,40 +281,65 @@ class AdaptiveMedicalDetector:
         # Initialize YOLOv5 (backup)
         try:
             self.yolo_detector = PressureUlcerDetector(self.yolo_model_path)
+            self._set_model_version(
+                DetectionEngine.YOLO_BACKUP,
+                getattr(self.yolo_detector, 'model_path', self.yolo_model_path)
+            )
             logger.info("✅ YOLOv5 backup engine initialized")
         except Exception as e:
             logger.error(f"YOLOv5 backup initialization failed: {e}")
             logger.warning("Running in mock mode only")
+        
+        # Initialize ONNX Runtime YOLOv5 (CPU-optimized backup)
+        if self.yolo_onnx_path:
+            if not ONNXRUNTIME_AVAILABLE:
+                logger.warning("onnxruntime not available - ONNX backend disabled")
+            else:
+                try:
+                    self.yolo_onnx_detector = OnnxLPPDetector(
+                        self.yolo_onnx_path,
+                        intra_op_threads=self.onnx_threads,
+                        cores=self.onnx_cores
+                    )
+                    self._set_model_version(DetectionEngine.YOLO_ONNX, self.yolo_onnx_path)
+                    logger.info("✅ YOLOv5 ONNX Runtime engine initialized")
+                except Exception as e:
+                    logger.warning(f"ONNX backend initialization failed: {e}")
     
     def _load_monai_model(self):
         """Load MONAI medical model"""
         if not MONAI_AVAILABLE:
             raise ImportError("MONAI not available")
         
-        # For demonstration - in production, load actual trained MONAI model
-        # This would be a DenseNet121 or similar medical model trained on pressure ulcer data
-        self.monai_model = DenseNet121(
-            spatial_dims=2,
-            in_channels=3,
-            out_channels=5,  # 5 LPP stages (0-4)
-            pretrained=False
-        ).to(self.device)
+        # Shared across detectors: weights load once per process and device
+        self.monai_model = load_monai_model(self.monai_model_path, self.device)
+        self._set_model_version(DetectionEngine.MONAI_PRIMARY, self.monai_model_path)
+    
+    def _set_model_version(self, engine: DetectionEngine, model_path: Optional[str]):
+        """
+        Record the model version of an engine and drop its cached results.
         
-        # Load trained weights if available
-        if self.monai_model_path and Path(self.monai_model_path).exists():
-            checkpoint = torch.load(self.monai_model_path, map_location=self.device)
-            self.monai_model.load_state_dict(checkpoint['model_state_dict'])
-            logger.info(f"Loaded MONAI model weights: {self.monai_model_path}")
+        Trained weights are identified by file name, size and mtime, so
+        workers loading the same file share Redis cache entries. Randomly
+        initialized or mock models get a unique version per load.
+        """
+        weights = Path(model_path) if model_path else None
+        if weights is not None and weights.exists():
+            stat = weights.stat()
+            version = f"{weights.name}:{stat.st_size}:{int(stat.st_mtime)}"
         else:
-            logger.warning("MONAI model weights not found - using random initialization")
+            version = f"untrained:{uuid.uuid4().hex[:12]}"
         
-        self.monai_model.eval()
+        self.model_versions[engine] = version
+        if self.detection_cache is not None:
+            self.detection_cache.invalidate(engine.value)
     
     async def detect_medical_condition(self, 
                                      image_path: str, 
                                      token_id: str,
                                      patient_context: Optional[Dict[str, Any]] = None,
-                                     force_engine: Optional[DetectionEngine] = None) -> MedicalAssessment:
+                                     force_engine: Optional[DetectionEngine] = None,
+                                     image: Optional[ImageBuffer] = None) -> MedicalAssessment:
         """
         Detect medical condition using adaptive engine selection.
         
@@ -240,6 +348,7 @@ class AdaptiveMedicalDetector:
             token_id: Batman token ID (HIPAA compliant)
             patient_context: Medical context for assessment
             force_engine: Force specific engine (for testing)
+            image: Already decoded image (skips reading image_path again)
             
         Returns:
             MedicalAssessment with comprehensive medical analysis
@@ -267,8 +376,13 @@ class AdaptiveMedicalDetector:
             # Continue processing even if audit fails
         
         try:
-            # Load and preprocess image
-            image = self._load_medical_image(image_path)
+            # Load and preprocess image (a caller-decoded buffer is used as is)
+            image_bytes = None
+            if image is not None:
+                image = image.as_rgb()
+            else:
+                image_bytes = Path(image_path).read_bytes()
+                image = self._decode_medical_image(image_bytes, image_path)
             
             # Adaptive engine selection
             if force_engine:
@@ -276,13 +390,30 @@ class AdaptiveMedicalDetector:
             else:
                 engine, reason = await self._select_optimal_engine(image, patient_context)
             
+            # Resubmitted images are served from the detection cache
+            cache_key = None
+            detection_result = None
+            model_version = self.model_versions.get(engine)
+            if self.detection_cache is not None and model_version is not None:
+                # File contents when the file was read, decoded pixels otherwise
+                # (separate key namespaces, the two hashes never match)
+                if image_bytes is not None:
+                    cache_key = self.detection_cache.make_key(image_bytes, image)
+                else:
+                    cache_key = self.detection_cache.make_pixel_key(image)
+                detection_result = await self.detection_cache.get(engine.value, model_version, cache_key)
+            cache_hit = detection_result is not None
+            
             # Run detection with selected engine
-            detection_result = await self._run_detection(image, engine, token_id)
+            if not cache_hit:
+                detection_result = await self._run_detection(image, engine, token_id)
+                await self._cache_detection_result(engine, model_version, cache_key, detection_result)
             
             # Create medical assessment
             assessment = self._create_medical_assessment(
                 detection_result, engine, reason, start_time, token_id, patient_context
             )
+            assessment.cache_hit = cache_hit
             
             # Store raw outputs if available
             if assessment.raw_outputs:
@@ -315,6 +446,7 @@ class AdaptiveMedicalDetector:
                         "confidence": assessment.confidence,
                         "processing_time": assessment.detection_metrics.processing_time,
                         "medical_grade": assessment.detection_metrics.medical_grade,
+                        "cache_hit": cache_hit,
                         "token_id": token_id
                     }
                 )
@@ -372,7 +504,7 @@ class AdaptiveMedicalDetector:
         """
         # Check MONAI availability
         if not self.monai_model or not MONAI_AVAILABLE:
-            return DetectionEngine.YOLO_BACKUP, EngineSelectionReason.MONAI_UNAVAILABLE
+            return self._backup_engine(), EngineSelectionReason.MONAI_UNAVAILABLE
         
         # Priority medical cases always use MONAI
         if patient_context:
@@ -386,6 +518,12 @@ class AdaptiveMedicalDetector:
         # Default to MONAI primary for medical quality
         return DetectionEngine.MONAI_PRIMARY, EngineSelectionReason.MONAI_SUCCESS
     
+    def _backup_engine(self) -> DetectionEngine:
+        """YOLO backend used as backup: ONNX Runtime when loaded, else eager"""
+        if self.yolo_onnx_detector is not None:
+            return DetectionEngine.YOLO_ONNX
+        return DetectionEngine.YOLO_BACKUP
+    
     async def _run_detection(self, 
                            image: np.ndarray, 
                            engine: DetectionEngine, 
@@ -403,8 +541,8 @@ class AdaptiveMedicalDetector:
         """
         if engine == DetectionEngine.MONAI_PRIMARY:
             return await self._run_monai_detection(image, token_id)
-        elif engine == DetectionEngine.YOLO_BACKUP:
-            return await self._run_yolo_detection(image, token_id)
+        elif engine in (DetectionEngine.YOLO_BACKUP, DetectionEngine.YOLO_ONNX):
+            return await self._run_yolo_detection(image, token_id, engine)
         else:
             return self._generate_mock_detection(image)
     
@@ -427,7 +565,7 @@ class AdaptiveMedicalDetector:
             if self.monai_transforms:
                 processed_image = self.monai_transforms(image)
                 if isinstance(processed_image, MetaTensor):
-                    processed_image = processed_image.tensor
+                    processed_image = processed_image.as_tensor()
                 
                 # Add batch dimension
                 if len(processed_image.shape) == 3:
@@ -438,18 +576,17 @@ class AdaptiveMedicalDetector:
                 # Fallback preprocessing
                 processed_image = torch.from_numpy(image).permute(2, 0, 1).unsqueeze(0).float().to(self.device)
             
-            # Run detection with timeout
-            with torch.no_grad():
-                # Simulate timeout-aware processing
-                detection_task = asyncio.create_task(self._monai_inference(processed_image))
-                
-                try:
-                    predictions = await asyncio.wait_for(detection_task, timeout=self.monai_timeout)
-                except asyncio.TimeoutError:
-                    raise TimeoutError(f"MONAI detection timeout after {self.monai_timeout}s")
+            # Run detection with timeout (a timed-out request leaves its batch)
+            try:
+                predictions = await asyncio.wait_for(
+                    self._monai_inference(processed_image), timeout=self.monai_timeout
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"MONAI detection timeout after {self.monai_timeout}s")
             
-            # Capture raw outputs for research and audit
-            raw_outputs = self._capture_monai_raw_outputs(predictions)
+            # Capture raw outputs for research and audit (serialized off the event loop)
+            loop = asyncio.get_running_loop()
+            raw_outputs = await loop.run_in_executor(None, self._capture_monai_raw_outputs, predictions)
             
             # Process MONAI predictions
             results = self._process_monai_predictions(predictions, image.shape)
@@ -482,15 +619,57 @@ class AdaptiveMedicalDetector:
         """
         Run MONAI model inference (async wrapper for timeout handling).
         
+        The tensor is queued on the MONAI scheduler and batched with
+        concurrent requests.
+        
         Args:
-            processed_image: Preprocessed medical image tensor
+            processed_image: Preprocessed medical image tensor (1, C, H, W)
             
         Returns:
-            MONAI predictions
+            MONAI predictions for this image (1, num_classes)
+        """
+        return await self.inference_schedulers[DetectionEngine.MONAI_PRIMARY].submit(processed_image)
+    
+    def _monai_batch_inference(self, tensors: List[torch.Tensor]) -> List[torch.Tensor]:
+        """
+        Run one MONAI forward pass per input shape (inference thread).
+        
+        Args:
+            tensors: Preprocessed tensors, each (1, C, H, W)
+            
+        Returns:
+            Predictions per input, in input order
+        """
+        results: List[Optional[torch.Tensor]] = [None] * len(tensors)
+        
+        # Transformed inputs share one shape; fallback-preprocessed ones may not
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for index, tensor in enumerate(tensors):
+            groups.setdefault(tuple(tensor.shape[1:]), []).append(index)
+        
+        with torch.no_grad():
+            for indices in groups.values():
+                batch = torch.cat([tensors[i] for i in indices], dim=0)
+                predictions = self.monai_model(batch)
+                for row, index in enumerate(indices):
+                    results[index] = predictions[row:row + 1]
+        
+        return results
+    
+    def _yolo_batch_inference(self, images: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """
+        Run YOLOv5 detection on a batch of images (inference thread).
+        
+        Inference errors are raised rather than returned as empty detection
+        lists, so a failed run is never cached as an image without lesions.
         """
-        # Run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.monai_model, processed_image)
+        if hasattr(self.yolo_detector, 'detect_batch'):
+            return self.yolo_detector.detect_batch(images, raise_errors=True)
+        return [self.yolo_detector.detect(image, raise_errors=True) for image in images]
+    
+    def _yolo_onnx_batch_inference(self, images: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Run ONNX Runtime YOLOv5 detection on a batch of images (inference thread)."""
+        return self.yolo_onnx_detector.detect_batch(images, raise_errors=True)
     
     def _process_monai_predictions(self, predictions: torch.Tensor, image_shape: Tuple[int, ...]) -> Dict[str, Any]:
         """
@@ -539,26 +718,32 @@ class AdaptiveMedicalDetector:
             'confidence_threshold': self.confidence_threshold_monai
         }
     
-    async def _run_yolo_detection(self, image: np.ndarray, token_id: str) -> Dict[str, Any]:
+    async def _run_yolo_detection(self,
+                                  image: np.ndarray,
+                                  token_id: str,
+                                  engine: DetectionEngine = DetectionEngine.YOLO_BACKUP) -> Dict[str, Any]:
         """
         Run YOLOv5 backup detection.
         
         Args:
             image: Medical image
             token_id: Batman token ID
+            engine: YOLO_BACKUP (eager PyTorch) or YOLO_ONNX (ONNX Runtime)
             
         Returns:
             YOLOv5 detection results
         """
-        self.engine_stats[DetectionEngine.YOLO_BACKUP]['attempts'] += 1
+        stats = self.engine_stats[engine]
+        stats['attempts'] += 1
         start_time = time.time()
         
         try:
-            # Run YOLOv5 detection
-            detections = self.yolo_detector.detect(image)
+            # Run YOLOv5 detection (batched with concurrent requests)
+            detections = await self.inference_schedulers[engine].submit(image)
             
-            # Capture raw outputs for research and audit
-            raw_outputs = self._capture_yolo_raw_outputs(detections)
+            # Capture raw outputs for research and audit (serialized off the event loop)
+            loop = asyncio.get_running_loop()
+            raw_outputs = await loop.run_in_executor(None, self._capture_yolo_raw_outputs, detections)
             
             # Add engine metadata
             for detection in detections:
@@ -567,18 +752,19 @@ class AdaptiveMedicalDetector:
             
             # Update statistics
             processing_time = time.time() - start_time
-            self.engine_stats[DetectionEngine.YOLO_BACKUP]['successes'] += 1
-            self.engine_stats[DetectionEngine.YOLO_BACKUP]['avg_time'] = (
-                (self.engine_stats[DetectionEngine.YOLO_BACKUP]['avg_time'] * 
-                 (self.engine_stats[DetectionEngine.YOLO_BACKUP]['successes'] - 1) + processing_time) /
-                self.engine_stats[DetectionEngine.YOLO_BACKUP]['successes']
+            stats['successes'] += 1
+            stats['avg_time'] = (
+                (stats['avg_time'] * (stats['successes'] - 1) + processing_time) /
+                stats['successes']
             )
             
-            logger.info(f"YOLOv5 detection completed in {processing_time:.2f}s")
+            backend = 'onnxruntime' if engine == DetectionEngine.YOLO_ONNX else 'pytorch'
+            logger.info(f"YOLOv5 detection ({backend}) completed in {processing_time:.2f}s")
             
             return {
                 'detections': detections,
                 'processing_engine': 'yolo',
+                'execution_backend': backend,
                 'medical_grade': False,
                 'confidence_threshold': self.confidence_threshold_yolo,
                 'raw_outputs': raw_outputs
@@ -627,7 +813,20 @@ class AdaptiveMedicalDetector:
         Returns:
             Loaded image as numpy array
         """
-        image = cv2.imread(image_path)
+        return self._decode_medical_image(Path(image_path).read_bytes(), image_path)
+    
+    def _decode_medical_image(self, image_bytes: bytes, image_path: str) -> np.ndarray:
+        """
+        Decode and validate medical image file contents.
+        
+        Args:
+            image_bytes: Encoded image file contents
+            image_path: Path the contents were read from (for errors)
+            
+        Returns:
+            Decoded RGB image as numpy array
+        """
+        image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
         if image is None:
             raise ValueError(f"Could not load medical image: {image_path}")
         
@@ -640,6 +839,28 @@ class AdaptiveMedicalDetector:
         
         return image
     
+    async def _cache_detection_result(self,
+                                      engine: DetectionEngine,
+                                      model_version: Optional[str],
+                                      cache_key,
+                                      detection_result: Dict[str, Any]):
+        """
+        Store a detection result unless the engine fell back to another one.
+        
+        Failed inference never reaches this point: the engines raise instead
+        of returning empty detections (see _yolo_batch_inference).
+        """
+        if cache_key is None or model_version is None:
+            return
+        
+        produced_by = detection_result.get('processing_engine')
+        if produced_by != engine.value.split('_')[0]:
+            return
+        
+        # Raw outputs belong to the original run and are already stored
+        cached = {k: v for k, v in detection_result.items() if k != 'raw_outputs'}
+        await self.detection_cache.put(engine.value, model_version, cache_key, cached)
+    
     def _create_medical_assessment(self, 
                                  detection_result: Dict[str, Any],
                                  engine: DetectionEngine,
@@ -690,7 +911,7 @@ class AdaptiveMedicalDetector:
             processing_time=processing_time,
             confidence_score=confidence,
             selection_reason=reason.value,
-            backup_triggered=engine == DetectionEngine.YOLO_BACKUP,
+            backup_triggered=engine in (DetectionEngine.YOLO_BACKUP, DetectionEngine.YOLO_ONNX),
             medical_grade=medical_grade,
             audit_timestamp=datetime.now()
         )
@@ -739,16 +960,15 @@ class AdaptiveMedicalDetector:
         """
         Compress numpy array for efficient storage.
         
+        The blob carries the array's dtype and shape (see raw_output_codec).
+        
         Args:
             array: Numpy array to compress
             
         Returns:
             Compressed binary data
         """
-        # Convert to bytes and compress with gzip
-        array_bytes = array.tobytes()
-        compressed = gzip.compress(array_bytes)
-        return compressed
+        return get_raw_output_codec().encode(array)
     
     def _capture_monai_raw_outputs(self, 
                                   predictions: torch.Tensor,
@@ -789,6 +1009,7 @@ class AdaptiveMedicalDetector:
         processing_metadata = {
             "prediction_shape": raw_predictions.shape,
             "prediction_dtype": str(raw_predictions.dtype),
+            "raw_output_codec": get_raw_output_codec().compression_method,
             "confidence_threshold": self.confidence_threshold_monai,
             "medical_context": "lpp_detection",
             "timestamp": datetime.now().isoformat()
@@ -894,13 +1115,28 @@ class AdaptiveMedicalDetector:
         return {
             'monai_available': self.monai_model is not None,
             'yolo_available': self.yolo_detector is not None,
+            'yolo_onnx_available': self.yolo_onnx_detector is not None,
             'engine_stats': dict(self.engine_stats),
+            'model_registry': get_model_registry().get_stats(),
+            'model_versions': {engine.value: version for engine, version in self.model_versions.items()},
+            'detection_cache': self.detection_cache.get_stats() if self.detection_cache else None,
+            'batching': {
+                engine.value: scheduler.get_stats()
+                for engine, scheduler in self.inference_schedulers.items()
+            },
             'configuration': {
                 'monai_timeout': self.monai_timeout,
                 'confidence_threshold_monai': self.confidence_threshold_monai,
                 'confidence_threshold_yolo': self.confidence_threshold_yolo
             }
         }
+    
+    async def close(self):
+        """Drain queued inference requests and stop the inference threads"""
+        for scheduler in self.inference_schedulers.values():
+            await scheduler.close()
+        if self.detection_cache is not None:
+            await self.detection_cache.close()
 
 
 # Factory functions for easy integration
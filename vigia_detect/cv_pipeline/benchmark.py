@@ -0,0 +1,384 @@
+"""
+CV Pipeline Benchmarks
+======================
+
+Stage-level latency benchmarks for the computer vision pipeline, run on
+synthetic wound photos so they need no patient data.
+
+Each stage is timed separately at several resolutions:
+- preprocess.decode: JPEG decode (cv2.imdecode)
+- preprocess.load_strip_exif: ImagePreprocessor._load_image (PIL decode,
+  EXIF-free pixel copy)
+- preprocess.face_blur: face detection and blurring
+- preprocess.clahe: contrast enhancement
+- preprocess.resize / preprocess.normalize: resize to the target size and
+  scale to float32 0-1
+- preprocess.total: ImagePreprocessor.preprocess_buffer end to end
+- detector.mock / detector.real: LPPDetector with the simulated model and
+  RealLPPDetector with trained weights (skipped when unavailable)
+- raw_output.encode / raw_output.decode: raw AI output compression
+
+Results are stored as JSON baselines and later runs are compared against
+them; a stage regresses when its median grows beyond the threshold.
+
+Usage:
+    results = run_cv_benchmarks(resolutions=[(1280, 960)], repeats=5)
+    regressions = compare_to_baseline(results, load_baseline(path), threshold=0.25)
+"""
+
+import json
+import logging
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .image_buffer import BufferPool
+from .preprocessor import ImagePreprocessor
+
+logger = logging.getLogger('lpp-detect.benchmark')
+
+BASELINE_VERSION = 1
+DEFAULT_RESOLUTIONS = [(640, 480), (1280, 960), (4032, 3024)]
+DEFAULT_THRESHOLD = 0.25
+# Stages faster than this are too noisy to flag on relative change alone
+DEFAULT_MIN_DELTA_MS = 0.5
+# YOLOv5 raw prediction tensor at 640x640 (25200 anchors, 5 + 5 classes)
+RAW_OUTPUT_SHAPE = (1, 25200, 10)
+
+
+def synthetic_wound_image(width: int, height: int, stage: int = 2, seed: int = 0) -> np.ndarray:
+    """
+    Synthetic BGR photo of a pressure injury on skin.
+
+    Skin-toned background with lighting gradient and texture noise, an
+    elliptical erythema halo and a darker wound bed whose size grows with
+    the stage.
+
+    Args:
+        width: Image width
+        height: Image height
+        stage: LPP stage (1-4) controlling wound size and color
+        seed: Random seed for the texture and wound placement
+
+    Returns:
+        uint8 BGR array (height, width, 3)
+    """
+    rng = np.random.default_rng(seed)
+
+    # Piel con gradiente de iluminación
+    skin = np.array([150, 180, 225], dtype=np.float32)  # BGR
+    gradient = np.linspace(0.8, 1.1, width, dtype=np.float32)[None, :, None]
+    image = np.broadcast_to(skin, (height, width, 3)) * gradient
+    image = image + rng.normal(0, 6, (height, width, 3)).astype(np.float32)
+
+    center = (int(width * rng.uniform(0.35, 0.65)), int(height * rng.uniform(0.35, 0.65)))
+    radius = max(4, int(min(width, height) * (0.05 + 0.04 * stage)))
+    axes = (radius, int(radius * rng.uniform(0.6, 0.9)))
+    angle = float(rng.uniform(0, 180))
+
+    image = np.clip(image, 0, 255).astype(np.uint8)
+
+    # Eritema difuso alrededor de la lesión
+    halo = np.zeros((height, width), dtype=np.uint8)
+    cv2.ellipse(halo, center, (int(axes[0] * 1.6), int(axes[1] * 1.6)), angle, 0, 360, 255, -1)
+    halo = cv2.GaussianBlur(halo, (0, 0), max(1.0, radius / 3)).astype(np.float32)[..., None] / 255.0
+    erythema = np.array([90, 90, 210], dtype=np.float32)
+    image = (image * (1 - 0.6 * halo) + erythema * 0.6 * halo).astype(np.uint8)
+
+    # Lecho de la herida (más oscuro en etapas avanzadas)
+    bed_color = (60, 50, 170) if stage <= 2 else (40, 35, 110)
+    cv2.ellipse(image, center, axes, angle, 0, 360, bed_color, -1)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.ellipse(mask, center, axes, angle, 0, 360, 1, -1)
+    mask = mask.astype(bool)
+    bed_noise = rng.normal(0, 12, (int(mask.sum()), 3))
+    image[mask] = np.clip(image[mask] + bed_noise, 0, 255).astype(np.uint8)
+
+    return image
+
+
+def write_fixture(image: np.ndarray, path: Path, quality: int = 90) -> Path:
+    """Save a BGR fixture as JPEG with camera EXIF, like a phone photo"""
+    exif = Image.Exif()
+    exif[0x010F] = "Vigia"  # Make
+    exif[0x0110] = "Synthetic Wound Camera"  # Model
+    exif[0x0132] = "2024:01:01 12:00:00"  # DateTime
+    Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).save(path, quality=quality, exif=exif)
+    return path
+
+
+def measure(fn: Callable[..., Any],
+            setup: Optional[Callable[[], Tuple]] = None,
+            repeats: int = 5,
+            warmup: int = 1) -> Dict[str, Any]:
+    """
+    Time fn over several runs; only the call itself is timed.
+
+    Args:
+        fn: Callable to benchmark
+        setup: Returns fresh positional arguments for each call (untimed)
+        repeats: Timed runs
+        warmup: Untimed runs before measuring
+
+    Returns:
+        Dict with median_ms, p95_ms, mean_ms, min_ms and repeats
+    """
+    timings = []
+    for run in range(warmup + repeats):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        if run >= warmup:
+            timings.append(elapsed)
+
+    timings.sort()
+    p95_index = min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))
+    return {
+        'median_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(timings[p95_index], 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'min_ms': round(timings[0], 4),
+        'repeats': repeats
+    }
+
+
+def stage_key(stage: str, resolution: Optional[Tuple[int, int]] = None) -> str:
+    """Result key of a stage, e.g. 'preprocess.clahe@1280x960'"""
+    return f"{stage}@{resolution[0]}x{resolution[1]}" if resolution else stage
+
+
+def benchmark_preprocessor(image_path: Path,
+                           preprocessor: ImagePreprocessor,
+                           repeats: int = 5,
+                           warmup: int = 1) -> Dict[str, Dict[str, Any]]:
+    """
+    Time every ImagePreprocessor stage on one fixture.
+
+    Args:
+        image_path: JPEG fixture
+        preprocessor: Preprocessor under test
+        repeats: Timed runs per stage
+        warmup: Untimed runs per stage
+
+    Returns:
+        Stage name -> timing stats
+    """
+    data = Path(image_path).read_bytes()
+    encoded = np.frombuffer(data, dtype=np.uint8)
+    image, _ = preprocessor._load_image(image_path)
+    width, height = preprocessor.target_size
+    resized = cv2.resize(image, preprocessor.target_size)
+    normalized = np.empty((height, width, 3), np.float32)
+    pool = BufferPool()
+
+    stages = {
+        'preprocess.decode': measure(lambda: cv2.imdecode(encoded, cv2.IMREAD_COLOR), repeats=repeats, warmup=warmup),
+        'preprocess.load_strip_exif': measure(lambda: preprocessor._load_image(image_path), repeats=repeats, warmup=warmup),
+        'preprocess.clahe': measure(lambda: preprocessor._enhance_image_contrast(image), repeats=repeats, warmup=warmup),
+        'preprocess.resize': measure(lambda: cv2.resize(image, preprocessor.target_size), repeats=repeats, warmup=warmup),
+        'preprocess.normalize': measure(
+            lambda: np.multiply(resized, 1.0 / 255.0, out=normalized, casting='unsafe'),
+            repeats=repeats, warmup=warmup
+        ),
+        'preprocess.total': measure(
+            lambda: preprocessor.preprocess_buffer(image_path, pool=pool).release(),
+            repeats=repeats, warmup=warmup
+        )
+    }
+    if preprocessor.face_detection:
+        # El difuminado modifica la imagen: copiar fuera de la medición
+        stages['preprocess.face_blur'] = measure(
+            lambda copy: preprocessor._detect_and_blur_faces(copy),
+            setup=lambda: (image.copy(),), repeats=repeats, warmup=warmup
+        )
+    return stages
+
+
+def benchmark_detector(detector: Any, image: np.ndarray, repeats: int = 5, warmup: int = 1) -> Dict[str, Any]:
+    """Time detector.detect on a preprocessed image"""
+    return measure(lambda: detector.detect(image), repeats=repeats, warmup=warmup)
+
+
+def benchmark_raw_output_codec(repeats: int = 5, warmup: int = 1, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    Time encoding and decoding of a YOLO-sized raw prediction tensor.
+
+    Returns:
+        Stage name -> timing stats (encode stats include the compression ratio)
+    """
+    from ..db.raw_output_codec import get_raw_output_codec, decode_raw_array
+
+    rng = np.random.default_rng(seed)
+    raw = rng.normal(0, 1, RAW_OUTPUT_SHAPE).astype(np.float32)
+    codec = get_raw_output_codec()
+    blob = codec.encode(raw)
+
+    encode = measure(lambda: codec.encode(raw), repeats=repeats, warmup=warmup)
+    encode['compression_ratio'] = round(raw.nbytes / len(blob), 3)
+    encode['codec'] = codec.compression_method
+    return {
+        'raw_output.encode': encode,
+        'raw_output.decode': measure(lambda: decode_raw_array(blob), repeats=repeats, warmup=warmup)
+    }
+
+
+def _mock_lpp_detector() -> Any:
+    """LPPDetector backed by the simulated YOLO model (None without torch)"""
+    previous = os.environ.get('VIGIA_USE_MOCK_YOLO')
+    os.environ['VIGIA_USE_MOCK_YOLO'] = 'true'
+    try:
+        from .detector import LPPDetector
+        return LPPDetector()
+    except ImportError as e:
+        logger.info(f"LPPDetector no disponible para benchmark: {e}")
+        return None
+    finally:
+        if previous is None:
+            os.environ.pop('VIGIA_USE_MOCK_YOLO', None)
+        else:
+            os.environ['VIGIA_USE_MOCK_YOLO'] = previous
+
+
+def _real_lpp_detector(weights: Optional[str]) -> Any:
+    """RealLPPDetector with trained weights (None when unavailable)"""
+    if not weights or not Path(weights).exists():
+        return None
+    try:
+        from .real_lpp_detector import RealLPPDetector
+        return RealLPPDetector(weights)
+    except Exception as e:
+        logger.warning(f"RealLPPDetector no disponible para benchmark: {e}")
+        return None
+
+
+def run_cv_benchmarks(resolutions: Iterable[Tuple[int, int]] = DEFAULT_RESOLUTIONS,
+                      repeats: int = 5,
+                      warmup: int = 1,
+                      detectors: bool = True,
+                      weights: Optional[str] = None,
+                      preprocessor: Optional[ImagePreprocessor] = None) -> Dict[str, Any]:
+    """
+    Run every stage benchmark on synthetic fixtures.
+
+    Args:
+        resolutions: (width, height) of the synthetic photos
+        repeats: Timed runs per stage
+        warmup: Untimed runs per stage
+        detectors: Include detector inference stages
+        weights: Trained YOLOv5 weights for the real detector stage
+        preprocessor: Preprocessor under test (defaults to ImagePreprocessor())
+
+    Returns:
+        Baseline-format dict with 'environment' and 'results'
+    """
+    preprocessor = preprocessor or ImagePreprocessor(max_workers=1)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    inference = {}
+    if detectors:
+        inference = {
+            'detector.mock': _mock_lpp_detector(),
+            'detector.real': _real_lpp_detector(weights)
+        }
+        inference = {name: detector for name, detector in inference.items() if detector is not None}
+
+    with tempfile.TemporaryDirectory(prefix='vigia-bench-') as tmp:
+        for width, height in resolutions:
+            path = write_fixture(synthetic_wound_image(width, height), Path(tmp) / f"wound_{width}x{height}.jpg")
+
+            for stage, stats in benchmark_preprocessor(path, preprocessor, repeats, warmup).items():
+                results[stage_key(stage, (width, height))] = stats
+
+            if inference:
+                buffer = preprocessor.preprocess_buffer(path)
+                for stage, detector in inference.items():
+                    results[stage_key(stage, (width, height))] = benchmark_detector(detector, buffer.array, repeats, warmup)
+
+    results.update(benchmark_raw_output_codec(repeats, warmup))
+
+    return {
+        'version': BASELINE_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'environment': environment_info(),
+        'results': results
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    """Host details stored with a baseline (timings only compare on similar hosts)"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'opencv_threads': cv2.getNumThreads()
+    }
+
+
+def save_baseline(report: Dict[str, Any], path: str) -> str:
+    """Write a benchmark report as a JSON baseline"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return str(path)
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    """Read a JSON baseline (None when the file does not exist)"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    baseline = json.loads(path.read_text())
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"Unsupported baseline version {baseline.get('version')} in {path}")
+    return baseline
+
+
+def compare_to_baseline(report: Dict[str, Any],
+                        baseline: Dict[str, Any],
+                        threshold: float = DEFAULT_THRESHOLD,
+                        min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[Dict[str, Any]]:
+    """
+    Stages whose median latency regressed against the baseline.
+
+    A stage regresses when its median exceeds the baseline median by more
+    than threshold (relative) and by more than min_delta_ms (absolute).
+    Stages missing from either side are ignored.
+
+    Args:
+        report: Current run from run_cv_benchmarks
+        baseline: Stored baseline
+        threshold: Allowed relative slowdown (0.25 = 25%)
+        min_delta_ms: Smallest absolute slowdown reported
+
+    Returns:
+        Regressions sorted by ratio, each with stage, baseline_ms, current_ms and ratio
+    """
+    regressions = []
+    for stage, stats in report['results'].items():
+        reference = baseline['results'].get(stage)
+        if not reference or not reference.get('median_ms'):
+            continue
+
+        baseline_ms, current_ms = reference['median_ms'], stats['median_ms']
+        if current_ms > baseline_ms * (1 + threshold) and current_ms - baseline_ms > min_delta_ms:
+            regressions.append({
+                'stage': stage,
+                'baseline_ms': baseline_ms,
+                'current_ms': current_ms,
+                'ratio': round(current_ms / baseline_ms, 3)
+            })
+
+    return sorted(regressions, key=lambda r: r['ratio'], reverse=True)
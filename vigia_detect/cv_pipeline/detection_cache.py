@@ -0,0 +1,306 @@
+"""
+Detection Result Cache
+======================
+
+Caches engine detection results by image content so resubmitted photos
+(e.g. the same wound photo resent over WhatsApp) skip inference.
+
+Entries are scoped by engine and model version. Lookups go to a bounded
+in-memory LRU first and then to an optional Redis tier shared by workers.
+With perceptual matching enabled, a 64-bit difference hash (dHash) also
+matches near-duplicates (recompressed or resized copies) whose Hamming
+distance is within a threshold.
+
+Usage:
+    cache = DetectionCache(max_entries=1024, perceptual=True)
+    key = cache.make_key(image_bytes, image)  # or make_pixel_key(image) without the file
+    result = await cache.get("yolo_backup", "yolov5s", key)
+    if result is None:
+        result = run_inference(image)
+        await cache.put("yolo_backup", "yolov5s", key, result)
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "vigia:detection_cache"
+
+
+@dataclass(frozen=True)
+class ImageCacheKey:
+    """Content and (optional) perceptual hash of an image."""
+    content_hash: str
+    perceptual_hash: Optional[int] = None
+    namespace: str = "sha256"  # "sha256" (file contents) or "pixels" (decoded array)
+
+    @property
+    def content_id(self) -> str:
+        return f"{self.namespace}:{self.content_hash}"
+
+
+def compute_dhash(image: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Compute a difference hash of an image.
+
+    Args:
+        image: RGB or grayscale image
+        hash_size: Hash side; the hash has hash_size * hash_size bits
+
+    Returns:
+        Hash as an integer
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize numpy scalars/arrays found in detection results."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class DetectionCache:
+    """Two-tier (LRU + Redis) cache of detection results."""
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 perceptual: bool = False,
+                 max_hamming_distance: int = 4,
+                 redis_url: Optional[str] = None,
+                 redis_ttl: int = 86400):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Maximum entries held in memory
+            perceptual: Also match near-duplicate images by dHash
+            max_hamming_distance: Maximum dHash distance for a near-duplicate
+            redis_url: Redis URL for the shared tier (memory only if None)
+            redis_ttl: TTL of Redis entries (seconds)
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+
+        self.max_entries = max_entries
+        self.perceptual = perceptual
+        self.max_hamming_distance = max_hamming_distance
+        self.redis_url = redis_url
+        self.redis_ttl = redis_ttl
+        self.redis_client = None
+
+        # (engine, model_version, content_id) -> (perceptual_hash, result)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[Optional[int], Dict[str, Any]]]" = OrderedDict()
+
+        self.stats = {
+            'hits': 0,
+            'near_duplicate_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def make_key(self, image_bytes: bytes, image: Optional[np.ndarray] = None) -> ImageCacheKey:
+        """
+        Build the cache key of an image.
+
+        Args:
+            image_bytes: Encoded image file contents
+            image: Decoded image, required for perceptual matching
+
+        Returns:
+            ImageCacheKey
+        """
+        content_hash = hashlib.sha256(image_bytes).hexdigest()
+        perceptual_hash = None
+        if self.perceptual and image is not None:
+            perceptual_hash = compute_dhash(image)
+        return ImageCacheKey(content_hash, perceptual_hash)
+
+    def make_pixel_key(self, image: np.ndarray) -> ImageCacheKey:
+        """
+        Build the cache key of an already decoded image.
+
+        The hash covers shape, dtype and pixels and lives in its own key
+        namespace: it never equals the file hash of make_key, so the same
+        photo submitted as a file and as a decoded array is cached twice
+        (perceptual matching can still join them).
+
+        Args:
+            image: Decoded image
+
+        Returns:
+            ImageCacheKey
+        """
+        image = np.ascontiguousarray(image)
+        digest = hashlib.sha256(f"{image.shape}:{image.dtype.str}".encode())
+        digest.update(image.data)
+        perceptual_hash = compute_dhash(image) if self.perceptual else None
+        return ImageCacheKey(digest.hexdigest(), perceptual_hash, namespace="pixels")
+
+    async def get(self, engine: str, model_version: str, key: ImageCacheKey) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached detection result.
+
+        Args:
+            engine: Detection engine name
+            model_version: Version of the engine's model
+            key: Image cache key
+
+        Returns:
+            Cached result, or None on a miss
+        """
+        entry_key = (engine, model_version, key.content_id)
+
+        entry = self._entries.get(entry_key)
+        if entry is not None:
+            self._entries.move_to_end(entry_key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+        if key.perceptual_hash is not None:
+            match = self._find_near_duplicate(engine, model_version, key.perceptual_hash)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self.stats['near_duplicate_hits'] += 1
+                return self._entries[match][1]
+
+        result = await self._redis_get(engine, model_version, key)
+        if result is not None:
+            self._store(entry_key, key.perceptual_hash, result)
+            self.stats['redis_hits'] += 1
+            return result
+
+        self.stats['misses'] += 1
+        return None
+
+    async def put(self, engine: str, model_version: str, key: ImageCacheKey, result: Dict[str, Any]):
+        """
+        Store a detection result.
+
+        Args:
+            engine: Detection engine name
+            model_version: Version of the engine's model
+            key: Image cache key
+            result: JSON-serializable detection result
+        """
+        self._store((engine, model_version, key.content_id), key.perceptual_hash, result)
+        await self._redis_put(engine, model_version, key, result)
+
+    def invalidate(self, engine: Optional[str] = None) -> int:
+        """
+        Drop in-memory entries of an engine (all engines if None).
+
+        Redis entries are not deleted: they are scoped by model version, so
+        entries of a replaced model are never read and expire by TTL.
+
+        Returns:
+            Number of entries dropped
+        """
+        stale = [entry_key for entry_key in self._entries if engine is None or entry_key[0] == engine]
+        for entry_key in stale:
+            del self._entries[entry_key]
+        self.stats['invalidations'] += 1
+        return len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters and size"""
+        lookups = sum(self.stats[k] for k in ('hits', 'near_duplicate_hits', 'redis_hits', 'misses'))
+        hits = lookups - self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'perceptual': self.perceptual,
+            'redis_enabled': self.redis_url is not None,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+    async def close(self):
+        """Close the Redis connection"""
+        if self.redis_client is not None:
+            await self.redis_client.close()
+            self.redis_client = None
+
+    def _store(self, entry_key: Tuple[str, str, str], perceptual_hash: Optional[int], result: Dict[str, Any]):
+        self._entries[entry_key] = (perceptual_hash, result)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _find_near_duplicate(self, engine: str, model_version: str, perceptual_hash: int) -> Optional[Tuple[str, str, str]]:
+        best_key, best_distance = None, self.max_hamming_distance + 1
+        for entry_key, (entry_hash, _) in self._entries.items():
+            if entry_hash is None or entry_key[0] != engine or entry_key[1] != model_version:
+                continue
+            distance = bin(entry_hash ^ perceptual_hash).count("1")
+            if distance < best_distance:
+                best_key, best_distance = entry_key, distance
+        return best_key
+
+    def _redis_keys(self, engine: str, model_version: str, key: ImageCacheKey) -> Tuple[str, Optional[str]]:
+        scope = f"{REDIS_KEY_PREFIX}:{engine}:{model_version}"
+        content_key = f"{scope}:{key.content_id}"
+        perceptual_key = f"{scope}:dhash:{key.perceptual_hash:016x}" if key.perceptual_hash is not None else None
+        return content_key, perceptual_key
+
+    async def _get_redis(self):
+        if self.redis_url is None or not REDIS_AVAILABLE:
+            return None
+        if self.redis_client is None:
+            self.redis_client = redis.from_url(self.redis_url)
+        return self.redis_client
+
+    async def _redis_get(self, engine: str, model_version: str, key: ImageCacheKey) -> Optional[Dict[str, Any]]:
+        try:
+            client = await self._get_redis()
+            if client is None:
+                return None
+
+            content_key, perceptual_key = self._redis_keys(engine, model_version, key)
+            payload = await client.get(content_key)
+            if payload is None and perceptual_key is not None:
+                payload = await client.get(perceptual_key)
+            return json.loads(payload) if payload is not None else None
+
+        except Exception as e:
+            logger.warning(f"Detection cache Redis lookup failed: {e}")
+            return None
+
+    async def _redis_put(self, engine: str, model_version: str, key: ImageCacheKey, result: Dict[str, Any]):
+        try:
+            client = await self._get_redis()
+            if client is None:
+                return
+
+            payload = json.dumps(result, default=_json_default)
+            content_key, perceptual_key = self._redis_keys(engine, model_version, key)
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(content_key, payload, ex=self.redis_ttl)
+                if perceptual_key is not None:
+                    pipe.set(perceptual_key, payload, ex=self.redis_ttl)
+                await pipe.execute()
+
+        except Exception as e:
+            logger.warning(f"Detection cache Redis write failed: {e}")
@@ -12,6 +12,8 @@ from pathlib import Path
 import torch
 import numpy as np
 
+from .image_buffer import unwrap_image
+
 # Import performance monitoring utilities
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from utils.performance_profiler import profile_performance
@@ -57,8 +59,8 @@ class LPPDetector:
             # Usar cargador aislado para evitar conflictos de nombres
             from .yolo_loader import load_yolo_model_isolated, create_mock_yolo_model
             
-            # Intentar cargar YOLOv5 real con entorno aislado
-            self.model = load_yolo_model_isolated(self.model_type, self.model_path)
+            # Intentar cargar YOLOv5 real con entorno aislado (compartido entre detectores)
+            self.model = load_yolo_model_isolated(self.model_type, self.model_path, str(self.device))
             
             if self.model is None:
                 logger.warning("No se pudo cargar YOLOv5 real, usando simulación")
@@ -66,10 +68,10 @@ class LPPDetector:
             else:
                 logger.info("✅ Modelo YOLOv5 real cargado exitosamente")
             
-            # Configurar el modelo
+            # Configurar el modelo (compartido: su umbral conf no se modifica,
+            # cada detector filtra por conf_threshold tras la inferencia)
             try:
                 self.model.to(self.device)
-                self.model.conf = self.conf_threshold
                 # Modo evaluación
                 self.model.eval()
             except Exception as config_error:
@@ -113,6 +115,9 @@ class LPPDetector:
         if self.model is None:
             raise ValueError("Modelo no inicializado. Llama a _load_model primero.")
         
+        # ImageBuffer del preprocesador: usar su array sin copiarlo
+        image = unwrap_image(image)
+        
         # Realizar inferencia
         results = self.model(image)
         
@@ -130,6 +135,11 @@ class LPPDetector:
             for detection in detections:
                 x1, y1, x2, y2, conf, cls = detection
                 
+                # El modelo es compartido: aplicar el umbral de este detector
+                # (valores por debajo del conf del modelo no recuperan cajas)
+                if conf < self.conf_threshold:
+                    continue
+                
                 # Convertir etapa del modelo a nuestra numeración (0-4)
                 # Mapeamos las clases según el modelo específico
                 stage = int(cls)  # En implementación real, mapear correctamente
@@ -0,0 +1,312 @@
+"""
+Face Anonymization
+==================
+
+FaceAnonymizer blurs faces before an image reaches the detectors. The Haar
+cascade runs on a grayscale copy downscaled to detection_max_side; the
+resulting boxes are scaled back and blurred on the full-resolution image.
+
+CascadeClassifier is not safe to share between threads, so each cascade file
+has a bounded process-wide pool of loaded classifiers. A thread checks one
+out for a detectMultiScale call and returns it, so short-lived worker pools
+(batch runners, preprocess_batch) reuse classifiers instead of loading the
+XML again on every run.
+
+Wound photos taken as close-ups of a body region cannot contain a face.
+When the capture metadata says so (EXIF macro/close subject distance range,
+a short subject distance, or a crop around a body-region box) detection is
+skipped entirely.
+
+Usage:
+    anonymizer = FaceAnonymizer(detection_max_side=640)
+    image, report = anonymizer.anonymize(bgr_image, read_capture_metadata(pil_image))
+    report['time_ms'], anonymizer.get_stats()
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('lpp-detect.face_anonymizer')
+
+DEFAULT_CASCADE = 'haarcascade_frontalface_default.xml'
+
+# EXIF tags (Exif sub-IFD) describing how far the subject was from the camera
+EXIF_IFD = 0x8769
+EXIF_SUBJECT_DISTANCE = 0x9206
+EXIF_SUBJECT_DISTANCE_RANGE = 0xA40C
+CLOSE_DISTANCE_RANGES = (1, 2)  # 1 = macro, 2 = close view
+
+# Regions where a close-up may still show a face
+FACIAL_REGIONS = {'face', 'head', 'facial', 'nose', 'ear', 'ears', 'occiput', 'occipital', 'chin'}
+
+# Classifiers kept per cascade file; detectMultiScale is CPU-bound, so more
+# concurrent copies than cores would only cost memory and load time
+CASCADE_POOL_SIZE = max(4, os.cpu_count() or 1)
+
+
+class CascadePool:
+    """Bounded pool of loaded classifiers for one cascade file."""
+
+    def __init__(self, cascade_path: str, max_size: int = CASCADE_POOL_SIZE):
+        """
+        Args:
+            cascade_path: Cascade XML file
+            max_size: Most classifiers loaded at once; further checkouts wait
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.cascade_path = cascade_path
+        self.max_size = max_size
+        self._idle: List[cv2.CascadeClassifier] = []
+        self._loaded = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def checkout(self) -> Iterator[cv2.CascadeClassifier]:
+        """Borrow a classifier for the calling thread and return it afterwards."""
+        cascade = self._acquire()
+        try:
+            yield cascade
+        finally:
+            with self._cond:
+                self._idle.append(cascade)
+                self._cond.notify()
+
+    def _acquire(self) -> cv2.CascadeClassifier:
+        with self._cond:
+            while not self._idle and self._loaded >= self.max_size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._loaded += 1
+
+        # Load outside the lock so other threads can return classifiers meanwhile
+        try:
+            cascade = cv2.CascadeClassifier(self.cascade_path)
+            if cascade.empty():
+                raise ValueError(f"Could not load face cascade: {self.cascade_path}")
+        except Exception:
+            with self._cond:
+                self._loaded -= 1
+                self._cond.notify()
+            raise
+        return cascade
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Loaded and idle classifier counts"""
+        with self._cond:
+            return {'loaded': self._loaded, 'idle': len(self._idle), 'max_size': self.max_size}
+
+
+_cascade_pools: Dict[str, CascadePool] = {}
+_cascade_pools_lock = threading.Lock()
+
+
+def get_cascade_pool(cascade_path: Optional[str] = None) -> CascadePool:
+    """
+    Process-wide classifier pool for a cascade file.
+
+    Args:
+        cascade_path: Cascade XML file (defaults to OpenCV's frontal face model)
+
+    Returns:
+        CascadePool shared by every thread of the process
+    """
+    cascade_path = cascade_path or cv2.data.haarcascades + DEFAULT_CASCADE
+    with _cascade_pools_lock:
+        pool = _cascade_pools.get(cascade_path)
+        if pool is None:
+            pool = _cascade_pools[cascade_path] = CascadePool(cascade_path)
+        return pool
+
+
+def read_capture_metadata(pil_image: Any) -> Dict[str, Any]:
+    """
+    Capture details from EXIF that decide whether face detection is needed.
+
+    Only non-identifying fields are kept; the rest of the EXIF block is
+    discarded with the pixels' container as before.
+
+    Args:
+        pil_image: Opened PIL image
+
+    Returns:
+        Dict with 'subject_distance_range' and/or 'subject_distance' (meters)
+    """
+    try:
+        exif = pil_image.getexif().get_ifd(EXIF_IFD)
+    except Exception:
+        return {}
+
+    metadata = {}
+    distance_range = exif.get(EXIF_SUBJECT_DISTANCE_RANGE)
+    if distance_range is not None:
+        metadata['subject_distance_range'] = int(distance_range)
+    distance = exif.get(EXIF_SUBJECT_DISTANCE)
+    if distance is not None:
+        try:
+            metadata['subject_distance'] = float(distance)
+        except (TypeError, ValueError, ZeroDivisionError):
+            pass
+    return metadata
+
+
+def close_up_reason(metadata: Optional[Dict[str, Any]], max_subject_distance: float = 0.5) -> Optional[str]:
+    """
+    Why the image is a close-up of a non-facial body region, if it is.
+
+    Args:
+        metadata: Capture/crop metadata of the image
+        max_subject_distance: Largest EXIF subject distance (m) considered a close-up
+
+    Returns:
+        Short reason string, or None when faces may be present
+    """
+    if not metadata:
+        return None
+
+    region = metadata.get('body_region') or metadata.get('anatomical_location')
+    if region and str(region).lower() in FACIAL_REGIONS:
+        return None
+
+    if metadata.get('close_up'):
+        return 'close_up'
+    if metadata.get('crop') is not None and region:
+        return 'body_region_crop'
+    if metadata.get('subject_distance_range') in CLOSE_DISTANCE_RANGES:
+        return 'exif_distance_range'
+    distance = metadata.get('subject_distance')
+    if distance is not None and 0 < distance <= max_subject_distance:
+        return 'exif_subject_distance'
+    return None
+
+
+class FaceAnonymizer:
+    """Downscaled Haar face detection with full-resolution blurring."""
+
+    def __init__(self,
+                 detection_max_side: Optional[int] = 640,
+                 cascade_path: Optional[str] = None,
+                 scale_factor: float = 1.1,
+                 min_neighbors: int = 5,
+                 min_size: Tuple[int, int] = (30, 30),
+                 skip_close_ups: bool = True):
+        """
+        Args:
+            detection_max_side: Longest side of the grayscale copy used for
+                detection (None to detect at full resolution)
+            cascade_path: Cascade XML file (defaults to OpenCV's frontal face model)
+            scale_factor: detectMultiScale scale step
+            min_neighbors: detectMultiScale neighbor threshold
+            min_size: Smallest face (pixels) in the full-resolution image
+            skip_close_ups: Skip detection for close-ups of body regions
+        """
+        self.detection_max_side = detection_max_side
+        self.cascade_path = cascade_path or cv2.data.haarcascades + DEFAULT_CASCADE
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.skip_close_ups = skip_close_ups
+
+        # Fail early on a missing cascade file (and keep the loaded classifier pooled)
+        self._cascades = get_cascade_pool(self.cascade_path)
+        with self._cascades.checkout():
+            pass
+
+        self._lock = threading.Lock()
+        self.stats = {'images': 0, 'skipped': 0, 'faces': 0, 'detect_ms': 0.0, 'blur_ms': 0.0}
+
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        """
+        Face boxes in full-resolution coordinates.
+
+        Args:
+            image: BGR (or grayscale) uint8 image
+
+        Returns:
+            Int array (n, 4) of (x, y, w, h)
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+        scale = 1.0
+        if self.detection_max_side and max(gray.shape[:2]) > self.detection_max_side:
+            scale = self.detection_max_side / max(gray.shape[:2])
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        min_size = (max(1, round(self.min_size[0] * scale)), max(1, round(self.min_size[1] * scale)))
+        with self._cascades.checkout() as cascade:
+            faces = cascade.detectMultiScale(
+                gray,
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=min_size
+            )
+        if len(faces) == 0:
+            return np.empty((0, 4), dtype=int)
+
+        faces = np.asarray(faces)
+        if scale != 1.0:
+            faces = np.round(faces / scale).astype(int)
+        return faces
+
+    def anonymize(self, image: np.ndarray, metadata: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Blur every detected face in place.
+
+        Args:
+            image: BGR uint8 image (modified in place)
+            metadata: Capture/crop metadata used to skip close-ups
+
+        Returns:
+            (image, report) with 'faces', 'skipped', 'time_ms' and, when
+            skipped, the 'reason'
+        """
+        start = time.perf_counter()
+
+        reason = close_up_reason(metadata) if self.skip_close_ups else None
+        if reason:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.stats['images'] += 1
+                self.stats['skipped'] += 1
+            return image, {'faces': 0, 'skipped': True, 'reason': reason, 'time_ms': elapsed_ms}
+
+        faces = self.detect(image)
+        detected = time.perf_counter()
+
+        height, width = image.shape[:2]
+        for (x, y, w, h) in faces:
+            x, y = max(0, x), max(0, y)
+            x2, y2 = min(width, x + w), min(height, y + h)
+            if x2 <= x or y2 <= y:
+                continue
+            image[y:y2, x:x2] = cv2.GaussianBlur(image[y:y2, x:x2], (99, 99), 30)
+            logger.info(f"Rostro detectado y difuminado en coordenadas: ({x}, {y}, {w}, {h})")
+        blurred = time.perf_counter()
+
+        detect_ms = (detected - start) * 1000
+        blur_ms = (blurred - detected) * 1000
+        with self._lock:
+            self.stats['images'] += 1
+            self.stats['faces'] += len(faces)
+            self.stats['detect_ms'] += detect_ms
+            self.stats['blur_ms'] += blur_ms
+
+        return image, {'faces': len(faces), 'skipped': False, 'time_ms': detect_ms + blur_ms}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters and time spent detecting and blurring faces"""
+        with self._lock:
+            stats = dict(self.stats)
+        total_ms = stats['detect_ms'] + stats['blur_ms']
+        stats['total_ms'] = round(total_ms, 3)
+        stats['avg_ms'] = round(total_ms / stats['images'], 3) if stats['images'] else 0.0
+        stats['detection_max_side'] = self.detection_max_side
+        return stats
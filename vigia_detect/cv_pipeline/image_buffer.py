@@ -0,0 +1,195 @@
+"""
+Shared Image Buffers
+====================
+
+ImageBuffer carries one decoded image array plus its metadata from the
+preprocessor to the detectors, so no stage re-reads the file or converts
+the pixels again. as_tensor() wraps the array with torch.from_numpy, which
+shares memory with the array instead of copying it.
+
+BufferPool keeps preallocated arrays for fixed shapes (e.g. the 640x640
+target size) and hands them out again once a request releases its buffer.
+Steady-state preprocessing then allocates no new image memory.
+
+Usage:
+    buffer = preprocessor.preprocess_buffer(image_path, pool=get_buffer_pool())
+    try:
+        results = detector.detect(buffer)
+    finally:
+        buffer.release()
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class BufferPool:
+    """Thread-safe free lists of preallocated arrays per (shape, dtype)."""
+
+    def __init__(self, max_per_shape: int = 16):
+        """
+        Args:
+            max_per_shape: Maximum idle arrays kept for each (shape, dtype)
+        """
+        self.max_per_shape = max_per_shape
+        self._free: Dict[Tuple[Tuple[int, ...], str], List[np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'allocations': 0, 'reuses': 0, 'releases': 0, 'discards': 0}
+
+    def acquire(self, shape: Tuple[int, ...], dtype: Any = np.float32) -> np.ndarray:
+        """
+        Get an array of the given shape and dtype (contents undefined).
+
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+
+        Returns:
+            Pooled or newly allocated array
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.stats['reuses'] += 1
+                return free.pop()
+            self.stats['allocations'] += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, array: np.ndarray):
+        """Return an array obtained from acquire() to the pool"""
+        key = (array.shape, array.dtype.str)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) < self.max_per_shape:
+                free.append(array)
+                self.stats['releases'] += 1
+            else:
+                self.stats['discards'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Allocation/reuse counters and idle bytes held"""
+        with self._lock:
+            idle = [array for free in self._free.values() for array in free]
+            return {
+                **self.stats,
+                'idle_buffers': len(idle),
+                'idle_bytes': sum(array.nbytes for array in idle)
+            }
+
+
+@dataclass
+class ImageBuffer:
+    """
+    Decoded image (HWC) and metadata shared by every pipeline stage.
+
+    The array is owned by the buffer: stages may read it, but must not keep
+    references after release() when the buffer came from a BufferPool.
+    """
+    array: np.ndarray
+    color_order: str = "BGR"  # Channel order of array ("BGR" or "RGB")
+    normalized: bool = False  # float32 in 0-1 instead of uint8 0-255
+    source_path: Optional[str] = None
+    original_size: Optional[Tuple[int, int]] = None  # (width, height) before resizing
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    _release: Optional[Callable[[np.ndarray], None]] = field(default=None, repr=False)
+
+    @classmethod
+    def from_file(cls, image_path: str, color_order: str = "RGB") -> "ImageBuffer":
+        """
+        Read and decode an image file once.
+
+        Args:
+            image_path: Path to the image
+            color_order: Channel order to decode to ("BGR" or "RGB")
+
+        Returns:
+            ImageBuffer with a uint8 HWC array
+        """
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        array = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if array is None:
+            raise ValueError(f"Could not decode image: {image_path}")
+        if color_order == "RGB":
+            cv2.cvtColor(array, cv2.COLOR_BGR2RGB, dst=array)
+        return cls(
+            array=array,
+            color_order=color_order,
+            source_path=str(image_path),
+            original_size=(array.shape[1], array.shape[0])
+        )
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.array.shape
+
+    def as_rgb(self) -> np.ndarray:
+        """Array in RGB order (the array itself when already RGB)"""
+        if self.color_order == "RGB":
+            return self.array
+        return cv2.cvtColor(self.array, cv2.COLOR_BGR2RGB)
+
+    def as_bgr(self) -> np.ndarray:
+        """Array in BGR order (the array itself when already BGR)"""
+        if self.color_order == "BGR":
+            return self.array
+        return cv2.cvtColor(self.array, cv2.COLOR_RGB2BGR)
+
+    def as_tensor(self, channels_first: bool = True, batch_dim: bool = False):
+        """
+        Torch view of the array without copying.
+
+        Args:
+            channels_first: Return CHW (a permuted view) instead of HWC
+            batch_dim: Prepend a batch dimension of size 1
+
+        Returns:
+            torch.Tensor sharing memory with the array
+        """
+        import torch
+
+        tensor = torch.from_numpy(self.array)
+        if channels_first:
+            tensor = tensor.permute(2, 0, 1)
+        if batch_dim:
+            tensor = tensor.unsqueeze(0)
+        return tensor
+
+    def release(self):
+        """Return the array to its pool (no-op for unpooled buffers)"""
+        if self._release is not None:
+            release, self._release = self._release, None
+            release(self.array)
+
+    def __enter__(self) -> "ImageBuffer":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def unwrap_image(image: Any) -> Any:
+    """Array of an ImageBuffer; any other input is returned unchanged"""
+    return image.array if isinstance(image, ImageBuffer) else image
+
+
+# Global pool instance
+_buffer_pool: Optional[BufferPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_buffer_pool() -> BufferPool:
+    """Get or create the process-wide buffer pool"""
+    global _buffer_pool
+
+    if _buffer_pool is None:
+        with _pool_lock:
+            if _buffer_pool is None:
+                _buffer_pool = BufferPool()
+
+    return _buffer_pool
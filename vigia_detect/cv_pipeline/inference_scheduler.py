@@ -0,0 +1,192 @@
+"""
+Dynamic Batching Inference Scheduler
+====================================
+
+In-process scheduler that queues inference inputs per engine and runs them
+as dynamic batches on a dedicated inference thread.
+
+While a batch is running, new requests accumulate; when the engine becomes
+free they are dispatched together (up to max_batch_size). An idle engine waits
+at most max_wait_ms for a batch to fill. Each caller awaits its own result,
+and a caller that times out or is cancelled does not affect the rest of its
+batch.
+
+Usage:
+    scheduler = DynamicBatchScheduler("monai", batch_fn, max_batch_size=8)
+    result = await scheduler.submit(tensor)
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+QUEUE_WAIT_MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+@dataclass
+class _PendingInference:
+    """Inference request waiting for a batch."""
+    item: Any
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class DynamicBatchScheduler:
+    """Per-engine dynamic batching of inference requests."""
+
+    def __init__(self,
+                 name: str,
+                 batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0):
+        """
+        Initialize scheduler.
+
+        Args:
+            name: Engine name (used for the inference thread and metrics)
+            batch_fn: Blocking function mapping a list of inputs to a list of
+                results of the same length and order
+            max_batch_size: Maximum inputs per batch_fn call
+            max_wait_ms: Maximum time an idle engine waits for a batch to fill
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max(0.0, max_wait_ms)
+
+        # One inference thread per engine: batches run back to back
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-inference")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[_PendingInference] = []
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._running: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.batch_size_histogram = Histogram(f"{name}_batch_size", BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(f"{name}_queue_wait_ms", QUEUE_WAIT_MS_BUCKETS)
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "cancelled": 0,
+            "errors": 0
+        }
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an input and wait for its result.
+
+        Args:
+            item: Preprocessed input for batch_fn
+
+        Returns:
+            The result produced for this input
+        """
+        if self._closed:
+            raise RuntimeError(f"{self.name} inference scheduler is closed")
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # New event loop (e.g. a new asyncio.run): drop state bound to the old one
+            self._loop = loop
+            self._pending = []
+            self._flush_handle = None
+            self._running = None
+
+        self.stats["requests"] += 1
+        future = loop.create_future()
+        self._pending.append(_PendingInference(item, future, time.perf_counter()))
+
+        if self._running is None:
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.max_wait_ms / 1000.0, self._dispatch)
+
+        return await future
+
+    def _dispatch(self):
+        """Start the next batch unless one is already running."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if self._running is not None:
+            return
+
+        # Skip callers that already timed out or were cancelled
+        live = [request for request in self._pending if not request.future.done()]
+        self.stats["cancelled"] += len(self._pending) - len(live)
+
+        batch = live[:self.max_batch_size]
+        self._pending = live[self.max_batch_size:]
+        if batch:
+            self._running = asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[_PendingInference]):
+        """Run one batch on the inference thread and deliver each result."""
+        started_at = time.perf_counter()
+        for request in batch:
+            self.queue_wait_histogram.observe((started_at - request.enqueued_at) * 1000.0)
+        self.batch_size_histogram.observe(len(batch))
+        self.stats["batches"] += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                self._executor, self.batch_fn, [request.item for request in batch]
+            )
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"{self.name} batch returned {len(results)} results for {len(batch)} inputs"
+                )
+
+            for request, result in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(result)
+
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"{self.name} batch inference failed ({len(batch)} inputs): {e}")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+
+        finally:
+            self._running = None
+            # Requests that queued up while the engine was busy go next
+            if self._pending:
+                self._dispatch()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics."""
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "busy": self._running is not None,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batch_size_histogram": self.batch_size_histogram.snapshot(),
+            "queue_wait_ms_histogram": self.queue_wait_histogram.snapshot()
+        }
+
+    async def close(self):
+        """Run queued requests, wait for them and stop the inference thread."""
+        self._closed = True
+        while self._pending or self._running is not None:
+            if self._running is None:
+                self._dispatch()
+                if self._running is None:
+                    break
+            await asyncio.gather(self._running, return_exceptions=True)
+        self._executor.shutdown(wait=False)
@@ -19,9 +19,14 @@ Usage:
 """
 
 import logging
-from typing import Optional, Dict, Any, Union
+import threading
+from functools import partial
+from pathlib import Path
+from typing import Optional, Dict, Any, Union, List, Callable
 from enum import Enum
 
+import torch
+
 # Vigia configuration and existing detectors
 from ..core.service_config import (
     get_ai_model_config, 
@@ -31,8 +36,10 @@ from ..core.service_config import (
     is_using_mocks,
     ServiceType
 )
-from .adaptive_medical_detector import AdaptiveMedicalDetector, DetectionEngine
-from .real_lpp_detector import PressureUlcerDetector
+from .adaptive_medical_detector import AdaptiveMedicalDetector, DetectionEngine, load_monai_model, MONAI_AVAILABLE
+from .real_lpp_detector import PressureUlcerDetector, load_yolo_weights
+from .model_registry import get_model_registry
+from .onnx_backend import parse_core_list
 
 logger = logging.getLogger(__name__)
 
@@ -155,7 +162,10 @@ class MedicalDetectorFactory:
             'confidence_threshold_yolo': kwargs.get(
                 'confidence_threshold_yolo',
                 adaptive_config.get('confidence_threshold_yolo', 0.6)
-            )
+            ),
+            'yolo_onnx_path': kwargs.get('yolo_onnx_path', yolo_config.get('onnx_model_path')),
+            'onnx_threads': kwargs.get('onnx_threads', yolo_config.get('onnx_threads')),
+            'onnx_cores': kwargs.get('onnx_cores', parse_core_list(yolo_config.get('onnx_cores')))
         }
         
         logger.info("Creating adaptive medical detector with MONAI primary + YOLOv5 backup")
@@ -212,6 +222,46 @@ class MedicalDetectorFactory:
         logger.info("Creating mock detector for testing")
         return AdaptiveMedicalDetector(**detector_config)
     
+    def warm_up_models(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Load the configured detector's models into the shared model registry.
+        
+        Called at worker start so the first request does not pay for
+        loading weights. Detectors created afterwards reuse the loaded models.
+        
+        Args:
+            background: Load in a daemon thread instead of blocking
+            
+        Returns:
+            The warm-up thread when background is True and there is work
+        """
+        loaders = self._get_warm_up_loaders(self.force_detector_type or self._determine_optimal_detector_type())
+        if not loaders:
+            return None
+        
+        logger.info(f"Warming up {len(loaders)} detection model(s)")
+        return get_model_registry().warm_up(loaders, background=background)
+    
+    def _get_warm_up_loaders(self, detector_type: DetectorType) -> List[Callable[[], Any]]:
+        """Model loaders used by a detector type (mock detectors load nothing)"""
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        monai_path = self.ai_config.get('monai', {}).get('model_path')
+        yolo_path = self.ai_config.get('yolo', {}).get('model_path')
+        
+        loaders = []
+        if detector_type in (DetectorType.ADAPTIVE_MEDICAL, DetectorType.MONAI_PRIMARY) and MONAI_AVAILABLE and monai_path:
+            loaders.append(partial(load_monai_model, monai_path, device))
+        if detector_type in (DetectorType.ADAPTIVE_MEDICAL, DetectorType.YOLO_ONLY, DetectorType.LEGACY_COMPATIBLE):
+            # Detectors fall back to a mock model when weights are missing
+            if yolo_path and Path(yolo_path).exists():
+                loaders.append(partial(load_yolo_weights, yolo_path, device))
+        
+        return loaders
+    
+    def get_model_stats(self) -> Dict[str, Any]:
+        """Load time and memory footprint of models shared by all detectors"""
+        return get_model_registry().get_stats()
+    
     def get_detector_capabilities(self, detector_type: Optional[DetectorType] = None) -> Dict[str, Any]:
         """
         Get capabilities of specified detector type.
@@ -319,6 +369,19 @@ def get_medical_detector_factory(force_detector_type: Optional[DetectorType] = N
     return _detector_factory
 
 
+def warm_up_detector_models(background: bool = True) -> Optional[threading.Thread]:
+    """
+    Load the configured detection models at worker start.
+    
+    Args:
+        background: Load in a daemon thread instead of blocking
+        
+    Returns:
+        The warm-up thread when background is True and there is work
+    """
+    return get_medical_detector_factory().warm_up_models(background=background)
+
+
 def create_medical_detector(**kwargs) -> Union[AdaptiveMedicalDetector, PressureUlcerDetector]:
     """
     Convenience function to create optimal medical detector.
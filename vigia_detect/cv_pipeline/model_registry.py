@@ -0,0 +1,224 @@
+"""
+Process-wide Model Registry
+===========================
+
+Loads each (engine, weights path, device) model once per process and shares
+the instance across every detector that asks for it. Detectors created by
+MedicalDetectorFactory, agents such as ImageAnalysisAgent and the legacy
+LPPDetector all go through the registry, so a worker holds one copy of
+each set of weights.
+
+Models can be warmed up in a background thread at worker start, and the
+registry reports load time and memory footprint per model.
+
+Usage:
+    registry = get_model_registry()
+    model = registry.get_or_load("yolo", weights_path, "cpu", load_fn)
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ModelKey = Tuple[str, str, str]
+
+
+@dataclass
+class LoadedModel:
+    """Shared model instance and its load metrics."""
+    key: ModelKey
+    model: Any
+    load_time_seconds: float
+    parameter_bytes: Optional[int]
+    rss_delta_bytes: Optional[int]
+    loaded_at: datetime = field(default_factory=datetime.now)
+    hits: int = 0
+
+
+def _parameter_bytes(model: Any) -> Optional[int]:
+    """Bytes held by a torch module's parameters and buffers."""
+    if not hasattr(model, 'parameters'):
+        return None
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+
+def _current_rss() -> Optional[int]:
+    if not PSUTIL_AVAILABLE:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class ModelRegistry:
+    """Thread-safe, load-once cache of model instances."""
+
+    def __init__(self):
+        self._models: Dict[ModelKey, LoadedModel] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+
+    @staticmethod
+    def make_key(engine: str, weights_path: Optional[str], device: Any) -> ModelKey:
+        """Normalize (engine, weights path, device) into a registry key"""
+        return (engine, str(weights_path) if weights_path else "default", str(device))
+
+    def get_or_load(self,
+                    engine: str,
+                    weights_path: Optional[str],
+                    device: Any,
+                    loader: Callable[[], Any]) -> Any:
+        """
+        Return the shared model for a key, loading it on first use.
+
+        Concurrent callers asking for the same key wait for a single load.
+        A loader that raises is not cached, so the next caller retries.
+
+        Args:
+            engine: Engine name (e.g. "yolo", "monai")
+            weights_path: Weights file, or None for the engine default
+            device: Target device
+            loader: Zero-argument function returning the loaded model
+
+        Returns:
+            Shared model instance
+        """
+        key = self.make_key(engine, weights_path, device)
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                entry.hits += 1
+                return entry.model
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    entry.hits += 1
+                    return entry.model
+
+            rss_before = _current_rss()
+            started = time.perf_counter()
+            model = loader()
+            load_time = time.perf_counter() - started
+            rss_after = _current_rss()
+
+            entry = LoadedModel(
+                key=key,
+                model=model,
+                load_time_seconds=load_time,
+                parameter_bytes=_parameter_bytes(model),
+                rss_delta_bytes=rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            )
+            with self._lock:
+                self._models[key] = entry
+
+            logger.info(f"Loaded {engine} model {key[1]} on {key[2]} in {load_time:.2f}s")
+            return model
+
+    def warm_up(self,
+                loaders: List[Callable[[], Any]],
+                background: bool = True) -> Optional[threading.Thread]:
+        """
+        Load models ahead of the first request.
+
+        Args:
+            loaders: Zero-argument functions that load a model through
+                get_or_load (e.g. load_yolo_weights bound to its arguments)
+            background: Load in a daemon thread instead of blocking
+
+        Returns:
+            The warm-up thread when background is True
+        """
+        def load_all():
+            for loader in loaders:
+                try:
+                    loader()
+                except Exception as e:
+                    logger.warning(f"Model warm-up failed: {e}")
+
+        if not background:
+            load_all()
+            return None
+
+        thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def is_loaded(self, engine: str, weights_path: Optional[str], device: Any) -> bool:
+        """Whether a model is already in the registry"""
+        with self._lock:
+            return self.make_key(engine, weights_path, device) in self._models
+
+    def evict(self, engine: Optional[str] = None) -> int:
+        """
+        Drop shared models so the next request reloads them.
+
+        Args:
+            engine: Engine to evict (all engines if None)
+
+        Returns:
+            Number of models dropped
+        """
+        with self._lock:
+            stale = [key for key in self._models if engine is None or key[0] == engine]
+            for key in stale:
+                del self._models[key]
+        return len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Load time, footprint and reuse count per loaded model"""
+        with self._lock:
+            models = [
+                {
+                    'engine': entry.key[0],
+                    'weights_path': entry.key[1],
+                    'device': entry.key[2],
+                    'load_time_seconds': round(entry.load_time_seconds, 4),
+                    'parameter_bytes': entry.parameter_bytes,
+                    'rss_delta_bytes': entry.rss_delta_bytes,
+                    'loaded_at': entry.loaded_at.isoformat(),
+                    'hits': entry.hits
+                }
+                for entry in self._models.values()
+            ]
+
+        return {
+            'loaded_models': len(models),
+            'total_load_time_seconds': round(sum(m['load_time_seconds'] for m in models), 4),
+            'total_parameter_bytes': sum(m['parameter_bytes'] or 0 for m in models),
+            'process_rss_bytes': _current_rss(),
+            'models': models
+        }
+
+
+# Global registry instance
+_model_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create the process-wide model registry"""
+    global _model_registry
+
+    if _model_registry is None:
+        with _registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+
+    return _model_registry
@@ -0,0 +1,603 @@
+"""
+ONNX Runtime Backend for LPP Detectors
+======================================
+
+CPU-optimized execution of the YOLOv5 LPP detector for hospital nodes
+without a GPU.
+
+- export_detector() converts the configured YOLOv5 weights to ONNX (and
+  optionally to an INT8 dynamically quantized ONNX and/or TorchScript).
+  A JSON sidecar next to the .onnx file keeps the input size and classes.
+- OnnxLPPDetector runs the exported model through ONNX Runtime with a fixed
+  thread budget and optional core affinity, behind the RealLPPDetector
+  interface (detect / detect_batch).
+- check_parity() compares an exported detector against the eager model on
+  a fixture set and reports detection agreement and CPU latency.
+
+Usage:
+    paths = export_detector("models/lpp.pt", "models/onnx", int8=True)
+    detector = OnnxLPPDetector(paths["onnx_int8"], intra_op_threads=4)
+    report = check_parity(RealLPPDetector("models/lpp.pt"), detector, fixture_images)
+"""
+
+import copy
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .model_registry import get_model_registry
+from .image_buffer import ImageBuffer
+from .real_lpp_detector import RealLPPDetector, load_yolo_weights
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INPUT_SIZE = 640
+LETTERBOX_COLOR = 114
+
+
+def _sidecar_path(onnx_path: Union[str, Path]) -> Path:
+    return Path(onnx_path).with_suffix(".json")
+
+
+def read_export_metadata(onnx_path: Union[str, Path]) -> Dict[str, Any]:
+    """Metadata written next to an exported model (empty if missing)"""
+    sidecar = _sidecar_path(onnx_path)
+    if not sidecar.exists():
+        return {}
+    return json.loads(sidecar.read_text())
+
+
+def _unwrap_yolo_module(model: Any) -> Any:
+    """Inner DetectionModel of a torch hub YOLOv5 model (AutoShape -> DetectMultiBackend)."""
+    module = model
+    while type(module).__name__ in ('AutoShape', 'DetectMultiBackend') and hasattr(module, 'model'):
+        module = module.model
+    return module
+
+
+def _prepare_for_export(model: Any):
+    """Float32 CPU copy of the inner YOLOv5 module returning only its predictions."""
+    module = copy.deepcopy(_unwrap_yolo_module(model)).float().cpu().eval()
+    for layer in module.modules():
+        # YOLOv5 Detect layers return (predictions, features) unless export is set
+        if hasattr(layer, 'export'):
+            layer.export = True
+    return module
+
+
+def export_onnx(model: Any,
+                output_path: Union[str, Path],
+                input_size: int = DEFAULT_INPUT_SIZE,
+                opset: int = 12,
+                dynamic_batch: bool = True) -> str:
+    """
+    Export a YOLOv5 model to ONNX.
+
+    The shared (registry) model is not modified: a CPU float32 copy of its
+    inner module is exported.
+
+    Args:
+        model: YOLOv5 model (torch hub AutoShape or plain module)
+        output_path: Destination .onnx file
+        input_size: Square input side
+        opset: ONNX opset version
+        dynamic_batch: Allow any batch size at inference
+
+    Returns:
+        Path of the exported model
+    """
+    import torch
+
+    module = _prepare_for_export(model)
+    dummy = torch.zeros(1, 3, input_size, input_size)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            dummy,
+            str(output_path),
+            opset_version=opset,
+            input_names=['images'],
+            output_names=['output'],
+            dynamic_axes={'images': {0: 'batch'}, 'output': {0: 'batch'}} if dynamic_batch else None,
+            do_constant_folding=True
+        )
+
+    logger.info(f"Exported ONNX model to {output_path}")
+    return str(output_path)
+
+
+def export_torchscript(model: Any, output_path: Union[str, Path], input_size: int = DEFAULT_INPUT_SIZE) -> str:
+    """
+    Export a YOLOv5 model to TorchScript (traced).
+
+    Args:
+        model: YOLOv5 model (torch hub AutoShape or plain module)
+        output_path: Destination .torchscript file
+        input_size: Square input side used for tracing
+
+    Returns:
+        Path of the exported model
+    """
+    import torch
+
+    module = _prepare_for_export(model)
+    dummy = torch.zeros(1, 3, input_size, input_size)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(module, dummy, strict=False)
+    traced.save(str(output_path))
+
+    logger.info(f"Exported TorchScript model to {output_path}")
+    return str(output_path)
+
+
+def quantize_onnx_int8(onnx_path: Union[str, Path], output_path: Union[str, Path]) -> str:
+    """
+    Dynamically quantize an ONNX model's weights to INT8.
+
+    Args:
+        onnx_path: Float32 ONNX model
+        output_path: Destination of the quantized model
+
+    Returns:
+        Path of the quantized model
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ImportError("onnxruntime is required for INT8 quantization")
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(onnx_path), str(output_path), weight_type=QuantType.QUInt8)
+    logger.info(f"Quantized ONNX model to {output_path}")
+    return str(output_path)
+
+
+def export_detector(weights_path: Union[str, Path],
+                    output_dir: Union[str, Path],
+                    input_size: int = DEFAULT_INPUT_SIZE,
+                    opset: int = 12,
+                    int8: bool = False,
+                    torchscript: bool = False,
+                    class_names: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Export the configured detector weights for CPU inference.
+
+    Args:
+        weights_path: Trained YOLOv5 weights (.pt)
+        output_dir: Directory for the exported files
+        input_size: Square input side
+        opset: ONNX opset version
+        int8: Also write an INT8 dynamically quantized ONNX model
+        torchscript: Also write a TorchScript model
+        class_names: Class names (defaults to RealLPPDetector classes)
+
+    Returns:
+        Paths of the exported files by format ("onnx", "onnx_int8", "torchscript")
+    """
+    import torch
+
+    weights_path = Path(weights_path)
+    output_dir = Path(output_dir)
+    model = load_yolo_weights(str(weights_path), torch.device('cpu'))
+
+    metadata = {
+        'source_weights': weights_path.name,
+        'input_size': input_size,
+        'opset': opset,
+        'class_names': class_names or list(RealLPPDetector.CLASS_NAMES),
+        'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+    paths = {'onnx': export_onnx(model, output_dir / f"{weights_path.stem}.onnx", input_size, opset)}
+    _sidecar_path(paths['onnx']).write_text(json.dumps({**metadata, 'quantized': False}, indent=2))
+
+    if int8:
+        paths['onnx_int8'] = quantize_onnx_int8(paths['onnx'], output_dir / f"{weights_path.stem}.int8.onnx")
+        _sidecar_path(paths['onnx_int8']).write_text(json.dumps({**metadata, 'quantized': True}, indent=2))
+
+    if torchscript:
+        paths['torchscript'] = export_torchscript(model, output_dir / f"{weights_path.stem}.torchscript", input_size)
+
+    return paths
+
+
+def parse_core_list(value: Optional[str]) -> Optional[List[int]]:
+    """Parse a core list such as "0-3" or "0,2,4" (None if empty)"""
+    if not value:
+        return None
+    cores = []
+    for part in value.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-')
+            cores.extend(range(int(start), int(end) + 1))
+        elif part:
+            cores.append(int(part))
+    return cores or None
+
+
+def _default_thread_count() -> int:
+    if PSUTIL_AVAILABLE:
+        physical = psutil.cpu_count(logical=False)
+        if physical:
+            return physical
+    return os.cpu_count() or 1
+
+
+def create_cpu_session(model_path: Union[str, Path],
+                       intra_op_threads: Optional[int] = None,
+                       inter_op_threads: int = 1,
+                       cores: Optional[Sequence[int]] = None) -> Any:
+    """
+    Create an ONNX Runtime CPU session tuned for low-latency inference.
+
+    Args:
+        model_path: ONNX model
+        intra_op_threads: Threads per operator (physical cores if None, or
+            len(cores) when cores are given)
+        inter_op_threads: Threads running independent operators
+        cores: CPU cores (0-based) to pin the intra-op threads to
+
+    Returns:
+        onnxruntime.InferenceSession
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ImportError("onnxruntime is not installed")
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = intra_op_threads or (len(cores) if cores else _default_thread_count())
+    options.inter_op_num_threads = inter_op_threads
+
+    if cores and options.intra_op_num_threads > 1:
+        # One entry per intra-op thread except the calling thread; ONNX
+        # Runtime numbers logical processors from 1
+        pinned = [cores[i % len(cores)] + 1 for i in range(1, options.intra_op_num_threads)]
+        options.add_session_config_entry("session.intra_op_thread_affinities", ";".join(str(c) for c in pinned))
+
+    return ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def letterbox(image: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize keeping aspect ratio and pad to a square input (YOLOv5 letterbox).
+
+    Args:
+        image: HWC uint8 image
+        size: Square output side
+
+    Returns:
+        (padded image, scale ratio, (pad_x, pad_y))
+    """
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = round(width * ratio), round(height * ratio)
+
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+    padded = np.full((size, size, 3), LETTERBOX_COLOR, dtype=np.uint8)
+    padded[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = image
+    return padded, ratio, (pad_x, pad_y)
+
+
+def postprocess_predictions(predictions: np.ndarray,
+                            conf_threshold: float,
+                            iou_threshold: float,
+                            max_detections: int = 300) -> np.ndarray:
+    """
+    Decode raw YOLOv5 predictions of one image.
+
+    Args:
+        predictions: (anchors, 5 + classes) rows of cx, cy, w, h, objectness, class scores
+        conf_threshold: Minimum objectness * class score
+        iou_threshold: Class-aware NMS threshold
+        max_detections: Maximum detections kept
+
+    Returns:
+        (k, 6) array of x1, y1, x2, y2, confidence, class
+    """
+    candidates = predictions[predictions[:, 4] > conf_threshold]
+    if not len(candidates):
+        return np.empty((0, 6), dtype=np.float32)
+
+    scores = candidates[:, 5:] * candidates[:, 4:5]
+    classes = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), classes]
+    keep = confidences > conf_threshold
+    candidates, classes, confidences = candidates[keep], classes[keep], confidences[keep]
+    if not len(candidates):
+        return np.empty((0, 6), dtype=np.float32)
+
+    boxes = np.empty((len(candidates), 4), dtype=np.float32)
+    boxes[:, 0] = candidates[:, 0] - candidates[:, 2] / 2
+    boxes[:, 1] = candidates[:, 1] - candidates[:, 3] / 2
+    boxes[:, 2] = candidates[:, 0] + candidates[:, 2] / 2
+    boxes[:, 3] = candidates[:, 1] + candidates[:, 3] / 2
+
+    # Class-aware NMS: offset boxes per class so classes never overlap
+    offset = boxes + (classes[:, None] * 4096).astype(np.float32)
+    xywh = np.concatenate([offset[:, :2], offset[:, 2:] - offset[:, :2]], axis=1)
+    kept = cv2.dnn.NMSBoxes(xywh.tolist(), confidences.tolist(), conf_threshold, iou_threshold)
+    kept = np.array(kept).reshape(-1)[:max_detections]
+
+    return np.concatenate([
+        boxes[kept],
+        confidences[kept, None],
+        classes[kept, None].astype(np.float32)
+    ], axis=1)
+
+
+class OnnxLPPDetector(RealLPPDetector):
+    """Pressure ulcer detector running an exported YOLOv5 model on ONNX Runtime."""
+
+    def __init__(self,
+                 model_path: str,
+                 intra_op_threads: Optional[int] = None,
+                 inter_op_threads: int = 1,
+                 cores: Optional[Sequence[int]] = None):
+        """
+        Args:
+            model_path: Exported .onnx model (see export_detector)
+            intra_op_threads: Threads per operator (physical cores if None)
+            inter_op_threads: Threads running independent operators
+            cores: CPU cores (0-based) to pin inference threads to
+        """
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.cores = list(cores) if cores else None
+        self.session = None
+        super().__init__(model_path)
+
+    def _load_model(self):
+        """Create (or reuse) the ONNX Runtime session; no mock fallback."""
+        if not self.model_path or not Path(self.model_path).exists():
+            raise FileNotFoundError(f"ONNX model not found: {self.model_path}")
+
+        metadata = read_export_metadata(self.model_path)
+        self.input_size = metadata.get('input_size', DEFAULT_INPUT_SIZE)
+        self.class_names = metadata.get('class_names', self.class_names)
+        self.quantized = metadata.get('quantized', False)
+
+        # Sessions are shared per model file and thread configuration
+        device_key = f"cpu:threads={self.intra_op_threads or 'auto'}:cores={self.cores or 'any'}"
+        self.session = get_model_registry().get_or_load(
+            "yolo_onnx", self.model_path, device_key,
+            lambda: create_cpu_session(self.model_path, self.intra_op_threads, self.inter_op_threads, self.cores)
+        )
+        self.model = self.session
+        self.input_name = self.session.get_inputs()[0].name
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.dynamic_batch = not isinstance(batch_dim, int)
+        logger.info(f"Loaded ONNX LPP model: {self.model_path}")
+
+    def detect(self, image: Union[np.ndarray, ImageBuffer], raise_errors: bool = False) -> List[Dict[str, Any]]:
+        """
+        Detect pressure ulcers in image.
+
+        Args:
+            image: Input image as numpy array (RGB) or ImageBuffer
+            raise_errors: Re-raise inference errors instead of returning no detections
+
+        Returns:
+            List of detection dictionaries with bounding boxes and classifications
+        """
+        return self.detect_batch([image], raise_errors)[0]
+
+    def detect_batch(self,
+                     images: List[Union[np.ndarray, ImageBuffer]],
+                     raise_errors: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Detect pressure ulcers in several images with one session run.
+
+        Args:
+            images: Input images as numpy arrays (RGB) or ImageBuffers
+            raise_errors: Re-raise inference errors instead of returning no
+                detections for every image
+
+        Returns:
+            One detection list per input image, in the same order
+        """
+        if not images:
+            return []
+
+        try:
+            inputs = [self._to_uint8(self._as_model_input(image)) for image in images]
+            batch = np.empty((len(inputs), 3, self.input_size, self.input_size), dtype=np.float32)
+            placements = []
+            for index, image in enumerate(inputs):
+                padded, ratio, pad = letterbox(image, self.input_size)
+                np.multiply(padded.transpose(2, 0, 1), 1.0 / 255.0, out=batch[index], casting='unsafe')
+                placements.append((ratio, pad, image.shape[:2]))
+
+            if self.dynamic_batch:
+                outputs = self.session.run(None, {self.input_name: batch})[0]
+            else:
+                outputs = np.concatenate([
+                    self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                    for i in range(len(inputs))
+                ])
+
+            return [
+                self._parse_rows(self._scale_rows(
+                    postprocess_predictions(outputs[i], self.confidence_threshold, self.iou_threshold),
+                    *placements[i]
+                ))
+                for i in range(len(inputs))
+            ]
+
+        except Exception as e:
+            logger.error(f"Error in ONNX detection: {e}")
+            if raise_errors:
+                raise
+            return [[] for _ in images]
+
+    @staticmethod
+    def _to_uint8(image: np.ndarray) -> np.ndarray:
+        """Preprocessed float images (0-1 or 0-255) back to uint8."""
+        if image.dtype == np.uint8:
+            return image
+        scale = 255.0 if image.max() <= 1.0 else 1.0
+        return np.clip(image * scale, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def _scale_rows(rows: np.ndarray, ratio: float, pad: Tuple[int, int], shape: Tuple[int, int]) -> np.ndarray:
+        """Map letterboxed boxes back to the input image."""
+        if not len(rows):
+            return rows
+        height, width = shape
+        rows[:, [0, 2]] = np.clip((rows[:, [0, 2]] - pad[0]) / ratio, 0, width)
+        rows[:, [1, 3]] = np.clip((rows[:, [1, 3]] - pad[1]) / ratio, 0, height)
+        return rows
+
+    def _parse_rows(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """Convert x1, y1, x2, y2, conf, cls rows to detection dictionaries."""
+        detections = []
+        for x1, y1, x2, y2, conf, cls in rows:
+            class_name = self.class_names[int(cls)] if int(cls) < len(self.class_names) else 'unknown'
+            detections.append({
+                'bbox': [int(x1), int(y1), int(x2), int(y2)],
+                'confidence': float(conf),
+                'class_id': int(cls),
+                'class_name': class_name,
+                'lpp_stage': self._extract_lpp_stage(class_name)
+            })
+        return detections
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Backend configuration"""
+        return {
+            'backend': 'onnxruntime',
+            'model_path': self.model_path,
+            'quantized': self.quantized,
+            'input_size': self.input_size,
+            'dynamic_batch': self.dynamic_batch,
+            'intra_op_threads': self.intra_op_threads,
+            'inter_op_threads': self.inter_op_threads,
+            'cores': self.cores
+        }
+
+
+def _box_iou(a: List[float], b: List[float]) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    intersection = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def check_parity(reference: Any,
+                 candidate: Any,
+                 images: Sequence[Union[str, np.ndarray]],
+                 iou_threshold: float = 0.5,
+                 min_agreement: float = 0.95,
+                 confidence_tolerance: float = 0.1) -> Dict[str, Any]:
+    """
+    Compare a detector backend against the eager model on fixture images.
+
+    Detections are matched greedily by class and IoU. Both detectors are
+    warmed up on the first image before timing.
+
+    Args:
+        reference: Eager detector (e.g. RealLPPDetector)
+        candidate: Exported detector (e.g. OnnxLPPDetector)
+        images: Fixture image paths or RGB arrays
+        iou_threshold: Minimum IoU for two detections to match
+        min_agreement: Minimum matched fraction of both detection sets
+        confidence_tolerance: Maximum confidence difference of a match
+
+    Returns:
+        Parity report with agreement, confidence delta, latencies and speedup
+    """
+    arrays = []
+    for image in images:
+        if isinstance(image, (str, Path)):
+            array = cv2.imread(str(image))
+            if array is None:
+                raise ValueError(f"Could not load fixture image: {image}")
+            image = cv2.cvtColor(array, cv2.COLOR_BGR2RGB)
+        arrays.append(image)
+
+    if not arrays:
+        raise ValueError("Parity check needs at least one fixture image")
+
+    reference.detect(arrays[0])
+    candidate.detect(arrays[0])
+
+    totals = {'reference': 0, 'candidate': 0, 'matched': 0}
+    latency = {'reference': 0.0, 'candidate': 0.0}
+    max_confidence_delta = 0.0
+
+    for array in arrays:
+        started = time.perf_counter()
+        expected = reference.detect(array)
+        latency['reference'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = candidate.detect(array)
+        latency['candidate'] += time.perf_counter() - started
+
+        totals['reference'] += len(expected)
+        totals['candidate'] += len(actual)
+
+        unmatched = list(actual)
+        for detection in sorted(expected, key=lambda d: -d['confidence']):
+            best, best_iou = None, iou_threshold
+            for other in unmatched:
+                if other.get('class_id') != detection.get('class_id'):
+                    continue
+                iou = _box_iou(detection['bbox'], other['bbox'])
+                if iou >= best_iou:
+                    best, best_iou = other, iou
+            if best is not None:
+                unmatched.remove(best)
+                totals['matched'] += 1
+                max_confidence_delta = max(max_confidence_delta, abs(best['confidence'] - detection['confidence']))
+
+    recall = totals['matched'] / totals['reference'] if totals['reference'] else 1.0
+    precision = totals['matched'] / totals['candidate'] if totals['candidate'] else 1.0
+    reference_ms = latency['reference'] * 1000 / len(arrays)
+    candidate_ms = latency['candidate'] * 1000 / len(arrays)
+
+    return {
+        'images': len(arrays),
+        'reference_detections': totals['reference'],
+        'candidate_detections': totals['candidate'],
+        'matched_detections': totals['matched'],
+        'recall': round(recall, 4),
+        'precision': round(precision, 4),
+        'max_confidence_delta': round(max_confidence_delta, 4),
+        'reference_latency_ms': round(reference_ms, 2),
+        'candidate_latency_ms': round(candidate_ms, 2),
+        'speedup': round(reference_ms / candidate_ms, 2) if candidate_ms > 0 else None,
+        'passed': (
+            recall >= min_agreement
+            and precision >= min_agreement
+            and max_confidence_delta <= confidence_tolerance
+        )
+    }
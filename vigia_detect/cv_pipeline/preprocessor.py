@@ -9,10 +9,16 @@ import os
 import cv2
 import numpy as np
 import logging
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from PIL import Image, ExifTags
+from PIL import Image
 import PIL
 
+from .face_anonymizer import FaceAnonymizer, read_capture_metadata
+from .image_buffer import ImageBuffer
+from .tiled_inference import TileConfig, TiledImage, extract_tile, plan_tiles
+
 # Configuración de logging
 logger = logging.getLogger('lpp-detect.preprocessor')
 
@@ -23,13 +29,14 @@ class ImagePreprocessor:
     Implementa transformaciones como:
     - Redimensionamiento
     - Normalización
-    - Eliminación de metadatos EXIF
+    - Eliminación de metadatos EXIF (siempre: solo se copian los píxeles)
     - Detección facial para enmascaramiento
     - Mejora de contraste para identificar eritemas
     """
     
     def __init__(self, target_size=(640, 640), normalize=True, face_detection=True,
-                enhance_contrast=True, remove_exif=True):
+                enhance_contrast=True, remove_exif=None, face_detection_max_side=640,
+                max_workers=None, skip_close_up_faces=True):
         """
         Inicializa el preprocesador.
         
@@ -38,13 +45,30 @@ class ImagePreprocessor:
             normalize: Normalizar valores de píxeles (0-1)
             face_detection: Activar detección facial y enmascaramiento
             enhance_contrast: Mejorar contraste para identificar eritemas
-            remove_exif: Eliminar metadatos EXIF con información privada
+            remove_exif: Obsoleto y sin efecto; los metadatos EXIF se eliminan
+                siempre al cargar la imagen
+            face_detection_max_side: Lado máximo de la copia reducida usada para
+                detectar rostros (None para detectar en resolución completa)
+            max_workers: Hilos de preprocess_batch (por defecto según CPUs)
+            skip_close_up_faces: Omitir la detección facial cuando los metadatos
+                EXIF o de recorte indican un primer plano de una región corporal
         """
         self.target_size = target_size
         self.normalize = normalize
         self.face_detection = face_detection
         self.enhance_contrast = enhance_contrast
-        self.remove_exif = remove_exif
+        if remove_exif is False:
+            warnings.warn(
+                "remove_exif está obsoleto y no tiene efecto: los metadatos EXIF "
+                "se eliminan siempre",
+                DeprecationWarning,
+                stacklevel=2
+            )
+        self.remove_exif = True  # Comportamiento efectivo, para get_preprocessor_info
+        self.face_detection_max_side = face_detection_max_side
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.skip_close_up_faces = skip_close_up_faces
+        self.face_anonymizer = None
         
         # Cargar detector facial si se solicita
         if self.face_detection:
@@ -53,45 +77,35 @@ class ImagePreprocessor:
     def _init_face_detector(self):
         """Inicializa el detector facial."""
         try:
-            # Usar detector facial de OpenCV (Haar Cascade)
-            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            self.face_detector = cv2.CascadeClassifier(cascade_path)
+            # Haar Cascade de OpenCV desde un pool acotado por proceso
+            self.face_anonymizer = FaceAnonymizer(
+                detection_max_side=self.face_detection_max_side,
+                skip_close_ups=self.skip_close_up_faces
+            )
             logger.info("Detector facial inicializado correctamente")
         except Exception as e:
             logger.warning(f"No se pudo inicializar detector facial: {str(e)}")
             self.face_detection = False
     
-    def _remove_exif_data(self, pil_image):
-        """Elimina metadatos EXIF que pueden contener información privada."""
-        data = list(pil_image.getdata())
-        image_without_exif = Image.new(pil_image.mode, pil_image.size)
-        image_without_exif.putdata(data)
-        return image_without_exif
-    
-    def _detect_and_blur_faces(self, cv_image):
-        """Detecta rostros en la imagen y los difumina para proteger privacidad."""
-        if not self.face_detection or self.face_detector is None:
-            return cv_image
-        
-        # Convertir a escala de grises para detección
-        gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
+    def _detect_and_blur_faces(self, cv_image, metadata=None):
+        """
+        Detecta rostros en la imagen y los difumina para proteger privacidad.
         
-        # Detectar rostros
-        faces = self.face_detector.detectMultiScale(
-            gray, 
-            scaleFactor=1.1, 
-            minNeighbors=5, 
-            minSize=(30, 30)
-        )
+        La detección se hace sobre una copia reducida a face_detection_max_side
+        y las cajas se escalan a la imagen original.
         
-        # Difuminar rostros detectados
-        for (x, y, w, h) in faces:
-            # Aplicar gaussianBlur al área del rostro
-            face_roi = cv_image[y:y+h, x:x+w]
-            cv_image[y:y+h, x:x+w] = cv2.GaussianBlur(face_roi, (99, 99), 30)
-            logger.info(f"Rostro detectado y difuminado en coordenadas: ({x}, {y}, {w}, {h})")
+        Args:
+            cv_image: Imagen BGR (se modifica en el lugar)
+            metadata: Metadatos de captura/recorte; los primeros planos de
+                regiones corporales se omiten
+            
+        Returns:
+            Tupla (imagen, informe) con rostros, omisión y tiempo en ms
+        """
+        if not self.face_detection or self.face_anonymizer is None:
+            return cv_image, {'faces': 0, 'skipped': True, 'reason': 'disabled', 'time_ms': 0.0}
         
-        return cv_image
+        return self.face_anonymizer.anonymize(cv_image, metadata)
     
     def _enhance_image_contrast(self, cv_image):
         """Mejora el contraste para mejor visualización de eritemas."""
@@ -121,51 +135,246 @@ class ImagePreprocessor:
         
         return enhanced
     
+    def _load_image(self, image_path):
+        """
+        Carga la imagen como array BGR propio (sin metadatos EXIF).
+        
+        Returns:
+            Tupla (array BGR, metadatos de captura/recorte para la detección facial)
+        """
+        if isinstance(image_path, (str, Path)):
+            # Cargar con PIL; np.array copia solo los píxeles, por lo que los
+            # metadatos EXIF nunca llegan al array. Solo se conserva la
+            # distancia al sujeto para omitir la detección en primeros planos
+            with Image.open(image_path) as pil_image:
+                metadata = read_capture_metadata(pil_image) if self.skip_close_up_faces else {}
+                image = np.array(pil_image)
+            
+            # Convertir a BGR en el mismo array
+            return cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=image), metadata
+        
+        if isinstance(image_path, ImageBuffer):
+            # as_bgr convierte (copia) si es RGB; si ya es BGR copiar porque
+            # el difuminado de rostros modifica el array
+            bgr = image_path.as_bgr()
+            return (bgr.copy() if bgr is image_path.array else bgr), dict(image_path.metadata)
+        
+        # Asumir que es un array numpy
+        return image_path.copy(), {}
+    
+    def _transform(self, cv_image, metadata=None, out=None):
+        """
+        Aplica rostros, contraste y redimensionamiento (resultado uint8 BGR).
+        
+        Args:
+            cv_image: Imagen BGR (puede modificarse en el lugar)
+            metadata: Metadatos de captura/recorte para la detección facial
+            out: Array uint8 (alto, ancho, 3) preasignado para el resultado
+            
+        Returns:
+            Tupla (imagen redimensionada, informe de anonimización o None)
+        """
+        # Detectar y difuminar rostros
+        report = None
+        if self.face_detection:
+            cv_image, report = self._detect_and_blur_faces(cv_image, metadata)
+        
+        # Mejorar contraste para detectar eritemas
+        if self.enhance_contrast:
+            cv_image = self._enhance_image_contrast(cv_image)
+        
+        # Redimensionar
+        return cv2.resize(cv_image, self.target_size, dst=out), report
+    
     def preprocess(self, image_path):
         """
         Preprocesa una imagen para optimizar la detección de LPP.
         
         Args:
-            image_path: Ruta a la imagen o array NumPy
+            image_path: Ruta a la imagen, array NumPy o ImageBuffer
             
         Returns:
             numpy.ndarray: Imagen preprocesada como array NumPy
         """
+        return self.preprocess_buffer(image_path).array
+    
+    def preprocess_buffer(self, image_path, pool=None):
+        """
+        Preprocesa una imagen hacia un ImageBuffer compartido por los detectores.
+        
+        Con un BufferPool, el redimensionado y la normalización se escriben
+        en arrays preasignados del pool; el llamador debe invocar release()
+        sobre el buffer cuando termine la detección.
+        
+        Args:
+            image_path: Ruta a la imagen, array NumPy o ImageBuffer
+            pool: BufferPool para los arrays de tamaño fijo (opcional)
+            
+        Returns:
+            ImageBuffer BGR de tamaño target_size (float32 0-1 si normalize=True)
+        """
         try:
-            # Cargar imagen
-            if isinstance(image_path, (str, Path)):
-                # Cargar con PIL para manejar EXIF
-                pil_image = Image.open(image_path)
-                
-                # Eliminar EXIF si se solicita
-                if self.remove_exif:
-                    pil_image = self._remove_exif_data(pil_image)
-                
-                # Convertir a array numpy
-                cv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+            cv_image, capture_metadata = self._load_image(image_path)
+            original_size = (cv_image.shape[1], cv_image.shape[0])
+            width, height = self.target_size
+            
+            resized = pool.acquire((height, width, 3), np.uint8) if pool else None
+            array, anonymization = self._transform(cv_image, capture_metadata, out=resized)
+            
+            # Normalizar valores de píxeles si se solicita
+            if self.normalize:
+                normalized = pool.acquire((height, width, 3), np.float32) if pool else np.empty((height, width, 3), np.float32)
+                np.multiply(array, 1.0 / 255.0, out=normalized, casting='unsafe')
+                if pool:
+                    pool.release(array)
+                array = normalized
+            
+            if isinstance(image_path, ImageBuffer):
+                source_path = image_path.source_path
+            elif isinstance(image_path, (str, Path)):
+                source_path = str(image_path)
             else:
-                # Asumir que es un array numpy
-                cv_image = image_path.copy()
+                source_path = None
             
-            # Detectar y difuminar rostros
-            if self.face_detection:
-                cv_image = self._detect_and_blur_faces(cv_image)
+            return ImageBuffer(
+                array=array,
+                color_order="BGR",
+                normalized=self.normalize,
+                source_path=source_path,
+                original_size=original_size,
+                metadata={'anonymization': anonymization} if anonymization else {},
+                _release=pool.release if pool else None
+            )
             
-            # Mejorar contraste para detectar eritemas
+        except Exception as e:
+            logger.error(f"Error en preprocesamiento: {str(e)}")
+            raise
+    
+    def preprocess_tiles(self, image_path, tile_config=None, pool=None):
+        """
+        Preprocesa una imagen en resolución completa dividida en teselas.
+    
+        Rostros y contraste se procesan sobre la imagen original; cada tesela
+        se recorta, se redimensiona a tile_size y se normaliza como en
+        preprocess_buffer. Las imágenes menores que min_image_side producen
+        una única tesela con la imagen completa.
+    
+        Args:
+            image_path: Ruta a la imagen, array NumPy o ImageBuffer
+            tile_config: TileConfig con el presupuesto de teselas
+            pool: BufferPool para los arrays de las teselas (opcional)
+    
+        Returns:
+            TiledImage con un ImageBuffer BGR por tesela
+        """
+        tile_config = tile_config or TileConfig()
+        tile_size = tile_config.tile_size
+        buffers = []
+    
+        try:
+            cv_image, capture_metadata = self._load_image(image_path)
+            height, width = cv_image.shape[:2]
+    
+            anonymization = None
+            if self.face_detection:
+                cv_image, anonymization = self._detect_and_blur_faces(cv_image, capture_metadata)
             if self.enhance_contrast:
                 cv_image = self._enhance_image_contrast(cv_image)
+    
+            tiles = plan_tiles(width, height, tile_config)
+            scratch = np.empty((tile_size, tile_size, 3), np.uint8) if self.normalize else None
+    
+            for tile in tiles:
+                if self.normalize:
+                    resized = extract_tile(cv_image, tile, tile_size, out=scratch)
+                    array = pool.acquire((tile_size, tile_size, 3), np.float32) if pool else np.empty((tile_size, tile_size, 3), np.float32)
+                    np.multiply(resized, 1.0 / 255.0, out=array, casting='unsafe')
+                else:
+                    array = pool.acquire((tile_size, tile_size, 3), np.uint8) if pool else None
+                    array = extract_tile(cv_image, tile, tile_size, out=array)
+                    if array.base is not None and pool is None:
+                        # Las teselas sin redimensionar son vistas de la imagen completa
+                        array = array.copy()
+    
+                buffers.append(ImageBuffer(
+                    array=array,
+                    color_order="BGR",
+                    normalized=self.normalize,
+                    original_size=(tile.width, tile.height),
+                    metadata={'tile': tile},
+                    _release=pool.release if pool else None
+                ))
+    
+            if isinstance(image_path, ImageBuffer):
+                source_path = image_path.source_path
+            elif isinstance(image_path, (str, Path)):
+                source_path = str(image_path)
+            else:
+                source_path = None
+    
+            return TiledImage(
+                buffers=buffers,
+                tiles=tiles,
+                original_size=(width, height),
+                config=tile_config,
+                source_path=source_path,
+                metadata={'anonymization': anonymization} if anonymization else {}
+            )
+    
+        except Exception as e:
+            for buffer in buffers:
+                buffer.release()
+            logger.error(f"Error en preprocesamiento por teselas: {str(e)}")
+            raise
+    
+    def preprocess_batch(self, images, out=None):
+        """
+        Preprocesa un lote de imágenes en paralelo hacia un único array NCHW.
+        
+        Cada hilo decodifica una imagen, anonimiza los rostros y escribe el resultado directamente en su posición del
+        array de salida (sin listas intermedias ni np.stack).
+        
+        Args:
+            images: Lista de rutas a imágenes, arrays NumPy BGR o ImageBuffer
+            out: Array float32 preasignado de forma (N, 3, alto, ancho) (opcional)
             
-            # Redimensionar
-            cv_image = cv2.resize(cv_image, self.target_size)
-            
-            # Normalizar valores de píxeles si se solicita
-            if self.normalize:
-                cv_image = cv_image.astype(np.float32) / 255.0
+        Returns:
+            numpy.ndarray: Array float32 (N, 3, alto, ancho) en orden BGR,
+            normalizado a 0-1 si normalize=True
+        """
+        images = list(images)
+        width, height = self.target_size
+        shape = (len(images), 3, height, width)
+        
+        if out is None:
+            out = np.empty(shape, dtype=np.float32)
+        elif out.shape != shape or out.dtype != np.float32:
+            raise ValueError(f"Array de salida debe ser float32 con forma {shape}, recibido {out.dtype} {out.shape}")
+        
+        scale = 1.0 / 255.0 if self.normalize else 1.0
+        
+        def process_into(index):
+            cv_image, capture_metadata = self._load_image(images[index])
+            cv_image, _ = self._transform(cv_image, capture_metadata)
+            # HWC uint8 -> CHW float32 escrito en el slot del lote
+            np.multiply(cv_image.transpose(2, 0, 1), scale, out=out[index], casting='unsafe')
+        
+        if not images:
+            return out
+        
+        try:
+            if len(images) == 1 or self.max_workers == 1:
+                for index in range(len(images)):
+                    process_into(index)
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(images))) as executor:
+                    # list() propaga la primera excepción
+                    list(executor.map(process_into, range(len(images))))
             
-            return cv_image
+            return out
             
         except Exception as e:
-            logger.error(f"Error en preprocesamiento: {str(e)}")
+            logger.error(f"Error en preprocesamiento por lote: {str(e)}")
             raise
     
     def get_preprocessor_info(self):
@@ -175,5 +384,9 @@ class ImagePreprocessor:
             "normalize": self.normalize,
             "face_detection": self.face_detection,
             "enhance_contrast": self.enhance_contrast,
-            "remove_exif": self.remove_exif
+            "remove_exif": self.remove_exif,
+            "face_detection_max_side": self.face_detection_max_side,
+            "skip_close_up_faces": self.skip_close_up_faces,
+            "max_workers": self.max_workers,
+            "anonymization": self.face_anonymizer.get_stats() if self.face_anonymizer else None
         }
@@ -10,13 +10,43 @@ import cv2
 import numpy as np
 from pathlib import Path
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from .yolo_loader import load_shared_yolo_model
+from .image_buffer import ImageBuffer
 
 logger = logging.getLogger(__name__)
 
+
+def load_yolo_weights(model_path: str, device: torch.device) -> Any:
+    """
+    Load trained YOLOv5 weights once per process and device.
+    
+    Goes through the same loader as LPPDetector, so both share one
+    registry entry built with the same load options.
+    
+    Args:
+        model_path: Path to the trained weights
+        device: Device to place the model on
+        
+    Returns:
+        Shared YOLOv5 model
+    """
+    return load_shared_yolo_model(model_path=model_path, device=device)
+
+
 class RealLPPDetector:
     """Real pressure ulcer detector using trained YOLOv5 model."""
     
+    # LPP class mapping
+    CLASS_NAMES = (
+        'pressure-ulcer-stage-1',
+        'pressure-ulcer-stage-2', 
+        'pressure-ulcer-stage-3',
+        'pressure-ulcer-stage-4',
+        'non-pressure-ulcer'
+    )
+    
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path or self._get_default_model_path()
         self.model = None
@@ -24,14 +54,7 @@ class RealLPPDetector:
         self.confidence_threshold = 0.25
         self.iou_threshold = 0.45
         
-        # LPP class mapping
-        self.class_names = [
-            'pressure-ulcer-stage-1',
-            'pressure-ulcer-stage-2', 
-            'pressure-ulcer-stage-3',
-            'pressure-ulcer-stage-4',
-            'non-pressure-ulcer'
-        ]
+        self.class_names = list(self.CLASS_NAMES)
         
         # Load model
         self._load_model()
@@ -51,10 +74,8 @@ class RealLPPDetector:
         """Load the YOLOv5 model."""
         try:
             if self.model_path and Path(self.model_path).exists():
-                # Load custom trained model
-                self.model = torch.hub.load('ultralytics/yolov5', 'custom', 
-                                          path=self.model_path, force_reload=True)
-                self.model.to(self.device)
+                # Load custom trained model (shared across detectors)
+                self.model = load_yolo_weights(self.model_path, self.device)
                 logger.info(f"Loaded custom LPP model: {self.model_path}")
                 
             else:
@@ -117,16 +138,20 @@ class RealLPPDetector:
         
         return MockModel()
     
-    def detect(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def detect(self, image: Union[np.ndarray, ImageBuffer], raise_errors: bool = False) -> List[Dict[str, Any]]:
         """
         Detect pressure ulcers in image.
         
         Args:
-            image: Input image as numpy array
+            image: Input image as numpy array (RGB) or ImageBuffer
+            raise_errors: Re-raise inference errors instead of returning no
+                detections (callers that cache results must not mistake a
+                failure for a clean image)
             
         Returns:
             List of detection dictionaries with bounding boxes and classifications
         """
+        image = self._as_model_input(image)
         try:
             # Run inference
             results = self.model(image)
@@ -136,17 +161,7 @@ class RealLPPDetector:
             
             if hasattr(results, 'xyxy') and len(results.xyxy[0]) > 0:
                 # Real YOLOv5 results
-                for detection in results.xyxy[0]:
-                    x1, y1, x2, y2, conf, cls = detection.cpu().numpy()
-                    
-                    if conf >= self.confidence_threshold:
-                        detections.append({
-                            'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                            'confidence': float(conf),
-                            'class_id': int(cls),
-                            'class_name': self.class_names[int(cls)] if int(cls) < len(self.class_names) else 'unknown',
-                            'lpp_stage': self._extract_lpp_stage(self.class_names[int(cls)] if int(cls) < len(self.class_names) else 'unknown')
-                        })
+                detections = self._parse_xyxy(results.xyxy[0])
             
             elif hasattr(results, 'pandas'):
                 # Mock results format
@@ -169,8 +184,73 @@ class RealLPPDetector:
             
         except Exception as e:
             logger.error(f"Error in detection: {e}")
+            if raise_errors:
+                raise
             return []
     
+    def detect_batch(self,
+                     images: List[Union[np.ndarray, ImageBuffer]],
+                     raise_errors: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Detect pressure ulcers in several images with one forward pass.
+        
+        Args:
+            images: Input images as numpy arrays (RGB) or ImageBuffers
+            raise_errors: Re-raise inference errors instead of returning no
+                detections for every image
+            
+        Returns:
+            One detection list per input image, in the same order
+        """
+        if not images:
+            return []
+        
+        images = [self._as_model_input(image) for image in images]
+        
+        if not isinstance(self.model, torch.nn.Module):
+            # Mock model handles one image per call
+            return [self.detect(image, raise_errors) for image in images]
+        
+        try:
+            # YOLOv5 AutoShape batches a list of images into one forward pass
+            results = self.model(list(images))
+            batch_detections = [self._parse_xyxy(xyxy) for xyxy in results.xyxy]
+            
+            logger.info(f"Detected {sum(len(d) for d in batch_detections)} pressure ulcers "
+                        f"in batch of {len(images)} images")
+            return batch_detections
+            
+        except Exception as e:
+            logger.error(f"Error in batch detection: {e}")
+            if raise_errors:
+                raise
+            return [[] for _ in images]
+    
+    def _as_model_input(self, image: Union[np.ndarray, ImageBuffer]) -> np.ndarray:
+        """RGB array for YOLOv5 (ImageBuffers already in RGB are not copied)."""
+        if isinstance(image, ImageBuffer):
+            return image.as_rgb()
+        return image
+    
+    def _parse_xyxy(self, xyxy: torch.Tensor) -> List[Dict[str, Any]]:
+        """Convert one image's YOLOv5 xyxy tensor to detection dictionaries."""
+        detections = []
+        
+        for detection in xyxy:
+            x1, y1, x2, y2, conf, cls = detection.cpu().numpy()
+            
+            if conf >= self.confidence_threshold:
+                class_name = self.class_names[int(cls)] if int(cls) < len(self.class_names) else 'unknown'
+                detections.append({
+                    'bbox': [int(x1), int(y1), int(x2), int(y2)],
+                    'confidence': float(conf),
+                    'class_id': int(cls),
+                    'class_name': class_name,
+                    'lpp_stage': self._extract_lpp_stage(class_name)
+                })
+        
+        return detections
+    
     def _extract_lpp_stage(self, class_name: str) -> Optional[int]:
         """Extract LPP stage from class name."""
         if 'stage-1' in class_name:
@@ -13,6 +13,15 @@ from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 from cv_pipeline.detector import LPPDetector
+from cv_pipeline.model_registry import get_model_registry
+
+
+@pytest.fixture(autouse=True)
+def clear_model_registry():
+    """Cada test parchea torch.hub.load: evitar modelos compartidos entre tests."""
+    get_model_registry().evict()
+    yield
+    get_model_registry().evict()
 
 # Tests
 def test_detector_initialization():
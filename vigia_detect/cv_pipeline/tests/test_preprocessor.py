@@ -12,6 +12,7 @@ import cv2
 from pathlib import Path
 
 from cv_pipeline.preprocessor import ImagePreprocessor
+from cv_pipeline.image_buffer import BufferPool, ImageBuffer
 
 # Directorio con imágenes de prueba
 TEST_IMAGES_DIR = Path(__file__).resolve().parent / "data"
@@ -172,9 +173,89 @@ def test_contrast_enhancement():
     # Y verificamos que el procesamiento no falló
     assert enhanced_img.size > 0
 
+def test_preprocess_batch_matches_single_image():
+    """Verifica que el lote NCHW coincide con el preprocesamiento individual."""
+    test_images = setup_test_images()
+    
+    preprocessor = ImagePreprocessor(
+        target_size=(160, 128),
+        face_detection=False,
+        enhance_contrast=True,
+        max_workers=2
+    )
+    
+    batch = preprocessor.preprocess_batch(test_images + [test_images[0]])
+    
+    # Verificar forma NCHW y tipo
+    assert batch.shape == (3, 3, 128, 160)
+    assert batch.dtype == np.float32
+    
+    # Cada slot corresponde a la imagen individual en HWC
+    for index, image_path in enumerate(test_images):
+        single = preprocessor.preprocess(image_path)
+        np.testing.assert_allclose(batch[index], single.transpose(2, 0, 1), atol=1e-6)
+
+def test_preprocess_batch_writes_into_preallocated_array():
+    """Verifica la escritura sobre un array preasignado y su validación."""
+    test_images = setup_test_images()
+    
+    preprocessor = ImagePreprocessor(
+        target_size=(64, 64),
+        normalize=False,
+        face_detection=False,
+        enhance_contrast=False
+    )
+    
+    out = np.zeros((2, 3, 64, 64), dtype=np.float32)
+    result = preprocessor.preprocess_batch(test_images, out=out)
+    
+    assert result is out
+    assert out.max() > 1.0  # Sin normalizar
+    
+    with pytest.raises(ValueError):
+        preprocessor.preprocess_batch(test_images, out=np.zeros((1, 3, 64, 64), dtype=np.float32))
+
+def test_preprocess_buffer_reuses_pooled_arrays():
+    """Verifica que preprocess_buffer coincide con preprocess y recicla arrays."""
+    test_images = setup_test_images()
+    
+    preprocessor = ImagePreprocessor(target_size=(96, 64), face_detection=False)
+    pool = BufferPool()
+    
+    buffer = preprocessor.preprocess_buffer(test_images[0], pool=pool)
+    assert buffer.shape == (64, 96, 3)
+    assert buffer.original_size == (300, 300)
+    assert buffer.normalized and buffer.color_order == "BGR"
+    np.testing.assert_allclose(buffer.array, preprocessor.preprocess(test_images[0]), atol=1e-6)
+    
+    pooled_array = buffer.array
+    buffer.release()
+    
+    second = preprocessor.preprocess_buffer(test_images[1], pool=pool)
+    assert second.array is pooled_array
+    assert pool.get_stats()["reuses"] == 2  # uint8 redimensionado + float32 normalizado
+    
+    # Un ImageBuffer decodificado previamente también es una entrada válida
+    decoded = ImageBuffer.from_file(str(test_images[0]))
+    np.testing.assert_allclose(
+        preprocessor.preprocess(decoded), preprocessor.preprocess(test_images[0]), atol=1 / 255 + 1e-6
+    )
+
+def test_remove_exif_is_deprecated_no_op():
+    """Verifica que remove_exif se sigue aceptando y que EXIF se elimina siempre."""
+    with pytest.warns(DeprecationWarning):
+        preprocessor = ImagePreprocessor(face_detection=False, remove_exif=False)
+    
+    assert preprocessor.get_preprocessor_info()["remove_exif"] is True
+    ImagePreprocessor(face_detection=False, remove_exif=True)  # Sin aviso
+
 if __name__ == "__main__":
     test_preprocessor_initialization()
     test_image_preprocessing_basic()
     test_face_detection_preprocessing()
     test_contrast_enhancement()
+    test_preprocess_batch_matches_single_image()
+    test_preprocess_batch_writes_into_preallocated_array()
+    test_preprocess_buffer_reuses_pooled_arrays()
+    test_remove_exif_is_deprecated_no_op()
     print("Todos los tests pasaron correctamente.")
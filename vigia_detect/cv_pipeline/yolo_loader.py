@@ -25,16 +25,22 @@ import subprocess
 import importlib
 from typing import Optional
 
+from .model_registry import get_model_registry
+
 logger = logging.getLogger(__name__)
 
 
-def load_yolo_model_isolated(model_type='yolov5s', model_path=None):
+def load_yolo_model_isolated(model_type='yolov5s', model_path=None, device='cpu'):
     """
     Carga un modelo YOLOv5 de manera aislada para evitar conflictos de nombres.
     
+    El modelo se carga una sola vez por proceso para cada (modelo, dispositivo)
+    y se comparte entre detectores a través del registro de modelos.
+    
     Args:
         model_type: Tipo de modelo YOLOv5 ('yolov5s', 'yolov5m', 'yolov5l')
         model_path: Ruta al modelo personalizado (opcional)
+        device: Dispositivo en el que se coloca el modelo
         
     Returns:
         Modelo YOLOv5 cargado o None si hay error
@@ -45,66 +51,98 @@ def load_yolo_model_isolated(model_type='yolov5s', model_path=None):
         return None
     
     try:
-        # Estrategia 1: Intentar cargar con entorno aislado
-        logger.info("Intentando cargar YOLOv5 con entorno aislado...")
+        return load_shared_yolo_model(model_type, model_path, device)
+    except Exception as e:
+        logger.error(f"Error cargando YOLOv5: {e}")
+        return None
+
+
+def load_shared_yolo_model(model_type='yolov5s', model_path=None, device='cpu'):
+    """
+    Único punto de carga de YOLOv5 en el registro de modelos.
+    
+    Todos los detectores (LPPDetector, RealLPPDetector, exportación ONNX)
+    cargan por aquí, de modo que la entrada ("yolo", pesos, dispositivo)
+    siempre contiene un modelo cargado con las mismas opciones y ya
+    movido a ese dispositivo.
+    
+    Args:
+        model_type: Tipo de modelo YOLOv5 si no hay pesos personalizados
+        model_path: Ruta al modelo personalizado (opcional)
+        device: Dispositivo en el que se coloca el modelo
+        
+    Returns:
+        Modelo YOLOv5 compartido
+        
+    Raises:
+        Exception: Si la carga falla (no se guarda en el registro)
+    """
+    weights = model_path if model_path and os.path.exists(model_path) else model_type
+    
+    return get_model_registry().get_or_load(
+        "yolo", weights, device,
+        lambda: _load_yolo_isolated(model_type, model_path).to(device)
+    )
+
+
+def _load_yolo_isolated(model_type, model_path):
+    """Carga YOLOv5 desde torch hub con sys.path y sys.modules aislados."""
+    # Estrategia 1: Intentar cargar con entorno aislado
+    logger.info("Intentando cargar YOLOv5 con entorno aislado...")
+    
+    # Limpiar caché de módulos relacionados con YOLOv5
+    modules_to_remove = []
+    for module_name in sys.modules.keys():
+        if any(keyword in module_name.lower() for keyword in ['yolo', 'ultralytics', 'models']):
+            modules_to_remove.append(module_name)
+    
+    for module_name in modules_to_remove:
+        if module_name in sys.modules:
+            del sys.modules[module_name]
+    
+    # Guardar estado actual del path
+    original_path = sys.path.copy()
+    original_modules = sys.modules.copy()
+    
+    try:
+        # Crear un path limpio sin nuestros módulos
+        clean_path = []
+        for path in sys.path:
+            # Excluir paths que contienen 'vigia' o son el directorio actual
+            if 'vigia' not in path.lower() and path != os.getcwd() and path != '':
+                clean_path.append(path)
         
-        # Limpiar caché de módulos relacionados con YOLOv5
-        modules_to_remove = []
-        for module_name in sys.modules.keys():
-            if any(keyword in module_name.lower() for keyword in ['yolo', 'ultralytics', 'models']):
-                modules_to_remove.append(module_name)
+        # Asignar path limpio temporalmente
+        sys.path = clean_path
         
-        for module_name in modules_to_remove:
-            if module_name in sys.modules:
-                del sys.modules[module_name]
+        # Limpiar referencia a nuestro módulo utils
+        if 'utils' in sys.modules:
+            del sys.modules['utils']
         
-        # Guardar estado actual del path
-        original_path = sys.path.copy()
-        original_modules = sys.modules.copy()
+        # Importar torch hub en el contexto limpio
+        import torch
         
-        try:
-            # Crear un path limpio sin nuestros módulos
-            clean_path = []
-            for path in sys.path:
-                # Excluir paths que contienen 'vigia' o son el directorio actual
-                if 'vigia' not in path.lower() and path != os.getcwd() and path != '':
-                    clean_path.append(path)
-            
-            # Asignar path limpio temporalmente
-            sys.path = clean_path
-            
-            # Limpiar referencia a nuestro módulo utils
-            if 'utils' in sys.modules:
-                del sys.modules['utils']
-            
-            # Importar torch hub en el contexto limpio
-            import torch
-            
-            if model_path and os.path.exists(model_path):
-                logger.info(f"Cargando modelo personalizado desde {model_path}")
-                model = torch.hub.load('ultralytics/yolov5', 'custom', path=model_path)
-            else:
-                logger.info(f"Cargando modelo preentrenado {model_type}")
-                model = torch.hub.load('ultralytics/yolov5', model_type)
-            
-            logger.info("✅ YOLOv5 cargado exitosamente con entorno aislado")
-            return model
-            
-        except Exception as isolated_error:
-            logger.warning(f"Falló carga aislada: {isolated_error}")
-            raise isolated_error
-            
-        finally:
-            # Restaurar estado original
-            sys.path = original_path
-            # Solo restaurar módulos que no sean de YOLOv5
-            for module_name, module in original_modules.items():
-                if module_name not in sys.modules and 'yolo' not in module_name.lower():
-                    sys.modules[module_name] = module
-                    
-    except Exception as e:
-        logger.error(f"Error cargando YOLOv5: {e}")
-        return None
+        if model_path and os.path.exists(model_path):
+            logger.info(f"Cargando modelo personalizado desde {model_path}")
+            model = torch.hub.load('ultralytics/yolov5', 'custom', path=model_path)
+        else:
+            logger.info(f"Cargando modelo preentrenado {model_type}")
+            model = torch.hub.load('ultralytics/yolov5', model_type)
+        
+        logger.info("✅ YOLOv5 cargado exitosamente con entorno aislado")
+        return model
+        
+    except Exception as isolated_error:
+        logger.warning(f"Falló carga aislada: {isolated_error}")
+        raise isolated_error
+        
+    finally:
+        # Restaurar estado original
+        sys.path = original_path
+        # Solo restaurar módulos que no sean de YOLOv5
+        for module_name, module in original_modules.items():
+            if module_name not in sys.modules and 'yolo' not in module_name.lower():
+                sys.modules[module_name] = module
 
 
 def create_mock_yolo_model():
@@ -0,0 +1,277 @@
+"""
+Raw Output Array Codec
+======================
+
+Self-describing binary serialization for the numpy arrays captured as raw
+AI outputs (MONAI confidence maps, YOLOv5 detection arrays, Hume AI
+expression vectors).
+
+Each blob starts with a small header holding the codec, dtype and shape,
+so readers no longer depend on side metadata to rebuild the array.
+The payload is byte-shuffled (the bytes of each element are grouped by
+significance, which makes float data far more compressible) and compressed
+with the fastest codec available: zstd, then lz4, then zlib at level 1.
+Float arrays can optionally be quantized to float16 before compression.
+
+Blobs written before this format (plain gzip of array.tobytes()) are still
+readable through decode_raw_array().
+
+Usage:
+    codec = get_raw_output_codec()
+    blob = codec.encode(confidence_maps)
+    array = decode_raw_array(blob)
+"""
+
+import gzip
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+MAGIC = b"VRAW"
+FORMAT_VERSION = 1
+
+# Header: magic, version, codec id, flags, ndim, dtype length
+_HEADER = struct.Struct("<4sBBBBB")
+
+FLAG_SHUFFLE = 0x01
+FLAG_FLOAT16 = 0x02
+
+CODEC_IDS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+
+DEFAULT_LEVELS = {"zlib": 1, "zstd": 3, "lz4": 0}
+
+
+def available_codecs() -> Dict[str, bool]:
+    """Codecs usable in this process"""
+    return {"zstd": ZSTD_AVAILABLE, "lz4": LZ4_AVAILABLE, "zlib": True, "none": True}
+
+
+def _default_codec() -> str:
+    if ZSTD_AVAILABLE:
+        return "zstd"
+    if LZ4_AVAILABLE:
+        return "lz4"
+    return "zlib"
+
+
+def _shuffle(data: bytes, itemsize: int) -> bytes:
+    if itemsize <= 1:
+        return data
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+
+
+def _unshuffle(data: bytes, itemsize: int) -> bytes:
+    if itemsize <= 1:
+        return data
+    return np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1).T.tobytes()
+
+
+def _compress(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if codec == "lz4":
+        return lz4.frame.compress(data, compression_level=level)
+    if codec == "zlib":
+        return zlib.compress(data, level)
+    return data
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to decode this raw output")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "lz4":
+        if not LZ4_AVAILABLE:
+            raise RuntimeError("lz4 is required to decode this raw output")
+        return lz4.frame.decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+def is_encoded(data: Optional[bytes]) -> bool:
+    """Whether a blob uses the self-describing format"""
+    return bool(data) and bytes(data[:4]) == MAGIC
+
+
+def blob_compression_method(data: bytes) -> str:
+    """Compression label of a stored blob ("gzip" for legacy blobs)"""
+    if not is_encoded(data):
+        return "gzip"
+    _, _, codec_id, flags, _, _ = _HEADER.unpack_from(bytes(data[:_HEADER.size]))
+    method = CODEC_NAMES.get(codec_id, "unknown")
+    if flags & FLAG_SHUFFLE:
+        method += "+shuffle"
+    if flags & FLAG_FLOAT16:
+        method += "+float16"
+    return method
+
+
+class RawOutputCodec:
+    """Encoder of numpy arrays into self-describing compressed blobs."""
+
+    def __init__(self,
+                 codec: Optional[str] = None,
+                 level: Optional[int] = None,
+                 shuffle: bool = True,
+                 quantize_float16: bool = False):
+        """
+        Initialize codec.
+
+        Args:
+            codec: "zstd", "lz4", "zlib" or "none" (fastest available if None)
+            level: Compression level (codec default if None)
+            shuffle: Byte-shuffle elements before compressing
+            quantize_float16: Store float32/float64 arrays as float16
+        """
+        codec = codec or _default_codec()
+        if codec not in CODEC_IDS:
+            raise ValueError(f"Unknown raw output codec: {codec}")
+        if not available_codecs()[codec]:
+            raise ValueError(f"Raw output codec {codec} is not installed")
+
+        self.codec = codec
+        self.level = DEFAULT_LEVELS.get(codec, 0) if level is None else level
+        self.shuffle = shuffle
+        self.quantize_float16 = quantize_float16
+
+    @property
+    def compression_method(self) -> str:
+        """Label recorded with stored outputs"""
+        method = self.codec
+        if self.shuffle and self.codec != "none":
+            method += "+shuffle"
+        if self.quantize_float16:
+            method += "+float16"
+        return method
+
+    def encode(self, array: np.ndarray) -> bytes:
+        """
+        Serialize an array with a dtype/shape header.
+
+        Args:
+            array: Array to serialize
+
+        Returns:
+            Encoded blob
+        """
+        array = np.asarray(array)
+        original_dtype = array.dtype
+        flags = 0
+
+        if self.quantize_float16 and original_dtype in (np.float32, np.float64):
+            array = array.astype(np.float16)
+            flags |= FLAG_FLOAT16
+
+        data = np.ascontiguousarray(array).tobytes()
+        if self.shuffle and self.codec != "none":
+            data = _shuffle(data, array.dtype.itemsize)
+            flags |= FLAG_SHUFFLE
+
+        dtype_str = original_dtype.str.encode()
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, CODEC_IDS[self.codec], flags, array.ndim, len(dtype_str))
+        shape = struct.pack(f"<{array.ndim}Q", *array.shape)
+
+        return header + dtype_str + shape + _compress(data, self.codec, self.level)
+
+    @staticmethod
+    def decode(data: bytes) -> np.ndarray:
+        """
+        Rebuild an array from an encoded blob.
+
+        Args:
+            data: Blob produced by encode()
+
+        Returns:
+            Array with its original dtype and shape
+        """
+        data = bytes(data)
+        magic, version, codec_id, flags, ndim, dtype_len = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not an encoded raw output")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported raw output format version: {version}")
+
+        offset = _HEADER.size
+        dtype = np.dtype(data[offset:offset + dtype_len].decode())
+        offset += dtype_len
+        shape = struct.unpack_from(f"<{ndim}Q", data, offset)
+        offset += 8 * ndim
+
+        payload = _decompress(data[offset:], CODEC_NAMES[codec_id])
+        stored_dtype = np.dtype(np.float16) if flags & FLAG_FLOAT16 else dtype
+        if flags & FLAG_SHUFFLE:
+            payload = _unshuffle(payload, stored_dtype.itemsize)
+
+        array = np.frombuffer(payload, dtype=stored_dtype).reshape(shape)
+        return array.astype(dtype) if stored_dtype != dtype else array
+
+    def get_config(self) -> Dict[str, Any]:
+        """Codec settings"""
+        return {
+            'codec': self.codec,
+            'level': self.level,
+            'shuffle': self.shuffle,
+            'quantize_float16': self.quantize_float16,
+            'compression_method': self.compression_method
+        }
+
+
+def decode_raw_array(data: bytes,
+                     dtype: Any = "float32",
+                     shape: Optional[Tuple[int, ...]] = None) -> np.ndarray:
+    """
+    Decode a stored raw output array in either format.
+
+    Args:
+        data: Encoded blob, or legacy gzip of array.tobytes()
+        dtype: Dtype of legacy blobs (ignored for self-describing blobs)
+        shape: Shape of legacy blobs (flat if None)
+
+    Returns:
+        Decoded array
+    """
+    if is_encoded(data):
+        return RawOutputCodec.decode(data)
+
+    array = np.frombuffer(gzip.decompress(data), dtype=dtype)
+    return array.reshape(shape) if shape is not None else array
+
+
+# Global codec instance
+_raw_output_codec: Optional[RawOutputCodec] = None
+
+
+def get_raw_output_codec() -> RawOutputCodec:
+    """
+    Get or create the process-wide codec.
+
+    Configured by VIGIA_RAW_OUTPUT_CODEC (zstd/lz4/zlib/none) and
+    VIGIA_RAW_OUTPUT_FLOAT16 (true to quantize float outputs).
+    """
+    global _raw_output_codec
+
+    if _raw_output_codec is None:
+        _raw_output_codec = RawOutputCodec(
+            codec=os.getenv("VIGIA_RAW_OUTPUT_CODEC") or None,
+            quantize_float16=os.getenv("VIGIA_RAW_OUTPUT_FLOAT16", "false").lower() == "true"
+        )
+
+    return _raw_output_codec
@@ -17,6 +17,7 @@ import json
 import uuid
 import gzip
 import base64
+import asyncio
 import logging
 import numpy as np
 from datetime import datetime, timedelta
@@ -29,6 +30,8 @@ try:
 except ImportError:
     SUPABASE_AVAILABLE = False
 
+from .raw_output_codec import RawOutputCodec, blob_compression_method, get_raw_output_codec
+
 # RawOutputCapture will be imported dynamically to avoid circular imports
 
 logger = logging.getLogger(__name__)
@@ -37,16 +40,21 @@ logger = logging.getLogger(__name__)
 class RawOutputsClient:
     """Client for managing raw AI outputs in Processing Database"""
     
-    def __init__(self, supabase_url: str = None, supabase_key: str = None):
+    BINARY_FIELDS = ("confidence_maps", "detection_arrays", "expression_vectors")
+    
+    def __init__(self, supabase_url: str = None, supabase_key: str = None,
+                 codec: Optional[RawOutputCodec] = None):
         """
         Initialize raw outputs database client.
         
         Args:
             supabase_url: Supabase URL for Processing Database
             supabase_key: Supabase API key
+            codec: Codec for numpy arrays passed in raw outputs (process-wide codec if None)
         """
         self.supabase_url = supabase_url
         self.supabase_key = supabase_key
+        self.codec = codec or get_raw_output_codec()
         self.client: Optional[Client] = None
         
         if SUPABASE_AVAILABLE and supabase_url and supabase_key:
@@ -70,6 +78,9 @@ class RawOutputsClient:
         """
         Store raw AI output in the database.
         
+        Binary fields may hold encoded blobs or numpy arrays; arrays are
+        encoded with the raw output codec in a worker thread.
+        
         Args:
             token_id: Batman token ID
             ai_engine: AI engine name ('monai', 'yolov5', 'hume_ai', 'risk_assessment', 'monai_review', 'diagnostic_fusion', 'voice_analysis')
@@ -90,6 +101,10 @@ class RawOutputsClient:
             # Generate output ID
             output_id = str(uuid.uuid4())
             
+            # Serialize binary fields off the event loop
+            loop = asyncio.get_running_loop()
+            blobs = await loop.run_in_executor(None, self.encode_binary_fields, raw_outputs)
+            
             # Prepare raw output data
             raw_output_data = {
                 "output_id": output_id,
@@ -104,16 +119,16 @@ class RawOutputsClient:
                 
                 # Raw output storage
                 "raw_output": raw_outputs.raw_predictions,
-                "confidence_maps": base64.b64encode(raw_outputs.confidence_maps).decode() if raw_outputs.confidence_maps else None,
-                "detection_arrays": base64.b64encode(raw_outputs.detection_arrays).decode() if raw_outputs.detection_arrays else None,
-                "expression_vectors": base64.b64encode(raw_outputs.expression_vectors).decode() if raw_outputs.expression_vectors else None,
+                "confidence_maps": base64.b64encode(blobs["confidence_maps"]).decode() if blobs["confidence_maps"] else None,
+                "detection_arrays": base64.b64encode(blobs["detection_arrays"]).decode() if blobs["detection_arrays"] else None,
+                "expression_vectors": base64.b64encode(blobs["expression_vectors"]).decode() if blobs["expression_vectors"] else None,
                 
                 # Metadata
                 "output_format": "json_with_binary",
-                "compression_method": "gzip",
+                "compression_method": self._compression_method(blobs),
                 "encoding_method": "base64",
                 "raw_size_bytes": self._calculate_raw_size(raw_outputs),
-                "compressed_size_bytes": raw_outputs.compressed_size or 0,
+                "compressed_size_bytes": raw_outputs.compressed_size or sum(len(b) for b in blobs.values() if b),
                 
                 # Engine-specific metadata
                 f"{ai_engine}_metadata": raw_outputs.model_metadata,
@@ -246,6 +261,23 @@ class RawOutputsClient:
             logger.error(f"Error retrieving research data: {e}")
             return []
     
+    def encode_binary_fields(self, raw_outputs: Any) -> Dict[str, Optional[bytes]]:
+        """Binary fields of a capture as stored blobs (numpy arrays are encoded)"""
+        blobs = {}
+        for field_name in self.BINARY_FIELDS:
+            value = getattr(raw_outputs, field_name, None)
+            if isinstance(value, np.ndarray):
+                value = self.codec.encode(value)
+            blobs[field_name] = value if value else None
+        return blobs
+    
+    def _compression_method(self, blobs: Dict[str, Optional[bytes]]) -> str:
+        """Compression label of the stored blobs"""
+        methods = {blob_compression_method(blob) for blob in blobs.values() if blob}
+        if not methods:
+            return self.codec.compression_method
+        return methods.pop() if len(methods) == 1 else ",".join(sorted(methods))
+    
     def _calculate_raw_size(self, raw_outputs: Any) -> int:
         """Calculate total raw data size"""
         size = 0
@@ -253,14 +285,12 @@ class RawOutputsClient:
         if hasattr(raw_outputs.raw_predictions, '__len__'):
             size += len(str(raw_outputs.raw_predictions))
         
-        if raw_outputs.confidence_maps:
-            size += len(raw_outputs.confidence_maps)
-        
-        if raw_outputs.detection_arrays:
-            size += len(raw_outputs.detection_arrays)
-        
-        if raw_outputs.expression_vectors:
-            size += len(raw_outputs.expression_vectors)
+        for field_name in self.BINARY_FIELDS:
+            value = getattr(raw_outputs, field_name, None)
+            if isinstance(value, np.ndarray):
+                size += value.nbytes
+            elif value:
+                size += len(value)
         
         return size
     
@@ -0,0 +1,229 @@
+"""
+BM25 Index - Índice invertido con scoring BM25 para protocolos médicos.
+
+Mantiene postings por término con frecuencias precomputadas, longitudes de
+documento, postings por chunk y el primer offset de cada término en el
+contenido, de modo que el costo de una consulta depende del largo de las
+listas de postings y no del texto total del corpus.
+"""
+
+import heapq
+import math
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r'\b\w{3,}\b')  # Palabras de 3+ caracteres
+
+STOP_WORDS = frozenset({
+    'and', 'the', 'for', 'are', 'with', 'this', 'that', 'from', 'they', 'been',
+    'have', 'has', 'had', 'will', 'would', 'could', 'should', 'may', 'might',
+    'una', 'los', 'las', 'del', 'por', 'para', 'con', 'que', 'como', 'este',
+    'esta', 'estos', 'estas', 'pero', 'desde', 'hasta', 'durante', 'entre'
+})
+
+# Lista permitida de términos médicos que se indexan aunque tengan menos de
+# 4 caracteres (el filtro de longitud de tokenize_with_offsets). Solo tiene
+# efecto para las entradas de 3 caracteres, como 'lpp'; las de 4 o más ya
+# pasan el filtro.
+SHORT_MEDICAL_TERMS = frozenset({
+    'lpp', 'lesion', 'presion', 'pressure', 'injury', 'ulcer', 'wound',
+    'tratamiento', 'treatment', 'protocolo', 'protocol', 'procedimiento',
+    'medicamento', 'medication', 'antibiotico', 'antibiotic', 'dolor', 'pain'
+})
+
+
+def tokenize_with_offsets(text: str) -> List[Tuple[str, int]]:
+    """
+    Tokenizar texto en términos indexables con su offset de inicio.
+
+    Args:
+        text: Texto original
+
+    Returns:
+        Lista de (término en minúsculas, offset)
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        word = match.group()
+        if word not in STOP_WORDS and (len(word) >= 4 or word in SHORT_MEDICAL_TERMS):
+            tokens.append((word, match.start()))
+    return tokens
+
+
+class BM25Index:
+    """Índice invertido con scoring BM25 y postings por chunk."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, title_weight: float = 2.0):
+        """
+        Inicializar índice.
+
+        Args:
+            k1: Saturación de frecuencia de término
+            b: Normalización por longitud de documento
+            title_weight: Peso de cada ocurrencia de un término en el título
+        """
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+
+        # término -> {doc_id: frecuencia ponderada}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self.total_length = 0.0
+
+        # doc_id -> término -> índices de chunk que lo contienen
+        self.chunk_postings: Dict[str, Dict[str, List[int]]] = {}
+        # doc_id -> término -> primer offset en el contenido
+        self.first_offsets: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.doc_lengths
+
+    @property
+    def average_length(self) -> float:
+        return self.total_length / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def add_document(self, doc_id: str, title: str, content: str, chunks: Iterable[str]):
+        """
+        Indexar documento (reemplaza una versión previa con el mismo doc_id).
+
+        Args:
+            doc_id: ID del documento
+            title: Título
+            content: Contenido limpio
+            chunks: Chunks del contenido
+        """
+        if doc_id in self.doc_lengths:
+            self.remove_document(doc_id)
+
+        frequencies: Dict[str, float] = {}
+        offsets: Dict[str, int] = {}
+
+        title_tokens = tokenize_with_offsets(title)
+        for term, _ in title_tokens:
+            frequencies[term] = frequencies.get(term, 0.0) + self.title_weight
+
+        content_tokens = tokenize_with_offsets(content)
+        for term, offset in content_tokens:
+            frequencies[term] = frequencies.get(term, 0.0) + 1.0
+            offsets.setdefault(term, offset)
+
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+
+        length = len(title_tokens) * self.title_weight + len(content_tokens)
+        self.doc_lengths[doc_id] = length
+        self.doc_terms[doc_id] = tuple(frequencies)
+        self.total_length += length
+        self.first_offsets[doc_id] = offsets
+
+        chunk_terms: Dict[str, List[int]] = {}
+        for chunk_index, chunk in enumerate(chunks):
+            for term in {term for term, _ in tokenize_with_offsets(chunk)}:
+                chunk_terms.setdefault(term, []).append(chunk_index)
+        self.chunk_postings[doc_id] = chunk_terms
+
+    def remove_document(self, doc_id: str):
+        """Eliminar documento del índice."""
+        if doc_id not in self.doc_lengths:
+            return
+
+        for term in self.doc_terms.pop(doc_id, ()):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.first_offsets.pop(doc_id, None)
+        self.chunk_postings.pop(doc_id, None)
+
+    def idf(self, term: str) -> float:
+        """IDF BM25 (siempre positivo)."""
+        document_frequency = len(self.postings.get(term, ()))
+        total = len(self.doc_lengths)
+        return math.log(1.0 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self,
+               terms: Iterable[str],
+               top_k: int,
+               allowed: Optional[Set[str]] = None,
+               accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Buscar documentos por BM25 recorriendo solo las postings de la consulta.
+
+        Args:
+            terms: Términos de la consulta
+            top_k: Número de resultados
+            allowed: Conjunto opcional de doc_ids permitidos (se intersecta con cada posting)
+            accept: Filtro opcional por doc_id aplicado a los candidatos puntuados
+
+        Returns:
+            Lista de (doc_id, score) ordenada por score descendente
+        """
+        if not self.doc_lengths or top_k <= 0:
+            return []
+
+        average_length = self.average_length or 1.0
+        scores: Dict[str, float] = {}
+
+        for term in set(terms):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+
+            idf = self.idf(term)
+            if allowed is not None:
+                # Intersección recorriendo la lista más corta
+                if len(allowed) < len(posting):
+                    entries = [(doc_id, posting[doc_id]) for doc_id in allowed if doc_id in posting]
+                else:
+                    entries = [(doc_id, tf) for doc_id, tf in posting.items() if doc_id in allowed]
+            else:
+                entries = posting.items()
+
+            for doc_id, frequency in entries:
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+
+        if accept is not None:
+            candidates = ((doc_id, score) for doc_id, score in scores.items() if accept(doc_id))
+        else:
+            candidates = scores.items()
+
+        return heapq.nlargest(top_k, candidates, key=lambda item: item[1])
+
+    def max_score(self, terms: Iterable[str]) -> float:
+        """Cota superior del score BM25 para la consulta (frecuencia → ∞)."""
+        return sum(self.idf(term) * (self.k1 + 1.0) for term in set(terms) if term in self.postings)
+
+    def matching_chunks(self, doc_id: str, terms: Iterable[str], limit: int) -> List[int]:
+        """Índices de chunks ordenados por número de términos de la consulta que contienen."""
+        chunk_terms = self.chunk_postings.get(doc_id, {})
+        counts: Dict[int, int] = {}
+        for term in set(terms):
+            for chunk_index in chunk_terms.get(term, ()):
+                counts[chunk_index] = counts.get(chunk_index, 0) + 1
+
+        ranked = heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], item[0]))
+        return [chunk_index for chunk_index, _ in ranked]
+
+    def first_offset(self, doc_id: str, terms: Iterable[str]) -> Optional[int]:
+        """Primer offset en el contenido de cualquiera de los términos."""
+        offsets = self.first_offsets.get(doc_id, {})
+        found = [offsets[term] for term in terms if term in offsets]
+        return min(found) if found else None
+
+    def clear(self):
+        """Vaciar índice."""
+        self.postings.clear()
+        self.doc_lengths.clear()
+        self.doc_terms.clear()
+        self.chunk_postings.clear()
+        self.first_offsets.clear()
+        self.total_length = 0.0
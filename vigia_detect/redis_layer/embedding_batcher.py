@@ -0,0 +1,178 @@
+"""
+Embedding Batcher - Micro-batching de embeddings para el servicio vectorial.
+
+Agrupa solicitudes concurrentes de embeddings durante unos milisegundos (o
+hasta N textos) y las resuelve con una sola llamada a `encode`, devolviendo a
+cada solicitante su propio vector.
+
+Características:
+- Ventana de espera y tamaño máximo de lote configurables
+- Deduplicación de textos idénticos en vuelo
+- Histogramas de tamaño de lote y tiempo de espera en cola
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from ..utils.metrics import Histogram
+from ..utils.secure_logger import SecureLogger
+
+logger = SecureLogger("embedding_batcher")
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+@dataclass
+class _PendingEmbedding:
+    """Solicitud de embedding en espera de lote."""
+    text: str
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class MicroBatchEmbedder:
+    """Agrupa solicitudes concurrentes de embeddings en llamadas batch a `encode`."""
+
+    def __init__(self,
+                 encode_fn: Callable[[List[str]], Any],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0,
+                 executor: Optional[Executor] = None):
+        """
+        Inicializar micro-batcher.
+
+        Args:
+            encode_fn: Función que recibe una lista de textos y retorna una matriz (n, dim)
+            max_batch_size: Máximo de textos por llamada a encode_fn
+            max_wait_ms: Tiempo máximo que una solicitud espera a que se llene el lote
+            executor: Executor donde ejecutar encode_fn (None = executor por defecto)
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.executor = executor
+
+        self._pending: List[_PendingEmbedding] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+        self.batch_size_histogram = Histogram("embedding_batch_size", BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram("embedding_queue_wait_ms", QUEUE_WAIT_MS_BUCKETS)
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "deduplicated": 0,
+            "errors": 0
+        }
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Obtener embedding para un texto, agrupándolo con solicitudes concurrentes.
+
+        Args:
+            text: Texto a codificar
+
+        Returns:
+            Vector float32 propio del solicitante
+        """
+        if self._closed:
+            raise RuntimeError("Embedding batcher is closed")
+
+        self.stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+
+        # Reutilizar solicitud idéntica ya en vuelo
+        existing = self._inflight.get(text)
+        if existing is not None:
+            self.stats["deduplicated"] += 1
+            vector = await asyncio.shield(existing)
+            return vector.copy()
+
+        future = loop.create_future()
+        self._inflight[text] = future
+        self._pending.append(_PendingEmbedding(text, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000.0, self._flush)
+
+        return await asyncio.shield(future)
+
+    async def embed_many(self, texts: Sequence[str]) -> List[np.ndarray]:
+        """Obtener embeddings para varios textos compartiendo los lotes."""
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    def _flush(self):
+        """Despachar las solicitudes pendientes en lotes de max_batch_size."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[_PendingEmbedding]):
+        """Codificar un lote y entregar cada vector a su solicitante."""
+        started_at = time.perf_counter()
+        for item in batch:
+            self.queue_wait_histogram.observe((started_at - item.enqueued_at) * 1000.0)
+        self.batch_size_histogram.observe(len(batch))
+        self.stats["batches"] += 1
+
+        texts = [item.text for item in batch]
+        try:
+            loop = asyncio.get_running_loop()
+            raw = await loop.run_in_executor(self.executor, self.encode_fn, texts)
+            vectors = np.asarray(raw, dtype=np.float32).reshape(len(texts), -1)
+
+            for item, vector in zip(batch, vectors):
+                if not item.future.done():
+                    # Copia para no retener la matriz completa del lote
+                    item.future.set_result(vector.copy())
+
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Batch embedding failed ({len(texts)} texts): {e}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+        finally:
+            for item in batch:
+                if self._inflight.get(item.text) is item.future:
+                    del self._inflight[item.text]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas de batching."""
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batch_size_histogram": self.batch_size_histogram.snapshot(),
+            "queue_wait_ms_histogram": self.queue_wait_histogram.snapshot()
+        }
+
+    async def close(self):
+        """Despachar solicitudes pendientes y esperar lotes en curso."""
+        self._closed = True
+        self._flush()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
@@ -0,0 +1,287 @@
+"""
+Hybrid Retriever - Recuperación híbrida léxica + densa con reciprocal-rank fusion.
+
+Ejecuta en paralelo la búsqueda por palabras clave del indexador de protocolos
+y la búsqueda vectorial, fusiona los rankings con RRF y guarda el resultado
+fusionado bajo una única clave de cache.
+
+Características:
+- Búsquedas lexical y densa concurrentes con un único presupuesto de latencia
+- Reciprocal-rank fusion con pesos por fuente
+- Cache del resultado fusionado (Redis si está disponible, LRU local si no)
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.secure_logger import SecureLogger
+
+logger = SecureLogger("hybrid_retriever")
+
+VECTOR_SOURCE = "vector_search"
+PROTOCOL_SOURCE = "protocol_indexer"
+
+
+@dataclass
+class HybridRetrievalConfig:
+    """Configuración de recuperación híbrida."""
+    rrf_k: int = 60  # Constante de suavizado RRF
+    vector_weight: float = 1.0
+    protocol_weight: float = 1.0
+    candidates_per_source: int = 10  # Resultados pedidos a cada fuente
+    latency_budget_ms: float = 800.0  # Presupuesto total para ambas búsquedas
+    cache_ttl: int = 1800  # 30 minutos
+    local_cache_size: int = 256
+
+
+class HybridRetriever:
+    """Recuperador híbrido sobre EnhancedProtocolIndexer y EnhancedVectorService."""
+
+    def __init__(self,
+                 vector_service: Optional[Any] = None,
+                 protocol_indexer: Optional[Any] = None,
+                 config: Optional[HybridRetrievalConfig] = None,
+                 redis_client: Optional[Any] = None):
+        """
+        Inicializar recuperador híbrido.
+
+        Args:
+            vector_service: Servicio con `search_similar(query, k, filter_by_type, filter_by_language)`
+            protocol_indexer: Indexador con `search_protocols(query, protocol_type, query_type, max_results, language)`
+            config: Configuración de fusión y cache
+            redis_client: Cliente Redis async para el cache fusionado (por defecto el del servicio vectorial)
+        """
+        self.vector_service = vector_service
+        self.protocol_indexer = protocol_indexer
+        self.config = config or HybridRetrievalConfig()
+        self._redis_client = redis_client
+
+        self._local_cache: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.stats = {
+            "queries": 0,
+            "cache_hits": 0,
+            "partial_results": 0,
+            "source_timeouts": {VECTOR_SOURCE: 0, PROTOCOL_SOURCE: 0},
+            "source_errors": {VECTOR_SOURCE: 0, PROTOCOL_SOURCE: 0}
+        }
+
+    @property
+    def redis_client(self) -> Optional[Any]:
+        if self._redis_client is not None:
+            return self._redis_client
+        return getattr(self.vector_service, "redis_client", None)
+
+    async def search(self,
+                     query: str,
+                     k: int = 5,
+                     document_type: Optional[str] = None,
+                     protocol_type: Optional[str] = None,
+                     query_type: Optional[str] = None,
+                     language: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Buscar en ambas fuentes concurrentemente y fusionar con RRF.
+
+        Args:
+            query: Consulta de búsqueda
+            k: Número de resultados fusionados
+            document_type: Filtro de tipo para la búsqueda vectorial
+            protocol_type: Filtro de tipo para el indexador de protocolos
+            query_type: Tipo de consulta para contexto del indexador
+            language: Filtro de idioma para ambas fuentes
+
+        Returns:
+            Lista de resultados fusionados con `fused_score` y `retrieval_ranks`
+        """
+        self.stats["queries"] += 1
+
+        cache_key = self._get_cache_key(query, k, document_type, protocol_type, query_type, language)
+        cached = await self._get_cached(cache_key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        started = time.perf_counter()
+        rankings, complete = await self._gather_rankings(
+            query, document_type, protocol_type, query_type, language
+        )
+        fused = self.fuse(rankings, k)
+
+        # Un resultado parcial (fuente caída o fuera de presupuesto) no se cachea
+        if complete:
+            await self._store_cached(cache_key, fused)
+        else:
+            self.stats["partial_results"] += 1
+
+        logger.audit("hybrid_search_completed", {
+            "query_length": len(query),
+            "results_found": len(fused),
+            "sources": {source: len(results) for source, results in rankings.items()},
+            "complete": complete,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        })
+
+        return fused
+
+    async def _gather_rankings(self,
+                               query: str,
+                               document_type: Optional[str],
+                               protocol_type: Optional[str],
+                               query_type: Optional[str],
+                               language: Optional[str]) -> Tuple[Dict[str, List[Dict[str, Any]]], bool]:
+        """Ejecutar ambas búsquedas bajo un único presupuesto de latencia."""
+        candidates = self.config.candidates_per_source
+        tasks: Dict[str, asyncio.Task] = {}
+
+        if self.vector_service is not None:
+            tasks[VECTOR_SOURCE] = asyncio.ensure_future(self.vector_service.search_similar(
+                query,
+                k=candidates,
+                filter_by_type=document_type,
+                filter_by_language=language
+            ))
+        if self.protocol_indexer is not None:
+            tasks[PROTOCOL_SOURCE] = asyncio.ensure_future(self.protocol_indexer.search_protocols(
+                query,
+                protocol_type=protocol_type,
+                query_type=query_type,
+                max_results=candidates,
+                language=language
+            ))
+
+        if not tasks:
+            return {}, True
+
+        done, pending = await asyncio.wait(
+            tasks.values(), timeout=self.config.latency_budget_ms / 1000.0
+        )
+        for task in pending:
+            task.cancel()
+
+        rankings: Dict[str, List[Dict[str, Any]]] = {}
+        complete = True
+        for source, task in tasks.items():
+            if task in pending:
+                self.stats["source_timeouts"][source] += 1
+                logger.warning(f"Hybrid search source {source} exceeded latency budget")
+                complete = False
+                continue
+
+            try:
+                results = task.result()
+            except Exception as e:
+                self.stats["source_errors"][source] += 1
+                logger.warning(f"Hybrid search source {source} failed: {e}")
+                complete = False
+                continue
+
+            rankings[source] = results if isinstance(results, list) else []
+
+        return rankings, complete
+
+    def fuse(self, rankings: Dict[str, List[Dict[str, Any]]], k: int) -> List[Dict[str, Any]]:
+        """
+        Fusionar rankings con reciprocal-rank fusion.
+
+        score(d) = Σ_fuente peso_fuente / (rrf_k + rank_fuente(d)), con rank desde 1.
+
+        Args:
+            rankings: Resultados ordenados por fuente
+            k: Número de resultados a retornar
+
+        Returns:
+            Resultados fusionados ordenados por `fused_score`
+        """
+        weights = {
+            VECTOR_SOURCE: self.config.vector_weight,
+            PROTOCOL_SOURCE: self.config.protocol_weight
+        }
+        fused: Dict[str, Dict[str, Any]] = {}
+
+        for source, results in rankings.items():
+            weight = weights.get(source, 1.0)
+            for rank, result in enumerate(results, start=1):
+                key = self._result_key(result)
+                contribution = weight / (self.config.rrf_k + rank)
+
+                entry = fused.get(key)
+                if entry is None:
+                    entry = {
+                        **result,
+                        "sources": list(result.get("sources", [source])),
+                        "fused_score": 0.0,
+                        "retrieval_ranks": {}
+                    }
+                    fused[key] = entry
+                else:
+                    for result_source in result.get("sources", [source]):
+                        if result_source not in entry["sources"]:
+                            entry["sources"].append(result_source)
+                    entry["confidence"] = max(entry.get("confidence", 0.0), result.get("confidence", 0.0))
+
+                entry["fused_score"] += contribution
+                entry["retrieval_ranks"][source] = rank
+
+        ranked = sorted(fused.values(), key=lambda item: item["fused_score"], reverse=True)
+        return ranked[:k]
+
+    def _result_key(self, result: Dict[str, Any]) -> str:
+        """Identidad de un resultado entre fuentes."""
+        if result.get("doc_id"):
+            return str(result["doc_id"])
+        content = str(result.get("content", ""))
+        return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+    def _get_cache_key(self, query: str, k: int, *filters: Optional[str]) -> str:
+        """Clave única para el resultado fusionado."""
+        cache_data = "|".join([query, str(k)] + [f or "" for f in filters])
+        return f"hybrid_cache:{hashlib.sha256(cache_data.encode()).hexdigest()[:16]}"
+
+    async def _get_cached(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
+        """Obtener resultado fusionado desde cache."""
+        redis_client = self.redis_client
+        if redis_client is not None:
+            try:
+                cached_data = await redis_client.get(cache_key)
+                if cached_data:
+                    return json.loads(cached_data)
+            except Exception as e:
+                logger.warning(f"Hybrid cache retrieval failed: {e}")
+            return None
+
+        entry = self._local_cache.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if expires_at < time.monotonic():
+            del self._local_cache[cache_key]
+            return None
+        self._local_cache.move_to_end(cache_key)
+        return results
+
+    async def _store_cached(self, cache_key: str, results: List[Dict[str, Any]]):
+        """Guardar resultado fusionado en cache."""
+        redis_client = self.redis_client
+        if redis_client is not None:
+            try:
+                await redis_client.setex(cache_key, self.config.cache_ttl, json.dumps(results, default=str))
+            except Exception as e:
+                logger.warning(f"Hybrid cache storage failed: {e}")
+            return
+
+        self._local_cache[cache_key] = (time.monotonic() + self.config.cache_ttl, results)
+        self._local_cache.move_to_end(cache_key)
+        while len(self._local_cache) > self.config.local_cache_size:
+            self._local_cache.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del recuperador."""
+        return {
+            **self.stats,
+            "cache_hit_rate": self.stats["cache_hits"] / max(self.stats["queries"], 1),
+            "local_cache_size": len(self._local_cache)
+        }
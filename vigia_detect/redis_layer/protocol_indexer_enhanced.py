@@ -31,6 +31,7 @@ from redis.exceptions import RedisError
 
 from ..utils.secure_logger import SecureLogger
 from ..utils.error_handling import handle_exceptions
+from .bm25_index import BM25Index, tokenize_with_offsets
 
 logger = SecureLogger("protocol_indexer_enhanced")
 
@@ -66,6 +67,10 @@ class ProtocolIndexConfig:
     chunk_size: int = 1000  # Tamaño de chunks para indexación
     overlap_size: int = 100  # Solapamiento entre chunks
     min_chunk_size: int = 200  # Tamaño mínimo de chunk
+    bm25_k1: float = 1.5
+    bm25_b: float = 0.75
+    title_weight: float = 2.0  # Peso BM25 de términos en el título
+    min_relevance_score: float = 0.05  # Score BM25 normalizado mínimo
     supported_formats: List[str] = None
     
     def __post_init__(self):
@@ -122,7 +127,11 @@ class EnhancedProtocolIndexer:
         self.protocol_store: Dict[str, ProtocolDocument] = {}
         
         # Índices invertidos para búsqueda rápida
-        self.term_index: Dict[str, set] = {}  # término -> set de doc_ids
+        self.bm25_index = BM25Index(
+            k1=self.config.bm25_k1,
+            b=self.config.bm25_b,
+            title_weight=self.config.title_weight
+        )
         self.type_index: Dict[ProtocolType, set] = {}  # tipo -> set de doc_ids
         
         # Cache de búsquedas
@@ -529,41 +538,12 @@ class EnhancedProtocolIndexer:
             self.type_index[doc.protocol_type] = set()
         self.type_index[doc.protocol_type].add(doc.doc_id)
         
-        # Índice de términos
-        all_text = f"{doc.title} {doc.content}".lower()
-        terms = self._extract_search_terms(all_text)
-        
-        for term in terms:
-            if term not in self.term_index:
-                self.term_index[term] = set()
-            self.term_index[term].add(doc.doc_id)
+        # Índice de términos (frecuencias, longitudes, postings por chunk y offsets)
+        self.bm25_index.add_document(doc.doc_id, doc.title, doc.content, doc.chunks)
     
     def _extract_search_terms(self, text: str) -> set:
         """Extraer términos de búsqueda del texto."""
-        # Tokenizar y limpiar
-        words = re.findall(r'\b\w{3,}\b', text.lower())  # Palabras de 3+ caracteres
-        
-        # Filtrar stop words comunes
-        stop_words = {
-            'and', 'the', 'for', 'are', 'with', 'this', 'that', 'from', 'they', 'been',
-            'have', 'has', 'had', 'will', 'would', 'could', 'should', 'may', 'might',
-            'una', 'los', 'las', 'del', 'por', 'para', 'con', 'que', 'como', 'este',
-            'esta', 'estos', 'estas', 'pero', 'desde', 'hasta', 'durante', 'entre'
-        }
-        
-        # Incluir términos médicos importantes
-        medical_terms = {
-            'lpp', 'lesion', 'presion', 'pressure', 'injury', 'ulcer', 'wound',
-            'tratamiento', 'treatment', 'protocolo', 'protocol', 'procedimiento',
-            'medicamento', 'medication', 'antibiotico', 'antibiotic', 'dolor', 'pain'
-        }
-        
-        filtered_terms = set()
-        for word in words:
-            if word not in stop_words and (len(word) >= 4 or word in medical_terms):
-                filtered_terms.add(word)
-        
-        return filtered_terms
+        return {term for term, _ in tokenize_with_offsets(text)}
     
     @handle_exceptions(logger)
     async def search_protocols(self,
@@ -636,158 +616,100 @@ class EnhancedProtocolIndexer:
                             query_type: Optional[str],
                             max_results: int,
                             language: Optional[str]) -> List[ProtocolSearchResult]:
-        """Ejecutar búsqueda de protocolos."""
+        """Ejecutar búsqueda de protocolos con BM25 sobre el índice invertido."""
         try:
             # Extraer términos de búsqueda
-            search_terms = self._extract_search_terms(query.lower())
+            search_terms = self._extract_search_terms(query)
             
             if not search_terms:
                 return []
             
-            # Encontrar documentos candidatos
-            candidate_docs = self._find_candidate_documents(search_terms, protocol_type)
-            
-            if not candidate_docs:
+            # Restringir por tipo de protocolo (se intersecta con cada posting)
+            allowed_docs = self._find_candidate_documents(protocol_type)
+            if allowed_docs is not None and not allowed_docs:
                 return []
             
-            # Calcular relevancia para cada documento
-            scored_results = []
+            def accept(doc_id: str) -> bool:
+                doc = self.protocol_store.get(doc_id)
+                # Filtrar por idioma si se especifica
+                return doc is not None and (not language or doc.language == language)
             
-            for doc_id in candidate_docs:
-                if doc_id not in self.protocol_store:
-                    continue
+            ranked = self.bm25_index.search(search_terms, max_results, allowed=allowed_docs, accept=accept)
+            max_score = self.bm25_index.max_score(search_terms)
+            
+            scored_results = []
+            for doc_id, score in ranked:
+                relevance_score = self._calculate_relevance_score(score, max_score)
+                
+                if relevance_score < self.config.min_relevance_score:  # Umbral mínimo
+                    break
                 
                 doc = self.protocol_store[doc_id]
                 
-                # Filtrar por idioma si se especifica
-                if language and doc.language != language:
-                    continue
+                # Encontrar chunks relevantes
+                matched_chunks = self._find_matching_chunks(search_terms, doc)
                 
-                # Calcular score de relevancia
-                relevance_score = self._calculate_relevance_score(query, search_terms, doc)
+                # Crear snippet desde el offset almacenado del primer término encontrado
+                snippet = self._create_content_snippet(
+                    doc.content, self.bm25_index.first_offset(doc_id, search_terms)
+                )
                 
-                if relevance_score > 0.1:  # Umbral mínimo
-                    # Encontrar chunks relevantes
-                    matched_chunks = self._find_matching_chunks(search_terms, doc.chunks)
-                    
-                    # Crear snippet
-                    snippet = self._create_content_snippet(query, doc.content)
-                    
-                    result = ProtocolSearchResult(
-                        doc_id=doc.doc_id,
-                        title=doc.title,
-                        content_snippet=snippet,
-                        protocol_type=doc.protocol_type,
-                        metadata=doc.metadata,
-                        relevance_score=relevance_score,
-                        matched_chunks=matched_chunks[:3],  # Top 3 chunks
-                        language=doc.language
-                    )
-                    
-                    scored_results.append(result)
+                result = ProtocolSearchResult(
+                    doc_id=doc.doc_id,
+                    title=doc.title,
+                    content_snippet=snippet,
+                    protocol_type=doc.protocol_type,
+                    metadata=doc.metadata,
+                    relevance_score=relevance_score,
+                    matched_chunks=matched_chunks,
+                    language=doc.language
+                )
+                
+                scored_results.append(result)
             
-            # Ordenar por relevancia y limitar resultados
-            scored_results.sort(key=lambda x: x.relevance_score, reverse=True)
-            return scored_results[:max_results]
+            return scored_results
             
         except Exception as e:
             logger.error(f"Search execution failed: {e}")
             return []
     
-    def _find_candidate_documents(self, search_terms: set, protocol_type: Optional[str]) -> set:
-        """Encontrar documentos candidatos basados en términos de búsqueda."""
-        candidate_docs = set()
+    def _find_candidate_documents(self, protocol_type: Optional[str]) -> Optional[set]:
+        """
+        Documentos permitidos por el filtro de tipo de protocolo.
         
-        # Buscar por términos
-        for term in search_terms:
-            if term in self.term_index:
-                candidate_docs.update(self.term_index[term])
+        Returns:
+            Conjunto de doc_ids del tipo, o None si no se filtra
+        """
+        if not protocol_type:
+            return None
         
-        # Filtrar por tipo de protocolo si se especifica
-        if protocol_type:
-            try:
-                protocol_enum = ProtocolType(protocol_type)
-                if protocol_enum in self.type_index:
-                    type_docs = self.type_index[protocol_enum]
-                    candidate_docs = candidate_docs.intersection(type_docs)
-            except ValueError:
-                logger.warning(f"Unknown protocol type: {protocol_type}")
+        try:
+            protocol_enum = ProtocolType(protocol_type)
+        except ValueError:
+            logger.warning(f"Unknown protocol type: {protocol_type}")
+            return None
         
-        return candidate_docs
+        return self.type_index.get(protocol_enum, set())
     
-    def _calculate_relevance_score(self, query: str, search_terms: set, doc: ProtocolDocument) -> float:
-        """Calcular score de relevancia para un documento."""
-        score = 0.0
-        
-        # Texto completo para búsqueda
-        full_text = f"{doc.title} {doc.content}".lower()
-        query_lower = query.lower()
-        
-        # Score por coincidencia exacta en título (peso alto)
-        if query_lower in doc.title.lower():
-            score += 2.0
-        
-        # Score por términos en título
-        title_words = set(doc.title.lower().split())
-        title_matches = search_terms.intersection(title_words)
-        score += len(title_matches) * 0.5
-        
-        # Score por términos en contenido
-        content_words = set(full_text.split())
-        content_matches = search_terms.intersection(content_words)
-        score += len(content_matches) * 0.3
-        
-        # Score por densidad de términos
-        if search_terms:
-            density = len(content_matches) / len(search_terms)
-            score += density * 0.4
-        
-        # Bonus por términos médicos específicos
-        medical_bonus_terms = ['lpp', 'lesion', 'presion', 'tratamiento', 'protocolo']
-        for term in medical_bonus_terms:
-            if term in query_lower and term in full_text:
-                score += 0.3
-        
-        # Normalizar score
-        return min(score, 3.0) / 3.0
+    def _calculate_relevance_score(self, bm25_score: float, max_score: float) -> float:
+        """Normalizar score BM25 a [0, 1] respecto de su cota superior para la consulta."""
+        if max_score <= 0:
+            return 0.0
+        return min(bm25_score / max_score, 1.0)
     
-    def _find_matching_chunks(self, search_terms: set, chunks: List[str]) -> List[str]:
-        """Encontrar chunks que coinciden con términos de búsqueda."""
-        matching_chunks = []
-        
-        for chunk in chunks:
-            chunk_lower = chunk.lower()
-            chunk_words = set(chunk_lower.split())
-            
-            # Verificar si hay coincidencias
-            matches = search_terms.intersection(chunk_words)
-            if matches:
-                matching_chunks.append((chunk, len(matches)))
-        
-        # Ordenar por número de coincidencias
-        matching_chunks.sort(key=lambda x: x[1], reverse=True)
-        
-        return [chunk for chunk, _ in matching_chunks]
+    def _find_matching_chunks(self, search_terms: set, doc: ProtocolDocument, limit: int = 3) -> List[str]:
+        """Encontrar chunks que coinciden con términos de búsqueda (postings por chunk)."""
+        chunk_indices = self.bm25_index.matching_chunks(doc.doc_id, search_terms, limit)
+        return [doc.chunks[i] for i in chunk_indices if i < len(doc.chunks)]
     
-    def _create_content_snippet(self, query: str, content: str, max_length: int = 300) -> str:
-        """Crear snippet del contenido centrado en la consulta."""
-        query_terms = query.lower().split()
-        content_lower = content.lower()
-        
-        # Buscar la primera ocurrencia de cualquier término de la consulta
-        best_pos = -1
-        for term in query_terms:
-            pos = content_lower.find(term)
-            if pos != -1:
-                if best_pos == -1 or pos < best_pos:
-                    best_pos = pos
-        
-        if best_pos == -1:
+    def _create_content_snippet(self, content: str, anchor: Optional[int], max_length: int = 300) -> str:
+        """Crear snippet del contenido centrado en el offset del término encontrado."""
+        if anchor is None:
             # Si no se encuentra, usar el inicio
             snippet = content[:max_length]
         else:
             # Centrar alrededor de la posición encontrada
-            start = max(0, best_pos - max_length // 2)
+            start = max(0, anchor - max_length // 2)
             end = start + max_length
             snippet = content[start:end]
             
@@ -1006,6 +928,7 @@ class EnhancedProtocolIndexer:
             "cache_hit_rate": self.stats["cache_hits"] / max(self.stats["search_queries"], 1),
             "supported_formats": self.config.supported_formats,
             "redis_available": self.redis_client is not None,
+            "indexed_terms": len(self.bm25_index.postings),
             "protocol_types": {pt.value: len(docs) for pt, docs in self.type_index.items()}
         }
     
@@ -1017,7 +940,7 @@ class EnhancedProtocolIndexer:
             
             # Limpiar caches
             self.search_cache.clear()
-            self.term_index.clear()
+            self.bm25_index.clear()
             self.type_index.clear()
             self.protocol_store.clear()
             
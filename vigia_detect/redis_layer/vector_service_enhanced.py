@@ -15,7 +15,7 @@ import json
 import hashlib
 import numpy as np
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Set
 from dataclasses import dataclass
 from enum import Enum
 import logging
@@ -30,6 +30,8 @@ import faiss
 
 from ..utils.secure_logger import SecureLogger
 from ..utils.error_handling import handle_exceptions
+from .embedding_batcher import MicroBatchEmbedder
+from .vector_snapshot import VectorSnapshotStore, SnapshotDocumentTable, encode_document_record
 
 logger = SecureLogger("vector_service_enhanced")
 
@@ -52,6 +54,12 @@ class VectorSearchConfig:
     cache_ttl: int = 3600  # 1 hora
     max_results: int = 20
     similarity_threshold: float = 0.7
+    embedding_batch_size: int = 32
+    embedding_batch_wait_ms: float = 5.0
+    snapshot_dir: Optional[str] = None  # None = sin snapshots en disco
+    filtered_exact_scan_max: int = 2048  # Candidatos filtrados bajo este número se comparan exhaustivamente
+    filtered_max_ef_search: int = 4096  # Límite de ampliación de efSearch en búsquedas filtradas
+    wal_fsync: bool = False
 
 
 @dataclass
@@ -94,11 +102,32 @@ class EnhancedVectorService:
         self.config = config or VectorSearchConfig()
         self.redis_client: Optional[redis.Redis] = None
         self.embedding_model: Optional[SentenceTransformer] = None
+        self.embedding_batcher: Optional[MicroBatchEmbedder] = None
         self.vector_index: Optional[faiss.IndexHNSWFlat] = None
         self.document_store: Dict[str, VectorDocument] = {}
         self.index_to_doc_id: Dict[int, str] = {}
+        self.doc_id_to_index: Dict[str, int] = {}
         self.next_index_id = 0
         
+        # Bitmaps de filtrado del índice delta (ids vivos por tipo e idioma)
+        self.delta_type_ids: Dict[str, Set[int]] = {}
+        self.delta_language_ids: Dict[str, Set[int]] = {}
+        # Posiciones del snapshot base reemplazadas por documentos reindexados
+        self.shadowed_base_positions: Set[int] = set()
+        self.search_stats = {
+            "filtered_searches": 0,
+            "exact_scans": 0,
+            "widened_searches": 0
+        }
+        
+        # Snapshot en disco (índice base mmap de solo lectura + WAL)
+        self.snapshot_store: Optional[VectorSnapshotStore] = (
+            VectorSnapshotStore(self.config.snapshot_dir, fsync_wal=self.config.wal_fsync)
+            if self.config.snapshot_dir else None
+        )
+        self.base_index = None
+        self.base_documents: Optional[SnapshotDocumentTable] = None
+        
         # Cache para embeddings
         self.embedding_cache: Dict[str, np.ndarray] = {}
         self.cache_stats = {
@@ -125,8 +154,11 @@ class EnhancedVectorService:
             # Inicializar índice vectorial
             await self._initialize_vector_index()
             
-            # Cargar documentos existentes
-            await self._load_existing_documents()
+            # Cargar documentos existentes (snapshot + WAL, o reconstrucción desde Redis)
+            if not self._load_snapshot():
+                await self._load_existing_documents()
+                if self.snapshot_store and self.document_store:
+                    await self.save_snapshot()
             
             logger.info("Enhanced vector service initialized successfully")
             
@@ -175,27 +207,38 @@ class EnhancedVectorService:
                 logger.warning(f"Model dimension {actual_dim} differs from config {self.config.dimension}")
                 self.config.dimension = actual_dim
             
+            # Micro-batching de consultas concurrentes
+            self.embedding_batcher = MicroBatchEmbedder(
+                self.embedding_model.encode,
+                max_batch_size=self.config.embedding_batch_size,
+                max_wait_ms=self.config.embedding_batch_wait_ms
+            )
+            
             logger.info(f"Embedding model loaded successfully (dim: {self.config.dimension})")
             
         except Exception as e:
             logger.error(f"Failed to load embedding model: {e}")
             raise
     
+    def _create_index(self):
+        """Crear índice FAISS vacío según configuración."""
+        if self.config.index_type == "HNSW":
+            # HNSW index para búsqueda rápida y precisa
+            index = faiss.IndexHNSWFlat(
+                self.config.dimension,
+                32  # M parameter for HNSW
+            )
+            index.hnsw.efConstruction = 200
+            index.hnsw.efSearch = 100
+            return index
+        
+        # Flat index como fallback
+        return faiss.IndexFlatL2(self.config.dimension)
+    
     async def _initialize_vector_index(self):
         """Inicializar índice vectorial FAISS."""
         try:
-            if self.config.index_type == "HNSW":
-                # HNSW index para búsqueda rápida y precisa
-                self.vector_index = faiss.IndexHNSWFlat(
-                    self.config.dimension,
-                    32  # M parameter for HNSW
-                )
-                self.vector_index.hnsw.efConstruction = 200
-                self.vector_index.hnsw.efSearch = 100
-                
-            else:
-                # Flat index como fallback
-                self.vector_index = faiss.IndexFlatL2(self.config.dimension)
+            self.vector_index = self._create_index()
             
             logger.info(f"Vector index initialized: {self.config.index_type}")
             
@@ -234,6 +277,107 @@ class EnhancedVectorService:
         except Exception as e:
             logger.error(f"Failed to load existing documents: {e}")
     
+    def _load_snapshot(self) -> bool:
+        """Cargar índice base desde snapshot y reproducir el WAL."""
+        if not self.snapshot_store:
+            return False
+        
+        snapshot = self.snapshot_store.load(self.config.dimension)
+        if snapshot is None:
+            return False
+        
+        self.base_index = snapshot.index
+        self.base_documents = snapshot.documents
+        
+        # Documentos indexados después del snapshot van al índice delta
+        replayed = []
+        for entry in self.snapshot_store.iter_wal():
+            vector = entry.pop("vector")
+            if len(vector) != self.config.dimension:
+                continue
+            entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+            replayed.append(VectorDocument(vector=vector, **entry))
+        self._add_many_to_index(replayed)
+        
+        logger.info(
+            f"Loaded vector snapshot generation {snapshot.generation}: "
+            f"{len(self.base_documents)} documents, {len(replayed)} replayed from WAL"
+        )
+        return True
+    
+    async def save_snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        Escribir snapshot con todos los documentos indexados y reiniciar el WAL.
+        
+        Se ejecuta en el event loop para que ningún index_document concurrente
+        quede fuera del snapshot; pensado para arranque y tareas de mantenimiento.
+        
+        Returns:
+            Manifest del snapshot o None si no hay almacén configurado
+        """
+        if not self.snapshot_store:
+            return None
+        
+        manifest = self._write_snapshot()
+        
+        # Recargar para que el índice base quede mapeado en memoria
+        self._reset_indexes()
+        self._load_snapshot()
+        
+        logger.audit("vector_snapshot_saved", {
+            "generation": manifest["generation"],
+            "documents": manifest["count"]
+        })
+        return manifest
+    
+    def _write_snapshot(self) -> Dict[str, Any]:
+        """Combinar índice base e índice delta en un snapshot nuevo."""
+        doc_ids, raw_records, document_types, languages, vectors = [], [], [], [], []
+        
+        if self.base_documents is not None:
+            base_vectors = self.base_index.reconstruct_n(0, self.base_index.ntotal)
+            for position in range(len(self.base_documents)):
+                doc_id = self.base_documents.doc_id(position)
+                if doc_id in self.document_store:
+                    continue  # Reemplazado por una versión más reciente
+                doc_ids.append(doc_id)
+                raw_records.append(self.base_documents.raw_record(position))
+                document_types.append(self.base_documents.document_types[self.base_documents.type_codes[position]])
+                languages.append(self.base_documents.languages[self.base_documents.language_codes[position]])
+                vectors.append(base_vectors[position])
+        
+        for doc in self.document_store.values():
+            record = encode_document_record(
+                doc.doc_id, doc.content, doc.metadata,
+                doc.language, doc.document_type, doc.created_at
+            )
+            doc_ids.append(doc.doc_id)
+            raw_records.append(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+            document_types.append(doc.document_type)
+            languages.append(doc.language)
+            vectors.append(doc.vector.reshape(-1))
+        
+        index = self._create_index()
+        if vectors:
+            index.add(np.vstack(vectors).astype(np.float32))
+        
+        return self.snapshot_store.write_snapshot(index, doc_ids, raw_records, document_types, languages)
+    
+    def _reset_indexes(self):
+        """Descartar índices en memoria (base y delta)."""
+        if self.base_documents is not None:
+            self.base_documents.close()
+        self.base_index = None
+        self.base_documents = None
+        self.vector_index = self._create_index()
+        self.document_store.clear()
+        self.index_to_doc_id.clear()
+        self.doc_id_to_index.clear()
+        self.delta_type_ids.clear()
+        self.delta_language_ids.clear()
+        self.shadowed_base_positions.clear()
+        self.next_index_id = 0
+    
     @handle_exceptions(logger)
     async def index_document(self, 
                            content: str,
@@ -277,6 +421,9 @@ class EnhancedVectorService:
             # Agregar al índice
             self._add_to_index(doc)
             
+            # Registrar en WAL para el próximo arranque
+            self._append_to_wal(doc)
+            
             # Persistir en Redis
             await self._persist_document(doc)
             
@@ -329,10 +476,14 @@ class EnhancedVectorService:
             # Generar embedding de la consulta
             query_embedding = await self._generate_embedding(query)
             
-            # Realizar búsqueda vectorial
-            raw_results = await self._vector_search(query_embedding, k * 2)  # Buscar más para filtrar
+            # Realizar búsqueda vectorial (los filtros se aplican dentro del índice)
+            raw_results = await self._vector_search(
+                query_embedding, k,
+                filter_type=filter_by_type,
+                filter_language=filter_by_language
+            )
             
-            # Aplicar filtros
+            # Aplicar umbral de similitud
             filtered_results = self._apply_filters(
                 raw_results,
                 filter_by_type,
@@ -380,13 +531,16 @@ class EnhancedVectorService:
             # Preprocesar texto para contexto médico
             processed_text = self._preprocess_medical_text(text)
             
-            # Generar embedding en hilo separado
-            loop = asyncio.get_event_loop()
-            embedding = await loop.run_in_executor(
-                None,
-                self.embedding_model.encode,
-                processed_text
-            )
+            # Generar embedding agrupado con consultas concurrentes
+            if self.embedding_batcher:
+                embedding = await self.embedding_batcher.embed(processed_text)
+            else:
+                loop = asyncio.get_event_loop()
+                embedding = await loop.run_in_executor(
+                    None,
+                    self.embedding_model.encode,
+                    processed_text
+                )
             
             # Convertir a numpy array si no lo es
             embedding = np.array(embedding, dtype=np.float32)
@@ -436,39 +590,216 @@ class EnhancedVectorService:
             vector = doc.vector.reshape(1, -1)
             self.vector_index.add(vector)
             
-            # Mantener mapeo de índice a doc_id
-            self.index_to_doc_id[self.next_index_id] = doc.doc_id
-            self.next_index_id += 1
-            
-            # Guardar documento
-            self.document_store[doc.doc_id] = doc
+            # Mantener mapeo de índice a doc_id, bitmaps y documento
+            self._register_delta_document(doc)
             
         except Exception as e:
             logger.error(f"Failed to add document to index: {e}")
             raise
     
-    async def _vector_search(self, query_vector: np.ndarray, k: int) -> List[VectorSearchResult]:
-        """Realizar búsqueda vectorial en el índice."""
-        if not self.vector_index or self.vector_index.ntotal == 0:
+    def _add_many_to_index(self, docs: List[VectorDocument]):
+        """Agregar varios documentos al índice con una sola llamada a FAISS."""
+        docs = [doc for doc in docs if doc.vector is not None]
+        if not self.vector_index or not docs:
+            return
+        
+        self.vector_index.add(np.vstack([doc.vector.reshape(1, -1) for doc in docs]).astype(np.float32))
+        for doc in docs:
+            self._register_delta_document(doc)
+    
+    def _register_delta_document(self, doc: VectorDocument):
+        """Registrar documento recién agregado al índice delta (id = next_index_id)."""
+        index_id = self.next_index_id
+        self.next_index_id += 1
+        
+        # Un doc_id reindexado deja su versión anterior fuera de las búsquedas
+        previous_id = self.doc_id_to_index.get(doc.doc_id)
+        if previous_id is not None:
+            previous = self.document_store[doc.doc_id]
+            self.index_to_doc_id.pop(previous_id, None)
+            self.delta_type_ids.get(previous.document_type, set()).discard(previous_id)
+            self.delta_language_ids.get(previous.language, set()).discard(previous_id)
+        elif self.base_documents is not None:
+            base_position = self.base_documents.position_of(doc.doc_id)
+            if base_position is not None:
+                self.shadowed_base_positions.add(base_position)
+        
+        self.index_to_doc_id[index_id] = doc.doc_id
+        self.doc_id_to_index[doc.doc_id] = index_id
+        self.delta_type_ids.setdefault(doc.document_type, set()).add(index_id)
+        self.delta_language_ids.setdefault(doc.language, set()).add(index_id)
+        self.document_store[doc.doc_id] = doc
+    
+    def _append_to_wal(self, doc: VectorDocument):
+        """Registrar documento en el WAL del snapshot."""
+        if not self.snapshot_store or doc.vector is None:
+            return
+        
+        try:
+            record = encode_document_record(
+                doc.doc_id, doc.content, doc.metadata,
+                doc.language, doc.document_type, doc.created_at
+            )
+            self.snapshot_store.append_wal(record, doc.vector)
+        except Exception as e:
+            logger.warning(f"Failed to append document {doc.doc_id} to WAL: {e}")
+    
+    def _get_base_document(self, position: int) -> Optional[VectorDocument]:
+        """Obtener documento del snapshot base por posición en el índice."""
+        record = self.base_documents.record(position)
+        return VectorDocument(
+            doc_id=record["doc_id"],
+            content=record["content"],
+            metadata=record["metadata"],
+            vector=None,
+            language=record["language"],
+            document_type=record["document_type"],
+            created_at=datetime.fromisoformat(record["created_at"])
+        )
+    
+    def _delta_selection(self,
+                         filter_type: Optional[str],
+                         filter_language: Optional[str]) -> Optional[np.ndarray]:
+        """Máscara de ids seleccionables del índice delta (None = todos)."""
+        total = self.vector_index.ntotal
+        if not filter_type and not filter_language and len(self.index_to_doc_id) == total:
+            return None
+        
+        selected = set(self.index_to_doc_id)
+        if filter_type:
+            selected &= self.delta_type_ids.get(filter_type, set())
+        if filter_language:
+            selected &= self.delta_language_ids.get(filter_language, set())
+        
+        mask = np.zeros(total, dtype=bool)
+        if selected:
+            mask[np.fromiter(selected, dtype=np.int64, count=len(selected))] = True
+        return mask
+    
+    def _base_selection(self,
+                        filter_type: Optional[str],
+                        filter_language: Optional[str]) -> Optional[np.ndarray]:
+        """Máscara de posiciones seleccionables del snapshot base (None = todas)."""
+        if not filter_type and not filter_language and not self.shadowed_base_positions:
+            return None
+        
+        documents = self.base_documents
+        mask = np.ones(len(documents), dtype=bool)
+        if filter_type:
+            if filter_type not in documents.document_types:
+                return np.zeros(len(documents), dtype=bool)
+            mask &= documents.type_codes == documents.document_types.index(filter_type)
+        if filter_language:
+            if filter_language not in documents.languages:
+                return np.zeros(len(documents), dtype=bool)
+            mask &= documents.language_codes == documents.languages.index(filter_language)
+        if self.shadowed_base_positions:
+            mask[list(self.shadowed_base_positions)] = False
+        return mask
+    
+    def _search_index(self,
+                      index,
+                      query_vector: np.ndarray,
+                      k: int,
+                      selection: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Buscar en un índice FAISS restringido a los ids seleccionados.
+        
+        Filtros muy selectivos se resuelven con comparación exhaustiva sobre
+        los candidatos; el resto usa un IDSelectorBitmap dentro del recorrido
+        del índice, ampliando efSearch en HNSW hasta obtener k resultados.
+        
+        Returns:
+            Tupla (distancias, ids) unidimensionales, ids -1 descartables
+        """
+        if selection is None:
+            distances, indices = index.search(query_vector, min(k, index.ntotal))
+            return distances[0], indices[0]
+        
+        candidates = np.flatnonzero(selection)
+        wanted = min(k, len(candidates))
+        if wanted == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        
+        if len(candidates) <= max(k, self.config.filtered_exact_scan_max):
+            self.search_stats["exact_scans"] += 1
+            vectors = index.reconstruct_batch(candidates)
+            distances = ((vectors - query_vector) ** 2).sum(axis=1)
+            order = np.argsort(distances)[:wanted]
+            return distances[order], candidates[order]
+        
+        # El bitmap debe seguir vivo mientras FAISS lo usa
+        bitmap = np.packbits(selection, bitorder="little")
+        selector = faiss.IDSelectorBitmap(bitmap)
+        
+        if not isinstance(index, faiss.IndexHNSW):
+            distances, indices = index.search(
+                query_vector, wanted, params=faiss.SearchParameters(sel=selector)
+            )
+            return distances[0], indices[0]
+        
+        # Escalar efSearch según selectividad y duplicarlo mientras falten resultados
+        selectivity = len(candidates) / index.ntotal
+        max_ef = max(self.config.filtered_max_ef_search, index.hnsw.efSearch)
+        ef_search = min(max_ef, max(index.hnsw.efSearch, int(np.ceil(wanted / selectivity))))
+        while True:
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+            distances, indices = index.search(query_vector, wanted, params=params)
+            if (indices[0] >= 0).sum() >= wanted or ef_search >= max_ef:
+                return distances[0], indices[0]
+            ef_search = min(max_ef, ef_search * 2)
+            self.search_stats["widened_searches"] += 1
+    
+    async def _vector_search(self,
+                             query_vector: np.ndarray,
+                             k: int,
+                             filter_type: Optional[str] = None,
+                             filter_language: Optional[str] = None) -> List[VectorSearchResult]:
+        """Realizar búsqueda vectorial filtrada en el índice base (snapshot) y el índice delta."""
+        base_total = self.base_index.ntotal if self.base_index is not None else 0
+        delta_total = self.vector_index.ntotal if self.vector_index else 0
+        if base_total + delta_total == 0:
             return []
         
+        if filter_type or filter_language:
+            self.search_stats["filtered_searches"] += 1
+        
         try:
             # Buscar vectores similares
-            query_vector = query_vector.reshape(1, -1)
-            distances, indices = self.vector_index.search(query_vector, min(k, self.vector_index.ntotal))
+            query_vector = query_vector.reshape(1, -1).astype(np.float32)
+            candidates = []
+            
+            if delta_total:
+                distances, indices = self._search_index(
+                    self.vector_index, query_vector, k,
+                    self._delta_selection(filter_type, filter_language)
+                )
+                for distance, index in zip(distances, indices):
+                    if index == -1:  # No encontrado
+                        continue
+                    
+                    # Obtener documento
+                    doc_id = self.index_to_doc_id.get(int(index))
+                    if not doc_id or doc_id not in self.document_store:
+                        continue
+                    
+                    candidates.append((distance, self.document_store[doc_id]))
+            
+            if base_total:
+                distances, indices = self._search_index(
+                    self.base_index, query_vector, k,
+                    self._base_selection(filter_type, filter_language)
+                )
+                for distance, index in zip(distances, indices):
+                    if index == -1:
+                        continue
+                    
+                    candidates.append((distance, self._get_base_document(int(index))))
+            
+            candidates.sort(key=lambda candidate: candidate[0])
             
             results = []
-            for distance, index in zip(distances[0], indices[0]):
-                if index == -1:  # No encontrado
-                    continue
-                
-                # Obtener documento
-                doc_id = self.index_to_doc_id.get(index)
-                if not doc_id or doc_id not in self.document_store:
-                    continue
-                
-                doc = self.document_store[doc_id]
-                
+            for distance, doc in candidates[:k]:
                 # Convertir distancia a similitud (cosine similarity)
                 similarity = 1.0 / (1.0 + distance) if distance > 0 else 1.0
                 
@@ -476,7 +807,7 @@ class EnhancedVectorService:
                     doc_id=doc.doc_id,
                     content=doc.content,
                     metadata=doc.metadata,
-                    similarity_score=similarity,
+                    similarity_score=float(similarity),
                     document_type=doc.document_type,
                     language=doc.language
                 )
@@ -628,15 +959,23 @@ class EnhancedVectorService:
     async def get_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del servicio."""
         return {
-            "indexed_documents": len(self.document_store),
-            "vector_index_size": self.vector_index.ntotal if self.vector_index else 0,
+            "indexed_documents": len(self.document_store) + (len(self.base_documents) if self.base_documents is not None else 0),
+            "vector_index_size": (self.vector_index.ntotal if self.vector_index else 0) + (self.base_index.ntotal if self.base_index is not None else 0),
             "embedding_cache_size": len(self.embedding_cache),
             "cache_stats": self.cache_stats.copy(),
+            "search_stats": self.search_stats.copy(),
+            "embedding_batching": self.embedding_batcher.get_stats() if self.embedding_batcher else None,
             "model_info": {
                 "name": self.config.model_name,
                 "dimension": self.config.dimension
             },
-            "redis_available": self.redis_client is not None
+            "redis_available": self.redis_client is not None,
+            "snapshot": {
+                "enabled": self.snapshot_store is not None,
+                "generation": self.snapshot_store.generation if self.snapshot_store else None,
+                "base_documents": len(self.base_documents) if self.base_documents is not None else 0,
+                "delta_documents": len(self.document_store)
+            }
         }
     
     async def index_medical_protocols(self):
@@ -713,13 +1052,28 @@ class EnhancedVectorService:
     async def cleanup(self):
         """Limpiar recursos."""
         try:
+            if self.embedding_batcher:
+                await self.embedding_batcher.close()
+            
             if self.redis_client:
                 await self.redis_client.close()
             
+            if self.snapshot_store:
+                self.snapshot_store.close()
+            
+            if self.base_documents is not None:
+                self.base_documents.close()
+            self.base_index = None
+            self.base_documents = None
+            
             # Limpiar caches
             self.embedding_cache.clear()
             self.document_store.clear()
             self.index_to_doc_id.clear()
+            self.doc_id_to_index.clear()
+            self.delta_type_ids.clear()
+            self.delta_language_ids.clear()
+            self.shadowed_base_positions.clear()
             
             logger.info("Vector service cleanup completed")
             
@@ -0,0 +1,474 @@
+"""
+Vector Snapshot Store - Snapshots persistentes del índice FAISS con WAL incremental.
+
+Permite arrancar el servicio vectorial sin reconstruir el índice desde Redis:
+- Índice FAISS en disco cargado vía mmap (páginas compartidas entre workers)
+- Tabla compacta doc-id/metadatos con offsets mapeados en memoria
+- Write-ahead log append-only de documentos indexados desde el último snapshot
+
+Layout del directorio (por generación `g`):
+    manifest.json           Generación activa, vocabularios y generaciones retiradas
+    snapshot.lock           Lock entre workers (escritura de snapshots y WAL)
+    index-g.faiss           Índice FAISS
+    docs-g.bin              Registros JSON concatenados (contenido y metadatos)
+    docs-g.offsets.npy      Offsets int64 (n + 1) dentro de docs-g.bin
+    docs-g.ids.npy          doc_id por posición del índice
+    docs-g.types.npy        Código de document_type por posición
+    docs-g.langs.npy        Código de idioma por posición
+    wal-g.log               Documentos indexados después del snapshot g
+
+Al publicar una generación nueva, la anterior se conserva durante un período
+de gracia para los workers que aún la tienen mapeada; se elimina en una
+escritura de snapshot posterior.
+"""
+
+import base64
+import json
+import mmap
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+import faiss
+import numpy as np
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: un único worker por directorio de snapshots
+    FCNTL_AVAILABLE = False
+
+from ..utils.secure_logger import SecureLogger
+
+logger = SecureLogger("vector_snapshot")
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "snapshot.lock"
+
+
+class SnapshotDocumentTable:
+    """Tabla compacta de documentos del snapshot respaldada por mmap."""
+
+    def __init__(self,
+                 records_path: Path,
+                 offsets: np.ndarray,
+                 doc_ids: np.ndarray,
+                 type_codes: np.ndarray,
+                 language_codes: np.ndarray,
+                 document_types: List[str],
+                 languages: List[str]):
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.type_codes = type_codes
+        self.language_codes = language_codes
+        self.document_types = document_types
+        self.languages = languages
+        self._positions: Optional[Dict[str, int]] = None
+
+        self._records_file = open(records_path, "rb")
+        size = os.fstat(self._records_file.fileno()).st_size
+        self._records = (
+            mmap.mmap(self._records_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def doc_id(self, position: int) -> str:
+        return str(self.doc_ids[position])
+
+    def raw_record(self, position: int) -> bytes:
+        """Registro JSON serializado tal como está en disco."""
+        return self._records[int(self.offsets[position]):int(self.offsets[position + 1])]
+
+    def record(self, position: int) -> Dict[str, Any]:
+        """Registro decodificado (doc_id, content, metadata, language, document_type, created_at)."""
+        return json.loads(self.raw_record(position))
+
+    def position_of(self, doc_id: str) -> Optional[int]:
+        """Posición de un doc_id en el índice base (mapa construido bajo demanda)."""
+        if self._positions is None:
+            self._positions = {str(d): i for i, d in enumerate(self.doc_ids)}
+        return self._positions.get(doc_id)
+
+    def close(self):
+        if isinstance(self._records, mmap.mmap):
+            self._records.close()
+        self._records_file.close()
+
+
+@dataclass
+class LoadedSnapshot:
+    """Snapshot cargado desde disco."""
+    generation: int
+    index: Any
+    documents: SnapshotDocumentTable
+    manifest: Dict[str, Any]
+
+
+class VectorSnapshotStore:
+    """Gestiona snapshots del índice vectorial y su write-ahead log."""
+
+    def __init__(self, snapshot_dir: str, fsync_wal: bool = False, retired_grace_seconds: float = 600.0):
+        """
+        Inicializar almacén de snapshots.
+
+        Args:
+            snapshot_dir: Directorio donde se guardan snapshots y WAL
+            fsync_wal: Forzar fsync tras cada escritura al WAL
+            retired_grace_seconds: Tiempo que se conservan los archivos de una
+                generación reemplazada antes de eliminarlos
+        """
+        self.snapshot_dir = Path(snapshot_dir)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.fsync_wal = fsync_wal
+        self.retired_grace_seconds = retired_grace_seconds
+        self.generation = 0
+        self._wal_file = None
+        self._wal_generation = None
+        self._lock_file = None
+        self._manifest_stamp = None
+
+    # Lock entre workers
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """
+        Lock del directorio: exclusivo para publicar un snapshot, compartido
+        para escribir en el WAL. Un append nunca se cruza con el cambio de
+        generación.
+        """
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+
+        if self._lock_file is None:
+            self._lock_file = open(self.snapshot_dir / LOCK_FILE, "a+b")
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    # Manifest
+
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        """Leer manifest del snapshot activo, si existe."""
+        path = self.snapshot_dir / MANIFEST_FILE
+        if not path.exists():
+            return None
+        try:
+            manifest = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Invalid snapshot manifest: {e}")
+            return None
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            logger.warning(f"Unsupported snapshot format: {manifest.get('format_version')}")
+            return None
+        return manifest
+
+    def _current_generation(self) -> Optional[int]:
+        """Generación publicada en el manifest (cacheada por inodo y mtime)."""
+        try:
+            stat = os.stat(self.snapshot_dir / MANIFEST_FILE)
+        except FileNotFoundError:
+            return None
+
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if self._manifest_stamp is None or self._manifest_stamp[0] != stamp:
+            manifest = self.read_manifest()
+            self._manifest_stamp = (stamp, manifest["generation"] if manifest else None)
+        return self._manifest_stamp[1]
+
+    def _path(self, kind: str, generation: int) -> Path:
+        names = {
+            "index": f"index-{generation}.faiss",
+            "records": f"docs-{generation}.bin",
+            "offsets": f"docs-{generation}.offsets.npy",
+            "ids": f"docs-{generation}.ids.npy",
+            "types": f"docs-{generation}.types.npy",
+            "langs": f"docs-{generation}.langs.npy",
+            "wal": f"wal-{generation}.log",
+        }
+        return self.snapshot_dir / names[kind]
+
+    # Load
+
+    def load(self, dimension: int) -> Optional[LoadedSnapshot]:
+        """
+        Cargar el snapshot activo vía mmap.
+
+        Args:
+            dimension: Dimensión esperada de los vectores
+
+        Returns:
+            Snapshot cargado o None si no existe o no es compatible
+        """
+        manifest = self.read_manifest()
+        if manifest is None:
+            return None
+
+        if manifest.get("dimension") != dimension:
+            logger.warning(
+                f"Snapshot dimension {manifest.get('dimension')} differs from {dimension}, ignoring"
+            )
+            return None
+
+        generation = manifest["generation"]
+        try:
+            # IO_FLAG_MMAP_IFC mapea los códigos sin copiarlos: el índice es solo lectura
+            index = faiss.read_index(
+                str(self._path("index", generation)),
+                faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+            )
+            documents = SnapshotDocumentTable(
+                records_path=self._path("records", generation),
+                offsets=np.load(self._path("offsets", generation), mmap_mode="r"),
+                doc_ids=np.load(self._path("ids", generation), mmap_mode="r"),
+                type_codes=np.load(self._path("types", generation), mmap_mode="r"),
+                language_codes=np.load(self._path("langs", generation), mmap_mode="r"),
+                document_types=manifest.get("document_types", []),
+                languages=manifest.get("languages", [])
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load vector snapshot generation {generation}: {e}")
+            return None
+
+        if index.ntotal != len(documents):
+            logger.warning("Snapshot index and document table sizes differ, ignoring")
+            documents.close()
+            return None
+
+        self.generation = generation
+        return LoadedSnapshot(generation, index, documents, manifest)
+
+    # Write-ahead log
+
+    def append_wal(self, record: Dict[str, Any], vector: np.ndarray):
+        """
+        Agregar un documento indexado al WAL de la generación activa.
+
+        Si otro worker publicó una generación nueva, el registro va al WAL de
+        esa generación (que es el que se reproduce al cargarla).
+        """
+        entry = dict(record)
+        entry["vector"] = base64.b64encode(
+            np.ascontiguousarray(vector, dtype=np.float32).tobytes()
+        ).decode("ascii")
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+        with self._locked(exclusive=False):
+            current = self._current_generation()
+            if current is not None and current != self.generation:
+                logger.info(f"Vector snapshot generation {current} published elsewhere, switching WAL")
+                self.generation = current
+
+            if self._wal_file is None or self._wal_generation != self.generation:
+                self._close_wal()
+                # O_APPEND: escrituras de varios workers no se intercalan dentro de una línea
+                fd = os.open(self._path("wal", self.generation), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                self._wal_file = os.fdopen(fd, "ab", buffering=0)
+                self._wal_generation = self.generation
+
+            self._wal_file.write(line)
+            if self.fsync_wal:
+                os.fsync(self._wal_file.fileno())
+
+    def iter_wal(self) -> Iterator[Dict[str, Any]]:
+        """Iterar registros del WAL de la generación activa (ignora una línea final truncada)."""
+        path = self._path("wal", self.generation)
+        if not path.exists():
+            return
+
+        with open(path, "rb") as wal:
+            for line in wal:
+                if not line.endswith(b"\n"):
+                    logger.warning("Ignoring truncated WAL tail")
+                    break
+                try:
+                    entry = json.loads(line)
+                    entry["vector"] = np.frombuffer(
+                        base64.b64decode(entry["vector"]), dtype=np.float32
+                    )
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Skipping corrupt WAL entry: {e}")
+                    continue
+                yield entry
+
+    def _close_wal(self):
+        if self._wal_file is not None:
+            self._wal_file.close()
+            self._wal_file = None
+            self._wal_generation = None
+
+    # Write
+
+    def write_snapshot(self,
+                       index: Any,
+                       doc_ids: Sequence[str],
+                       raw_records: Sequence[bytes],
+                       document_types: Sequence[str],
+                       languages: Sequence[str]) -> Dict[str, Any]:
+        """
+        Escribir un snapshot nuevo y activarlo.
+
+        Se ejecuta con el lock exclusivo del directorio, así que dos workers
+        nunca escriben la misma generación. Las entradas del WAL anterior que
+        el snapshot no incluye (indexadas por otros workers) se copian al WAL
+        nuevo antes de reemplazar atómicamente el manifest. La generación
+        anterior se retira y se elimina pasado el período de gracia.
+
+        Args:
+            index: Índice FAISS con los vectores en el mismo orden que doc_ids
+            doc_ids: doc_id por posición
+            raw_records: Registro JSON serializado por posición
+            document_types: document_type por posición
+            languages: Idioma por posición
+
+        Returns:
+            Manifest del snapshot escrito
+        """
+        with self._locked(exclusive=True):
+            return self._write_snapshot_locked(index, doc_ids, raw_records, document_types, languages)
+
+    def _write_snapshot_locked(self,
+                               index: Any,
+                               doc_ids: Sequence[str],
+                               raw_records: Sequence[bytes],
+                               document_types: Sequence[str],
+                               languages: Sequence[str]) -> Dict[str, Any]:
+        """Escribir y publicar el snapshot (con el lock exclusivo tomado)."""
+        previous = self.read_manifest()
+        # Sin snapshot previo, los workers escriben el WAL de la generación 0
+        previous_generation = previous["generation"] if previous else 0
+        generation = max(self.generation, previous_generation) + 1
+
+        type_vocab = sorted(set(document_types))
+        language_vocab = sorted(set(languages))
+        type_lookup = {value: code for code, value in enumerate(type_vocab)}
+        language_lookup = {value: code for code, value in enumerate(language_vocab)}
+
+        faiss.write_index(index, str(self._path("index", generation)))
+
+        offsets = np.zeros(len(raw_records) + 1, dtype=np.int64)
+        with open(self._path("records", generation), "wb") as records_file:
+            for position, raw in enumerate(raw_records):
+                records_file.write(raw)
+                offsets[position + 1] = offsets[position] + len(raw)
+
+        np.save(self._path("offsets", generation), offsets)
+        np.save(self._path("ids", generation), np.array(list(doc_ids), dtype=str))
+        np.save(self._path("types", generation),
+                np.array([type_lookup[t] for t in document_types], dtype=np.uint16))
+        np.save(self._path("langs", generation),
+                np.array([language_lookup[l] for l in languages], dtype=np.uint16))
+
+        carried = self._carry_over_wal(previous_generation, generation, set(doc_ids))
+        retired = self._retire_generations(previous, previous_generation)
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "generation": generation,
+            "dimension": index.d,
+            "count": len(raw_records),
+            "document_types": type_vocab,
+            "languages": language_vocab,
+            "retired": retired,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+
+        tmp_manifest = self.snapshot_dir / f"{MANIFEST_FILE}.{os.getpid()}.tmp"
+        tmp_manifest.write_text(json.dumps(manifest))
+        os.replace(tmp_manifest, self.snapshot_dir / MANIFEST_FILE)
+
+        self._close_wal()
+        self.generation = generation
+
+        logger.info(
+            f"Vector snapshot generation {generation} written ({len(raw_records)} documents, "
+            f"{carried} carried over from WAL)"
+        )
+        return manifest
+
+    def _carry_over_wal(self, previous_generation: int, generation: int, snapshot_ids: Set[str]) -> int:
+        """Copiar al WAL nuevo las entradas del WAL anterior que el snapshot no incluye."""
+        source = self._path("wal", previous_generation)
+        if not source.exists():
+            return 0
+
+        carried = 0
+        with open(source, "rb") as wal, open(self._path("wal", generation), "ab") as new_wal:
+            for line in wal:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    doc_id = json.loads(line)["doc_id"]
+                except (ValueError, KeyError):
+                    continue
+                if doc_id not in snapshot_ids:
+                    new_wal.write(line)
+                    carried += 1
+            if self.fsync_wal:
+                new_wal.flush()
+                os.fsync(new_wal.fileno())
+        return carried
+
+    def _retire_generations(self, previous: Optional[Dict[str, Any]],
+                            previous_generation: int) -> List[Dict[str, Any]]:
+        """
+        Retirar la generación anterior y eliminar las que superaron el período
+        de gracia.
+
+        Returns:
+            Generaciones retiradas que aún se conservan en disco
+        """
+        now = time.time()
+        retired = list(previous.get("retired", [])) if previous else []
+        retired.append({"generation": previous_generation, "retired_at": now})
+
+        kept = []
+        for entry in retired:
+            if now - entry["retired_at"] >= self.retired_grace_seconds:
+                self._remove_generation(entry["generation"])
+            else:
+                kept.append(entry)
+        return kept
+
+    def _remove_generation(self, generation: int):
+        """Eliminar archivos de una generación reemplazada."""
+        for kind in ("index", "records", "offsets", "ids", "types", "langs", "wal"):
+            try:
+                self._path(kind, generation).unlink()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Failed to remove snapshot file for generation {generation}: {e}")
+
+    def close(self):
+        """Cerrar el WAL y el lock abiertos."""
+        self._close_wal()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def encode_document_record(doc_id: str,
+                           content: str,
+                           metadata: Dict[str, Any],
+                           language: str,
+                           document_type: str,
+                           created_at: datetime) -> Dict[str, Any]:
+    """Registro serializable de un documento para snapshot y WAL."""
+    return {
+        "doc_id": doc_id,
+        "content": content,
+        "metadata": metadata,
+        "language": language,
+        "document_type": document_type,
+        "created_at": created_at.isoformat()
+    }
@@ -23,6 +23,7 @@ from ..core.input_packager import StandardizedInput
 from ..core.medical_dispatcher import TriageDecision
 from ..redis_layer.vector_service import VectorService
 from ..redis_layer.protocol_indexer import ProtocolIndexer
+from ..redis_layer.hybrid_retriever import HybridRetriever, HybridRetrievalConfig
 from ..utils.secure_logger import SecureLogger
 from ..ai.medgemma_client import MedGemmaClient
 
@@ -102,7 +103,8 @@ class EnhancedMedicalKnowledgeSystem:
     def __init__(self, 
                  vector_service: Optional[VectorService] = None,
                  protocol_indexer: Optional[ProtocolIndexer] = None,
-                 medgemma_client: Optional[MedGemmaClient] = None):
+                 medgemma_client: Optional[MedGemmaClient] = None,
+                 retrieval_config: Optional[HybridRetrievalConfig] = None):
         """
         Inicializar sistema de conocimiento médico enhazado.
         
@@ -110,11 +112,19 @@ class EnhancedMedicalKnowledgeSystem:
             vector_service: Servicio de búsqueda vectorial
             protocol_indexer: Indexador de protocolos médicos
             medgemma_client: Cliente MedGemma para IA generativa
+            retrieval_config: Configuración de la recuperación híbrida (RRF)
         """
         self.vector_service = vector_service or VectorService()
         self.protocol_indexer = protocol_indexer or ProtocolIndexer()
         self.medgemma_client = medgemma_client
         
+        # Búsqueda vectorial y de protocolos concurrente, fusionada con RRF
+        self.hybrid_retriever = HybridRetriever(
+            vector_service=self.vector_service,
+            protocol_indexer=self.protocol_indexer,
+            config=retrieval_config
+        )
+        
         # Base de conocimiento estructurado completa
         self.knowledge_base = self._initialize_comprehensive_knowledge_base()
         
@@ -857,16 +867,11 @@ class EnhancedMedicalKnowledgeSystem:
         query_id = hashlib.sha256(f"{query.session_id}_{query.query_text}".encode()).hexdigest()[:16]
         
         try:
-            # Búsqueda vectorial semántica
-            vector_results = await self.vector_service.search_similar(
+            # Búsqueda vectorial semántica + protocolos indexados (concurrente, RRF)
+            hybrid_results = await self.hybrid_retriever.search(
                 query.query_text,
                 k=5,
-                filter_by_type="medical_protocol"
-            )
-            
-            # Búsqueda en protocolos indexados
-            protocol_results = await self.protocol_indexer.search_protocols(
-                query.query_text,
+                document_type="medical_protocol",
                 query_type=query.query_type.value
             )
             
@@ -875,8 +880,7 @@ class EnhancedMedicalKnowledgeSystem:
             
             # Combinar y rankear resultados
             combined_results = self._combine_search_results(
-                vector_results, 
-                protocol_results, 
+                hybrid_results,
                 structured_results
             )
             
@@ -1051,24 +1055,16 @@ class EnhancedMedicalKnowledgeSystem:
         return min(1.0, relevance)
     
     def _combine_search_results(self, 
-                               vector_results: List[Dict[str, Any]],
-                               protocol_results: List[Dict[str, Any]], 
+                               hybrid_results: List[Dict[str, Any]],
                                structured_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Combinar y rankear resultados de búsqueda."""
         all_results = []
         
-        # Agregar resultados vectoriales
-        for result in vector_results:
-            all_results.append({
-                **result,
-                "source_type": "vector_search"
-            })
-        
-        # Agregar resultados de protocolos
-        for result in protocol_results:
+        # Agregar resultados híbridos (vectoriales + protocolos, ya fusionados)
+        for result in hybrid_results:
             all_results.append({
                 **result,
-                "source_type": "protocol_index"
+                "source_type": "hybrid_search"
             })
         
         # Agregar resultados estructurados
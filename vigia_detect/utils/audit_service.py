@@ -11,10 +11,12 @@ Responsabilidades:
 """
 
 import asyncio
+import atexit
 import hashlib
 import json
+import weakref
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
 from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
@@ -24,6 +26,17 @@ from .secure_logger import SecureLogger
 
 logger = SecureLogger("audit_service")
 
+# Filtros de búsqueda con índice por igualdad: filtro -> prefijo del set
+SEARCH_INDEX_PREFIXES = {
+    "event_type": "audit_index:type",
+    "session_id": "audit_index:session",
+    "component": "audit_index:component",
+    "compliance_standard": "audit_index:compliance"
+}
+SEARCH_DAYS_KEY = "audit_index:days"  # Sorted set de días con eventos (score YYYYMMDD)
+SEARCH_FETCH_BATCH_SIZE = 100  # Eventos por pipeline de lectura
+SHUTDOWN_FLUSH_TIMEOUT = 5.0  # Espera máxima (segundos) del flush en un loop de otro hilo
+
 
 class AuditEventType(Enum):
     """Tipos de eventos de auditoría."""
@@ -119,15 +132,39 @@ class AuditService:
     Servicio de auditoría transversal para todo el sistema.
     """
     
-    def __init__(self, redis_url: Optional[str] = None):
+    def __init__(self,
+                 redis_url: Optional[str] = None,
+                 write_batch_size: int = 100,
+                 write_flush_interval: float = 0.05):
         """
         Inicializar servicio de auditoría.
         
         Args:
             redis_url: URL de Redis para persistencia
+            write_batch_size: Eventos por pipeline antes de forzar un flush
+            write_flush_interval: Espera máxima (segundos) de un evento en el buffer
         """
         self.redis_url = redis_url or "redis://localhost:6379/3"  # DB dedicada para auditoría
         self.redis_client = None
+        _audit_services.add(self)  # Flush de eventos pendientes al apagar
+        
+        # Buffer de escritura: los eventos se agrupan en pipelines
+        self.write_batch_size = write_batch_size
+        self.write_flush_interval = write_flush_interval
+        self.max_buffered_events = write_batch_size * 10  # Backpressure
+        self._write_buffer: List[AuditEvent] = []
+        self._write_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._legacy_days_registered = False
+        self.write_stats = {
+            "events_buffered": 0,
+            "events_flushed": 0,
+            "flushes": 0,
+            "durable_flushes": 0,
+            "failed_events": 0
+        }
         
         # Configuración de retención
         self.retention_config = {
@@ -260,16 +297,8 @@ class AuditService:
                 requires_alert=requires_alert
             )
             
-            # Guardar en Redis
-            await self._save_audit_event(audit_event)
-            
-            # Actualizar trail de sesión si aplica
-            if session_id:
-                await self._update_session_trail(session_id, audit_event)
-            
-            # Enviar alerta si es necesario
-            if requires_alert:
-                await self._send_alert(audit_event)
+            # Encolar escritura (evento, índices, trail de sesión y alerta)
+            await self._buffer_event(audit_event)
             
             # Log interno (sin PII)
             logger.audit("audit_event_logged", {
@@ -310,6 +339,9 @@ class AuditService:
             AuditTrail o None si no existe
         """
         try:
+            # Persistir eventos pendientes antes de leer
+            await self.flush()
+            
             # Obtener eventos de la sesión
             events = await self._get_session_events(session_id)
             
@@ -361,6 +393,8 @@ class AuditService:
             Dict con reporte de compliance
         """
         try:
+            await self.flush()
+            
             # Obtener eventos relevantes
             events = await self._get_events_by_compliance(standard, start_date, end_date)
             
@@ -468,31 +502,18 @@ class AuditService:
             Lista de eventos de auditoría
         """
         try:
-            # Obtener todas las claves de eventos en el rango de tiempo
-            start_time = filters.get("start_time")
-            end_time = filters.get("end_time", datetime.now(timezone.utc))
-            
-            # Buscar por patrón en Redis
-            pattern = "audit_event:*"
-            event_keys = await self.redis_client.keys(pattern)
+            # Persistir eventos pendientes antes de leer
+            await self.flush()
             
             events = []
-            for key in event_keys:
+            
+            # Los eventos llegan del más reciente al más antiguo
+            async for event in self._iter_matching_events(filters):
+                events.append(event)
                 if len(events) >= limit:
                     break
-                
-                event_data = await self.redis_client.hgetall(key)
-                if event_data:
-                    event = self._deserialize_event(event_data)
-                    
-                    # Aplicar filtros
-                    if self._matches_filters(event, filters):
-                        events.append(event)
             
-            # Ordenar por timestamp
-            events.sort(key=lambda e: e.timestamp, reverse=True)
-            
-            return events[:limit]
+            return events
             
         except Exception as e:
             logger.error("event_search_failed", {
@@ -501,6 +522,150 @@ class AuditService:
             })
             return []
     
+    async def _iter_matching_events(self, filters: Dict[str, Any]) -> AsyncIterator[AuditEvent]:
+        """
+        Ejecutar plan de búsqueda: recorrer días desde el más reciente,
+        intersectar la línea de tiempo del día con los índices de igualdad
+        y leer los eventos candidatos en lotes pipelined.
+        
+        Args:
+            filters: Filtros de búsqueda
+            
+        Yields:
+            Eventos que cumplen los filtros, del más reciente al más antiguo
+        """
+        start_time = filters.get("start_time")
+        end_time = filters.get("end_time") or datetime.now(timezone.utc)
+        
+        index_keys = [
+            f"{prefix}:{self._index_value(filters[name])}"
+            for name, prefix in SEARCH_INDEX_PREFIXES.items()
+            if filters.get(name) is not None
+        ]
+        
+        min_score = start_time.timestamp() if start_time else "-inf"
+        max_score = end_time.timestamp()
+        
+        for date_key in await self._plan_search_days(start_time, end_time):
+            async for event_ids in self._iter_day_candidates(date_key, index_keys, min_score, max_score):
+                for event in await self._fetch_events(event_ids):
+                    if self._matches_filters(event, filters):
+                        yield event
+    
+    async def _plan_search_days(self,
+                              start_time: Optional[datetime],
+                              end_time: datetime) -> List[str]:
+        """Días a recorrer (YYYYMMDD), del más reciente al más antiguo."""
+        if start_time is None:
+            # Sin inicio: días registrados en el índice de días (incluidos
+            # los días anteriores a ese índice)
+            await self._register_legacy_days()
+            days = await self.redis_client.zrevrangebyscore(
+                SEARCH_DAYS_KEY, int(end_time.strftime("%Y%m%d")), "-inf"
+            )
+            return [day.decode() if isinstance(day, bytes) else day for day in days]
+        
+        days = []
+        current_date = end_time.date()
+        while current_date >= start_time.date():
+            days.append(current_date.strftime("%Y%m%d"))
+            current_date -= timedelta(days=1)
+        return days
+    
+    async def _register_legacy_days(self):
+        """
+        Registrar en el índice de días los días escritos antes de que existiera,
+        a partir de sus sets audit_index:date:*. Se ejecuta una vez por instancia
+        (SCAN incremental, nunca KEYS).
+        """
+        if self._legacy_days_registered:
+            return
+        
+        prefix = "audit_index:date:"
+        legacy_days = {}
+        async for key in self.redis_client.scan_iter(match=f"{prefix}*", count=500):
+            date_key = (key.decode() if isinstance(key, bytes) else key)[len(prefix):]
+            if date_key.isdigit() and len(date_key) == 8:
+                legacy_days[date_key] = int(date_key)
+        
+        if legacy_days:
+            await self.redis_client.zadd(SEARCH_DAYS_KEY, legacy_days)
+        self._legacy_days_registered = True
+    
+    async def _iter_day_candidates(self,
+                                 date_key: str,
+                                 index_keys: List[str],
+                                 min_score: Any,
+                                 max_score: float) -> AsyncIterator[List[str]]:
+        """IDs candidatos de un día, en lotes y en orden de timestamp descendente."""
+        timeline_key = f"audit_timeline:{date_key}"
+        
+        if await self.redis_client.exists(timeline_key):
+            if not index_keys:
+                # Solo rango de tiempo: paginar la línea de tiempo
+                offset = 0
+                while True:
+                    event_ids = await self.redis_client.zrevrangebyscore(
+                        timeline_key, max_score, min_score,
+                        start=offset, num=SEARCH_FETCH_BATCH_SIZE
+                    )
+                    if not event_ids:
+                        return
+                    yield event_ids
+                    if len(event_ids) < SEARCH_FETCH_BATCH_SIZE:
+                        return
+                    offset += len(event_ids)
+            
+            # Intersección conservando el timestamp de la línea de tiempo como score
+            weights = {timeline_key: 1, **{key: 0 for key in index_keys}}
+            scored = await self.redis_client.zinter(weights, withscores=True)
+            lower = float(min_score)
+            event_ids = [
+                event_id for event_id, score in reversed(scored)
+                if lower <= score <= max_score
+            ]
+        else:
+            # Días anteriores a la línea de tiempo: índice por fecha
+            date_index = f"audit_index:date:{date_key}"
+            if index_keys:
+                event_ids = await self.redis_client.sinter([date_index] + index_keys)
+            else:
+                event_ids = await self.redis_client.smembers(date_index)
+            # Los IDs incluyen el timestamp (AUD_YYYYMMDD_HHMMSS_xxx)
+            event_ids = sorted(event_ids, reverse=True)
+        
+        for i in range(0, len(event_ids), SEARCH_FETCH_BATCH_SIZE):
+            yield event_ids[i:i + SEARCH_FETCH_BATCH_SIZE]
+    
+    async def _fetch_events(self, event_ids: List[Any]) -> List[AuditEvent]:
+        """Leer eventos en un solo pipeline, omitiendo los expirados."""
+        if not event_ids:
+            return []
+        
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for event_id in event_ids:
+                event_id_str = event_id.decode() if isinstance(event_id, bytes) else event_id
+                pipe.hgetall(f"audit_event:{event_id_str}")
+            results = await pipe.execute()
+        
+        return [
+            self._deserialize_event(self._decode_hash(event_data))
+            for event_data in results if event_data
+        ]
+    
+    @staticmethod
+    def _decode_hash(data: Dict[Any, Any]) -> Dict[str, Any]:
+        """Decodificar hash de Redis (cliente sin decode_responses)."""
+        return {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in data.items()
+        }
+    
+    @staticmethod
+    def _index_value(value: Any) -> str:
+        """Valor de filtro tal como aparece en las claves de índice."""
+        return value.value if isinstance(value, Enum) else str(value)
+    
     def _generate_event_id(self) -> str:
         """Generar ID único para evento."""
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
@@ -611,8 +776,142 @@ class AuditService:
         
         return event_type in alert_events
     
-    async def _save_audit_event(self, event: AuditEvent):
-        """Guardar evento en Redis."""
+    async def _buffer_event(self, event: AuditEvent):
+        """
+        Añadir evento al buffer de escritura.
+        
+        Los eventos CRITICAL se escriben antes de retornar, en una transacción
+        MULTI junto con todos los eventos anteriores aún en el buffer, de modo
+        que el trail persistido conserva el orden de registro.
+        """
+        self._bind_write_loop()
+        self._write_buffer.append(event)
+        self.write_stats["events_buffered"] += 1
+        
+        if event.severity == AuditSeverity.CRITICAL or len(self._write_buffer) >= self.max_buffered_events:
+            await self.flush()
+            return
+        
+        self._ensure_flusher()
+        if len(self._write_buffer) >= self.write_batch_size:
+            self._flush_requested.set()
+    
+    def _bind_write_loop(self):
+        """Crear primitivas de sincronización en el event loop actual."""
+        loop = asyncio.get_running_loop()
+        if self._write_loop is not loop:
+            self._write_loop = loop
+            self._flush_lock = asyncio.Lock()
+            self._flush_requested = asyncio.Event()
+            self._flusher_task = None
+    
+    def _ensure_flusher(self):
+        """Iniciar tarea de flush en segundo plano si no está activa."""
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.create_task(self._write_flusher())
+    
+    async def _write_flusher(self):
+        """Flush periódico del buffer (por tamaño o por tiempo)."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.write_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            
+            if not self._write_buffer:
+                continue
+            
+            try:
+                await self.flush()
+            except Exception:
+                # flush() ya registró el fallo y el fallback de los eventos
+                pass
+    
+    async def flush(self):
+        """
+        Escribir en Redis todos los eventos del buffer en un único pipeline.
+        
+        Raises:
+            Exception: Si Redis rechaza el pipeline (los eventos quedan en el log de fallback)
+        """
+        self._bind_write_loop()
+        
+        async with self._flush_lock:
+            if not self._write_buffer:
+                return
+            
+            batch = self._write_buffer
+            self._write_buffer = []
+            durable = any(event.severity == AuditSeverity.CRITICAL for event in batch)
+            
+            try:
+                async with self.redis_client.pipeline(transaction=durable) as pipe:
+                    for event in batch:
+                        self._save_audit_event(pipe, event)
+                        if event.session_id:
+                            self._update_session_trail(pipe, event.session_id, event)
+                        if event.requires_alert:
+                            self._send_alert(pipe, event)
+                    await pipe.execute()
+                    
+            except Exception as e:
+                self.write_stats["failed_events"] += len(batch)
+                logger.error("audit_flush_failed", {
+                    "events": len(batch),
+                    "durable": durable,
+                    "error": str(e)
+                })
+                # En caso de falla, usar logging como fallback
+                for event in batch:
+                    logger.audit(f"fallback_{event.event_type.value}", {
+                        "event_id": event.event_id,
+                        "component": event.component,
+                        "action": event.action,
+                        "details": event.details,
+                        "error": "audit_service_unavailable"
+                    })
+                raise
+            
+            self.write_stats["flushes"] += 1
+            self.write_stats["events_flushed"] += len(batch)
+            if durable:
+                self.write_stats["durable_flushes"] += 1
+            
+            for event in batch:
+                if event.requires_alert:
+                    logger.audit("audit_alert_sent", {
+                        "alert_id": f"ALERT_{event.event_id}",
+                        "event_id": event.event_id,
+                        "severity": event.severity.value
+                    })
+    
+    async def close(self):
+        """Detener flush en segundo plano y persistir eventos pendientes."""
+        self._bind_write_loop()
+        
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+        
+        await self.flush()
+    
+    async def _flush_with_new_client(self):
+        """Persistir el buffer cuando el loop del cliente Redis ya está cerrado."""
+        client = self.redis_client
+        self.redis_client = redis.from_url(self.redis_url)
+        try:
+            await self.flush()
+        finally:
+            await self.redis_client.close()
+            self.redis_client = client
+    
+    def _save_audit_event(self, pipe, event: AuditEvent):
+        """Encolar escritura del evento en el pipeline."""
         key = f"audit_event:{event.event_id}"
         
         # Serializar evento
@@ -635,7 +934,7 @@ class AuditService:
         }
         
         # Guardar en Redis
-        await self.redis_client.hset(key, mapping=data)
+        pipe.hset(key, mapping=data)
         
         # Set TTL basado en severidad
         ttl_config = {
@@ -646,85 +945,80 @@ class AuditService:
         }
         
         ttl_seconds = int(ttl_config[event.severity].total_seconds())
-        await self.redis_client.expire(key, ttl_seconds)
+        pipe.expire(key, ttl_seconds)
         
         # Añadir a índices para búsqueda
-        await self._update_search_indices(event)
+        self._update_search_indices(pipe, event)
     
-    async def _update_search_indices(self, event: AuditEvent):
-        """Actualizar índices de búsqueda."""
+    def _update_search_indices(self, pipe, event: AuditEvent):
+        """Encolar actualización de índices de búsqueda."""
         timestamp_key = event.timestamp.strftime("%Y%m%d")
+        index_ttl = int(self.retention_config["critical_events"].total_seconds())
         
         # Índice por fecha
-        await self.redis_client.sadd(f"audit_index:date:{timestamp_key}", event.event_id)
-        await self.redis_client.expire(f"audit_index:date:{timestamp_key}", 
-                                     int(self.retention_config["critical_events"].total_seconds()))
+        pipe.sadd(f"audit_index:date:{timestamp_key}", event.event_id)
+        pipe.expire(f"audit_index:date:{timestamp_key}", index_ttl)
+        
+        # Línea de tiempo del día (score = timestamp) y registro del día
+        pipe.zadd(f"audit_timeline:{timestamp_key}", {event.event_id: event.timestamp.timestamp()})
+        pipe.expire(f"audit_timeline:{timestamp_key}", index_ttl)
+        pipe.zadd(SEARCH_DAYS_KEY, {timestamp_key: int(timestamp_key)})
         
         # Índice por tipo de evento
-        await self.redis_client.sadd(f"audit_index:type:{event.event_type.value}", event.event_id)
+        pipe.sadd(f"audit_index:type:{event.event_type.value}", event.event_id)
         
         # Índice por sesión
         if event.session_id:
-            await self.redis_client.sadd(f"audit_index:session:{event.session_id}", event.event_id)
+            pipe.sadd(f"audit_index:session:{event.session_id}", event.event_id)
         
         # Índice por componente
-        await self.redis_client.sadd(f"audit_index:component:{event.component}", event.event_id)
+        pipe.sadd(f"audit_index:component:{event.component}", event.event_id)
+        
+        # Índice por estándar de compliance
+        for standard in event.compliance_flags:
+            pipe.sadd(f"audit_index:compliance:{standard.value}", event.event_id)
     
-    async def _update_session_trail(self, session_id: str, event: AuditEvent):
-        """Actualizar trail de sesión."""
+    def _update_session_trail(self, pipe, session_id: str, event: AuditEvent):
+        """Encolar actualización del trail de sesión."""
         trail_key = f"audit_trail:{session_id}"
         
         # Añadir evento al trail
-        await self.redis_client.lpush(trail_key, event.event_id)
+        pipe.lpush(trail_key, event.event_id)
         
         # Mantener solo últimos 100 eventos por sesión
-        await self.redis_client.ltrim(trail_key, 0, 99)
+        pipe.ltrim(trail_key, 0, 99)
         
         # Set TTL para el trail
-        await self.redis_client.expire(trail_key, 
-                                     int(self.retention_config["high_events"].total_seconds()))
+        pipe.expire(trail_key, int(self.retention_config["high_events"].total_seconds()))
     
-    async def _send_alert(self, event: AuditEvent):
-        """Enviar alerta para evento crítico."""
-        try:
-            # En implementación completa, esto integraría con:
-            # - Sistema de notificaciones (email, SMS, Slack)
-            # - SIEM (Security Information and Event Management)
-            # - Monitoring tools (Grafana, DataDog)
-            
-            alert_data = {
-                "alert_id": f"ALERT_{event.event_id}",
-                "event_id": event.event_id,
-                "severity": event.severity.value,
-                "event_type": event.event_type.value,
-                "risk_score": event.risk_score,
-                "timestamp": event.timestamp.isoformat(),
-                "component": event.component,
-                "action": event.action,
-                "requires_immediate_attention": event.severity == AuditSeverity.CRITICAL
-            }
-            
-            # Guardar alerta
-            alert_key = f"audit_alert:{alert_data['alert_id']}"
-            await self.redis_client.hset(alert_key, mapping={
-                k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
-                for k, v in alert_data.items()
-            })
-            
-            # TTL de 30 días para alertas
-            await self.redis_client.expire(alert_key, 2592000)
-            
-            logger.audit("audit_alert_sent", {
-                "alert_id": alert_data["alert_id"],
-                "event_id": event.event_id,
-                "severity": event.severity.value
-            })
-            
-        except Exception as e:
-            logger.error("alert_send_failed", {
-                "event_id": event.event_id,
-                "error": str(e)
-            })
+    def _send_alert(self, pipe, event: AuditEvent):
+        """Encolar alerta para evento crítico."""
+        # En implementación completa, esto integraría con:
+        # - Sistema de notificaciones (email, SMS, Slack)
+        # - SIEM (Security Information and Event Management)
+        # - Monitoring tools (Grafana, DataDog)
+        
+        alert_data = {
+            "alert_id": f"ALERT_{event.event_id}",
+            "event_id": event.event_id,
+            "severity": event.severity.value,
+            "event_type": event.event_type.value,
+            "risk_score": event.risk_score,
+            "timestamp": event.timestamp.isoformat(),
+            "component": event.component,
+            "action": event.action,
+            "requires_immediate_attention": event.severity == AuditSeverity.CRITICAL
+        }
+        
+        # Guardar alerta
+        alert_key = f"audit_alert:{alert_data['alert_id']}"
+        pipe.hset(alert_key, mapping={
+            k: json.dumps(v) if isinstance(v, (dict, list)) else str(v)
+            for k, v in alert_data.items()
+        })
+        
+        # TTL de 30 días para alertas
+        pipe.expire(alert_key, 2592000)
     
     async def _get_session_events(self, session_id: str) -> List[AuditEvent]:
         """Obtener eventos de una sesión."""
@@ -732,15 +1026,7 @@ class AuditService:
             trail_key = f"audit_trail:{session_id}"
             event_ids = await self.redis_client.lrange(trail_key, 0, -1)
             
-            events = []
-            for event_id in event_ids:
-                event_id_str = event_id.decode() if isinstance(event_id, bytes) else event_id
-                event_key = f"audit_event:{event_id_str}"
-                event_data = await self.redis_client.hgetall(event_key)
-                
-                if event_data:
-                    event = self._deserialize_event(event_data)
-                    events.append(event)
+            events = await self._fetch_events(event_ids)
             
             # Ordenar por timestamp
             events.sort(key=lambda e: e.timestamp)
@@ -819,31 +1105,13 @@ class AuditService:
                                       start_date: datetime,
                                       end_date: datetime) -> List[AuditEvent]:
         """Obtener eventos relevantes para un estándar de compliance."""
-        events = []
-        
-        # Buscar en índices por fecha
-        current_date = start_date
-        while current_date <= end_date:
-            date_key = current_date.strftime("%Y%m%d")
-            index_key = f"audit_index:date:{date_key}"
-            
-            event_ids = await self.redis_client.smembers(index_key)
-            
-            for event_id in event_ids:
-                event_id_str = event_id.decode() if isinstance(event_id, bytes) else event_id
-                event_key = f"audit_event:{event_id_str}"
-                event_data = await self.redis_client.hgetall(event_key)
-                
-                if event_data:
-                    event = self._deserialize_event(event_data)
-                    
-                    # Verificar si es relevante para el estándar
-                    if standard in event.compliance_flags:
-                        events.append(event)
-            
-            current_date += timedelta(days=1)
+        filters = {
+            "start_time": start_date,
+            "end_time": end_date,
+            "compliance_standard": standard
+        }
         
-        return events
+        return [event async for event in self._iter_matching_events(filters)]
     
     def _is_compliance_violation(self, event: AuditEvent, standard: ComplianceStandard) -> bool:
         """Verificar si el evento constituye una violación de compliance."""
@@ -945,6 +1213,12 @@ class AuditService:
             if event.user_id != filters["user_id"]:
                 return False
         
+        # Filtro por estándar de compliance
+        if "compliance_standard" in filters:
+            standard = self._index_value(filters["compliance_standard"])
+            if standard not in [f.value for f in event.compliance_flags]:
+                return False
+        
         return True
     
     async def _audit_retention_cleanup(self):
@@ -1047,6 +1321,54 @@ class AuditService:
                 await asyncio.sleep(1800)  # Retry en 30 minutos
 
 
+# Instancias vivas, para persistir sus buffers al apagar la app o el worker
+_audit_services: "weakref.WeakSet[AuditService]" = weakref.WeakSet()
+
+
+async def close_audit_services():
+    """
+    Cerrar todas las instancias de AuditService del proceso.
+    
+    Para el apagado de apps y workers con event loop: detiene los flushers
+    y persiste los eventos aún en buffer.
+    """
+    for service in list(_audit_services):
+        try:
+            await service.close()
+        except Exception as e:
+            logger.error("audit_service_close_failed", {"error": str(e)})
+
+
+def flush_audit_services_sync():
+    """
+    Persistir eventos en buffer fuera de un event loop (atexit, señales de worker).
+    
+    Cada instancia se cierra en su propio loop si sigue abierto. Si ese loop ya
+    se cerró (p. ej. tras asyncio.run), los eventos se escriben con un cliente
+    Redis nuevo en un loop temporal.
+    """
+    for service in list(_audit_services):
+        if not service._write_buffer:
+            continue
+        
+        loop = service._write_loop
+        try:
+            if loop is not None and loop.is_running():
+                asyncio.run_coroutine_threadsafe(service.close(), loop).result(SHUTDOWN_FLUSH_TIMEOUT)
+            elif loop is not None and not loop.is_closed():
+                loop.run_until_complete(service.close())
+            else:
+                asyncio.run(service._flush_with_new_client())
+        except Exception as e:
+            logger.error("audit_shutdown_flush_failed", {
+                "events": len(service._write_buffer),
+                "error": str(e)
+            })
+
+
+atexit.register(flush_audit_services_sync)
+
+
 # Singleton global para el servicio de auditoría
 _audit_service_instance = None
 
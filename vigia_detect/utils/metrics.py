@@ -0,0 +1,70 @@
+"""
+Lightweight in-process metrics for Vigia services.
+Provides fixed-bucket histograms used to tune batching and pooling layers.
+"""
+
+import bisect
+import threading
+from typing import Dict, Any, Optional, Sequence
+
+
+class Histogram:
+    """Fixed-bucket histogram with count/sum/min/max tracking."""
+
+    def __init__(self, name: str, buckets: Sequence[float]):
+        """
+        Initialize histogram.
+
+        Args:
+            name: Metric name, used in snapshots
+            buckets: Sorted upper bounds for each bucket (an overflow bucket is implicit)
+        """
+        self.name = name
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min: Optional[float] = None
+        self._max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record a single observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._min = value if self._min is None else min(self._min, value)
+            self._max = value if self._max is None else max(self._max, value)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self._count if self._count else 0.0
+
+    def reset(self):
+        """Discard all observations."""
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._count = 0
+            self._sum = 0.0
+            self._min = None
+            self._max = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a serializable view of the histogram."""
+        with self._lock:
+            labels = [f"le_{bound:g}" for bound in self.buckets] + ["le_inf"]
+            return {
+                "name": self.name,
+                "count": self._count,
+                "sum": self._sum,
+                "mean": self._sum / self._count if self._count else 0.0,
+                "min": self._min,
+                "max": self._max,
+                "buckets": dict(zip(labels, self._counts))
+            }